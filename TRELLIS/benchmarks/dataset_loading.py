@@ -0,0 +1,142 @@
+"""
+Benchmark of dataset loading on the CPU.
+
+Writes a synthetic dataset in the per-object layout (`latents/<model>/<sha256>.npz`,
+`voxels/<sha256>.ply`) and packs a copy of it into shards, raw and, if `zstandard` is
+installed, zstd compressed. Reports the size on disk, the time to read every record
+and the samples per second of `SLat` and `SparseStructure` through a DataLoader with
+0 and `num_workers` workers. Records read from the shards are checked against the files.
+Drop the page cache between runs to measure cold reads.
+
+    python benchmarks/dataset_loading.py [num_objects] [num_workers]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import pandas as pd
+import torch
+import utils3d
+from torch.utils.data import DataLoader
+from trellis.datasets import SLat, SparseStructure
+from trellis.datasets.shards import ShardWriter, ShardReader
+
+LATENT_MODEL = 'synthetic'
+RESOLUTION = 64
+
+
+def write_files(root, num_objects, seed=0):
+    """Per-object files as written by `encode_latent.py` and `voxelize.py`."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(root, 'latents', LATENT_MODEL))
+    os.makedirs(os.path.join(root, 'voxels'))
+    records = []
+    for i in range(num_objects):
+        sha256 = f'{i:064x}'
+        num_voxels = int(rng.integers(2000, 20000))
+        coords = np.unique(rng.integers(0, RESOLUTION, size=(num_voxels, 3)), axis=0).astype(np.uint8)
+        feats = rng.normal(size=(len(coords), 8)).astype(np.float32)
+        np.savez_compressed(os.path.join(root, 'latents', LATENT_MODEL, f'{sha256}.npz'), coords=coords, feats=feats)
+        utils3d.io.write_ply(os.path.join(root, 'voxels', f'{sha256}.ply'), (coords + 0.5) / RESOLUTION - 0.5)
+        records.append({
+            'sha256': sha256, 'aesthetic_score': 6.0, 'voxelized': True,
+            'num_voxels': len(coords), f'latent_{LATENT_MODEL}': True,
+        })
+    metadata = pd.DataFrame.from_records(records)
+    metadata.to_csv(os.path.join(root, 'metadata.csv'), index=False)
+    return metadata
+
+
+def write_shards(src, root, compression=None):
+    """Pack `src` into `root`, which gets only the metadata and the shards."""
+    os.makedirs(root)
+    shutil.copy(os.path.join(src, 'metadata.csv'), root)
+    sha256s = pd.read_csv(os.path.join(root, 'metadata.csv'))['sha256'].values
+    with ShardWriter(os.path.join(root, 'shards', 'latents', LATENT_MODEL), compression=compression) as writer:
+        for sha256 in sha256s:
+            data = np.load(os.path.join(src, 'latents', LATENT_MODEL, f'{sha256}.npz'))
+            writer.add(sha256, coords=data['coords'], feats=data['feats'])
+    with ShardWriter(os.path.join(root, 'shards', 'voxels'), compression=compression, attrs={'resolution': RESOLUTION}) as writer:
+        for sha256 in sha256s:
+            position = utils3d.io.read_ply(os.path.join(src, 'voxels', f'{sha256}.ply'))[0]
+            writer.add(sha256, coords=((position + 0.5) * RESOLUTION).astype(np.uint8))
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def samples_per_second(dataset, num_workers, batch_size=8):
+    loader = DataLoader(
+        dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers,
+        collate_fn=getattr(dataset, 'collate_fn', None),
+    )
+    start = time.time()
+    for _ in loader:
+        pass
+    return len(dataset) / (time.time() - start)
+
+
+def check(files_root, shards_root, sha256s):
+    latents = ShardReader(os.path.join(shards_root, 'shards', 'latents', LATENT_MODEL))
+    voxels = ShardReader(os.path.join(shards_root, 'shards', 'voxels'))
+    files_ss = SparseStructure(files_root, resolution=RESOLUTION)
+    shards_ss = SparseStructure(shards_root, resolution=RESOLUTION)
+    for sha256 in sha256s:
+        data = np.load(os.path.join(files_root, 'latents', LATENT_MODEL, f'{sha256}.npz'))
+        packed = latents[sha256]
+        assert np.array_equal(data['coords'], packed['coords']) and np.array_equal(data['feats'], packed['feats'])
+        assert voxels[sha256]['coords'].shape[0] == data['coords'].shape[0]
+        assert torch.equal(files_ss.get_instance(files_root, sha256)['ss'], shards_ss.get_instance(shards_root, sha256)['ss'])
+
+
+if __name__ == "__main__":
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tmpdir = tempfile.mkdtemp()
+    try:
+        files_root = os.path.join(tmpdir, 'files')
+        metadata = write_files(files_root, num_objects)
+        sha256s = list(metadata['sha256'].values)
+        roots = {'files': files_root}
+        compressions = [None]
+        try:
+            import zstandard
+            compressions.append('zstd')
+        except ImportError:
+            print("zstandard is not installed, skipping zstd shards")
+        for compression in compressions:
+            name = f'shards ({compression or "raw"})'
+            roots[name] = os.path.join(tmpdir, compression or 'raw')
+            start = time.time()
+            write_shards(files_root, roots[name], compression)
+            print(f"Packed {name} in {time.time() - start:.1f}s")
+            check(files_root, roots[name], sha256s[:50])
+
+        print(f"{'Layout':<20}{'Size (MB)':<12}{'Records/s':<12}{'SLat/s':<24}{'SparseStructure/s'}")
+        for name, root in roots.items():
+            if name == 'files':
+                start = time.time()
+                for sha256 in sha256s:
+                    data = np.load(os.path.join(root, 'latents', LATENT_MODEL, f'{sha256}.npz'))
+                    coords, feats = data['coords'], data['feats']
+            else:
+                reader = ShardReader(os.path.join(root, 'shards', 'latents', LATENT_MODEL))
+                start = time.time()
+                for sha256 in sha256s:
+                    reader.read(sha256)
+            records = num_objects / (time.time() - start)
+            slat = SLat(root, latent_model=LATENT_MODEL, min_aesthetic_score=0)
+            ss = SparseStructure(root, resolution=RESOLUTION, min_aesthetic_score=0)
+            slat_rates = [samples_per_second(slat, w) for w in (0, num_workers)]
+            ss_rates = [samples_per_second(ss, w) for w in (0, num_workers)]
+            print(
+                f"{name:<20}{dir_size(root) / 1024**2:<12.1f}{records:<12.0f}"
+                f"{' / '.join(f'{r:.0f}' for r in slat_rates):<24}{' / '.join(f'{r:.0f}' for r in ss_rates)}"
+            )
+        print(f"SLat/s and SparseStructure/s: 0 / {num_workers} DataLoader workers")
+    finally:
+        shutil.rmtree(tmpdir)
@@ -0,0 +1,87 @@
+"""
+Benchmark of the visibility estimators used by hole filling in `postprocess_mesh`.
+
+For each reference mesh, reports the time of the visibility pass and of the whole
+`_fill_holes` call, the number of faces found invisible, and how well the invisible set
+of each estimator agrees with the 1000-view rasterization (intersection over union).
+The rasterization baseline only runs when CUDA is available.
+
+    python benchmarks/fill_holes.py [mesh.ply mesh.glb ...]
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import torch
+import trimesh
+from trellis.utils.postprocessing_utils import _fill_holes
+from trellis.utils.visibility_utils import RasterizeVisibility, RayCastVisibility
+
+
+def normalize(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
+    mesh = mesh.copy()
+    mesh.apply_translation(-mesh.bounds.mean(axis=0))
+    mesh.apply_scale(0.95 / mesh.extents.max())
+    return mesh
+
+
+def reference_meshes():
+    """
+    Procedural meshes with hidden inner surfaces, plus any mesh given on the command line.
+    """
+    meshes = {}
+    meshes['sphere'] = trimesh.creation.icosphere(subdivisions=5)
+    # A sphere with a hidden inner shell
+    outer = trimesh.creation.icosphere(subdivisions=5)
+    inner = trimesh.creation.icosphere(subdivisions=4, radius=0.6)
+    inner.invert()
+    meshes['nested_spheres'] = trimesh.util.concatenate([outer, inner])
+    # A box with internal walls, like the double surfaces left by marching cubes
+    parts = [trimesh.creation.box(extents=[1, 1, 1])]
+    for x in [-0.25, 0, 0.25]:
+        wall = trimesh.creation.box(extents=[0.02, 0.9, 0.9])
+        wall.apply_translation([x, 0, 0])
+        parts.append(wall)
+    meshes['box_with_walls'] = trimesh.util.concatenate(parts).subdivide().subdivide()
+    for path in sys.argv[1:]:
+        meshes[os.path.basename(path)] = trimesh.load(path, force='mesh')
+    return {name: normalize(mesh) for name, mesh in meshes.items()}
+
+
+def timed(fn):
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.time()
+    out = fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return out, time.time() - start
+
+
+def iou(a: torch.Tensor, b: torch.Tensor) -> float:
+    union = (a | b).sum().item()
+    return (a & b).sum().item() / union if union > 0 else 1.0
+
+
+if __name__ == "__main__":
+    estimators = {}
+    if torch.cuda.is_available():
+        estimators['rasterize_1000'] = ('cuda', RasterizeVisibility(resolution=1024, num_views=1000))
+    estimators['raycast_50'] = ('cpu', RayCastVisibility(num_views=50))
+    estimators['raycast_100'] = ('cpu', RayCastVisibility(num_views=100))
+    estimators['raycast_100_centroid'] = ('cpu', RayCastVisibility(num_views=100, num_samples=1))
+
+    print(f"{'Mesh':<20}{'Faces':<10}{'Estimator':<24}{'Visibility (s)':<16}{'Fill holes (s)':<16}{'Invisible':<12}{'IoU':<8}{'Faces out':<10}")
+    for name, mesh in reference_meshes().items():
+        baseline = None
+        for est_name, (device, estimator) in estimators.items():
+            verts = torch.tensor(mesh.vertices, dtype=torch.float32, device=device)
+            faces = torch.tensor(mesh.faces, dtype=torch.int32, device=device)
+            visibility, t_vis = timed(lambda: estimator(verts, faces))
+            invisible = (visibility == 0).cpu()
+            if baseline is None and est_name.startswith('rasterize'):
+                baseline = invisible
+            (_, faces_out), t_fill = timed(lambda: _fill_holes(verts, faces, max_hole_size=0.04, max_hole_nbe=32, visibility=estimator))
+            agreement = f"{iou(invisible, baseline):.3f}" if baseline is not None else '-'
+            print(f"{name:<20}{faces.shape[0]:<10}{est_name:<24}{t_vis:<16.3f}{t_fill:<16.3f}{invisible.sum().item():<12}{agreement:<8}{faces_out.shape[0]:<10}")
@@ -0,0 +1,75 @@
+"""
+Benchmark of Gaussian file I/O.
+
+Compares the per-point PLY writer that `Gaussian.save_ply` used to have with the
+vectorized PLY path and the compact chunked format. Reports write and read times, file
+sizes and the largest reconstruction error of each attribute. The PLY round trip is
+checked to be bit-exact.
+
+    python benchmarks/gaussian_io.py [num_points ...]
+"""
+import os
+import sys
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from plyfile import PlyData, PlyElement
+from trellis.representations.gaussian import gaussian_io
+
+
+def random_attributes(num_points, sh_rest=0, seed=0):
+    rng = np.random.default_rng(seed)
+    rotation = rng.normal(size=(num_points, 4))
+    attrs = {
+        'xyz': rng.uniform(-0.5, 0.5, size=(num_points, 3)),
+        'f_dc': rng.normal(scale=0.5, size=(num_points, 3)),
+        'opacity': rng.normal(scale=2.0, size=(num_points, 1)),
+        'scale': rng.uniform(-8, -3, size=(num_points, 3)),
+        'rotation': rotation / np.linalg.norm(rotation, axis=1, keepdims=True),
+    }
+    if sh_rest > 0:
+        attrs['f_rest'] = rng.normal(scale=0.1, size=(num_points, 3 * sh_rest))
+    return {k: v.astype(np.float32) for k, v in attrs.items()}
+
+
+def write_ply_per_point(path, attrs):
+    """The PLY writer formerly in `Gaussian.save_ply`."""
+    xyz = attrs['xyz']
+    columns = [xyz, np.zeros_like(xyz)] + [attrs[f] for f in gaussian_io.FIELDS[1:] if f in attrs]
+    attributes = np.concatenate(columns, axis=1)
+    dtype_full = [(name, 'f4') for name in gaussian_io._ply_names(attrs)]
+    elements = np.empty(xyz.shape[0], dtype=dtype_full)
+    elements[:] = list(map(tuple, attributes))
+    PlyData([PlyElement.describe(elements, 'vertex')]).write(path)
+
+
+def timed(fn):
+    start = time.time()
+    out = fn()
+    return out, time.time() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [100_000, 500_000]
+    tmpdir = tempfile.mkdtemp()
+    print(f"{'Points':<10}{'Format':<22}{'Write (s)':<12}{'Read (s)':<12}{'Size (MB)':<12}{'Max error per field'}")
+    for num_points in sizes:
+        attrs = random_attributes(num_points, sh_rest=0)
+        path = os.path.join(tmpdir, 'gaussians.ply')
+
+        _, t_write = timed(lambda: write_ply_per_point(path, attrs))
+        print(f"{num_points:<10}{'ply (per point)':<22}{t_write:<12.3f}{'-':<12}{os.path.getsize(path) / 1e6:<12.2f}")
+
+        _, t_write = timed(lambda: gaussian_io.write_ply(path, attrs))
+        loaded, t_read = timed(lambda: gaussian_io.read_ply(path))
+        assert all(np.array_equal(loaded[k], attrs[k]) for k in attrs), "PLY round trip is not bit-exact"
+        print(f"{num_points:<10}{'ply (vectorized)':<22}{t_write:<12.3f}{t_read:<12.3f}{os.path.getsize(path) / 1e6:<12.2f}exact")
+
+        path = os.path.join(tmpdir, 'gaussians.trgs')
+        for bits in [16, None]:
+            _, t_write = timed(lambda: gaussian_io.write_compact(path, attrs, position_bits=bits))
+            loaded, t_read = timed(lambda: gaussian_io.read_compact(path))
+            errors = ', '.join(f"{k}: {np.abs(loaded[k] - attrs[k]).max():.1e}" for k in attrs)
+            name = f"compact ({bits or 32}-bit xyz)"
+            print(f"{num_points:<10}{name:<22}{t_write:<12.3f}{t_read:<12.3f}{os.path.getsize(path) / 1e6:<12.2f}{errors}")
@@ -0,0 +1,77 @@
+"""
+Benchmark and check of the 'dense' and 'sparse' FlexiCubes extraction of `SparseFeatures2Mesh`.
+
+Builds the features of a noisy spherical shell of voxels, as the mesh decoder outputs
+them, extracts the mesh with both modes on the CPU (and on CUDA when available) and
+reports the time, the peak CUDA memory and whether the two meshes are identical.
+Exits with an error if they differ.
+
+    python benchmarks/mesh_extraction.py [resolution ...]
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import torch
+from trellis.modules.sparse import SparseTensor
+from trellis.representations.mesh.cube2mesh import SparseFeatures2Mesh
+
+
+def shell_features(extractor, res, seed=0):
+    """Voxels within 1.5 voxels of a sphere, with the sdf of the sphere at their corners plus noise."""
+    generator = torch.Generator().manual_seed(seed)
+    grid = torch.stack(torch.meshgrid(*[torch.arange(res)] * 3, indexing='ij'), dim=-1).reshape(-1, 3)
+    radius = res * 0.35
+    center = torch.full((3,), res / 2)
+    distance = ((grid + 0.5 - center).norm(dim=-1) - radius).abs()
+    coords = grid[distance < 1.5].int()
+    corners = torch.tensor([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [0, 0, 1], [1, 0, 1], [0, 1, 1], [1, 1, 1]])
+    sdf = ((coords[:, None] + corners - center).norm(dim=-1) - radius) / res
+    sdf = sdf + 0.2 / res * torch.randn(sdf.shape, generator=generator)
+    feats = torch.zeros(coords.shape[0], extractor.feats_channels)
+    for name, value in [
+        ('sdf', sdf[..., None]),
+        ('deform', 0.1 * torch.randn(coords.shape[0], 8, 3, generator=generator)),
+        ('weights', 0.5 * torch.randn(coords.shape[0], 21, generator=generator)),
+    ]:
+        start, end = extractor.layouts[name]['range']
+        feats[:, start:end] = value.reshape(coords.shape[0], -1)
+    return coords, feats
+
+
+def extract(extractor, coords, feats, device):
+    coords = torch.cat([torch.zeros_like(coords[:, :1]), coords], dim=1).to(device)
+    # the extractor adds the sdf bias to the features in place
+    cubefeats = SparseTensor(feats.clone().to(device), coords)
+    if device == 'cuda':
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    start = time.time()
+    mesh = extractor(cubefeats)
+    if device == 'cuda':
+        torch.cuda.synchronize()
+    peak = torch.cuda.max_memory_allocated() / 1024**2 if device == 'cuda' else float('nan')
+    return mesh, time.time() - start, peak
+
+
+if __name__ == "__main__":
+    resolutions = [int(r) for r in sys.argv[1:]] or [64, 128]
+    devices = ['cpu'] + (['cuda'] if torch.cuda.is_available() else [])
+    failures = 0
+    print(f"{'Res':<6}{'Device':<8}{'Voxels':<10}{'Faces':<10}{'Dense (s)':<11}{'Sparse (s)':<12}{'Dense MB':<10}{'Sparse MB':<11}{'Identical'}")
+    for res in resolutions:
+        for device in devices:
+            # built for CUDA as in the mesh decoder, the tables follow the input to the CPU
+            extractors = {mode: SparseFeatures2Mesh(res=res, use_color=False, extract_mode=mode) for mode in ['dense', 'sparse']}
+            coords, feats = shell_features(extractors['dense'], res)
+            dense, dense_time, dense_peak = extract(extractors['dense'], coords, feats, device)
+            sparse, sparse_time, sparse_peak = extract(extractors['sparse'], coords, feats, device)
+            identical = torch.equal(dense.faces, sparse.faces) and torch.allclose(dense.vertices, sparse.vertices, atol=1e-6)
+            failures += not identical
+            print(
+                f"{res:<6}{device:<8}{coords.shape[0]:<10}{sparse.faces.shape[0]:<10}{dense_time:<11.2f}{sparse_time:<12.2f}"
+                f"{dense_peak:<10.0f}{sparse_peak:<11.0f}{identical}"
+            )
+    if failures:
+        print(f"{failures} extractions differ between the dense and sparse modes")
+        sys.exit(1)
@@ -0,0 +1,78 @@
+"""
+Benchmark of pipeline loading.
+
+Loads a pipeline the way `from_pretrained` used to (weights read into host memory,
+model built on the CPU, then moved to the GPU) and with the memory-mapped loader in
+its sequential, parallel and lazy variants. Reports the wall time of each and the
+time spent on every submodel. Run it twice to separate download from load time.
+
+    python benchmarks/model_loading.py [pipeline ...]
+"""
+import os
+import sys
+import time
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import torch
+from safetensors.torch import load_file
+from trellis import models
+from trellis.pipelines import TrellisTextTo3DPipeline
+
+
+def load_legacy(path):
+    """The former loading path: full state dict on the host, CPU model, then `.cuda()`."""
+    from huggingface_hub import hf_hub_download
+    is_local = os.path.exists(f"{path}/pipeline.json")
+    config_file = f"{path}/pipeline.json" if is_local else hf_hub_download(path, "pipeline.json")
+    with open(config_file, 'r') as f:
+        args = json.load(f)['args']
+    times = {}
+    for k, v in args['models'].items():
+        start = time.time()
+        try:
+            config_file, model_file = models.resolve_pretrained(f"{path}/{v}")
+        except Exception:
+            config_file, model_file = models.resolve_pretrained(v)
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+        model = getattr(models, config['name'])(**config['args'])
+        model.load_state_dict(load_file(model_file))
+        model.cuda()
+        torch.cuda.synchronize()
+        times[k] = time.time() - start
+    return times
+
+
+def timed(fn):
+    torch.cuda.synchronize()
+    start = time.time()
+    out = fn()
+    torch.cuda.synchronize()
+    return out, time.time() - start
+
+
+def report(name, total, times):
+    details = ', '.join(f"{k} {v:.2f}s" for k, v in times.items())
+    print(f"{name:<22}{total:<10.2f}{details}")
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or ["JeffreyXiang/TRELLIS-text-base", "JeffreyXiang/TRELLIS-text-large"]
+    for path in paths:
+        print(path)
+        print(f"{'Loader':<22}{'Total (s)':<10}{'Per submodel'}")
+        times, total = timed(lambda: load_legacy(path))
+        report('legacy', total, times)
+        torch.cuda.empty_cache()
+        for name, kwargs in [
+            ('mmap, sequential', {'num_workers': 1}),
+            ('mmap, parallel', {'num_workers': 4}),
+            ('mmap, lazy', {'lazy': True}),
+        ]:
+            pipeline, total = timed(lambda: TrellisTextTo3DPipeline.from_pretrained(path, device='cuda', **kwargs))
+            report(name, total, pipeline.models.load_times)
+            if pipeline.models.pending:
+                _, first_use = timed(lambda: pipeline.models['sparse_structure_flow_model'])
+                print(f"{'':<22}first use of sparse_structure_flow_model: {first_use:.2f}s")
+            del pipeline
+            torch.cuda.empty_cache()
@@ -0,0 +1,94 @@
+"""
+Simulation of the model pool of the scene app.
+
+Builds fake pipelines out of linear layers and switches between them under small
+device and host budgets, printing after every switch which submodels are on the device
+and how many disk loads, promotions and offloads happened. Runs on the CPU by default;
+pass "cuda" to move real weights between the GPU and pinned host memory and time the
+switches against loading from scratch. The switches are run with eagerly and with
+lazily loaded submodels; lazy loads must never take the device over its budget.
+
+    python benchmarks/model_pool.py [cpu|cuda]
+"""
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'poc_3d_scene'))
+import torch
+import torch.nn as nn
+from model_pool import ModelPool
+
+MB = 1024**2
+SUBMODELS = ['sparse_structure_flow_model', 'sparse_structure_decoder', 'slat_flow_model', 'slat_decoder_mesh', 'slat_decoder_gs']
+
+
+class LazyFakeModels(dict):
+    """Submodels built on first access, like `LazyModels`, checking the device budget as they load."""
+
+    def __init__(self, width, device, pool):
+        super().__init__()
+        self.width, self.device, self.pool = width, device, pool
+        self.pending = list(SUBMODELS)
+
+    def estimate_nbytes(self, key):
+        return (self.width * self.width + self.width) * 4
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.pending
+
+    def __missing__(self, key):
+        if key not in self.pending:
+            raise KeyError(key)
+        nbytes = self.estimate_nbytes(key)
+        assert self.pool.device_bytes + nbytes <= self.pool.device_budget, \
+            f"Loading {key} takes the device to {(self.pool.device_bytes + nbytes) / MB:.0f} MB"
+        self[key] = nn.Linear(self.width, self.width).to(self.device)
+        self.pending.remove(key)
+        return self[key]
+
+
+class FakePipeline:
+    def __init__(self, width, device, pool=None):
+        if pool is None:
+            self.models = {k: nn.Linear(width, width).to(device) for k in SUBMODELS}
+        else:
+            self.models = LazyFakeModels(width, device, pool)
+
+    def run(self):
+        first = self.models[SUBMODELS[0]]
+        x = torch.zeros(1, first.in_features, device=first.weight.device)
+        for k in SUBMODELS:
+            x = self.models[k](x)
+        return x
+
+
+def loader(widths, lazy=False):
+    pool = None
+
+    def load(name, device):
+        time.sleep(0.5)  # Stand-in for reading checkpoints from disk
+        return FakePipeline(widths[name], device, pool if lazy else None)
+
+    def bind(model_pool):
+        nonlocal pool
+        pool = model_pool
+    load.bind = bind
+    return load
+
+
+if __name__ == "__main__":
+    device = sys.argv[1] if len(sys.argv) > 1 else 'cpu'
+    widths = {'text-large': 2048, 'text-base': 1024, 'image-large': 2048}
+    for lazy in (False, True):
+        print(f"=== {'Lazy' if lazy else 'Eager'} submodels ===")
+        load = loader(widths, lazy)
+        pool = ModelPool(load, device=device, device_budget=48 * MB, host_budget=96 * MB)
+        load.bind(pool)
+        for name in ['text-large', 'text-base', 'text-large', 'image-large', 'text-base', 'text-large']:
+            start = time.time()
+            pool.get(name).run()
+            if device == 'cuda':
+                torch.cuda.synchronize()
+            print(f"Switch to {name}: {time.time() - start:.3f}s")
+            print(pool.format_stats())
+            print()
@@ -0,0 +1,71 @@
+"""
+Peak host memory of FlowEulerSampler.sample against step count for each trajectory policy.
+
+Runs on CPU with a tiny random-weight SparseStructureFlowModel. Every configuration is
+sampled in a fresh process so that the reported peak RSS is not polluted by earlier runs.
+
+    python benchmarks/sampler_memory.py
+"""
+import os
+os.environ.setdefault('ATTN_BACKEND', 'sdpa')
+import sys
+import resource
+import multiprocessing as mp
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+RESOLUTION = 32
+CHANNELS = 8
+STEPS = [10, 25, 50, 100]
+MODES = ['all', 'none', 'cpu', 'disk']
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(mode, steps, queue):
+    import torch
+    from trellis.models.sparse_structure_flow import SparseStructureFlowModel
+    from trellis.pipelines.samplers import FlowEulerCfgSampler
+
+    torch.manual_seed(0)
+    model = SparseStructureFlowModel(
+        resolution=RESOLUTION,
+        in_channels=CHANNELS,
+        model_channels=64,
+        cond_channels=64,
+        out_channels=CHANNELS,
+        num_blocks=2,
+        num_heads=4,
+        patch_size=4,
+    ).eval()
+    for p in model.parameters():
+        torch.nn.init.normal_(p, std=0.02)
+    sampler = FlowEulerCfgSampler(sigma_min=1e-5)
+    noise = torch.randn(1, CHANNELS, RESOLUTION, RESOLUTION, RESOLUTION)
+    cond = torch.randn(1, 16, 64)
+    neg_cond = torch.zeros_like(cond)
+
+    start = _peak_rss_mb()
+    ret = sampler.sample(model, noise, cond, neg_cond, steps=steps, verbose=False, trajectory=mode)
+    queue.put((_peak_rss_mb() - start, len(ret.trajectory_steps)))
+
+
+if __name__ == "__main__":
+    ctx = mp.get_context('spawn')
+    stats = {mode: [] for mode in MODES}
+    for mode in MODES:
+        for steps in STEPS:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(mode, steps, queue))
+            proc.start()
+            stats[mode].append(queue.get())
+            proc.join()
+
+    print("Peak RSS growth during sampling (MB), retained steps in parentheses")
+    print(f"{'Steps':<12}" + ''.join(f"{mode:<20}" for mode in MODES))
+    for i, steps in enumerate(STEPS):
+        row = ''.join(f"{f'{stats[mode][i][0]:.1f} ({stats[mode][i][1]})':<20}" for mode in MODES)
+        print(f"{steps:<12}{row}")
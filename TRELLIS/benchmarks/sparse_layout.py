@@ -0,0 +1,64 @@
+"""
+Check that the layout of a `SparseTensor` follows its coords across devices.
+
+Builds a ragged batch on the CPU, as the data loaders collate it, moves it to CUDA (when
+available) with `recursive_to_device`, as the trainers do, and back, and checks that the
+offsets and seqlens of the result and of everything derived from it (`detach`, indexing,
+`sparse_cat`, `SparseGroupNorm`) are on the device of the coords and match the coords.
+Exits with an error otherwise.
+
+    python benchmarks/sparse_layout.py
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import torch
+from trellis.modules import sparse as sp
+from trellis.utils.data_utils import recursive_to_device
+
+DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def ragged_batch(sizes, channels=32, resolution=16):
+    coords = []
+    for b, n in enumerate(sizes):
+        idx = torch.randperm(resolution ** 3)[:n]
+        xyz = torch.stack([idx // resolution ** 2, idx // resolution % resolution, idx % resolution], dim=1)
+        coords.append(torch.cat([torch.full((n, 1), b), xyz], dim=1))
+    coords = torch.cat(coords).int()
+    return sp.SparseTensor(feats=torch.randn(coords.shape[0], channels), coords=coords)
+
+
+def layout_errors(name, tensor):
+    errors = []
+    if tensor.offsets.device != tensor.coords.device:
+        errors.append(f"{name}: offsets on {tensor.offsets.device}, coords on {tensor.coords.device}")
+    else:
+        expected = torch.bincount(tensor.coords[:, 0].long(), minlength=tensor.shape[0])
+        if not torch.equal(tensor.seqlens, expected):
+            errors.append(f"{name}: seqlens {tensor.seqlens.tolist()}, expected {expected.tolist()}")
+    return errors
+
+
+if __name__ == "__main__":
+    torch.manual_seed(0)
+    print(f"Device: {DEVICE}")
+    x = ragged_batch([100, 37, 250, 1])
+    # the offsets are computed on the CPU before the batch moves
+    x.offsets
+    moved = recursive_to_device({'x': x}, DEVICE)['x']
+    norm = sp.SparseGroupNorm(8, 32).to(DEVICE)
+    derived = {
+        'to': moved,
+        'detach': moved.detach(),
+        'getitem': moved[torch.tensor([2, 0])],
+        'sparse_cat': sp.sparse_cat([moved, moved.detach()]),
+        'group_norm': norm(moved),
+        'cpu': moved.cpu(),
+    }
+    errors = [error for name, tensor in derived.items() for error in layout_errors(name, tensor)]
+    for error in errors:
+        print(error)
+    if errors:
+        sys.exit(1)
+    print(f"Layout follows the coords for {', '.join(derived)}")
@@ -0,0 +1,142 @@
+"""
+Micro-benchmark of the sparse attention preprocessing across voxel counts and batch sizes.
+
+Compares `calc_serialization` and `calc_window_partition` against the original per-window
+loop implementations kept below as references, and checks that both produce the same
+partitions. Runs on CUDA when available, otherwise on CPU.
+
+    python benchmarks/sparse_partition.py
+"""
+import os
+os.environ.setdefault('SPARSE_ATTN_BACKEND', 'sdpa')
+import sys
+import time
+import math
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import torch
+from easydict import EasyDict as edict
+import vox2seq
+from trellis.modules.sparse.attention.serialized_attn import calc_serialization, SerializeMode
+from trellis.modules.sparse.attention.windowed_attn import calc_window_partition
+
+
+DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
+VOXELS = [4096, 16384, 65536]
+BATCH_SIZES = [1, 4, 16]
+RESOLUTION = 64
+WINDOW = 64
+WINDOW_3D = 8
+REPEAT = 10
+
+
+def reference_serialization(tensor, window_size, shift_sequence=0, shift_window=(0, 0, 0)):
+    fwd_indices, bwd_indices, seq_lens, seq_batch_indices, offsets = [], [], [], [], [0]
+    serialize_coords = tensor.coords[:, 1:].clone()
+    serialize_coords += torch.tensor(shift_window, dtype=torch.int32, device=tensor.device).reshape(1, 3)
+    code = vox2seq.encode(serialize_coords, mode='z_order', permute=[0, 1, 2])
+    for bi, s in enumerate(tensor.layout):
+        num_points = s.stop - s.start
+        num_windows = (num_points + window_size - 1) // window_size
+        valid_window_size = num_points / num_windows
+        to_ordered = torch.argsort(code[s.start:s.stop])
+        if num_windows == 1:
+            fwd_indices.append(to_ordered + s.start)
+            bwd_indices.append(torch.zeros_like(to_ordered).scatter_(0, to_ordered, torch.arange(num_points, device=tensor.device)) + offsets[-1])
+            seq_lens.append(num_points)
+            seq_batch_indices.append(bi)
+            offsets.append(offsets[-1] + num_points)
+        else:
+            offset = 0
+            mids = [(i + 0.5) * valid_window_size + shift_sequence for i in range(num_windows)]
+            split = [math.floor(i * valid_window_size + shift_sequence) for i in range(num_windows + 1)]
+            bwd_index = torch.zeros((num_points,), dtype=torch.int64, device=tensor.device)
+            for i in range(num_windows):
+                valid_start, valid_end = split[i], split[i + 1]
+                padded_start = math.floor(mids[i] - 0.5 * window_size)
+                fwd_indices.append(to_ordered[torch.arange(padded_start, padded_start + window_size, device=tensor.device) % num_points])
+                offset += valid_start - padded_start
+                bwd_index.scatter_(0, fwd_indices[-1][valid_start-padded_start:valid_end-padded_start], torch.arange(offset, offset + valid_end - valid_start, device=tensor.device))
+                offset += padded_start + window_size - valid_start
+                fwd_indices[-1] += s.start
+            seq_lens.extend([window_size] * num_windows)
+            seq_batch_indices.extend([bi] * num_windows)
+            bwd_indices.append(bwd_index + offsets[-1])
+            offsets.append(offsets[-1] + num_windows * window_size)
+    return torch.cat(fwd_indices), torch.cat(bwd_indices), seq_lens, seq_batch_indices
+
+
+def reference_window_partition(tensor, window_size, shift_window=0):
+    DIM = tensor.coords.shape[1] - 1
+    shift_window = (shift_window,) * DIM
+    window_size = (window_size,) * DIM
+    shifted_coords = tensor.coords.clone()
+    shifted_coords[:, 1:] += torch.tensor(shift_window, device=tensor.device, dtype=torch.int32).unsqueeze(0)
+    MAX_COORDS = shifted_coords[:, 1:].max(dim=0).values.tolist()
+    NUM_WINDOWS = [math.ceil((mc + 1) / ws) for mc, ws in zip(MAX_COORDS, window_size)]
+    OFFSET = torch.cumprod(torch.tensor([1] + NUM_WINDOWS[::-1]), dim=0).tolist()[::-1]
+    shifted_coords[:, 1:] //= torch.tensor(window_size, device=tensor.device, dtype=torch.int32).unsqueeze(0)
+    shifted_indices = (shifted_coords * torch.tensor(OFFSET, device=tensor.device, dtype=torch.int32).unsqueeze(0)).sum(dim=1)
+    fwd_indices = torch.argsort(shifted_indices)
+    bwd_indices = torch.empty_like(fwd_indices)
+    bwd_indices[fwd_indices] = torch.arange(fwd_indices.shape[0], device=tensor.device)
+    seq_lens = torch.bincount(shifted_indices)
+    seq_batch_indices = torch.arange(seq_lens.shape[0], device=tensor.device, dtype=torch.int32) // OFFSET[0]
+    mask = seq_lens != 0
+    return fwd_indices, bwd_indices, seq_lens[mask].tolist(), seq_batch_indices[mask].tolist()
+
+
+def random_tensor(num_voxels, batch_size):
+    coords, layout, start = [], [], 0
+    for b in range(batch_size):
+        n = num_voxels // batch_size + b * 37     # ragged batch
+        idx = torch.randperm(RESOLUTION ** 3)[:n]
+        xyz = torch.stack([idx // RESOLUTION ** 2, idx // RESOLUTION % RESOLUTION, idx % RESOLUTION], dim=1)
+        coords.append(torch.cat([torch.full((n, 1), b), xyz], dim=1))
+        layout.append(slice(start, start + n))
+        start += n
+    coords = torch.cat(coords).int().to(DEVICE)
+    return edict(coords=coords, layout=layout, device=coords.device)
+
+
+def timeit(fn):
+    fn()
+    if DEVICE == 'cuda':
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(REPEAT):
+        fn()
+    if DEVICE == 'cuda':
+        torch.cuda.synchronize()
+    return (time.time() - start) / REPEAT * 1000
+
+
+def check_same_partition(ref, new, coords):
+    # Windows may list their points in a different order; compare them as sets
+    assert ref[2] == new[2] and ref[3] == new[3], "sequence metadata mismatch"
+    for fwd, bwd in [ref[:2], new[:2]]:
+        assert torch.equal(coords[fwd][bwd], coords), "backward indices do not invert forward indices"
+    for r, n in zip(ref[0].split(ref[2]), new[0].split(new[2])):
+        assert torch.equal(r.sort().values, n.sort().values), "window content mismatch"
+
+
+if __name__ == "__main__":
+    print(f"Device: {DEVICE}")
+    print(f"{'Voxels':<10}{'Batch':<8}{'Serialize ref (ms)':<22}{'Serialize (ms)':<18}{'Window ref (ms)':<20}{'Window (ms)':<14}")
+    for num_voxels in VOXELS:
+        for batch_size in BATCH_SIZES:
+            tensor = random_tensor(num_voxels, batch_size)
+            check_same_partition(
+                reference_serialization(tensor, WINDOW, WINDOW // 2),
+                calc_serialization(tensor, WINDOW, SerializeMode.Z_ORDER, WINDOW // 2),
+                tensor.coords,
+            )
+            check_same_partition(
+                reference_window_partition(tensor, WINDOW_3D, WINDOW_3D // 2),
+                calc_window_partition(tensor, WINDOW_3D, WINDOW_3D // 2),
+                tensor.coords,
+            )
+            t_ser_ref = timeit(lambda: reference_serialization(tensor, WINDOW, WINDOW // 2))
+            t_ser = timeit(lambda: calc_serialization(tensor, WINDOW, SerializeMode.Z_ORDER, WINDOW // 2))
+            t_win_ref = timeit(lambda: reference_window_partition(tensor, WINDOW_3D, WINDOW_3D // 2))
+            t_win = timeit(lambda: calc_window_partition(tensor, WINDOW_3D, WINDOW_3D // 2))
+            print(f"{num_voxels:<10}{batch_size:<8}{t_ser_ref:<22.3f}{t_ser:<18.3f}{t_win_ref:<20.3f}{t_win:<14.3f}")
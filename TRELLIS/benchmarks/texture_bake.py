@@ -0,0 +1,103 @@
+"""
+Benchmark of the 'average', 'multires' and 'stream' texture bake modes on the CPU rasterizer.
+
+Renders a textured UV sphere from random views, bakes the texture back from the views
+with every mode and reports the time, the number of rasterizations and the mean absolute
+error of the baked texels against the ground truth texture. 'stream' must rasterize every
+view about once per pass over the views, not once per optimization step.
+
+    python benchmarks/texture_bake.py [num_views] [max_cached_views]
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import torch
+from trellis.utils import bake_utils
+
+RESOLUTION = 256
+TEXTURE_SIZE = 256
+NUM_LEVELS = 3
+MAX_STEPS = 1000
+
+
+def uv_sphere(segments=48):
+    theta = np.linspace(0, np.pi, segments + 1)
+    phi = np.linspace(0, 2 * np.pi, 2 * segments + 1)
+    theta, phi = np.meshgrid(theta, phi, indexing='ij')
+    vertices = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], axis=-1).reshape(-1, 3) * 0.5
+    uvs = np.stack([phi / (2 * np.pi), theta / np.pi], axis=-1).reshape(-1, 2)
+    grid = np.arange(vertices.shape[0]).reshape(segments + 1, 2 * segments + 1)
+    a, b, c, d = grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]
+    faces = np.concatenate([np.stack([a, b, c], -1), np.stack([a, c, d], -1)]).reshape(-1, 3)
+    return torch.tensor(vertices).float(), torch.tensor(faces).int(), torch.tensor(uvs).float()
+
+
+def look_at(eye):
+    forward = -eye / np.linalg.norm(eye)
+    up = np.array([0, 0, 1.0]) if abs(forward[2]) < 0.99 else np.array([0, 1.0, 0])
+    right = np.cross(forward, up)
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    view = np.eye(4)
+    view[:3, :3] = np.stack([right, up, -forward])
+    view[:3, 3] = -view[:3, :3] @ eye
+    return torch.tensor(view).float()
+
+
+def perspective(fov=np.radians(40), near=0.1, far=10.0):
+    f = 1 / np.tan(fov / 2)
+    return torch.tensor([
+        [f, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0, 0, -1, 0],
+    ]).float()
+
+
+def render_views(rasterizer, vertices, faces, uvs, texture, num_views, seed=0):
+    """Observations and masks in image order, as `render_glb_observations` returns them."""
+    rng = np.random.default_rng(seed)
+    directions = rng.normal(size=(num_views, 3))
+    views = [look_at(2 * d / np.linalg.norm(d)) for d in directions]
+    projections = [perspective()] * num_views
+    observations, masks = [], []
+    for view, projection in zip(views, projections):
+        rast = rasterizer(vertices, faces, uvs, RESOLUTION, RESOLUTION, view=view, projection=projection)
+        color = bake_utils.sample_texture(texture, rast['uv'])[0] * rast['mask'][..., None]
+        observations.append((color.flip(0).numpy() * 255).round().astype(np.uint8))
+        masks.append(rast['mask'].flip(0).numpy())
+    return observations, masks, views, projections
+
+
+if __name__ == "__main__":
+    num_views = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    max_cached = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    torch.manual_seed(0)
+    np.random.seed(0)
+    rasterizer = bake_utils.get_rasterizer('cpu')
+    vertices, faces, uvs = uv_sphere()
+    checker = ((torch.arange(TEXTURE_SIZE)[:, None] // 32 + torch.arange(TEXTURE_SIZE)[None] // 32) % 2).float()
+    texture = torch.stack([checker, 1 - checker, torch.linspace(0, 1, TEXTURE_SIZE)[None].expand(TEXTURE_SIZE, -1)], dim=-1)[None]
+    observations, masks, views, projections = render_views(rasterizer, vertices, faces, uvs, texture, num_views)
+
+    print(f"{'Mode':<10}{'Time (s)':<10}{'Rasterizations':<16}{'Texel MAE'}")
+    for mode in ['average', 'multires', 'stream']:
+        start = time.time()
+        buffers = bake_utils.ViewBuffers(
+            rasterizer, vertices, faces, uvs, observations, masks, views, projections,
+            max_cached=max_cached if mode == 'stream' else None,
+        )
+        baked, observed = bake_utils.bake_average(buffers, TEXTURE_SIZE)
+        if mode != 'average':
+            baked = bake_utils.bake_multires(buffers, TEXTURE_SIZE, num_levels=NUM_LEVELS, max_steps=MAX_STEPS, init=baked)
+        elapsed = time.time() - start
+        error = (baked[0] - texture[0]).abs()[observed].mean().item()
+        print(f"{mode:<10}{elapsed:<10.1f}{buffers.num_rasterized:<16}{error:.4f}")
+        if mode == 'stream':
+            # one pass for the initial average and at most one per level, plus a partial pass
+            limit = (NUM_LEVELS + 2) * num_views
+            assert buffers.num_rasterized <= limit, f"'stream' rasterized {buffers.num_rasterized} times, expected at most {limit}"
+        else:
+            assert buffers.num_rasterized == num_views
@@ -0,0 +1,154 @@
+"""
+Benchmark and exactness check of `trellis.utils.voxel_utils` against open3d.
+
+First checks the voxels of a few meshes whose voxels are known by hand (boxes on and
+off the grid, degenerate triangles), deduplicated both with the bitmap and by sorting.
+Then voxelizes procedural meshes (spheres, boxes on and off the grid, a torus, random
+and degenerate triangles) at every resolution with `voxelize_mesh` and, if open3d is
+installed, with its `VoxelGrid.create_from_triangle_mesh_within_bounds`, as
+`voxelize.py` used to, and reports the voxel counts, whether the voxels are identical
+and both times. Exits with an error if any voxels differ. Finally reports the meshes
+per second of `voxelize_meshes` on batches of sphere meshes.
+
+    python benchmarks/voxelize.py [resolution ...]
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from trellis.utils.voxel_utils import voxelize_mesh, voxelize_meshes
+
+
+def sphere(radius, segments, center=(0, 0, 0)):
+    """UV sphere as (vertices, faces)."""
+    theta = np.linspace(0, np.pi, segments + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, 2 * segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing='ij')
+    vertices = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], axis=-1).reshape(-1, 3)
+    vertices = np.concatenate([[[0, 0, 1]], vertices, [[0, 0, -1]]]) * radius + np.array(center)
+    rings, columns = segments - 1, 2 * segments
+    grid = 1 + np.arange(rings * columns).reshape(rings, columns)
+    right = np.roll(grid, -1, axis=1)
+    faces = [
+        np.stack([np.zeros(columns, dtype=np.int64), grid[0], right[0]], axis=1),
+        np.stack([grid[:-1], grid[1:], right[1:]], axis=-1).reshape(-1, 3),
+        np.stack([grid[:-1], right[1:], right[:-1]], axis=-1).reshape(-1, 3),
+        np.stack([np.full(columns, len(vertices) - 1), right[-1], grid[-1]], axis=1),
+    ]
+    return vertices, np.concatenate(faces)
+
+
+def box(lo, hi):
+    """Axis aligned box as (vertices, faces)."""
+    vertices = np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    faces = np.array([
+        [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+        [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3],
+    ])
+    return vertices, faces
+
+
+def torus(radius, tube, segments, tube_segments):
+    u = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    v = np.linspace(0, 2 * np.pi, tube_segments, endpoint=False)
+    u, v = np.meshgrid(u, v, indexing='ij')
+    vertices = np.stack([(radius + tube * np.cos(v)) * np.cos(u), (radius + tube * np.cos(v)) * np.sin(u), tube * np.sin(v)], axis=-1).reshape(-1, 3)
+    grid = np.arange(segments * tube_segments).reshape(segments, tube_segments)
+    right, up = np.roll(grid, -1, axis=0), np.roll(grid, -1, axis=1)
+    diagonal = np.roll(right, -1, axis=1)
+    faces = np.concatenate([np.stack([grid, right, diagonal], axis=-1), np.stack([grid, diagonal, up], axis=-1)]).reshape(-1, 3)
+    return vertices, faces
+
+
+def meshes(seed=0):
+    rng = np.random.default_rng(seed)
+    yield 'sphere', sphere(0.45, 40)
+    yield 'box', box((-0.25,) * 3, (0.25,) * 3)
+    yield 'box_on_grid', box((-0.25, -0.25, 0), (0.25, 0, 0.25))
+    yield 'torus', torus(0.3, 0.1, 40, 20)
+    yield 'random', (rng.uniform(-0.49, 0.49, (300, 3)), rng.integers(0, 300, (400, 3)))
+    yield 'random_on_grid', (rng.integers(-31, 32, (300, 3)) / 64, rng.integers(0, 300, (400, 3)))
+    yield 'degenerate', (
+        np.array([[0, 0, 0], [0.1, 0.1, 0.1], [0.2, 0.2, 0.2], [0.3, 0.0, 0.0]]),
+        np.array([[0, 1, 2], [0, 0, 0], [0, 3, 3]]),
+    )
+
+
+def shell(lo, hi):
+    """Voxels of the surface of the box of voxels [lo, hi]^3."""
+    grid = np.stack(np.meshgrid(*[np.arange(lo, hi + 1)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    return grid[((grid == lo) | (grid == hi)).any(axis=1)]
+
+
+def known_voxels():
+    """(name, vertices, faces, resolution, expected [N, 3] voxels in lexicographic order)."""
+    # -0.25 and 0.25 fall on the boundaries of voxels 2 and 6 of 8; as in open3d, a face
+    # on a boundary marks the voxel it starts, not the one it ends
+    yield 'box_on_grid', *box((-0.25,) * 3, (0.25,) * 3), 8, shell(2, 6)
+    # -0.2 and 0.2 fall inside voxels 2 and 5 of 8
+    yield 'box_off_grid', *box((-0.2,) * 3, (0.2,) * 3), 8, shell(2, 5)
+    vertices = np.array([[0.01, 0.02, 0.03], [-0.3, 0.01, 0.01], [0.3, 0.01, 0.01], [0.0, 0.01, 0.01]])
+    # a point in voxel (4, 4, 4) and a segment along x through voxels 1 to 6
+    expected = np.array([[x, 4, 4] for x in range(1, 7)])
+    yield 'degenerate', vertices, np.array([[0, 0, 0], [1, 2, 3]]), 8, expected
+
+
+def voxelize_open3d(vertices, faces, resolution):
+    mesh = o3d.geometry.TriangleMesh(
+        o3d.utility.Vector3dVector(np.ascontiguousarray(vertices, dtype=np.float64)),
+        o3d.utility.Vector3iVector(np.ascontiguousarray(faces, dtype=np.int32)),
+    )
+    voxel_grid = o3d.geometry.VoxelGrid.create_from_triangle_mesh_within_bounds(
+        mesh, voxel_size=1 / resolution, min_bound=(-0.5, -0.5, -0.5), max_bound=(0.5, 0.5, 0.5))
+    coords = np.array([voxel.grid_index for voxel in voxel_grid.get_voxels()]).reshape(-1, 3)
+    return coords[np.lexsort(coords.T[::-1])]
+
+
+if __name__ == "__main__":
+    resolutions = [int(r) for r in sys.argv[1:]] or [64, 128, 256]
+    failures = 0
+    for name, vertices, faces, resolution, expected in known_voxels():
+        for max_bitmap in (1 << 24, 0):
+            out = voxelize_mesh(vertices, faces, resolution) if max_bitmap else \
+                voxelize_meshes([(vertices, faces)], resolution, max_bitmap=max_bitmap)[0]
+            if not np.array_equal(out, expected):
+                failures += 1
+                print(f"{name} ({'bitmap' if max_bitmap else 'sorted'}): {len(out)} voxels, expected {len(expected)}")
+    print("Known voxels match" if failures == 0 else f"{failures} known voxel sets differ")
+
+    try:
+        import open3d as o3d
+    except ImportError:
+        o3d = None
+        print("open3d is not installed, skipping the comparison with open3d")
+
+    if o3d is not None:
+        print(f"{'Res':<6}{'Mesh':<16}{'open3d':<10}{'Ours':<10}{'Equal':<8}{'open3d (s)':<12}{'Ours (s)'}")
+        for resolution in resolutions:
+            for name, (vertices, faces) in meshes():
+                vertices = np.clip(vertices, -0.5 + 1e-6, 0.5 - 1e-6)
+                start = time.time()
+                ref = voxelize_open3d(vertices, faces, resolution)
+                ref_time = time.time() - start
+                start = time.time()
+                out = voxelize_mesh(vertices, faces, resolution)
+                out_time = time.time() - start
+                equal = np.array_equal(ref, out)
+                failures += not equal
+                print(f"{resolution:<6}{name:<16}{len(ref):<10}{len(out):<10}{str(equal):<8}{ref_time:<12.3f}{out_time:.3f}")
+    if failures:
+        print(f"{failures} voxelizations differ")
+        sys.exit(1)
+
+    batch = [sphere(0.3 + 0.15 * i / 31, 24 + i % 8, (0.02 * (i % 3),) * 3) for i in range(32)]
+    print(f"{'Res':<6}{'Batch':<8}{'Meshes/s'}")
+    for resolution in resolutions:
+        singles = [voxelize_mesh(vertices, faces, resolution) for vertices, faces in batch[:4]]
+        for batch_size in (1, 8, 32):
+            start = time.time()
+            for first in range(0, len(batch), batch_size):
+                outs = voxelize_meshes(batch[first:first + batch_size], resolution)
+            print(f"{resolution:<6}{batch_size:<8}{len(batch) / (time.time() - start):.1f}")
+        assert all(np.array_equal(a, b) for a, b in zip(voxelize_meshes(batch[:4], resolution), singles))
+        assert all(np.array_equal(a, b) for a, b in zip(voxelize_meshes(batch[:4], resolution, max_bitmap=0), singles))
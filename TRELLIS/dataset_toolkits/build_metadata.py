@@ -9,7 +9,7 @@ import pandas as pd
 from tqdm import tqdm
 from easydict import EasyDict as edict
 from concurrent.futures import ThreadPoolExecutor
-import utils3d
+from utils import has_voxels, count_voxels
 
 def get_first_directory(path):  
     with os.scandir(path) as it:  
@@ -76,6 +76,7 @@ if __name__ == '__main__':
     latent_models = []
     if os.path.exists(os.path.join(opt.output_dir, 'latents')):
         latent_models = os.listdir(os.path.join(opt.output_dir, 'latents'))
+    voxel_resolutions = [int(d[len('voxels_'):]) for d in os.listdir(opt.output_dir) if d.startswith('voxels_') and d[len('voxels_'):].isdigit()]
     ss_latent_models = []
     if os.path.exists(os.path.join(opt.output_dir, 'ss_latents')):
         ss_latent_models = os.listdir(os.path.join(opt.output_dir, 'ss_latents'))
@@ -89,6 +90,10 @@ if __name__ == '__main__':
         metadata['voxelized'] = [False] * len(metadata)
     if 'num_voxels' not in metadata.columns:
         metadata['num_voxels'] = [0] * len(metadata)
+    for resolution in voxel_resolutions:
+        if f'voxelized_{resolution}' not in metadata.columns:
+            metadata[f'voxelized_{resolution}'] = [False] * len(metadata)
+            metadata[f'num_voxels_{resolution}'] = [0] * len(metadata)
     if 'cond_rendered' not in metadata.columns:
         metadata['cond_rendered'] = [False] * len(metadata)
     for model in image_models:
@@ -204,13 +209,20 @@ if __name__ == '__main__':
                         os.path.exists(os.path.join(opt.output_dir, 'renders', sha256, 'transforms.json')):
                         metadata.loc[sha256, 'rendered'] = True
                     if need_process('voxelized') and metadata.loc[sha256, 'rendered'] == True and metadata.loc[sha256, 'voxelized'] == False and \
-                        os.path.exists(os.path.join(opt.output_dir, 'voxels', f'{sha256}.ply')):
+                        has_voxels(opt.output_dir, sha256):
                         try:
-                            pts = utils3d.io.read_ply(os.path.join(opt.output_dir, 'voxels', f'{sha256}.ply'))[0]
+                            metadata.loc[sha256, 'num_voxels'] = count_voxels(opt.output_dir, sha256)
                             metadata.loc[sha256, 'voxelized'] = True
-                            metadata.loc[sha256, 'num_voxels'] = len(pts)
                         except Exception as e:
                             pass
+                    for resolution in voxel_resolutions:
+                        if need_process(f'voxelized_{resolution}') and metadata.loc[sha256, f'voxelized_{resolution}'] == False and \
+                            has_voxels(opt.output_dir, sha256, resolution):
+                            try:
+                                metadata.loc[sha256, f'num_voxels_{resolution}'] = count_voxels(opt.output_dir, sha256, resolution)
+                                metadata.loc[sha256, f'voxelized_{resolution}'] = True
+                            except Exception as e:
+                                pass
                     if need_process('cond_rendered') and metadata.loc[sha256, 'cond_rendered'] == False and \
                         os.path.exists(os.path.join(opt.output_dir, 'renders_cond', sha256, 'transforms.json')):
                         metadata.loc[sha256, 'cond_rendered'] = True
@@ -7,13 +7,11 @@ import argparse
 import torch
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 from easydict import EasyDict as edict
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue
 
 import trellis.models as models
 import trellis.modules.sparse as sp
+from utils import encode_batched, save_npz
 
 
 torch.set_grad_enabled(False)
@@ -37,6 +35,10 @@ if __name__ == '__main__':
                         help='Checkpoint to load')
     parser.add_argument('--instances', type=str, default=None,
                         help='Instances to process')
+    parser.add_argument('--batch_size', type=int, default=32,
+                        help='Maximum number of objects encoded together')
+    parser.add_argument('--max_batch_voxels', type=int, default=131072,
+                        help='Maximum total number of voxels of the objects encoded together')
     parser.add_argument('--rank', type=int, default=0)
     parser.add_argument('--world_size', type=int, default=1)
     opt = parser.parse_args()
@@ -85,41 +87,39 @@ if __name__ == '__main__':
             sha256s.remove(sha256)
 
     # encode latents
-    load_queue = Queue(maxsize=4)
+    def loader(sha256):
+        feats = np.load(os.path.join(opt.output_dir, 'features', opt.feat_model, f'{sha256}.npz'))
+        return {
+            'feats': torch.from_numpy(feats['patchtokens']).float(),
+            'coords': torch.from_numpy(feats['indices']).int(),
+        }
+
+    def encode(batch):
+        feats = sp.SparseTensor(
+            feats = torch.cat([b['feats'] for b in batch]).cuda(),
+            coords = torch.cat([
+                torch.cat([torch.full((b['coords'].shape[0], 1), i, dtype=torch.int32), b['coords']], dim=1)
+                for i, b in enumerate(batch)
+            ]).cuda(),
+        )
+        latent = encoder(feats, sample_posterior=False)
+        assert torch.isfinite(latent.feats).all(), "Non-finite latent"
+        feats = latent.feats.cpu().numpy().astype(np.float32)
+        coords = latent.coords[:, 1:].cpu().numpy().astype(np.uint8)
+        return [{'feats': feats[s], 'coords': coords[s]} for s in latent.layout]
+
+    def saver(sha256, pack):
+        save_npz(os.path.join(opt.output_dir, 'latents', latent_name, f'{sha256}.npz'), **pack)
+        records.append({'sha256': sha256, f'latent_{latent_name}': True})
+
     try:
-        with ThreadPoolExecutor(max_workers=32) as loader_executor, \
-            ThreadPoolExecutor(max_workers=32) as saver_executor:
-            def loader(sha256):
-                try:
-                    feats = np.load(os.path.join(opt.output_dir, 'features', opt.feat_model, f'{sha256}.npz'))
-                    load_queue.put((sha256, feats))
-                except Exception as e:
-                    print(f"Error loading features for {sha256}: {e}")
-            loader_executor.map(loader, sha256s)
-            
-            def saver(sha256, pack):
-                save_path = os.path.join(opt.output_dir, 'latents', latent_name, f'{sha256}.npz')
-                np.savez_compressed(save_path, **pack)
-                records.append({'sha256': sha256, f'latent_{latent_name}': True})
-                
-            for _ in tqdm(range(len(sha256s)), desc="Extracting latents"):
-                sha256, feats = load_queue.get()
-                feats = sp.SparseTensor(
-                    feats = torch.from_numpy(feats['patchtokens']).float(),
-                    coords = torch.cat([
-                        torch.zeros(feats['patchtokens'].shape[0], 1).int(),
-                        torch.from_numpy(feats['indices']).int(),
-                    ], dim=1),
-                ).cuda()
-                latent = encoder(feats, sample_posterior=False)
-                assert torch.isfinite(latent.feats).all(), "Non-finite latent"
-                pack = {
-                    'feats': latent.feats.cpu().numpy().astype(np.float32),
-                    'coords': latent.coords[:, 1:].cpu().numpy().astype(np.uint8),
-                }
-                saver_executor.submit(saver, sha256, pack)
-                
-            saver_executor.shutdown(wait=True)
+        encode_batched(
+            sha256s, loader, encode, saver,
+            batch_size=opt.batch_size,
+            max_batch_cost=opt.max_batch_voxels,
+            cost=lambda b: b['coords'].shape[0],
+            desc="Extracting latents",
+        )
     except:
         print("Error happened during processing.")
         
@@ -7,20 +7,17 @@ import argparse
 import torch
 import numpy as np
 import pandas as pd
-import utils3d
-from tqdm import tqdm
 from easydict import EasyDict as edict
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue
 
 import trellis.models as models
+from utils import encode_batched, save_npz, load_voxels
 
 
 torch.set_grad_enabled(False)
 
 
 def get_voxels(instance):
-    position = utils3d.io.read_ply(os.path.join(opt.output_dir, 'voxels', f'{instance}.ply'))[0]
+    position = (load_voxels(opt.output_dir, instance) + 0.5) / 64 - 0.5
     coords = ((torch.tensor(position) + 0.5) * opt.resolution).int().contiguous()
     ss = torch.zeros(1, opt.resolution, opt.resolution, opt.resolution, dtype=torch.long)
     ss[:, coords[:, 0], coords[:, 1], coords[:, 2]] = 1
@@ -45,6 +42,8 @@ if __name__ == '__main__':
                         help='Resolution')
     parser.add_argument('--instances', type=str, default=None,
                         help='Instances to process')
+    parser.add_argument('--batch_size', type=int, default=32,
+                        help='Number of objects encoded together')
     parser.add_argument('--rank', type=int, default=0)
     parser.add_argument('--world_size', type=int, default=1)
     opt = parser.parse_args()
@@ -93,34 +92,23 @@ if __name__ == '__main__':
             sha256s.remove(sha256)
 
     # encode latents
-    load_queue = Queue(maxsize=4)
+    def encode(batch):
+        ss = torch.stack(batch).cuda().float()
+        latent = encoder(ss, sample_posterior=False)
+        assert torch.isfinite(latent).all(), "Non-finite latent"
+        latent = latent.cpu().numpy()
+        return [{'mean': latent[i]} for i in range(len(batch))]
+
+    def saver(sha256, pack):
+        save_npz(os.path.join(opt.output_dir, 'ss_latents', latent_name, f'{sha256}.npz'), **pack)
+        records.append({'sha256': sha256, f'ss_latent_{latent_name}': True})
+
     try:
-        with ThreadPoolExecutor(max_workers=32) as loader_executor, \
-            ThreadPoolExecutor(max_workers=32) as saver_executor:
-            def loader(sha256):
-                try:
-                    ss = get_voxels(sha256)[None].float()
-                    load_queue.put((sha256, ss))
-                except Exception as e:
-                    print(f"Error loading features for {sha256}: {e}")
-            loader_executor.map(loader, sha256s)
-            
-            def saver(sha256, pack):
-                save_path = os.path.join(opt.output_dir, 'ss_latents', latent_name, f'{sha256}.npz')
-                np.savez_compressed(save_path, **pack)
-                records.append({'sha256': sha256, f'ss_latent_{latent_name}': True})
-                
-            for _ in tqdm(range(len(sha256s)), desc="Extracting latents"):
-                sha256, ss = load_queue.get()
-                ss = ss.cuda().float()
-                latent = encoder(ss, sample_posterior=False)
-                assert torch.isfinite(latent).all(), "Non-finite latent"
-                pack = {
-                    'mean': latent[0].cpu().numpy(),
-                }
-                saver_executor.submit(saver, sha256, pack)
-                
-            saver_executor.shutdown(wait=True)
+        encode_batched(
+            sha256s, get_voxels, encode, saver,
+            batch_size=opt.batch_size,
+            desc="Extracting latents",
+        )
     except:
         print("Error happened during processing.")
         
@@ -15,6 +15,7 @@ from concurrent.futures import ThreadPoolExecutor
 from queue import Queue
 from torchvision import transforms
 from PIL import Image
+from utils import load_voxels
 
 
 torch.set_grad_enabled(False)
@@ -122,7 +123,7 @@ if __name__ == '__main__':
                     for datum in get_data(frames, sha256):
                         datum['image'] = transform(datum['image'])
                         data.append(datum)
-                    positions = utils3d.io.read_ply(os.path.join(opt.output_dir, 'voxels', f'{sha256}.ply'))[0]
+                    positions = ((load_voxels(opt.output_dir, sha256) + 0.5) / 64 - 0.5).astype(np.float32)
                     load_queue.put((sha256, data, positions))
                 except Exception as e:
                     print(f"Error loading data for {sha256}: {e}")
@@ -0,0 +1,105 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from easydict import EasyDict as edict
+from concurrent.futures import ThreadPoolExecutor
+
+from trellis.datasets.shards import ShardWriter
+from utils import load_voxels
+
+
+def load_latent(output_dir, model, sha256):
+    data = np.load(os.path.join(output_dir, 'latents', model, f'{sha256}.npz'))
+    return {'coords': data['coords'], 'feats': data['feats']}
+
+
+def load_ss_latent(output_dir, model, sha256):
+    data = np.load(os.path.join(output_dir, 'ss_latents', model, f'{sha256}.npz'))
+    return {'mean': data['mean']}
+
+
+def load_voxel_coords(output_dir, resolution, sha256):
+    position = (load_voxels(output_dir, sha256) + 0.5) / 64 - 0.5
+    # same quantization as SparseStructure.get_instance
+    coords = ((position + 0.5) * resolution).astype(np.int64)
+    assert np.all(coords >= 0) and np.all(coords < resolution), "Some voxels are out of bounds"
+    return {'coords': coords.astype(np.uint8 if resolution <= 256 else np.uint16)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack per-object latents or voxels into memory-mapped shards')
+    parser.add_argument('--output_dir', type=str, required=True,
+                        help='Directory of the dataset')
+    parser.add_argument('--kind', type=str, required=True, choices=['latents', 'ss_latents', 'voxels'],
+                        help='Data to pack, read from <output_dir>/<kind>')
+    parser.add_argument('--model', type=str, default=None,
+                        help='Latent model, required for latents and ss_latents')
+    parser.add_argument('--resolution', type=int, default=64,
+                        help='Resolution the voxels are quantized at')
+    parser.add_argument('--shard_size', type=int, default=1024,
+                        help='Shard size in MB')
+    parser.add_argument('--compression', type=str, default=None, choices=['zstd'],
+                        help='Compress every record; shards are smaller but no longer zero-copy')
+    parser.add_argument('--compression_level', type=int, default=3)
+    parser.add_argument('--max_workers', type=int, default=16,
+                        help='Threads reading the per-object files')
+    opt = parser.parse_args()
+    opt = edict(vars(opt))
+
+    # get file list
+    if os.path.exists(os.path.join(opt.output_dir, 'metadata.csv')):
+        metadata = pd.read_csv(os.path.join(opt.output_dir, 'metadata.csv'))
+    else:
+        raise ValueError('metadata.csv not found')
+    attrs = {}
+    if opt.kind == 'voxels':
+        column = 'voxelized'
+        subdirs = ['voxels']
+        attrs['resolution'] = opt.resolution
+        load = lambda sha256: load_voxel_coords(opt.output_dir, opt.resolution, sha256)
+    else:
+        if opt.model is None:
+            raise ValueError(f'--model is required to pack {opt.kind}')
+        column = f'{opt.kind[:-1]}_{opt.model}'
+        subdirs = [opt.kind, opt.model]
+        attrs['model'] = opt.model
+        loader = load_latent if opt.kind == 'latents' else load_ss_latent
+        load = lambda sha256: loader(opt.output_dir, opt.model, sha256)
+    if column not in metadata.columns:
+        raise ValueError(f'metadata.csv does not have "{column}" column, please run "build_metadata.py" first')
+    sha256s = metadata[metadata[column] == True]['sha256'].values
+
+    # write to a temporary directory so readers never see a partial index
+    path = os.path.join(opt.output_dir, 'shards', *subdirs)
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def worker(sha256):
+        try:
+            return sha256, load(sha256)
+        except Exception as e:
+            print(f"Error loading {sha256}: {e}")
+            return sha256, None
+
+    num_records = 0
+    with ShardWriter(tmp_path, shard_bytes=opt.shard_size * 1024**2, compression=opt.compression,
+                     compression_level=opt.compression_level, attrs=attrs) as writer, \
+        ThreadPoolExecutor(max_workers=opt.max_workers) as executor, \
+        tqdm(total=len(sha256s), desc=f'Packing {opt.kind}') as pbar:
+        # read ahead a bounded number of objects, records are written in metadata order
+        chunk = opt.max_workers * 16
+        for start in range(0, len(sha256s), chunk):
+            for sha256, pack in executor.map(worker, sha256s[start:start + chunk]):
+                if pack is not None:
+                    writer.add(sha256, **pack)
+                    num_records += 1
+                pbar.update()
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+    print(f'Packed {num_records}/{len(sha256s)} objects into {path}')
@@ -1,6 +1,11 @@
 from typing import *
+import os
 import hashlib
+import threading
 import numpy as np
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
 
 
 def get_file_hash(file: str) -> str:
@@ -41,3 +46,169 @@ def sphere_hammersley_sequence(n, num_samples, offset=(0, 0)):
     theta = np.arccos(1 - 2 * u) - np.pi / 2
     phi = v * 2 * np.pi
     return [phi, theta]
+
+
+# ===============VOXELS================
+
+def voxels_dir(output_dir: str, resolution: int = 64) -> str:
+    return os.path.join(output_dir, 'voxels' if resolution == 64 else f'voxels_{resolution}')
+
+
+def save_voxels(output_dir: str, sha256: str, coords: np.ndarray, resolution: int = 64) -> None:
+    """
+    Save the grid indices of the occupied voxels as a [N, 3] uint8 `.npy`, 3 bytes per voxel.
+    """
+    path = os.path.join(voxels_dir(output_dir, resolution), f'{sha256}.npy')
+    tmp_path = f'{path}.tmp.npy'
+    np.save(tmp_path, np.asarray(coords).astype(np.uint8 if resolution <= 256 else np.uint16))
+    os.replace(tmp_path, path)
+
+
+def has_voxels(output_dir: str, sha256: str, resolution: int = 64) -> bool:
+    path = os.path.join(voxels_dir(output_dir, resolution), sha256)
+    return os.path.exists(f'{path}.npy') or (resolution == 64 and os.path.exists(f'{path}.ply'))
+
+
+def load_voxels(output_dir: str, sha256: str, resolution: int = 64) -> np.ndarray:
+    """
+    Grid indices [N, 3] of the occupied voxels, from the `.npy` or a PLY of voxel centers
+    written by earlier versions of `voxelize.py`.
+    """
+    path = os.path.join(voxels_dir(output_dir, resolution), sha256)
+    if os.path.exists(f'{path}.npy') or resolution != 64:
+        return np.load(f'{path}.npy').astype(np.int64)
+    import utils3d
+    position = utils3d.io.read_ply(f'{path}.ply')[0]
+    return ((position + 0.5) * resolution).astype(np.int64)
+
+
+def count_voxels(output_dir: str, sha256: str, resolution: int = 64) -> int:
+    """Number of occupied voxels, read from the `.npy` header only."""
+    path = os.path.join(voxels_dir(output_dir, resolution), f'{sha256}.npy')
+    if os.path.exists(path) or resolution != 64:
+        return np.load(path, mmap_mode='r').shape[0]
+    return len(load_voxels(output_dir, sha256, resolution))
+
+
+# ===============BATCHED ENCODING================
+
+def save_npz(path: str, **arrays) -> None:
+    """
+    `np.savez_compressed` to a temporary file renamed into place, so an interrupted run
+    never leaves a truncated output that a resumed run would skip.
+    """
+    tmp_path = f'{path}.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def encode_batched(
+    sha256s: List[str],
+    load: Callable[[str], Any],
+    encode: Callable[[List[Any]], List[Dict[str, np.ndarray]]],
+    save: Callable[[str, Dict[str, np.ndarray]], None],
+    batch_size: int = 32,
+    max_batch_cost: Optional[int] = None,
+    cost: Optional[Callable[[Any], int]] = None,
+    num_loaders: int = 32,
+    num_savers: int = 32,
+    prefetch: int = 64,
+    desc: str = 'Encoding',
+) -> int:
+    """
+    Encode objects in batches while loading and saving happen on background threads.
+
+    Loaded samples are packed in arrival order into batches of at most `batch_size`
+    objects and, if given, `max_batch_cost` total cost (e.g. voxels); an object above
+    the budget is encoded alone. A batch that fails, e.g. out of memory, is retried one
+    object at a time. Objects that fail to load, cost, encode or save are reported and
+    skipped.
+
+    Args:
+        sha256s: Objects to encode.
+        load: Reads the input of an object, run on the loader threads.
+        encode: Encodes a list of inputs, returns one output dict per input.
+        save: Writes the output of an object, run on the saver threads.
+        cost: Cost of an input counted against `max_batch_cost`.
+        prefetch: Loaded inputs waiting to be encoded.
+
+    Returns:
+        int: Number of objects encoded.
+    """
+    load_queue = Queue(maxsize=prefetch)
+    pending_saves = threading.BoundedSemaphore(prefetch)
+    num_encoded = 0
+
+    def loader(sha256):
+        try:
+            sample = load(sha256)
+        except Exception as e:
+            print(f"Error loading {sha256}: {e}")
+            sample = None
+        load_queue.put((sha256, sample))
+
+    def saver(sha256, pack):
+        try:
+            save(sha256, pack)
+        except Exception as e:
+            print(f"Error saving {sha256}: {e}")
+        finally:
+            pending_saves.release()
+
+    with ThreadPoolExecutor(max_workers=num_loaders) as loader_executor, \
+        ThreadPoolExecutor(max_workers=num_savers) as saver_executor, \
+        tqdm(total=len(sha256s), desc=desc) as pbar:
+
+        def flush(batch):
+            nonlocal num_encoded
+            try:
+                packs = encode([sample for _, sample in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    print(f"Error encoding {batch[0][0]}: {e}")
+                    pbar.update()
+                    return
+                print(f"Error encoding a batch of {len(batch)}, retrying one at a time: {e}")
+                for item in batch:
+                    flush([item])
+                return
+            for (sha256, _), pack in zip(batch, packs):
+                # bounds the outputs held in memory when saving falls behind
+                pending_saves.acquire()
+                saver_executor.submit(saver, sha256, pack)
+            num_encoded += len(batch)
+            pbar.update(len(batch))
+
+        loads = [loader_executor.submit(loader, sha256) for sha256 in sha256s]
+        try:
+            batch, batch_cost = [], 0
+            for _ in range(len(sha256s)):
+                sha256, sample = load_queue.get()
+                if sample is None:
+                    pbar.update()
+                    continue
+                try:
+                    sample_cost = cost(sample) if cost is not None else 1
+                except Exception as e:
+                    print(f"Error computing the cost of {sha256}: {e}")
+                    pbar.update()
+                    continue
+                if batch and (len(batch) >= batch_size or (max_batch_cost is not None and batch_cost + sample_cost > max_batch_cost)):
+                    flush(batch)
+                    batch, batch_cost = [], 0
+                batch.append((sha256, sample))
+                batch_cost += sample_cost
+            if batch:
+                flush(batch)
+        finally:
+            # if the loop stopped early, loaders blocked on the full queue would keep the
+            # executor from shutting down: drop the loads not started and drain the queue
+            for future in loads:
+                future.cancel()
+            while not all(future.done() for future in loads):
+                try:
+                    load_queue.get(timeout=0.1)
+                except Empty:
+                    pass
+
+    return num_encoded
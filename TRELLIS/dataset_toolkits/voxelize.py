@@ -1,27 +1,62 @@
 import os
 import copy
 import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import importlib
 import argparse
 import pandas as pd
 from easydict import EasyDict as edict
 from functools import partial
+from multiprocessing import Pool
+from tqdm import tqdm
 import numpy as np
-import open3d as o3d
 import utils3d
 
+from trellis.utils.voxel_utils import voxelize_meshes
+from utils import voxels_dir, save_voxels, has_voxels, count_voxels
 
-def _voxelize(file, sha256, output_dir):
-    mesh = o3d.io.read_triangle_mesh(os.path.join(output_dir, 'renders', sha256, 'mesh.ply'))
-    # clamp vertices to the range [-0.5, 0.5]
-    vertices = np.clip(np.asarray(mesh.vertices), -0.5 + 1e-6, 0.5 - 1e-6)
-    mesh.vertices = o3d.utility.Vector3dVector(vertices)
-    voxel_grid = o3d.geometry.VoxelGrid.create_from_triangle_mesh_within_bounds(mesh, voxel_size=1/64, min_bound=(-0.5, -0.5, -0.5), max_bound=(0.5, 0.5, 0.5))
-    vertices = np.array([voxel.grid_index for voxel in voxel_grid.get_voxels()])
-    assert np.all(vertices >= 0) and np.all(vertices < 64), "Some vertices are out of bounds"
-    vertices = (vertices + 0.5) / 64 - 0.5
-    utils3d.io.write_ply(os.path.join(output_dir, 'voxels', f'{sha256}.ply'), vertices)
-    return {'sha256': sha256, 'voxelized': True, 'num_voxels': len(vertices)}
+
+def _voxelize(sha256s, output_dir, resolution):
+    meshes = []
+    loaded = []
+    for sha256 in sha256s:
+        try:
+            vertices, faces = utils3d.io.read_ply(os.path.join(output_dir, 'renders', sha256, 'mesh.ply'))
+            # clamp vertices to the range [-0.5, 0.5]
+            vertices = np.clip(vertices.astype(np.float64), -0.5 + 1e-6, 0.5 - 1e-6)
+            # fan-triangulate polygons
+            faces = np.concatenate([faces[:, [0, i, i + 1]] for i in range(1, faces.shape[1] - 1)])
+            meshes.append((vertices, faces))
+            loaded.append(sha256)
+        except Exception as e:
+            print(f"Error loading mesh of {sha256}: {e}")
+    try:
+        voxels = voxelize_meshes(meshes, resolution)
+    except Exception as e:
+        print(f"Error voxelizing a batch of {len(meshes)}, retrying one at a time: {e}")
+        voxels = []
+        for sha256, mesh in zip(loaded, meshes):
+            try:
+                voxels.append(voxelize_meshes([mesh], resolution)[0])
+            except Exception as e:
+                print(f"Error voxelizing {sha256}: {e}")
+                voxels.append(None)
+    records = []
+    for sha256, coords in zip(loaded, voxels):
+        if coords is None:
+            continue
+        try:
+            assert np.all(coords >= 0) and np.all(coords < resolution), "Some vertices are out of bounds"
+            save_voxels(output_dir, sha256, coords, resolution)
+            records.append({'sha256': sha256, **_columns(resolution, len(coords))})
+        except Exception as e:
+            print(f"Error saving voxels of {sha256}: {e}")
+    return records
+
+
+def _columns(resolution, num_voxels):
+    suffix = '' if resolution == 64 else f'_{resolution}'
+    return {f'voxelized{suffix}': True, f'num_voxels{suffix}': num_voxels}
 
 
 if __name__ == '__main__':
@@ -40,10 +75,15 @@ if __name__ == '__main__':
     parser.add_argument('--rank', type=int, default=0)
     parser.add_argument('--world_size', type=int, default=1)
     parser.add_argument('--max_workers', type=int, default=None)
+    parser.add_argument('--resolution', type=int, default=64,
+                        help='Voxels per side, 64 to 256; other than 64 are saved to voxels_<resolution>')
+    parser.add_argument('--batch_size', type=int, default=8,
+                        help='Meshes voxelized together by a worker')
     opt = parser.parse_args(sys.argv[2:])
     opt = edict(vars(opt))
 
-    os.makedirs(os.path.join(opt.output_dir, 'voxels'), exist_ok=True)
+    os.makedirs(voxels_dir(opt.output_dir, opt.resolution), exist_ok=True)
+    voxelized_column = list(_columns(opt.resolution, 0))[0]
 
     # get file list
     if not os.path.exists(os.path.join(opt.output_dir, 'metadata.csv')):
@@ -55,8 +95,8 @@ if __name__ == '__main__':
         if 'rendered' not in metadata.columns:
             raise ValueError('metadata.csv does not have "rendered" column, please run "build_metadata.py" first')
         metadata = metadata[metadata['rendered'] == True]
-        if 'voxelized' in metadata.columns:
-            metadata = metadata[metadata['voxelized'] == False]
+        if voxelized_column in metadata.columns:
+            metadata = metadata[metadata[voxelized_column] == False]
     else:
         if os.path.exists(opt.instances):
             with open(opt.instances, 'r') as f:
@@ -71,16 +111,22 @@ if __name__ == '__main__':
     records = []
 
     # filter out objects that are already processed
+    sha256s = []
     for sha256 in copy.copy(metadata['sha256'].values):
-        if os.path.exists(os.path.join(opt.output_dir, 'voxels', f'{sha256}.ply')):
-            pts = utils3d.io.read_ply(os.path.join(opt.output_dir, 'voxels', f'{sha256}.ply'))[0]
-            records.append({'sha256': sha256, 'voxelized': True, 'num_voxels': len(pts)})
-            metadata = metadata[metadata['sha256'] != sha256]
+        if has_voxels(opt.output_dir, sha256, opt.resolution):
+            records.append({'sha256': sha256, **_columns(opt.resolution, count_voxels(opt.output_dir, sha256, opt.resolution))})
+        else:
+            sha256s.append(sha256)
                 
-    print(f'Processing {len(metadata)} objects...')
+    print(f'Processing {len(sha256s)} objects...')
 
-    # process objects
-    func = partial(_voxelize, output_dir=opt.output_dir)
-    voxelized = dataset_utils.foreach_instance(metadata, opt.output_dir, func, max_workers=opt.max_workers, desc='Voxelizing')
-    voxelized = pd.concat([voxelized, pd.DataFrame.from_records(records)])
+    # process objects in batches, in worker processes since the voxelizer holds the GIL
+    func = partial(_voxelize, output_dir=opt.output_dir, resolution=opt.resolution)
+    batches = [sha256s[i:i + opt.batch_size] for i in range(0, len(sha256s), opt.batch_size)]
+    with Pool(opt.max_workers or os.cpu_count()) as pool, \
+        tqdm(total=len(sha256s), desc='Voxelizing') as pbar:
+        for batch, batch_records in zip(batches, pool.imap(func, batches)):
+            records.extend(batch_records)
+            pbar.update(len(batch))
+    voxelized = pd.DataFrame.from_records(records)
     voxelized.to_csv(os.path.join(opt.output_dir, f'voxelized_{opt.rank}.csv'), index=False)
@@ -3,43 +3,52 @@ import torch
 import vox2seq
 
 
-if __name__ == "__main__":
-    stats = {
-        'z_order_cuda': [],
-        'z_order_pytorch': [],
-        'hilbert_cuda': [],
-        'hilbert_pytorch': [],
-    }
-    RES = [16, 32, 64, 128, 256]
-    for res in RES:
-        coords = torch.meshgrid(torch.arange(res), torch.arange(res), torch.arange(res))
-        coords = torch.stack(coords, dim=-1).reshape(-1, 3).int().cuda()
-
-        start = time.time()
-        for _ in range(100):
-            code_z_cuda = vox2seq.encode(coords, mode='z_order').cuda()
-        torch.cuda.synchronize()
-        stats['z_order_cuda'].append((time.time() - start) / 100)
+MAX_POINTS = 1 << 22
+REPEATS = 10
 
-        start = time.time()
-        for _ in range(100):
-            code_z_pytorch = vox2seq.pytorch.encode(coords, mode='z_order').cuda()
-        torch.cuda.synchronize()
-        stats['z_order_pytorch'].append((time.time() - start) / 100)
 
-        start = time.time()
-        for _ in range(100):
-            code_h_cuda = vox2seq.encode(coords, mode='hilbert').cuda()
+def timeit(fn, repeats, sync=False):
+    fn()
+    if sync:
         torch.cuda.synchronize()
-        stats['hilbert_cuda'].append((time.time() - start) / 100)
-
-        start = time.time()
-        for _ in range(100):
-            code_h_pytorch = vox2seq.pytorch.encode(coords, mode='hilbert').cuda()
+    start = time.time()
+    for _ in range(repeats):
+        fn()
+    if sync:
         torch.cuda.synchronize()
-        stats['hilbert_pytorch'].append((time.time() - start) / 100)
+    return (time.time() - start) / repeats
 
-    print(f"{'Resolution':<12}{'Z-Order (CUDA)':<24}{'Z-Order (PyTorch)':<24}{'Hilbert (CUDA)':<24}{'Hilbert (PyTorch)':<24}")
-    for res, z_order_cuda, z_order_pytorch, hilbert_cuda, hilbert_pytorch in zip(RES, stats['z_order_cuda'], stats['z_order_pytorch'], stats['hilbert_cuda'], stats['hilbert_pytorch']):
-        print(f"{res:<12}{z_order_cuda:<24.6f}{z_order_pytorch:<24.6f}{hilbert_cuda:<24.6f}{hilbert_pytorch:<24.6f}")
 
+if __name__ == "__main__":
+    has_cuda = torch.cuda.is_available() and vox2seq._C is not None
+    columns = ['lut_cpu', 'bitarray_cpu'] + (['cuda'] if has_cuda else [])
+    RES = [16, 32, 64, 128, 256, 512, 1024]
+
+    for mode in ['z_order', 'hilbert']:
+        print(f"\n{mode} encode / decode, seconds per call ({REPEATS} repeats, at most {MAX_POINTS} points)")
+        print(f"{'Resolution':<12}{'Points':<12}" + ''.join(f"{c + ' enc':<18}{c + ' dec':<18}" for c in columns))
+        for res in RES:
+            if res ** 3 <= MAX_POINTS:
+                coords = torch.meshgrid(torch.arange(res), torch.arange(res), torch.arange(res), indexing='ij')
+                coords = torch.stack(coords, dim=-1).reshape(-1, 3).int()
+            else:
+                coords = torch.randint(0, res, (MAX_POINTS, 3), dtype=torch.int32)
+            code = vox2seq.pytorch.encode(coords, mode=mode)
+
+            row = []
+            row.append(timeit(lambda: vox2seq.pytorch.encode(coords, mode=mode), REPEATS))
+            row.append(timeit(lambda: vox2seq.pytorch.decode(code, mode=mode), REPEATS))
+            # The bit-array implementation is too slow to be run on the largest grids.
+            if coords.shape[0] <= 1 << 18:
+                bitarray_encode = vox2seq.pytorch.z_order_encode if mode == 'z_order' else vox2seq.pytorch.hilbert_encode
+                bitarray_decode = vox2seq.pytorch.z_order_decode if mode == 'z_order' else vox2seq.pytorch.hilbert_decode
+                row.append(timeit(lambda: bitarray_encode(coords, depth=10), 1))
+                row.append(timeit(lambda: bitarray_decode(code.long(), depth=10), 1))
+            else:
+                row += [float('nan'), float('nan')]
+            if has_cuda:
+                coords_cuda, code_cuda = coords.cuda(), code.cuda()
+                row.append(timeit(lambda: vox2seq.encode(coords_cuda, mode=mode), REPEATS, sync=True))
+                row.append(timeit(lambda: vox2seq.decode(code_cuda, mode=mode), REPEATS, sync=True))
+
+            print(f"{res:<12}{coords.shape[0]:<12}" + ''.join(f"{t:<18.6f}" for t in row))
@@ -2,24 +2,114 @@ import torch
 import vox2seq
 
 
+RES = [16, 32, 64, 128, 256, 512, 1024]
+MAX_POINTS = 1 << 22
+PERMUTES = [[0, 1, 2], [1, 0, 2], [1, 2, 0], [2, 0, 1]]
+
+
+def grid_coords(res, device='cpu'):
+    """
+    All voxels of a res^3 grid, or a random subset of them for large resolutions.
+    """
+    if res ** 3 <= MAX_POINTS:
+        coords = torch.meshgrid(torch.arange(res), torch.arange(res), torch.arange(res), indexing='ij')
+        coords = torch.stack(coords, dim=-1).reshape(-1, 3)
+    else:
+        coords = torch.randint(0, res, (MAX_POINTS, 3))
+    return coords.int().to(device)
+
+
+def reference_encode(x, y, z, mode):
+    """
+    Scalar port of the CUDA kernels in src/z_order.cu and src/hilbert.cu.
+    """
+    def expand_bits(v):
+        v = (v * 0x00010001) & 0xFF0000FF
+        v = (v * 0x00000101) & 0x0F00F00F
+        v = (v * 0x00000011) & 0xC30C30C3
+        v = (v * 0x00000005) & 0x49249249
+        return v
+
+    point = [x, y, z]
+    if mode == 'hilbert':
+        q = 1 << 9
+        while q > 1:
+            p = q - 1
+            for i in range(3):
+                if point[i] & q:
+                    point[0] ^= p
+                else:
+                    t = (point[0] ^ point[i]) & p
+                    point[0] ^= t
+                    point[i] ^= t
+            q >>= 1
+        for i in range(1, 3):
+            point[i] ^= point[i - 1]
+        t = 0
+        q = 1 << 9
+        while q > 1:
+            if point[2] & q:
+                t ^= q - 1
+            q >>= 1
+        point = [c ^ t for c in point]
+    return expand_bits(point[0]) * 4 + expand_bits(point[1]) * 2 + expand_bits(point[2])
+
+
+def test_reference(mode):
+    coords = torch.randint(0, 1024, (4096, 3), dtype=torch.int32)
+    code = vox2seq.pytorch.encode(coords, mode=mode)
+    expected = [reference_encode(*c, mode=mode) for c in coords.tolist()]
+    assert code.tolist() == expected, f"{mode}: mismatch with the CUDA reference"
+
+
+def test_roundtrip(res, mode):
+    coords = grid_coords(res)
+    for permute in PERMUTES:
+        code = vox2seq.pytorch.encode(coords, permute=permute, mode=mode)
+        assert code.dtype == torch.int32
+        assert code.min() >= 0 and code.max() < res ** 3
+        decoded = vox2seq.pytorch.decode(code, permute=permute, mode=mode)
+        assert torch.equal(decoded, coords), f"{mode} @ {res}: roundtrip failed for permute {permute}"
+
+
+def test_bijection(res, mode):
+    """
+    The first res^3 codes cover exactly the res^3 grid anchored at the origin.
+    """
+    if res ** 3 > MAX_POINTS:
+        return
+    code = torch.arange(res ** 3, dtype=torch.int32)
+    coords = vox2seq.pytorch.decode(code, mode=mode)
+    assert coords.min() >= 0 and coords.max() < res
+    flat = (coords[:, 0].long() * res + coords[:, 1]) * res + coords[:, 2]
+    assert torch.equal(flat.sort().values, torch.arange(res ** 3)), f"{mode} @ {res}: not a bijection"
+    if mode == 'hilbert':
+        step = (coords[1:] - coords[:-1]).abs().sum(dim=-1)
+        assert (step == 1).all(), f"hilbert @ {res}: consecutive codes are not face neighbors"
+
+
+def test_cuda(res, mode):
+    if not torch.cuda.is_available() or vox2seq._C is None:
+        return
+    coords = grid_coords(res, 'cuda')
+    code_cuda = vox2seq.encode(coords, mode=mode)
+    code_pytorch = vox2seq.pytorch.encode(coords, mode=mode)
+    assert torch.equal(code_cuda, code_pytorch)
+    code = torch.randint(0, 1 << 30, (coords.shape[0],), dtype=torch.int32, device='cuda')
+    coords_cuda = vox2seq.decode(code, mode=mode)
+    coords_pytorch = vox2seq.pytorch.decode(code, mode=mode)
+    assert torch.equal(coords_cuda, coords_pytorch)
+    assert torch.equal(vox2seq.encode(coords.cpu(), mode=mode), code_cuda.cpu())
+
+
 if __name__ == "__main__":
-    RES = 256
-    coords = torch.meshgrid(torch.arange(RES), torch.arange(RES), torch.arange(RES))
-    coords = torch.stack(coords, dim=-1).reshape(-1, 3).int().cuda()
-    code_z_cuda = vox2seq.encode(coords, mode='z_order')
-    code_z_pytorch = vox2seq.pytorch.encode(coords, mode='z_order')
-    code_h_cuda = vox2seq.encode(coords, mode='hilbert')
-    code_h_pytorch = vox2seq.pytorch.encode(coords, mode='hilbert')
-    assert torch.equal(code_z_cuda, code_z_pytorch)
-    assert torch.equal(code_h_cuda, code_h_pytorch)
-
-    code = torch.arange(RES**3).int().cuda()
-    coords_z_cuda = vox2seq.decode(code, mode='z_order')
-    coords_z_pytorch = vox2seq.pytorch.decode(code, mode='z_order')
-    coords_h_cuda = vox2seq.decode(code, mode='hilbert')
-    coords_h_pytorch = vox2seq.pytorch.decode(code, mode='hilbert')
-    assert torch.equal(coords_z_cuda, coords_z_pytorch)
-    assert torch.equal(coords_h_cuda, coords_h_pytorch)
+    torch.manual_seed(0)
+    for mode in ['z_order', 'hilbert']:
+        test_reference(mode)
+        for res in RES:
+            test_roundtrip(res, mode)
+            test_bijection(res, mode)
+            test_cuda(res, mode)
+        print(f"{mode}: passed")
 
     print("All tests passed.")
-
@@ -1,14 +1,27 @@
 
 from typing import *
 import torch
-from . import _C
 from . import pytorch
+try:
+    from . import _C
+except ImportError:
+    _C = None
+
+
+def _backend(tensor: torch.Tensor):
+    """
+    The CUDA kernels for CUDA tensors, the LUT implementation otherwise.
+    """
+    if tensor.is_cuda and _C is not None:
+        return _C
+    return pytorch.lut
 
 
 @torch.no_grad()
 def encode(coords: torch.Tensor, permute: List[int] = [0, 1, 2], mode: Literal['z_order', 'hilbert'] = 'z_order') -> torch.Tensor:
     """
     Encodes 3D coordinates into a 30-bit code.
+    CPU tensors, or any tensor when the CUDA extension is not built, are encoded with `pytorch.lut`.
 
     Args:
         coords: a tensor of shape [N, 3] containing the 3D coordinates.
@@ -19,10 +32,11 @@ def encode(coords: torch.Tensor, permute: List[int] = [0, 1, 2], mode: Literal['
     x = coords[:, permute[0]].int()
     y = coords[:, permute[1]].int()
     z = coords[:, permute[2]].int()
+    backend = _backend(coords)
     if mode == 'z_order':
-        return _C.z_order_encode(x, y, z)
+        return backend.z_order_encode(x, y, z)
     elif mode == 'hilbert':
-        return _C.hilbert_encode(x, y, z)
+        return backend.hilbert_encode(x, y, z)
     else:
         raise ValueError(f"Unknown encoding mode: {mode}")
 
@@ -31,6 +45,7 @@ def encode(coords: torch.Tensor, permute: List[int] = [0, 1, 2], mode: Literal['
 def decode(code: torch.Tensor, permute: List[int] = [0, 1, 2], mode: Literal['z_order', 'hilbert'] = 'z_order') -> torch.Tensor:
     """
     Decodes a 30-bit code into 3D coordinates.
+    CPU tensors, or any tensor when the CUDA extension is not built, are decoded with `pytorch.lut`.
 
     Args:
         code: a tensor of shape [N] containing the 30-bit code.
@@ -38,10 +53,11 @@ def decode(code: torch.Tensor, permute: List[int] = [0, 1, 2], mode: Literal['z_
         mode: the decoding mode to use.
     """
     assert code.ndim == 1, "Input code must be of shape [N]"
+    backend = _backend(code)
     if mode == 'z_order':
-        coords = _C.z_order_decode(code)
+        coords = backend.z_order_decode(code)
     elif mode == 'hilbert':
-        coords = _C.hilbert_decode(code)
+        coords = backend.hilbert_decode(code)
     else:
         raise ValueError(f"Unknown decoding mode: {mode}")
     x = coords[permute.index(0)]
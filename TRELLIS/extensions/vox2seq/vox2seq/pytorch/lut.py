@@ -0,0 +1,173 @@
+"""
+Look-up-table based z-order and Hilbert encoding of 10-bit 3D coordinates.
+
+The functions mirror the `_C` CUDA kernels (same arguments, same int32 outputs, same bits)
+but run on any device, which makes them the fallback for CPU tensors and for machines
+where the extension is not built. Bit interleaving is done with pre-computed tables and
+the Hilbert transform is Skilling's algorithm applied to whole integer tensors, so every
+step is a handful of elementwise ops instead of a per-bit loop.
+"""
+
+import torch
+from typing import *
+
+
+BITS = 10
+MAX_COORD = (1 << BITS) - 1
+
+
+class CurveLUT:
+    def __init__(self):
+        r1024 = torch.arange(1 << BITS, dtype=torch.int64)
+        r512 = torch.arange(512, dtype=torch.int64)
+        device = torch.device("cpu")
+
+        # 10-bit value -> 30-bit value with two zeros inserted after each bit.
+        self._expand = {device: self.expand_bits(r1024, BITS)}
+        # 9-bit interleaved chunk -> the 3 bits of (x, y, z) it holds.
+        self._compact = {device: tuple(self.compact_bits(r512 >> s, 3) for s in (2, 1, 0))}
+
+    @staticmethod
+    def expand_bits(v, depth):
+        out = torch.zeros_like(v)
+        for i in range(depth):
+            out = out | (((v >> i) & 1) << (3 * i))
+        return out
+
+    @staticmethod
+    def compact_bits(v, depth):
+        out = torch.zeros_like(v)
+        for i in range(depth):
+            out = out | (((v >> (3 * i)) & 1) << i)
+        return out
+
+    def expand_lut(self, device=torch.device("cpu")):
+        if device not in self._expand:
+            self._expand[device] = self._expand[torch.device("cpu")].to(device)
+        return self._expand[device]
+
+    def compact_lut(self, device=torch.device("cpu")):
+        if device not in self._compact:
+            cpu = torch.device("cpu")
+            self._compact[device] = tuple(c.to(device) for c in self._compact[cpu])
+        return self._compact[device]
+
+
+_curve_lut = CurveLUT()
+
+
+def _interleave(x: torch.Tensor, y: torch.Tensor, z: torch.Tensor) -> torch.Tensor:
+    E = _curve_lut.expand_lut(x.device)
+    return (E[x & MAX_COORD] << 2) | (E[y & MAX_COORD] << 1) | E[z & MAX_COORD]
+
+
+def _deinterleave(code: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    DX, DY, DZ = _curve_lut.compact_lut(code.device)
+    x, y, z = torch.zeros_like(code), torch.zeros_like(code), torch.zeros_like(code)
+    for i in range((BITS + 2) // 3):
+        k = (code >> (9 * i)) & 511
+        x = x | (DX[k] << (3 * i))
+        y = y | (DY[k] << (3 * i))
+        z = z | (DZ[k] << (3 * i))
+    return x, y, z
+
+
+def _skilling_step(point: List[torch.Tensor], i: int, level: int) -> None:
+    # Branch-free form of: if point[i] & q, invert the low bits of point[0],
+    # otherwise exchange the low bits of point[0] and point[i].
+    p = (1 << level) - 1
+    bit = (point[i] >> level) & 1
+    invert = -bit & p
+    if i == 0:
+        point[0] = point[0] ^ invert
+        return
+    t = (point[0] ^ point[i]) & p & (bit - 1)
+    point[0] = point[0] ^ invert ^ t
+    point[i] = point[i] ^ t
+
+
+def _hilbert_axes_to_transpose(x, y, z) -> List[torch.Tensor]:
+    point = [x, y, z]
+    # Inverse undo excess work
+    for level in range(BITS - 1, 0, -1):
+        for i in range(3):
+            _skilling_step(point, i, level)
+    # Gray encode
+    point[1] = point[1] ^ point[0]
+    point[2] = point[2] ^ point[1]
+    t = torch.zeros_like(point[2])
+    for level in range(BITS - 1, 0, -1):
+        t = t ^ (-((point[2] >> level) & 1) & ((1 << level) - 1))
+    return [c ^ t for c in point]
+
+
+def _hilbert_transpose_to_axes(x, y, z) -> List[torch.Tensor]:
+    point = [x, y, z]
+    # Gray decode by H ^ (H/2)
+    t = point[2] >> 1
+    point[2] = point[2] ^ point[1]
+    point[1] = point[1] ^ point[0]
+    point[0] = point[0] ^ t
+    # Undo excess work
+    for level in range(1, BITS):
+        for i in range(2, -1, -1):
+            _skilling_step(point, i, level)
+    return point
+
+
+@torch.no_grad()
+def z_order_encode(x: torch.Tensor, y: torch.Tensor, z: torch.Tensor) -> torch.Tensor:
+    """
+    Z-order encode 3D points.
+
+    Args:
+        x, y, z: [N] tensors of coordinates in [0, 1024).
+
+    Returns:
+        [N] int32 tensor of 30-bit codes, equal to `_C.z_order_encode`.
+    """
+    return _interleave(x.long(), y.long(), z.long()).int()
+
+
+@torch.no_grad()
+def z_order_decode(code: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Z-order decode 30-bit codes.
+
+    Args:
+        code: [N] tensor of 30-bit codes.
+
+    Returns:
+        The x, y, z int32 tensors, equal to `_C.z_order_decode`.
+    """
+    return tuple(c.int() for c in _deinterleave(code.long()))
+
+
+@torch.no_grad()
+def hilbert_encode(x: torch.Tensor, y: torch.Tensor, z: torch.Tensor) -> torch.Tensor:
+    """
+    Hilbert encode 3D points.
+
+    Args:
+        x, y, z: [N] tensors of coordinates in [0, 1024).
+
+    Returns:
+        [N] int32 tensor of 30-bit codes, equal to `_C.hilbert_encode`.
+    """
+    point = _hilbert_axes_to_transpose(x.long() & MAX_COORD, y.long() & MAX_COORD, z.long() & MAX_COORD)
+    return _interleave(*point).int()
+
+
+@torch.no_grad()
+def hilbert_decode(code: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Hilbert decode 30-bit codes.
+
+    Args:
+        code: [N] tensor of 30-bit codes.
+
+    Returns:
+        The x, y, z int32 tensors, equal to `_C.hilbert_decode`.
+    """
+    point = _hilbert_transpose_to_axes(*_deinterleave(code.long()))
+    return tuple(c.int() for c in point)
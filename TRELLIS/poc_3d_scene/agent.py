@@ -1,19 +1,59 @@
+import json
+import time
 import logging
+import threading
 from datetime import datetime
+from griptape.artifacts import TextArtifact
+from griptape.events import EventBus, EventListener, FinishPromptEvent
 from griptape.structures import Agent
 from griptape.drivers.prompt.openai import OpenAiChatPromptDriver
-from griptape.memory.structure import ConversationMemory
+from griptape.memory.structure import ConversationMemory, Run
 from griptape.rules import Rule
 from config import AGENT_MODEL, AGENT_BASE_URL, LOG_LEVEL, LOG_FORMAT
-from utils import save_prompts_to_json
+from utils import save_prompts_to_json, ObjectListParser
+from response_cache import make_key
+from scene_plan import PLAN_SCHEMA, MAX_PROMPT_WORDS, extract_json, validate_plan
 
 # Set up logging
 logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
+# Agent running a prompt in the current thread; prompt events are published synchronously
+# in that thread, which attributes token counts to the right agent
+_active = threading.local()
+
+
+def _count_tokens(event):
+    agent = getattr(_active, "agent", None)
+    if agent is not None:
+        agent.metrics["input_tokens"] += event.input_token_count or 0
+        agent.metrics["output_tokens"] += event.output_token_count or 0
+
+
+EventBus.add_event_listener(EventListener(_count_tokens, event_types=[FinishPromptEvent]))
+
 
 class ScenePlanningAgent:
-    def __init__(self):
+    def __init__(self, base_url=AGENT_BASE_URL, model=AGENT_MODEL, cache=None):
+        self.base_url = base_url
+        self.model = model
+        self.cache = cache
+        # Rules are built once; switching modes only swaps the lists
+        self.planning_rules = self._get_planning_rules()
+        self.prompt_generation_rules = self._get_prompt_generation_rules()
+        self.metrics = {
+            "llm_calls": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "invalid_plans": 0,
+            "streamed_calls": 0,
+            "ttft_total": 0.0,
+            "ttft_last": None,
+        }
+        self.scene_request = ""
+        self.last_plan = None
         self.memory = ConversationMemory()
         self.agent = self._initialize_agent()
         self.is_generating_prompts = False
@@ -127,7 +167,10 @@ class ScenePlanningAgent:
                 "Generate a separate prompt for each object in the scene."
             ),
             Rule(
-                "Format each object's prompt with 'Object:' and 'Prompt:' labels."
+                "Also give the scene a short, descriptive name of 2-3 words."
+            ),
+            Rule(
+                "Answer with a single JSON object that follows the schema given in the request, and nothing else."
             ),
         ]
 
@@ -135,8 +178,8 @@ class ScenePlanningAgent:
         """Initialize the agent with initial planning rules."""
         try:
             prompt_driver = OpenAiChatPromptDriver(
-                model=AGENT_MODEL,
-                base_url=AGENT_BASE_URL,
+                model=self.model,
+                base_url=self.base_url,
                 api_key="not-needed",
                 user="user",
             )
@@ -146,49 +189,185 @@ class ScenePlanningAgent:
 
         agent = Agent(
             prompt_driver=prompt_driver,
-            rules=self._get_planning_rules(),
+            rules=self.planning_rules,
         )
         agent.memory = self.memory
         return agent
 
+    def _use_rules(self, rules):
+        """Switch the agent's rules, only when they change."""
+        if self.agent.rules is not rules:
+            self.agent.rules = rules
+
+    def _run(self, prompt, rules):
+        """Run the agent and return the response text, counting calls and tokens."""
+        self._use_rules(rules)
+        self.metrics["llm_calls"] += 1
+        _active.agent = self
+        try:
+            response = self.agent.run(prompt)
+        finally:
+            _active.agent = None
+        return response.output.value if hasattr(response, "output") else str(response)
+
+    def _cached_run(self, kind, prompt, rules, text="", objects=(), accept=None):
+        """`_run` through the response cache, storing only responses `accept` approves of.
+
+        Returns (response text, cache key).
+        """
+        if self.cache is None:
+            return self._run(prompt, rules), None
+        key = self._cache_key(kind, rules, text, objects)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics["cache_hits"] += 1
+            return cached, key
+        self.metrics["cache_misses"] += 1
+        tokens_before = (self.metrics["input_tokens"], self.metrics["output_tokens"])
+        response_text = self._run(prompt, rules)
+        if accept is not None and not accept(response_text):
+            return response_text, key
+        self.cache.put(
+            key,
+            kind,
+            response_text,
+            self.metrics["input_tokens"] - tokens_before[0],
+            self.metrics["output_tokens"] - tokens_before[1],
+        )
+        return response_text, key
+
+    def _cache_key(self, kind, rules, text="", objects=()):
+        return make_key(kind, self.model, [str(rule.value) for rule in rules], text, objects)
+
+    def _remember(self, message, response_text):
+        """Add an exchange answered from the cache to the conversation memory."""
+        self.memory.add_run(Run(input=TextArtifact(message), output=TextArtifact(response_text)))
+
     def chat(self, message, current_objects=None):
         """Handle chat messages and provide scene planning assistance."""
         try:
             # Always ensure we're in planning mode
-            if self.is_generating_prompts:
-                self.agent.rules = self._get_planning_rules()
-                self.is_generating_prompts = False
-
-            # Add current objects context to the message if provided
-            if current_objects:
-                context_message = f"Current objects in scene: {', '.join(current_objects)}\n\nUser message: {message}"
-            else:
-                context_message = message
-
-            # Normal chat response - always in planning mode
-            self.agent.rules = self._get_planning_rules()
-            response = self.agent.run(context_message)
-            response_text = response.output.value if hasattr(response, "output") else str(response)
-            return response_text
+            self.is_generating_prompts = False
+
+            context_message = self._context_message(message, current_objects)
+
+            # Opening requests do not depend on earlier turns, so they can be answered from the cache
+            if not self.memory.runs and not current_objects:
+                self.scene_request = message
+                response_text, _ = self._cached_run("chat", context_message, self.planning_rules, text=message)
+                if not self.memory.runs:
+                    self._remember(context_message, response_text)
+                return response_text
+            return self._run(context_message, self.planning_rules)
         except Exception as e:
             logger.error(f"Error in chat: {e}")
             return f"An error occurred: {str(e)}"
 
-    def generate_scene_name(self, description):
-        """Generate a scene name from the description."""
+    @staticmethod
+    def _context_message(message, current_objects):
+        """Add current objects context to the message if provided."""
+        if current_objects:
+            return f"Current objects in scene: {', '.join(current_objects)}\n\nUser message: {message}"
+        return message
+
+    def _messages(self, prompt, rules):
+        """OpenAI chat messages for `prompt`: the rules as system prompt, then the conversation so far."""
+        system = "Follow these rules:\n" + "\n".join(f"- {rule.value}" for rule in rules)
+        messages = [{"role": "system", "content": system}]
+        for run in self.memory.runs:
+            messages.append({"role": "user", "content": run.input.value})
+            messages.append({"role": "assistant", "content": run.output.value})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def chat_stream(self, message, current_objects=None):
+        """Streaming version of `chat`.
+
+        Tokens are requested straight from the prompt driver's OpenAI client and
+        suggested objects are parsed as lines complete. Closing the generator (for
+        instance when Gradio cancels the event) closes the HTTP stream, so the server
+        stops generating; a cancelled answer is not added to the conversation.
+
+        Yields:
+            (text, objects): The response so far and the objects parsed from it so far.
+        """
+        self.is_generating_prompts = False
+        context_message = self._context_message(message, current_objects)
+        parser = ObjectListParser()
+        key = None
+        if self.cache is not None and not self.memory.runs and not current_objects:
+            self.scene_request = message
+            key = self._cache_key("chat", self.planning_rules, text=message)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.metrics["cache_hits"] += 1
+                self.metrics["ttft_last"] = 0.0
+                parser.feed(cached)
+                self._remember(context_message, cached)
+                yield cached, parser.finish()
+                return
+            self.metrics["cache_misses"] += 1
+
+        text = ""
+        stream = None
         try:
-            # response = self.agent.run(f"""Based on this scene description: "{description}"
-            # Generate a short, descriptive name for this scene (2-3 words).
-            # Format the response as: "Scene Name: [name]"
-            # """)
+            self._use_rules(self.planning_rules)
+            self.metrics["llm_calls"] += 1
+            start = time.perf_counter()
+            stream = self.agent.prompt_driver.client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(context_message, self.planning_rules),
+                user="user",
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.usage is not None:
+                    self.metrics["input_tokens"] += chunk.usage.prompt_tokens or 0
+                    self.metrics["output_tokens"] += chunk.usage.completion_tokens or 0
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                if not text:
+                    ttft = time.perf_counter() - start
+                    self.metrics["streamed_calls"] += 1
+                    self.metrics["ttft_total"] += ttft
+                    self.metrics["ttft_last"] = ttft
+                    logger.info(f"Time to first token: {ttft * 1000:.0f} ms")
+                text += chunk.choices[0].delta.content
+                yield text, parser.feed(chunk.choices[0].delta.content)
+        except Exception as e:
+            logger.error(f"Error in chat: {e}")
+            yield f"An error occurred: {str(e)}", []
+            return
+        finally:
+            # Runs on completion, error and cancellation alike
+            if stream is not None:
+                stream.close()
+
+        objects = parser.finish()
+        self._remember(context_message, text)
+        if key is not None and text:
+            self.cache.put(key, "chat", text)
+        yield text, objects
 
-            response = self.agent.run(f"""Based on this scene discussion,
+    def generate_scene_name(self, description):
+        """Generate a scene name from the description.
+
+        Reuses the name of the last structured plan when there is one, which saves a call.
+        """
+        if self.last_plan is not None:
+            return self.last_plan["scene_name"]
+        try:
+            prompt = """Based on this scene discussion,
             Generate a short, descriptive name for this scene (2-3 words).
             Format the response as: "Scene Name: [name]"
-            """)
-
-            response_text = (
-                response.output.value if hasattr(response, "output") else str(response)
+            """
+            response_text, _ = self._cached_run(
+                "scene_name",
+                prompt,
+                self.planning_rules,
+                text=self.scene_request or description,
+                accept=lambda text: "Scene Name:" in text,
             )
 
             for line in response_text.split("\n"):
@@ -200,66 +379,84 @@ class ScenePlanningAgent:
             logger.error(f"Error generating scene name: {e}")
             return f"scene_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-    def generate_3d_prompts(self, scene_name, initial_description):
-        """Generate 3D prompts for each object in the final scene."""
-        try:
-            logger.info("Switching to prompt generation mode")
-            # Switch to prompt generation mode
-            self.agent.rules = self._get_prompt_generation_rules()
-            self.is_generating_prompts = True
+    def plan_scene(self, objects):
+        """Generate the 3D prompts of `objects` and the scene name in a single structured call.
 
-            generation_prompt = f"""Generate detailed 3D prompts for each object in the current scene, focusing on:
+        The answer is validated against `PLAN_SCHEMA`; if it does not conform, the model is
+        asked once more with the list of problems. Valid plans are cached by object set and
+        opening request.
+
+        Returns:
+            (plan, generation_prompt): plan is {"scene_name": str, "prompts": {name: prompt}},
+                or None if no valid plan was produced.
+        """
+        generation_prompt = f"""Generate detailed 3D prompts for each object in the current scene, focusing on:
             1. Visual and physical characteristics
             2. Materials and surface properties
             3. Context within the scene
-            Generate prompt for each object strictly from this list: {initial_description}
-            Keep each prompt to exactly 40 words or less.
-            Format each object's prompt with 'Object:' and 'Prompt:' labels.
+            Generate prompt for each object strictly from this list: {list(objects)}
+            Keep each prompt to exactly {MAX_PROMPT_WORDS} words or less.
+            Also name the scene in 2-3 words.
+            Answer only with JSON following this schema: {json.dumps(PLAN_SCHEMA)}
             """
-
-            response = self.agent.run(generation_prompt)
-
-            response_text = (
-                response.output.value if hasattr(response, "output") else str(response)
+        self.is_generating_prompts = True
+        try:
+            response_text, key = self._cached_run(
+                "plan",
+                generation_prompt,
+                self.prompt_generation_rules,
+                text=self.scene_request,
+                objects=objects,
+                accept=lambda text: not self._validate(text, objects)[1],
             )
-            logger.info("Received response from agent")
+            plan, errors = self._validate(response_text, objects)
+            if errors:
+                self.metrics["invalid_plans"] += 1
+                logger.warning(f"Invalid scene plan, asking again: {'; '.join(errors)}")
+                retry_prompt = (
+                    "Your answer did not follow the schema: " + "; ".join(errors)
+                    + f". Answer again for exactly these objects: {list(objects)}, "
+                    + f"with only JSON following this schema: {json.dumps(PLAN_SCHEMA)}"
+                )
+                response_text = self._run(retry_prompt, self.prompt_generation_rules)
+                plan, errors = self._validate(response_text, objects)
+                if errors:
+                    self.metrics["invalid_plans"] += 1
+                    logger.warning(f"No valid scene plan: {'; '.join(errors)}")
+                    return None, generation_prompt
+                if key is not None:
+                    self.cache.put(key, "plan", response_text)
+            self.last_plan = plan
+            return plan, generation_prompt
+        finally:
+            self.is_generating_prompts = False
 
-            object_prompts = {}
-            current_object = None
-            current_prompt = []
+    @staticmethod
+    def _validate(response_text, objects):
+        try:
+            data = extract_json(response_text)
+        except ValueError as e:
+            return None, [str(e)]
+        return validate_plan(data, objects)
 
-            for curr_line in response_text.split("\n"):
-                line = curr_line.strip()
-                if not line:
-                    continue
+    def generate_3d_prompts(self, scene_name, initial_description, save=True):
+        """Generate 3D prompts for each object in the final scene.
 
-                if "Object:" in line:
-                    if current_object and current_prompt:
-                        prompt_text = " ".join(current_prompt)
-                        word_count = len(prompt_text.split())
-                        if word_count > 40:
-                            prompt_text = " ".join(prompt_text.split()[:40])
-                        object_prompts[current_object] = prompt_text
-                    current_object = (
-                        line.split("Object:")[-1].strip().strip("*").strip()
-                    )
-                    current_prompt = []
-                elif "Prompt:" in line:
-                    prompt_text = line.split("Prompt:")[-1].strip().strip("*").strip()
-                    current_prompt.append(prompt_text)
-
-            if current_object and current_prompt:
-                prompt_text = " ".join(current_prompt)
-                word_count = len(prompt_text.split())
-                if word_count > 40:
-                    prompt_text = " ".join(prompt_text.split()[:40])
-                object_prompts[current_object] = prompt_text
-
-            if not object_prompts:
+        The prompts come from `plan_scene`; if `scene_name` is None the planned name is used.
+        With `save=False` the prompts are only returned, not written to the prompts file.
+        """
+        generation_prompt = ""
+        try:
+            logger.info("Generating 3D prompts")
+            plan, generation_prompt = self.plan_scene(initial_description)
+            if plan is None:
                 logger.warning("No prompts were extracted from the response")
                 return False, None, generation_prompt
 
-            if not save_prompts_to_json(
+            object_prompts = plan["prompts"]
+            if scene_name is None:
+                scene_name = plan["scene_name"]
+            if save and not save_prompts_to_json(
                 scene_name, object_prompts, initial_description
             ):
                 return False, None, generation_prompt
@@ -268,17 +465,24 @@ class ScenePlanningAgent:
         except Exception as e:
             logger.error(f"Error generating prompts: {e}")
             return False, None, generation_prompt
-        finally:
-            # Always switch back to planning mode after generation
-            logger.info("Switching back to planning mode after generation")
-            self.agent.rules = self._get_planning_rules()
-            self.is_generating_prompts = False
-            
+
+    def format_metrics(self):
+        """Calls, cache hits and tokens of this agent."""
+        m = self.metrics
+        lookups = m["cache_hits"] + m["cache_misses"]
+        hit_rate = f"{m['cache_hits'] / lookups:.0%}" if lookups else "n/a"
+        return (
+            f"LLM calls: {m['llm_calls']}, cache hits: {m['cache_hits']}/{lookups} ({hit_rate}), "
+            f"tokens: {m['input_tokens']} in / {m['output_tokens']} out, invalid plans: {m['invalid_plans']}"
+            + (f", mean TTFT: {m['ttft_total'] / m['streamed_calls'] * 1000:.0f} ms" if m["streamed_calls"] else "")
+        )
 
     def clear_memory(self):
         """Clear conversation memory."""
         self.memory = ConversationMemory()
         self.agent.memory = self.memory
+        self.scene_request = ""
+        self.last_plan = None
         # Reinitialize the agent to get a fresh context
         self.agent = self._initialize_agent()
 
@@ -0,0 +1,213 @@
+"""Load test of the scene planning agent.
+
+Runs concurrent sessions, each with its own `ScenePlanningAgent` as a Gradio session
+would, through the planning flow: chat turns, 3D prompt generation for the suggested
+objects and scene naming. Reports throughput, latency percentiles and the error and
+parse-failure rates of every call type, plus LLM requests, response cache hits and
+token counts.
+
+By default an in-process `llm_stub` server answers, with the latency options below;
+pass --base-url to load test a real server instead.
+
+    python agent_loadtest.py --sessions 64 --concurrency 16 --latency-ms 400 --tokens-per-second 30
+"""
+import re
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from agent import ScenePlanningAgent
+from llm_stub import StubLLM, serve
+from utils import parse_object_list
+from response_cache import ResponseCache
+from config import AGENT_MODEL, LOG_LEVEL, LOG_FORMAT
+
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+SCENE_REQUESTS = [
+    "I want a cozy living room for reading",
+    "Create a small home office",
+    "A minimalist bedroom with natural light",
+    "Design a dining area for six people",
+    "A rustic cabin lounge",
+]
+_FALLBACK_NAME = re.compile(r"^scene_\d{8}_\d{6}$")
+
+
+class Recorder:
+    """Thread-safe collection of call outcomes: (latency, 'ok' | 'error' | 'parse_failure')."""
+
+    def __init__(self):
+        self.calls = {}
+        self.agent_metrics = {}
+        self._lock = threading.Lock()
+
+    def add_metrics(self, metrics):
+        with self._lock:
+            for k, v in metrics.items():
+                if v is not None and k != "ttft_last":
+                    self.agent_metrics[k] = self.agent_metrics.get(k, 0) + v
+
+    def add(self, kind, latency, outcome):
+        with self._lock:
+            self.calls.setdefault(kind, []).append((latency, outcome))
+
+    def timed(self, kind, fn, classify):
+        start = time.perf_counter()
+        try:
+            result = fn()
+            outcome = classify(result)
+        except Exception as e:
+            logger.error(f"{kind} raised: {e}")
+            result, outcome = None, "error"
+        self.add(kind, time.perf_counter() - start, outcome)
+        return result
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def stream_chat(agent, message, accepted, recorder):
+    """`chat_stream` consumed like the UI does, recording the time to the first token."""
+    start = time.perf_counter()
+    response, first_token = "", False
+    for response, _ in agent.chat_stream(message, current_objects=accepted):
+        if response and not first_token:
+            first_token = True
+            outcome = "error" if response.startswith("An error occurred") else "ok"
+            recorder.add("chat_ttft", time.perf_counter() - start, outcome)
+    return response
+
+
+def run_session(session, base_url, model, turns, recorder, cache, stream=False):
+    """One user going through the planning flow."""
+    agent = ScenePlanningAgent(base_url=base_url, model=model, cache=cache)
+    accepted = []
+    for turn in range(turns):
+        message = SCENE_REQUESTS[(session + turn) % len(SCENE_REQUESTS)]
+
+        def classify_chat(response):
+            if response.startswith("An error occurred"):
+                return "error"
+            return "ok" if parse_object_list(response) else "parse_failure"
+
+        if stream:
+            chat = lambda: stream_chat(agent, message, accepted, recorder)
+        else:
+            chat = lambda: agent.chat(message, current_objects=accepted)
+        response = recorder.timed("chat", chat, classify_chat)
+        objects = parse_object_list(response or "")
+        accepted += [obj for obj in objects[:3] if obj not in accepted]
+
+    if accepted:
+        recorder.timed(
+            "generate_3d_prompts",
+            lambda: agent.generate_3d_prompts(f"loadtest_{session}", accepted, save=False),
+            lambda result: "ok" if result[0] and set(result[1]) >= set(accepted) else "parse_failure",
+        )
+    recorder.timed(
+        "generate_scene_name",
+        lambda: agent.generate_scene_name(""),
+        lambda name: "parse_failure" if _FALLBACK_NAME.match(name) else "ok",
+    )
+    recorder.add_metrics(agent.metrics)
+
+
+def report(recorder, sessions, wall_time):
+    summary = {"sessions": sessions, "wall_time": wall_time, "sessions_per_second": sessions / wall_time, "calls": {}}
+    total_calls = 0
+    print(f"{'Call':<22}{'Count':<8}{'Errors':<9}{'Parse fail':<12}{'p50 (s)':<10}{'p95 (s)':<10}{'p99 (s)':<10}{'Max (s)'}")
+    for kind, calls in recorder.calls.items():
+        latencies = [latency for latency, _ in calls]
+        errors = sum(outcome == "error" for _, outcome in calls) / len(calls)
+        parse_failures = sum(outcome == "parse_failure" for _, outcome in calls) / len(calls)
+        stats = {
+            "count": len(calls),
+            "error_rate": errors,
+            "parse_failure_rate": parse_failures,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+        }
+        summary["calls"][kind] = stats
+        total_calls += len(calls)
+        print(
+            f"{kind:<22}{len(calls):<8}{errors:<9.1%}{parse_failures:<12.1%}"
+            f"{stats['p50']:<10.2f}{stats['p95']:<10.2f}{stats['p99']:<10.2f}{stats['max']:.2f}"
+        )
+    summary["calls_per_second"] = total_calls / wall_time
+    summary["agent"] = dict(recorder.agent_metrics)
+    m = recorder.agent_metrics
+    lookups = m.get("cache_hits", 0) + m.get("cache_misses", 0)
+    print(
+        f"LLM requests: {m.get('llm_calls', 0)}, cache hits: {m.get('cache_hits', 0)}/{lookups}, "
+        f"tokens: {m.get('input_tokens', 0)} in / {m.get('output_tokens', 0)} out, invalid plans: {m.get('invalid_plans', 0)}"
+    )
+    print(f"{sessions} sessions in {wall_time:.1f}s: {summary['sessions_per_second']:.2f} sessions/s, {summary['calls_per_second']:.2f} calls/s")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the scene planning agent")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8, help="Sessions running at the same time")
+    parser.add_argument("--turns", type=int, default=2, help="Chat turns per session")
+    parser.add_argument("--base-url", help="Server to test; an in-process stub is started if omitted")
+    parser.add_argument("--model", default=AGENT_MODEL)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="Stream chat replies and measure time to first token")
+    parser.add_argument("--cache-db", help="Response cache database shared by the sessions; no cache if omitted")
+    parser.add_argument("--output", help="Write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        stub = StubLLM(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+            malformed_rate=args.malformed_rate,
+            seed=args.seed,
+        )
+        server = serve(stub, "localhost", 0)
+        base_url = f"http://localhost:{server.server_address[1]}/v1"
+
+    cache = ResponseCache(args.cache_db) if args.cache_db else None
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_session, session, base_url, args.model, args.turns, recorder, cache, args.stream)
+            for session in range(args.sessions)
+        ]
+        for future in futures:
+            future.result()
+    summary = report(recorder, args.sessions, time.perf_counter() - start)
+    summary["args"] = vars(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=4)
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,14 @@ HOME_DIR = Path.home()
 TRELLIS_DIR = HOME_DIR / ".trellis"  # Hidden directory
 ASSETS_DIR = TRELLIS_DIR / "assets"
 PROMPTS_DIR = TRELLIS_DIR / "prompts"
+GLB_CACHE_DIR = TRELLIS_DIR / "cache" / "glb"
+JOBS_DB_FILE = TRELLIS_DIR / "jobs.db"
+AGENT_CACHE_FILE = TRELLIS_DIR / "cache" / "agent_responses.db"
 
 # Create directories
 ASSETS_DIR.mkdir(parents=True, exist_ok=True)
 PROMPTS_DIR.mkdir(parents=True, exist_ok=True)
+AGENT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
 
 # Define file paths
 OUTPUT_DIR = ASSETS_DIR
@@ -23,12 +27,31 @@ DEFAULT_SEED = 42
 DEFAULT_SPARSE_STEPS = 25
 DEFAULT_SLAT_STEPS = 25
 DEFAULT_CFG_STRENGTH = 7.5
+DEFAULT_CFG_BATCHED = True  # Single forward pass for cond/neg_cond per sampling step
+DEFAULT_BATCH_SIZE = 4  # Objects sampled together in one pipeline pass
+DEFAULT_SIMPLIFY = 0.95  # Ratio of mesh faces removed before GLB export
+DEFAULT_TEXTURE_SIZE = 1024
+GLB_CACHE_MAX_BYTES = 10 * 1024**3  # Least recently used GLBs are evicted above this size
+DEFAULT_FILL_HOLES_VISIBILITY = "rasterize"  # 1000-view nvdiffrast visibility, for inline exports
+DEFAULT_BAKE_MODE = "opt"  # nvdiffrast texture optimization, for inline exports
+POSTPROCESS_FILL_HOLES_VISIBILITY = "raycast"  # BVH ray casting, as the export workers run on the CPU
+POSTPROCESS_BAKE_MODE = "multires"  # Coarse-to-fine texture baking on the CPU rasterizer
+POSTPROCESS_WORKERS = 2  # CPU processes exporting GLBs while sampling continues; 0 exports inline
+POSTPROCESS_MAX_PENDING = 4  # Objects queued for export before sampling waits
+MODEL_LOAD_LAZY = True  # Load each submodel on first use, unused decoders are never loaded
+MODEL_LOAD_WORKERS = 4  # Submodels loaded in parallel when not lazy
+PIPELINE_FORMATS = ["mesh", "gaussian"]  # Decoded outputs; the GLB export needs no radiance field
+JOB_CLAIM_SIZE = 8  # Objects the scheduler takes from a job at a time
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 30.0  # Seconds before the first retry, doubled on every attempt
+JOB_POLL_INTERVAL = 2.0
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
 # TRELLIS pipeline settings
 TRELLIS_TEXT_LARGE_MODEL = "JeffreyXiang/TRELLIS-text-large"
 TRELLIS_TEXT_BASE_MODEL = "JeffreyXiang/TRELLIS-text-base"
+TRELLIS_IMAGE_LARGE_MODEL = "JeffreyXiang/TRELLIS-image-large"
 
 
 # Model configuration
@@ -38,6 +61,25 @@ TRELLIS_MODEL_NAME_MAP = {
 }
 DEFAULT_TRELLIS_MODEL = "TRELLIS-text-large"
 
+# Pipelines the model pool can keep warm; submodels beyond the device budget wait in pinned host memory
+MODEL_POOL_MODELS = {
+    **TRELLIS_MODEL_NAME_MAP,
+    "TRELLIS-image-large": TRELLIS_IMAGE_LARGE_MODEL,
+}
+MODEL_POOL_PRELOAD = []  # Loaded at startup in addition to the default model
+MODEL_POOL_DEVICE_BUDGET = None  # Bytes of weights on the GPU; None uses MODEL_POOL_DEVICE_FRACTION of it
+MODEL_POOL_DEVICE_FRACTION = 0.5  # The rest is left for activations
+MODEL_POOL_HOST_BUDGET = 32 * 1024**3  # Pipelines are dropped, least recently used first, above this
+
+# ODE solver used by the flow samplers; higher-order solvers reach similar quality in fewer steps
+SAMPLER_SOLVER_PREFIX_MAP = {
+    "euler": "FlowEuler",
+    "heun": "FlowHeun",
+    "dpm_solver": "FlowDPMSolver",
+    "adaptive": "FlowAdaptive",
+}
+DEFAULT_SAMPLER_SOLVER = "euler"
+
 # Algorithm configuration
 SPCONV_ALGO = "spconv2"
 
@@ -48,3 +90,11 @@ INITIAL_MESSAGE = "Hello! I'm your helpful scene planning assistant. Please desc
 # Agent settings
 AGENT_MODEL = "meta/llama-3.1-8b-instruct"
 AGENT_BASE_URL = "http://localhost:8000/v1"
+AGENT_STREAMING = True  # Stream chat replies token by token into the UI
+AGENT_CACHE_ENABLED = True  # Reuse answers to near-identical planning requests across sessions
+AGENT_CACHE_MAX_ENTRIES = 10000
+AGENT_CACHE_TTL = 7 * 24 * 3600  # Seconds an unused answer is kept
+
+# Local stand-in for the agent LLM server (llm_stub.py), on the NIM port by default
+LLM_STUB_HOST = "localhost"
+LLM_STUB_PORT = 8000
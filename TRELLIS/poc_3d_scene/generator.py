@@ -4,25 +4,51 @@ import logging
 import shutil
 import socket
 import threading
-import os
+import time
 import numpy as np
 import torch
 import gc
+from concurrent.futures import wait, FIRST_COMPLETED
 from pathlib import Path
-from trellis.pipelines import TrellisTextTo3DPipeline
+from trellis.pipelines import samplers, from_pretrained as load_pipeline
 from trellis.utils import postprocessing_utils, render_utils
 import imageio
+from glb_cache import GLBCache
+from postprocess_pool import PostprocessPool, make_payload
+from model_pool import ModelPool
 from config import (
     SPCONV_ALGO,
     DEFAULT_SEED,
     DEFAULT_SPARSE_STEPS,
     DEFAULT_SLAT_STEPS,
     DEFAULT_CFG_STRENGTH,
+    DEFAULT_CFG_BATCHED,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_SIMPLIFY,
+    DEFAULT_TEXTURE_SIZE,
+    DEFAULT_FILL_HOLES_VISIBILITY,
+    DEFAULT_BAKE_MODE,
+    POSTPROCESS_FILL_HOLES_VISIBILITY,
+    POSTPROCESS_BAKE_MODE,
+    POSTPROCESS_WORKERS,
+    POSTPROCESS_MAX_PENDING,
+    MODEL_LOAD_LAZY,
+    MODEL_POOL_MODELS,
+    MODEL_POOL_PRELOAD,
+    MODEL_POOL_DEVICE_BUDGET,
+    MODEL_POOL_DEVICE_FRACTION,
+    MODEL_POOL_HOST_BUDGET,
+    MODEL_LOAD_WORKERS,
+    PIPELINE_FORMATS,
+    GLB_CACHE_DIR,
+    GLB_CACHE_MAX_BYTES,
     OUTPUT_DIR,
     LOG_LEVEL,
     LOG_FORMAT,
     TRELLIS_MODEL_NAME_MAP,
     DEFAULT_TRELLIS_MODEL,
+    SAMPLER_SOLVER_PREFIX_MAP,
+    DEFAULT_SAMPLER_SOLVER,
 )
 
 # Set up logging
@@ -30,16 +56,63 @@ logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
 
+class _ResultList(list):
+    """Fixed-size result list that reports every assignment to a callback."""
+
+    def __init__(self, size, on_result=None):
+        super().__init__([None] * size)
+        self.on_result = on_result
+
+    def __setitem__(self, index, result):
+        super().__setitem__(index, result)
+        if self.on_result is not None:
+            try:
+                self.on_result(index, result)
+            except Exception as e:
+                logger.error(f"Error reporting result {index}: {e}")
+
+
 class AssetGenerator:
     def __init__(self, default_model=DEFAULT_TRELLIS_MODEL):
         os.environ["SPCONV_ALGO"] = SPCONV_ALGO
         self.pipeline = None
         self.current_model = None
+        self.model_pool = ModelPool(
+            self._load_pipeline,
+            device="cuda",
+            device_budget=self._device_budget(),
+            host_budget=MODEL_POOL_HOST_BUDGET,
+        )
+        self.sampler_solver = None
+        self.glb_cache = GLBCache(GLB_CACHE_DIR, GLB_CACHE_MAX_BYTES)
+        # The export workers run on the CPU, so they use the CPU hole filling and baking
+        self.glb_settings = {
+            "simplify": DEFAULT_SIMPLIFY,
+            "texture_size": DEFAULT_TEXTURE_SIZE,
+            "fill_holes_visibility": POSTPROCESS_FILL_HOLES_VISIBILITY if POSTPROCESS_WORKERS > 0 else DEFAULT_FILL_HOLES_VISIBILITY,
+            "bake_mode": POSTPROCESS_BAKE_MODE if POSTPROCESS_WORKERS > 0 else DEFAULT_BAKE_MODE,
+        }
+        self._generate_lock = threading.Lock()
+        self.postprocess_pool = None
+        if POSTPROCESS_WORKERS > 0:
+            self.postprocess_pool = PostprocessPool(POSTPROCESS_WORKERS, POSTPROCESS_MAX_PENDING, self.glb_settings)
         self.termination_thread = None
         self.start_termination_server()
         
-        # Load the default model during initialization
+        # Warm the pool, then load the default model during initialization
+        for model_name in MODEL_POOL_PRELOAD:
+            if model_name != default_model:
+                self.load_model(model_name)
         self.load_model(default_model)
+
+    @staticmethod
+    def _device_budget():
+        """Bytes of weights the model pool may keep on the GPU"""
+        if MODEL_POOL_DEVICE_BUDGET is not None:
+            return MODEL_POOL_DEVICE_BUDGET
+        if not torch.cuda.is_available():
+            return None
+        return int(torch.cuda.get_device_properties(0).total_memory * MODEL_POOL_DEVICE_FRACTION)
     
     def start_termination_server(self):
         """Start the termination server in a separate thread"""
@@ -71,49 +144,43 @@ class AssetGenerator:
         self.termination_thread.start()
 
     def cleanup(self):
-        """Clean up the current model"""
-        if self.pipeline is not None:
-            try:
-                # Move to CPU first
-                if hasattr(self.pipeline, 'cuda'):
-                    self.pipeline.cpu()
-
-                # Clear internal tensors if any
-                if hasattr(self.pipeline, '__dict__'):
-                    for k, v in list(vars(self.pipeline).items()):
-                        if torch.is_tensor(v):
-                            setattr(self.pipeline, k, None)
-                            del v
-                # Delete the model reference
-                del self.pipeline
-                self.pipeline = None
-                self.current_model = None
-
-                # Force garbage collection
-                gc.collect()
-
-                # Empty unused memory from GPU cache
-                torch.cuda.empty_cache()
-                logger.info("Successfully cleaned up pipeline")
-            except Exception as e:
-                logger.error(f"Error during cleanup: {e}")
+        """Release every pipeline held by the model pool"""
+        try:
+            self.model_pool.clear()
+            self.pipeline = None
+            self.current_model = None
+
+            # Force garbage collection
+            gc.collect()
+
+            # Empty unused memory from GPU cache
+            torch.cuda.empty_cache()
+            logger.info("Successfully cleaned up pipeline")
+        except Exception as e:
+            logger.error(f"Error during cleanup: {e}")
+
+    def _load_pipeline(self, model_name, device):
+        """Load a pipeline from disk for the model pool"""
+        start = time.time()
+        pipeline = load_pipeline(
+            MODEL_POOL_MODELS[model_name],
+            device=device,
+            lazy=MODEL_LOAD_LAZY,
+            num_workers=MODEL_LOAD_WORKERS,
+        )
+        self._log_load_times(model_name, pipeline, time.time() - start)
+        return pipeline
 
     def load_model(self, model_name):
-        """Load a specific TRELLIS model"""
+        """Make a TRELLIS model current, loading it from disk only if it is not in the model pool"""
         try:
-            # Clean up existing model if any
-            if self.pipeline is not None:
-                if self.current_model != model_name:
-                    logger.info(f"Switching from {self.current_model} to {model_name}")
-                    self.cleanup()
-                else:
-                    logger.info(f"Model {model_name} is already loaded")
-                    return True
-
-            # Load new model
-            logger.info(f"Loading model: {model_name}")
-            self.pipeline = TrellisTextTo3DPipeline.from_pretrained(TRELLIS_MODEL_NAME_MAP[model_name])
-            self.pipeline.cuda()
+            if self.current_model == model_name and self.pipeline is not None:
+                logger.info(f"Model {model_name} is already loaded")
+                return True
+            if self.current_model is not None:
+                logger.info(f"Switching from {self.current_model} to {model_name}")
+            self.pipeline = self.model_pool.get(model_name)
+            self.apply_sampler_solver(self.sampler_solver or DEFAULT_SAMPLER_SOLVER)
             self.current_model = model_name
             logger.info(f"Successfully loaded model: {model_name}")
             return True
@@ -121,9 +188,34 @@ class AssetGenerator:
             logger.error(f"Error loading model {model_name}: {e}")
             return False
 
+    def _log_load_times(self, model_name, pipeline, total):
+        """Log how long each submodel took to load, and later the deferred ones as they are used."""
+        models = pipeline.models
+        details = ", ".join(f"{k} {v:.1f}s" for k, v in models.load_times.items())
+        logger.info(f"Loaded {model_name} in {total:.1f}s ({details or 'no submodels yet'})")
+        if models.pending:
+            logger.info(f"Deferred until first use: {', '.join(models.pending)}")
+        models.on_load = lambda key, seconds: logger.info(f"Loaded {model_name}/{key} on first use in {seconds:.1f}s")
+
+    def apply_sampler_solver(self, solver):
+        """Swap the pipeline samplers for another ODE solver, keeping their guidance mode"""
+        prefix = SAMPLER_SOLVER_PREFIX_MAP[solver]
+        for attr in ("sparse_structure_sampler", "slat_sampler"):
+            sampler = getattr(self.pipeline, attr)
+            name = type(sampler).__name__
+            for other in SAMPLER_SOLVER_PREFIX_MAP.values():
+                if name.startswith(other):
+                    name = prefix + name[len(other):]
+                    break
+            setattr(self.pipeline, attr, getattr(samplers, name)(sigma_min=sampler.sigma_min))
+        self.sampler_solver = solver
+        logger.info(f"Using {solver} sampler solver")
+
     def __del__(self):
         """Cleanup when the object is destroyed"""
         self.cleanup()
+        if self.postprocess_pool is not None:
+            self.postprocess_pool.shutdown()
         if self.termination_thread:
             self.termination_thread.join(timeout=1.0)
 
@@ -158,6 +250,105 @@ class AssetGenerator:
             logger.error(f"Error generating preview image: {e}")
             return False
 
+    def _sampler_params(self, sparse_steps, slat_steps):
+        """Build the sparse structure and SLat sampler parameters."""
+        return (
+            {
+                "steps": sparse_steps,
+                "cfg_strength": DEFAULT_CFG_STRENGTH,
+                "cfg_batched": DEFAULT_CFG_BATCHED,
+            },
+            {
+                "steps": slat_steps,
+                "cfg_strength": DEFAULT_CFG_STRENGTH,
+                "cfg_batched": DEFAULT_CFG_BATCHED,
+            },
+        )
+
+    def _next_glb_path(self, output_dir, base_filename, reserved=()):
+        """Return the first unused (optionally versioned) GLB path for an object.
+
+        Paths in `reserved` count as used, for exports that are still in flight.
+        """
+        version = 0
+        while True:
+            if version == 0:
+                # First try without version number
+                glb_path = os.path.join(output_dir, f"{base_filename}.glb")
+                if not os.path.exists(glb_path) and glb_path not in reserved:
+                    break
+                version = 1
+            else:
+                # Try with version number
+                glb_path = os.path.join(output_dir, f"{base_filename}_v{version}.glb")
+                if not os.path.exists(glb_path) and glb_path not in reserved:
+                    break
+                version += 1
+        return glb_path
+
+    def _cache_key(self, prompt, model_name, seed, sparse_steps, slat_steps):
+        """Content address of the GLB generated from these inputs with the loaded weights."""
+        return self.glb_cache.make_key(
+            prompt=prompt,
+            model_name=model_name,
+            weights=self.glb_cache.weight_hash(TRELLIS_MODEL_NAME_MAP[model_name]),
+            seed=seed,
+            sparse_steps=sparse_steps,
+            slat_steps=slat_steps,
+            cfg_strength=DEFAULT_CFG_STRENGTH,
+            sampler_solver=self.sampler_solver,
+            **self.glb_settings,
+        )
+
+    def _load_cached_glb(self, object_name, cache_key, output_dir, reserved=None):
+        """Copy a cached GLB for an object into the output directory, or return None on a miss.
+
+        The path is only allocated on a hit, skipping and then joining `reserved`, the paths
+        of exports still in flight.
+        """
+        def allocate():
+            glb_path = self._next_glb_path(output_dir, object_name, reserved or ())
+            if reserved is not None:
+                reserved.add(glb_path)
+            return glb_path
+
+        glb_path = self.glb_cache.get(cache_key, allocate)
+        if glb_path is not None:
+            logger.info(f"GLB cache hit for {object_name}")
+        return glb_path
+
+    def _export_glb(self, object_name, outputs, output_dir, cache_key=None):
+        """Postprocess pipeline outputs for one object, export them as GLB and cache the file."""
+        glb_path = self._next_glb_path(output_dir, object_name)
+        glb = postprocessing_utils.to_glb(
+            outputs["gaussian"][0],
+            outputs["mesh"][0],
+            **self.glb_settings,
+        )
+        glb.export(glb_path)
+        if cache_key is not None:
+            self._cache_glb(object_name, cache_key, glb_path)
+        return glb_path
+
+    def _cache_glb(self, object_name, cache_key, glb_path):
+        """Add an exported GLB to the cache; a failed write is logged, the export stands."""
+        try:
+            self.glb_cache.put(cache_key, glb_path)
+        except Exception as e:
+            logger.error(f"Error caching GLB of {object_name}: {e}")
+
+    def _generate_uncached(self, object_name, prompt, output_dir, cache_key, seed, sparse_steps, slat_steps):
+        """Run the pipeline for a single object and export the result."""
+        sparse_params, slat_params = self._sampler_params(sparse_steps, slat_steps)
+        outputs = self.pipeline.run(
+            prompt,
+            seed=seed,
+            sparse_structure_sampler_params=sparse_params,
+            slat_sampler_params=slat_params,
+            formats=PIPELINE_FORMATS,
+        )
+        return self._export_glb(object_name, outputs, output_dir, cache_key)
+
     def generate_assets(
         self,
         scene_name,
@@ -169,55 +360,239 @@ class AssetGenerator:
         sparse_steps=DEFAULT_SPARSE_STEPS,
         slat_steps=DEFAULT_SLAT_STEPS,
     ):
-        """Generate 3D assets for a single object."""
+        """Generate 3D assets for a single object, reusing a cached GLB when the inputs repeat."""
         try:
             # Ensure the correct model is loaded
             if not self.load_model(model_name):
                 return False, f"Failed to load model {model_name}", None
 
-            outputs = self.pipeline.run(
-                prompt,
-                seed=seed,
-                sparse_structure_sampler_params={
-                    "steps": sparse_steps,
-                    "cfg_strength": DEFAULT_CFG_STRENGTH,
-                },
-                slat_sampler_params={
-                    "steps": slat_steps,
-                    "cfg_strength": DEFAULT_CFG_STRENGTH,
-                },
-            )
+            cache_key = self._cache_key(prompt, model_name, seed, sparse_steps, slat_steps)
+            glb_path = self._load_cached_glb(object_name, cache_key, output_dir)
+            if glb_path is not None:
+                return True, f"Loaded cached assets for {object_name}", glb_path
 
-            # Handle versioning for the base filename
-            base_filename = object_name
-            version = 0
-            while True:
-                if version == 0:
-                    # First try without version number
-                    glb_path = os.path.join(output_dir, f"{base_filename}.glb")
-                    if not os.path.exists(glb_path):
-                        break
-                    version = 1
-                else:
-                    # Try with version number
-                    glb_path = os.path.join(output_dir, f"{base_filename}_v{version}.glb")
-                    if not os.path.exists(glb_path):
-                        break
-                    version += 1
-
-            # Generate the GLB file
-            glb = postprocessing_utils.to_glb(
-                outputs["gaussian"][0],
-                outputs["mesh"][0],
-                simplify=0.95,
-                texture_size=1024,
+            glb_path = self._generate_uncached(
+                object_name, prompt, output_dir, cache_key, seed, sparse_steps, slat_steps
             )
-            glb.export(glb_path)
             
             return True, f"Successfully generated assets for {object_name}", glb_path
         except Exception as e:
             return False, f"Error generating assets for {object_name}: {str(e)}", None
 
+    def _sample_batch(
+        self,
+        objects,
+        output_dir,
+        model_name,
+        seed,
+        sparse_steps,
+        slat_steps,
+        reserved=None,
+    ):
+        """Sample the objects missing from the GLB cache in a single pass.
+
+        Yields (index, result, outputs, cache_key) once per object. `result` is a
+        (success, message, glb_path) tuple for cache hits and failures, and None when
+        `outputs` holds the decoded pipeline outputs still to be exported. Cache hits
+        avoid and add to `reserved`, the GLB paths of exports in flight.
+        """
+        pending, yielded = [], set()
+        try:
+            if not self.load_model(model_name):
+                for i in range(len(objects)):
+                    yield i, (False, f"Failed to load model {model_name}", None), None, None
+                return
+
+            cache_keys = [
+                self._cache_key(obj["prompt"], model_name, seed, sparse_steps, slat_steps)
+                for obj in objects
+            ]
+            for i, obj in enumerate(objects):
+                glb_path = self._load_cached_glb(obj["name"], cache_keys[i], output_dir, reserved)
+                if glb_path is not None:
+                    yielded.add(i)
+                    yield i, (True, f"Loaded cached assets for {obj['name']}", glb_path), None, None
+                else:
+                    pending.append(i)
+            if not pending:
+                return
+
+            sparse_params, slat_params = self._sampler_params(sparse_steps, slat_steps)
+            batch_outputs = self.pipeline.run(
+                [objects[i]["prompt"] for i in pending],
+                seed=seed,
+                sparse_structure_sampler_params=sparse_params,
+                slat_sampler_params=slat_params,
+                formats=PIPELINE_FORMATS,
+            )
+        except Exception as e:
+            # Objects neither reported nor waiting to be sampled, e.g. after a cache read error
+            for i in range(len(objects)):
+                if i not in yielded and i not in pending:
+                    yield i, (False, f"Error generating assets: {str(e)}", None), None, None
+            if not pending:
+                return
+            # Fall back to one object at a time so a single bad prompt does not sink the batch
+            logger.warning(f"Batched generation failed, retrying objects one by one: {e}")
+            sparse_params, slat_params = self._sampler_params(sparse_steps, slat_steps)
+            for i in pending:
+                try:
+                    outputs = self.pipeline.run(
+                        objects[i]["prompt"],
+                        seed=seed,
+                        sparse_structure_sampler_params=sparse_params,
+                        slat_sampler_params=slat_params,
+                        formats=PIPELINE_FORMATS,
+                    )
+                except Exception as e:
+                    yield i, (False, f"Error generating assets for {objects[i]['name']}: {str(e)}", None), None, None
+                    continue
+                yield i, None, outputs, cache_keys[i]
+            return
+
+        for i, outputs in zip(pending, batch_outputs):
+            yield i, None, outputs, cache_keys[i]
+
+    def generate_assets_batch(
+        self,
+        objects,
+        output_dir,
+        model_name="TRELLIS-text-large",
+        seed=DEFAULT_SEED,
+        sparse_steps=DEFAULT_SPARSE_STEPS,
+        slat_steps=DEFAULT_SLAT_STEPS,
+    ):
+        """Generate 3D assets for several objects in a single sampling pass.
+
+        Objects found in the GLB cache are copied from it and left out of the pass.
+        Returns one (success, message, glb_path) tuple per object.
+        """
+        results = [None] * len(objects)
+        for i, result, outputs, cache_key in self._sample_batch(
+            objects, output_dir, model_name, seed, sparse_steps, slat_steps
+        ):
+            if result is None:
+                name = objects[i]["name"]
+                try:
+                    glb_path = self._export_glb(name, outputs, output_dir, cache_key)
+                    result = (True, f"Successfully generated assets for {name}", glb_path)
+                except Exception as e:
+                    result = (False, f"Error generating assets for {name}: {str(e)}", None)
+            results[i] = result
+        return results
+
+    def _collect_exports(self, in_flight, objects, results, reserved, block):
+        """Record the finished postprocess tasks and return how many there were."""
+        if not in_flight:
+            return 0
+        if block:
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        else:
+            done = [future for future in in_flight if future.done()]
+        for future in done:
+            i, cache_key, glb_path = in_flight.pop(future)
+            name = objects[i]["name"]
+            reserved.discard(glb_path)
+            try:
+                glb_path, seconds = future.result()
+            except Exception as e:
+                results[i] = (False, f"Error generating assets for {name}: {str(e)}", None)
+                continue
+            self._cache_glb(name, cache_key, glb_path)
+            results[i] = (True, f"Successfully generated assets for {name} (postprocessed in {seconds:.1f}s)", glb_path)
+        return len(done)
+
+    def _process_objects_pipelined(self, objects, output_dir, progress, model_name, seed, sparse_steps, slat_steps, batch_size, on_result):
+        """Sample objects on the GPU while the postprocess pool exports earlier ones.
+
+        The sampling loop is the producer: it decodes each batch, renders the texture
+        baking views and hands each object to the pool, waiting whenever the pool is
+        full. Returns one (success, message, glb_path) tuple per object.
+        """
+        total_objects = len(objects)
+        results = _ResultList(total_objects, on_result)
+        in_flight = {}  # future -> (object index, cache key, glb path)
+        reserved = set()
+        sampled = finished = 0
+
+        def report(desc):
+            progress((sampled + finished) / (2 * total_objects), desc=desc)
+
+        for start in range(0, total_objects, batch_size):
+            batch = objects[start:start + batch_size]
+            names = ", ".join(obj["name"] for obj in batch)
+            report(f"Generating {names}...")
+            for j, result, outputs, cache_key in self._sample_batch(
+                batch, output_dir, model_name, seed, sparse_steps, slat_steps, reserved
+            ):
+                i = start + j
+                sampled += 1
+                if result is None:
+                    try:
+                        payload = make_payload(outputs, postprocessing_utils.render_glb_observations)
+                        del outputs
+                        glb_path = self._next_glb_path(output_dir, objects[i]["name"], reserved)
+                        reserved.add(glb_path)
+                        future = self.postprocess_pool.submit(payload, glb_path)
+                        in_flight[future] = (i, cache_key, glb_path)
+                    except Exception as e:
+                        result = (False, f"Error generating assets for {objects[i]['name']}: {str(e)}", None)
+                if result is not None:
+                    results[i] = result
+                    finished += 1
+                finished += self._collect_exports(in_flight, objects, results, reserved, block=False)
+                report(f"Sampled {sampled}/{total_objects}, exported {finished}/{total_objects}")
+
+        while in_flight:
+            finished += self._collect_exports(in_flight, objects, results, reserved, block=True)
+            report(f"Sampled {sampled}/{total_objects}, exported {finished}/{total_objects}")
+        return list(results)
+
+    def generate_objects(
+        self,
+        objects,
+        output_dir,
+        model_name="TRELLIS-text-large",
+        seed=DEFAULT_SEED,
+        sparse_steps=DEFAULT_SPARSE_STEPS,
+        slat_steps=DEFAULT_SLAT_STEPS,
+        batch_size=DEFAULT_BATCH_SIZE,
+        progress=None,
+        on_result=None,
+    ):
+        """Generate a list of {"name", "prompt"} objects, sampling up to `batch_size` per pass.
+
+        With a postprocess pool, GLB export runs in worker processes while the next
+        batch is sampled; otherwise each batch is exported before the next one starts.
+        `on_result(index, (success, message, glb_path))` is called as soon as each
+        object is finished. Returns the results in object order.
+        """
+        progress = progress or (lambda *args, **kwargs: None)
+        with self._generate_lock:
+            if self.postprocess_pool is not None:
+                return self._process_objects_pipelined(
+                    objects, output_dir, progress, model_name, seed, sparse_steps, slat_steps, batch_size, on_result
+                )
+
+            total_objects = len(objects)
+            results = _ResultList(total_objects, on_result)
+            for start in range(0, total_objects, batch_size):
+                batch = objects[start:start + batch_size]
+                names = ", ".join(obj["name"] for obj in batch)
+                progress(start / total_objects, desc=f"Generating {names}...")
+                batch_results = self.generate_assets_batch(
+                    batch,
+                    output_dir,
+                    model_name,
+                    seed,
+                    sparse_steps,
+                    slat_steps,
+                )
+                for j, result in enumerate(batch_results):
+                    results[start + j] = result
+                progress((start + len(batch)) / total_objects, desc=f"Completed {names}")
+            return list(results)
+
     def process_scene(
         self,
         scene_data,
@@ -227,29 +602,27 @@ class AssetGenerator:
         sparse_steps=DEFAULT_SPARSE_STEPS,
         slat_steps=DEFAULT_SLAT_STEPS,
         model_name="TRELLIS-text-large",
+        batch_size=DEFAULT_BATCH_SIZE,
     ):
-        """Process all objects in a scene."""
+        """Process all objects in a scene, sampling up to `batch_size` objects per pass."""
         scene_name = scene_data["name"]
         results = [f"Processing scene: {scene_name}"]
         generated_assets = []
 
-        total_objects = len(scene_data["objects"])
-        for i, obj in enumerate(scene_data["objects"], 1):
-            progress((i - 1) / total_objects, desc=f"Generating {obj['name']}...")
-            success, message, glb_path = self.generate_assets(
-                scene_name,
-                obj["name"],
-                obj["prompt"],
-                output_dir,
-                model_name,
-                seed,
-                sparse_steps,
-                slat_steps,
-            )
+        object_results = self.generate_objects(
+            scene_data["objects"],
+            output_dir,
+            model_name,
+            seed,
+            sparse_steps,
+            slat_steps,
+            batch_size=batch_size,
+            progress=progress,
+        )
+        for success, message, glb_path in object_results:
             results.append(message)
             if success and glb_path:
                 generated_assets.append(glb_path)
-            progress(i / total_objects, desc=f"Completed {obj['name']}")
 
         if generated_assets:
             results.append("\nGenerated assets in this scene:")
@@ -298,6 +671,8 @@ class AssetGenerator:
             #         if file.endswith(".glb"):
             #             all_results.append(f"- {os.path.join(root, file)}")
 
+            all_results.append(f"\n{self.glb_cache.format_stats()}")
+
             return "\n".join(all_results)
         except Exception as e:
             return f"Error processing prompts file: {str(e)}"
@@ -313,16 +688,9 @@ class AssetGenerator:
                 initial_vram = torch.cuda.memory_allocated()
                 logger.info(f"Initial VRAM usage: {initial_vram / 1024**3:.2f} GB")
             
-            # Clean up current model
-            self.cleanup()
-            
-            # Get VRAM after cleanup
-            if torch.cuda.is_available():
-                after_cleanup_vram = torch.cuda.memory_allocated()
-                logger.info(f"VRAM after cleanup: {after_cleanup_vram / 1024**3:.2f} GB")
-            
-            # Load new model
+            # Switch model through the pool
             success = self.load_model(model_name)
+            logger.info(f"Model pool:\n{self.model_pool.format_stats()}")
             
             # Get VRAM after loading
             if torch.cuda.is_available():
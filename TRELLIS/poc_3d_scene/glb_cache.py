@@ -0,0 +1,210 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from config import LOG_LEVEL, LOG_FORMAT
+
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+
+def _sha256_file(path, chunk_size=1 << 20):
+    """Stream a file through SHA-256."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _resolve_file(path):
+    """Resolve a local file or a `<user>/<repo>/<file>` Hugging Face path, like `from_pretrained`."""
+    if os.path.exists(path):
+        return path
+    from huggingface_hub import hf_hub_download
+    path_parts = path.split("/")
+    return hf_hub_download(f"{path_parts[0]}/{path_parts[1]}", "/".join(path_parts[2:]))
+
+
+def pipeline_weight_files(model_path):
+    """List the config and weight files a pipeline is loaded from."""
+    pipeline_file = _resolve_file(f"{model_path}/pipeline.json")
+    with open(pipeline_file, "r") as f:
+        args = json.load(f)["args"]
+    files = [pipeline_file]
+    for name in sorted(args["models"]):
+        v = args["models"][name]
+        for ext in ("json", "safetensors"):
+            try:
+                files.append(_resolve_file(f"{model_path}/{v}.{ext}"))
+            except Exception:
+                files.append(_resolve_file(f"{v}.{ext}"))
+    return files
+
+
+class GLBCache:
+    """Content-addressed store of exported GLB files with size-bounded LRU eviction.
+
+    Each entry is `<root>/<key>.glb`, where the key is a SHA-256 of every input that
+    affects the asset. The recency order is persisted through file modification times,
+    so it survives restarts. Files are written to a temporary file in the cache directory
+    and renamed into place, so a crash never leaves a truncated entry behind.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._weight_hashes = {}
+        os.makedirs(self.root, exist_ok=True)
+
+        # Rebuild the LRU index from disk, least recently used first
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".glb"):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            elif name.startswith(".tmp"):
+                os.remove(path)  # Left over from an interrupted write
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._bytes = sum(self._entries.values())
+
+    @staticmethod
+    def make_key(**inputs):
+        """Hash generation inputs into a cache key."""
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def weight_hash(self, model_path):
+        """Hash of the config and weight files of a pipeline.
+
+        Full hashes are memoized in `weights.json` by file path, size and modification
+        time, so each checkpoint is only read once.
+        """
+        if model_path in self._weight_hashes:
+            return self._weight_hashes[model_path]
+        memo_file = os.path.join(self.root, "weights.json")
+        memo = {}
+        if os.path.exists(memo_file):
+            with open(memo_file, "r") as f:
+                memo = json.load(f)
+
+        h = hashlib.sha256()
+        for path in pipeline_weight_files(model_path):
+            real = os.path.realpath(path)
+            stat = os.stat(real)
+            memo_key = f"{real}:{stat.st_size}:{stat.st_mtime_ns}"
+            if memo_key not in memo:
+                logger.info(f"Hashing weights: {real}")
+                memo[memo_key] = _sha256_file(real)
+            h.update(memo[memo_key].encode("utf-8"))
+
+        self._atomic_write_text(memo_file, json.dumps(memo, indent=4))
+        self._weight_hashes[model_path] = h.hexdigest()
+        return self._weight_hashes[model_path]
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.glb")
+
+    def _atomic_write_text(self, path, text):
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def get(self, key, output_path):
+        """Copy a cached GLB to `output_path`. Returns the path written, or None if the key was not found.
+
+        `output_path` may also be a function returning the path, called only on a hit so
+        that a miss does not allocate one.
+        """
+        with self._lock:
+            if key not in self._entries or not os.path.exists(self._path(key)):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            os.utime(self._path(key))
+            self.hits += 1
+            if callable(output_path):
+                output_path = output_path()
+            copy_atomic(self._path(key), output_path)
+        return output_path
+
+    def put(self, key, src_path):
+        """Store a copy of the GLB file at `src_path` under `key`."""
+        copy_atomic(src_path, self._path(key))
+        size = os.path.getsize(self._path(key))
+        with self._lock:
+            self._bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits, keeping the newest one."""
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every entry and reset the statistics."""
+        with self._lock:
+            for key in self._entries:
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def format_stats(self):
+        """One-line summary of `stats` for display."""
+        s = self.stats()
+        return (
+            f"Cache hits: {s['hits']}, misses: {s['misses']} ({s['hit_rate']:.0%} hit rate), "
+            f"evictions: {s['evictions']}, entries: {s['entries']}, "
+            f"size: {s['bytes'] / 1024**2:.1f} / {s['max_bytes'] / 1024**2:.0f} MB"
+        )
+
+
+def copy_atomic(src, dst):
+    """Copy a file so that `dst` is either absent or complete."""
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp", suffix=os.path.splitext(dst)[1], dir=os.path.dirname(os.path.abspath(dst)))
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,7 +1,14 @@
+import os
+import json
+import time
+import shutil
+import logging
 import gradio as gr
 from agent import ScenePlanningAgent
 from generator import AssetGenerator
-from utils import delete_prompts_file
+from job_queue import JobQueue, JobScheduler, format_job, COMPLETED, FAILED, CANCELLED
+from utils import delete_prompts_file, parse_object_list
+from response_cache import ResponseCache
 from config import (
     DEFAULT_SEED,
     DEFAULT_SPARSE_STEPS,
@@ -10,55 +17,44 @@ from config import (
     PROMPTS_FILE,
     INITIAL_MESSAGE,
     DEFAULT_TRELLIS_MODEL,
+    JOBS_DB_FILE,
+    JOB_CLAIM_SIZE,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF,
+    JOB_POLL_INTERVAL,
+    AGENT_CACHE_ENABLED,
+    AGENT_CACHE_FILE,
+    AGENT_CACHE_MAX_ENTRIES,
+    AGENT_CACHE_TTL,
+    AGENT_STREAMING,
+    LOG_LEVEL,
+    LOG_FORMAT,
 )
 
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
 
 class SceneGeneratorInterface:
     def __init__(self):
-        self.agent = ScenePlanningAgent()
+        agent_cache = None
+        if AGENT_CACHE_ENABLED:
+            agent_cache = ResponseCache(AGENT_CACHE_FILE, max_entries=AGENT_CACHE_MAX_ENTRIES, ttl=AGENT_CACHE_TTL)
+        self.agent = ScenePlanningAgent(cache=agent_cache)
         self.generator = AssetGenerator(default_model=DEFAULT_TRELLIS_MODEL)
+        # Scenes are generated by a background scheduler from a persistent queue,
+        # which resumes unfinished objects after a restart
+        self.job_queue = JobQueue(JOBS_DB_FILE, max_attempts=JOB_MAX_ATTEMPTS, backoff=JOB_RETRY_BACKOFF)
+        self.scheduler = JobScheduler(self.job_queue, self.generator, JOB_CLAIM_SIZE, poll_interval=JOB_POLL_INTERVAL)
+        self.scheduler.start()
         self.INITIAL_MESSAGE = INITIAL_MESSAGE
         # Delete existing prompts file if it exists
         delete_prompts_file()
 
     def parse_object_list(self, response):
-        """Parse the LLM response to extract suggested objects from numbered lists.
-        
-        Args:
-            response (str): The LLM's response text
-            
-        Returns:
-            list: List of extracted objects with proper formatting
-        """
-        objects = []
-        in_objects_section = False
-        
-        for line in response.split('\n'):
-            line = line.strip()
-            
-            # Look for the start of the objects section
-            if "Suggested objects:" in line:
-                in_objects_section = True
-                continue
-                
-            # Skip empty lines
-            if not line:
-                continue
-                
-            # If we're in the objects section and the line starts with a number
-            if in_objects_section and line[0].isdigit():
-                # Extract the object name after the number and dot
-                obj = line.split('.', 1)[-1].strip()
-                if obj:
-                    # Format the object name
-                    # Replace underscores with spaces and capitalize first letter of each word
-                    obj = obj.replace('_', ' ').title()
-                    objects.append(obj)
-            # If we hit a line that doesn't start with a number, we're done with the objects section
-            elif in_objects_section and not line[0].isdigit():
-                break
-                
-        return objects
+        """Parse the LLM response to extract suggested objects, see `utils.parse_object_list`."""
+        return parse_object_list(response)
 
     def create_interface(self):
         """Create the Gradio interface for the 3D Scene Generator."""
@@ -81,6 +77,7 @@ class SceneGeneratorInterface:
                             )
                             with gr.Row():
                                 submit_btn = gr.Button("Send")
+                                stop_btn = gr.Button("Stop")
                                 clear_btn = gr.Button("Clear Chat")
 
                             gr.Markdown("""
@@ -153,19 +150,11 @@ class SceneGeneratorInterface:
                         ]
 
                     def respond(message, chat_history, suggested, accepted):
-                        """Handle chat response and update suggested objects."""
-                        # Pass current accepted objects to the agent
-                        response = self.agent.chat(message, current_objects=accepted)
-                        # First element is user message, second is assistant response
-                        chat_history.append((message, response))
-                        
-                        # Parse and update object list
-                        objects = self.parse_object_list(response)
-                        
-                        # Keep existing accepted objects in the suggested list
-                        # but don't show them as checked
-                        all_objects = [obj for obj in accepted if obj not in objects] + objects
-                        
+                        """Handle chat response and update suggested objects.
+
+                        In streaming mode the reply and the suggested objects are updated as
+                        tokens arrive; stopping the event cancels the request to the LLM server.
+                        """
                         # Format accepted objects display
                         accepted_html = "<div style='background-color: #f8f9fa; padding: 15px; border-radius: 8px; border: 1px solid #dee2e6;'>"
                         if accepted:
@@ -176,8 +165,26 @@ class SceneGeneratorInterface:
                         else:
                             accepted_html += "<p style='margin: 0; color: #6c757d;'>No objects accepted yet</p>"
                         accepted_html += "</div>"
-                        
-                        return chat_history, "", gr.update(choices=all_objects), accepted, gr.update(value=accepted_html)
+
+                        if AGENT_STREAMING:
+                            # Pass current accepted objects to the agent
+                            updates = self.agent.chat_stream(message, current_objects=accepted)
+                        else:
+                            response = self.agent.chat(message, current_objects=accepted)
+                            updates = [(response, self.parse_object_list(response))]
+
+                        # First element is user message, second is assistant response
+                        chat_history.append((message, ""))
+                        shown_objects = None
+                        for response, objects in updates:
+                            chat_history[-1] = (message, response)
+                            # Keep existing accepted objects in the suggested list
+                            # but don't show them as checked; only touch the list when it changes
+                            choices = gr.update()
+                            if objects != shown_objects:
+                                shown_objects = objects
+                                choices = gr.update(choices=[obj for obj in accepted if obj not in objects] + objects)
+                            yield chat_history, "", choices, accepted, gr.update(value=accepted_html)
 
                     def update_accepted_objects(selected_objects):
                         """Update accepted objects based on checkbox selection."""
@@ -210,18 +217,21 @@ class SceneGeneratorInterface:
                         ]
                     )
                     
-                    submit_btn.click(
+                    submit_event = submit_btn.click(
                         respond, 
                         [msg, chatbot, suggested_objects_state, accepted_objects_state], 
                         [chatbot, msg, suggested_objects_checkboxes, accepted_objects_state, accepted_objects_display]
                     )
                     
-                    msg.submit(
+                    enter_event = msg.submit(
                         respond, 
                         [msg, chatbot, suggested_objects_state, accepted_objects_state], 
                         [chatbot, msg, suggested_objects_checkboxes, accepted_objects_state, accepted_objects_display]
                     )
 
+                    # Stopping closes the handler, which closes the stream to the LLM server
+                    stop_btn.click(None, None, None, cancels=[submit_event, enter_event])
+
                     # Handle checkbox changes
                     suggested_objects_checkboxes.change(
                         update_accepted_objects,
@@ -243,10 +253,12 @@ class SceneGeneratorInterface:
                             scene_description = chat_history[-1][0] if chat_history else ""
                             
                             # Generate prompts for accepted objects
+                            # Prompts and scene name come from a single structured call
                             success, prompts, generation_prompt = self.agent.generate_3d_prompts(
-                                scene_name="current_scene",  # We can generate a better name if needed
+                                scene_name=None,
                                 initial_description=accepted_objects
                             )
+                            logger.info(self.agent.format_metrics())
                             
                             if not success:
                                 return gr.update(
@@ -324,13 +336,26 @@ class SceneGeneratorInterface:
                             interactive=True,
                         )
 
-                    delete_existing = gr.Checkbox(
-                        label="Delete existing output directory", value=False
-                    )
+                    with gr.Row():
+                        delete_existing = gr.Checkbox(
+                            label="Delete existing output directory", value=False
+                        )
+                        priority = gr.Number(
+                            label="Priority (higher runs first)", value=0, precision=0, interactive=True
+                        )
 
                     generate_btn = gr.Button("Generate Assets")
                     output = gr.Textbox(label="Generation Progress", lines=10)
 
+                    with gr.Row():
+                        cache_stats = gr.Textbox(
+                            label="GLB Cache",
+                            value=self.generator.glb_cache.format_stats(),
+                            interactive=False,
+                            scale=4,
+                        )
+                        clear_cache_btn = gr.Button("Clear Cache", scale=1)
+
                     # Debug section for model switching
                     # with gr.Group():
                     #     gr.Markdown("### Debug Model Switching")
@@ -354,43 +379,105 @@ class SceneGeneratorInterface:
                     #     )
 
 
-                    def generate_assets_with_progress(prompts_file, output_dir, delete_existing, model_choice, seed, sparse_steps, slat_steps):
+                    with gr.Group():
+                        gr.Markdown("### Job Queue")
+                        jobs_table = gr.Dataframe(
+                            headers=["Job", "Scene", "Status", "Priority", "Done", "Failed", "Objects"],
+                            value=self.jobs_table(),
+                            interactive=False,
+                        )
+                        with gr.Row():
+                            job_id = gr.Number(label="Job ID", precision=0, interactive=True)
+                            show_job_btn = gr.Button("Show Job")
+                            cancel_job_btn = gr.Button("Cancel Job")
+                            refresh_jobs_btn = gr.Button("Refresh")
+
+                    def generate_assets_with_progress(prompts_file, output_dir, delete_existing, model_choice, seed, sparse_steps, slat_steps, priority):
+                        """Queue every scene of the prompts file and stream the job status until they finish."""
                         try:
                             # Disable button immediately
                             disable_btn = gr.update(interactive=False)
 
                             # Show intermediate state
-                            yield disable_btn, "Starting generation..."
-
-                            # Do the actual generation
-                            result = self.generator.generate_all_assets(
-                                prompts_file,
-                                output_dir,
-                                delete_existing,
-                                seed,
-                                sparse_steps,
-                                slat_steps,
-                                model_name=model_choice,
-                                progress=gr.Progress()
+                            yield disable_btn, "Queueing scenes...", self.generator.glb_cache.format_stats(), self.jobs_table()
+
+                            job_ids = self.queue_scenes(
+                                prompts_file, output_dir, delete_existing, model_choice, seed, sparse_steps, slat_steps, priority
                             )
 
+                            # The job runs in the background; keep streaming its status
+                            while True:
+                                jobs = [self.job_queue.job(i) for i in job_ids]
+                                status = "\n\n".join(format_job(job) for job in jobs)
+                                if all(job["status"] in (COMPLETED, FAILED, CANCELLED) for job in jobs):
+                                    break
+                                yield disable_btn, status, self.generator.glb_cache.format_stats(), self.jobs_table()
+                                time.sleep(JOB_POLL_INTERVAL)
+
                             # Re-enable button & return result
                             enable_btn = gr.update(interactive=True)
-                            yield enable_btn, result
+                            yield enable_btn, status, self.generator.glb_cache.format_stats(), self.jobs_table()
 
                         except Exception as e:
                             enable_btn = gr.update(interactive=True)
-                            yield enable_btn, f"Error during generation: {str(e)}"
+                            yield enable_btn, f"Error during generation: {str(e)}", self.generator.glb_cache.format_stats(), self.jobs_table()
 
                     generate_btn.click(
                         fn=generate_assets_with_progress,
-                        inputs=[prompts_file, output_dir, delete_existing, model_choice, seed, sparse_steps, slat_steps],
-                        outputs=[generate_btn, output]
+                        inputs=[prompts_file, output_dir, delete_existing, model_choice, seed, sparse_steps, slat_steps, priority],
+                        outputs=[generate_btn, output, cache_stats, jobs_table]
                     )
 
+                    def show_job(job_id):
+                        """Show the status of a single job."""
+                        job = self.job_queue.job(int(job_id or 0))
+                        return format_job(job) if job else f"Job {job_id} not found", self.jobs_table()
+
+                    def cancel_job(job_id):
+                        """Cancel a job; its running objects still finish."""
+                        if self.job_queue.cancel(int(job_id or 0)):
+                            return f"Cancelled job {job_id}", self.jobs_table()
+                        return f"Job {job_id} is not queued or running", self.jobs_table()
+
+                    show_job_btn.click(show_job, inputs=[job_id], outputs=[output, jobs_table])
+                    cancel_job_btn.click(cancel_job, inputs=[job_id], outputs=[output, jobs_table])
+                    refresh_jobs_btn.click(self.jobs_table, inputs=[], outputs=[jobs_table])
+
+                    def clear_cache():
+                        """Remove every cached GLB and reset the cache statistics."""
+                        self.generator.glb_cache.clear()
+                        return self.generator.glb_cache.format_stats()
+
+                    clear_cache_btn.click(clear_cache, inputs=[], outputs=[cache_stats])
+
 
         return demo
 
+    def queue_scenes(self, prompts_file, output_dir, delete_existing, model_name, seed, sparse_steps, slat_steps, priority=0):
+        """Submit every scene of the prompts file to the job queue and return the job IDs."""
+        if delete_existing and os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+
+        with open(prompts_file, "r") as f:
+            data = json.load(f)
+
+        params = {
+            "output_dir": str(output_dir),
+            "model_name": model_name,
+            "seed": int(seed),
+            "sparse_steps": int(sparse_steps),
+            "slat_steps": int(slat_steps),
+        }
+        return [self.job_queue.submit(scene, params, priority=int(priority or 0)) for scene in data["scenes"]]
+
+    def jobs_table(self):
+        """Rows of the job queue table, most recent first."""
+        return [
+            [job["id"], job["scene_name"], job["status"], job["priority"], job["done"] or 0, job["failed"] or 0, job["total"]]
+            for job in self.job_queue.list_jobs()
+        ]
+
     def launch(self, **kwargs):
         """Launch the Gradio interface."""
         demo = self.create_interface()
@@ -0,0 +1,347 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from config import LOG_LEVEL, LOG_FORMAT
+
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Object states
+PENDING = "pending"
+DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scene_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    params TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS objects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    glb_path TEXT,
+    message TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_job ON objects(job_id, status);
+CREATE INDEX IF NOT EXISTS jobs_order ON jobs(status, priority DESC, id);
+"""
+
+
+class JobQueue:
+    """Persistent queue of scene generation jobs, stored in SQLite.
+
+    A job is a scene; each of its objects is tracked separately with its own state,
+    attempt count and result, so an interrupted job resumes from the objects that
+    are not done yet. Failed objects are retried with exponential backoff up to
+    `max_attempts` times. Jobs with a higher priority are served first, ties in
+    submission order.
+
+    Each call opens its own connection, so the queue can be shared between the
+    Gradio handlers and the scheduler thread, and across processes.
+    """
+
+    def __init__(self, db_path, max_attempts=3, backoff=30.0):
+        self.db_path = str(db_path)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the database lock up front."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def submit(self, scene_data, params, priority=0):
+        """Queue a scene. `params` holds the generation arguments shared by its objects."""
+        now = time.time()
+        with self._transaction() as conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (scene_name, status, priority, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (scene_data["name"], QUEUED, int(priority), json.dumps(params), now, now),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO objects (job_id, idx, name, prompt, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, i, obj["name"], obj["prompt"], PENDING, now) for i, obj in enumerate(scene_data["objects"])],
+            )
+        logger.info(f"Queued job {job_id} for scene {scene_data['name']}")
+        return job_id
+
+    def recover(self):
+        """Return objects left running by a crashed or killed process to the queue."""
+        now = time.time()
+        with self._transaction() as conn:
+            count = conn.execute(
+                "UPDATE objects SET status = ?, updated_at = ? WHERE status = ?", (PENDING, now, RUNNING)
+            ).rowcount
+            conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?", (QUEUED, now, RUNNING))
+        if count:
+            logger.info(f"Resuming {count} interrupted objects")
+        return count
+
+    def claim(self, limit):
+        """Mark up to `limit` runnable objects of the highest priority job as running.
+
+        Returns (job, objects) as dicts, or (None, []) when nothing is runnable yet.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            job = conn.execute(
+                """
+                SELECT jobs.* FROM jobs
+                WHERE jobs.status IN (?, ?) AND EXISTS (
+                    SELECT 1 FROM objects
+                    WHERE objects.job_id = jobs.id AND objects.status = ? AND objects.next_attempt_at <= ?
+                )
+                ORDER BY jobs.priority DESC, jobs.id
+                LIMIT 1
+                """,
+                (QUEUED, RUNNING, PENDING, now),
+            ).fetchone()
+            if job is None:
+                return None, []
+            objects = conn.execute(
+                "SELECT * FROM objects WHERE job_id = ? AND status = ? AND next_attempt_at <= ? ORDER BY idx LIMIT ?",
+                (job["id"], PENDING, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE objects SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(RUNNING, now, obj["id"]) for obj in objects],
+            )
+            conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (RUNNING, now, job["id"]))
+        job = dict(job)
+        job["params"] = json.loads(job["params"])
+        return job, [dict(obj) for obj in objects]
+
+    def complete(self, object_id, glb_path, message):
+        """Record a finished object."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE objects SET status = ?, glb_path = ?, message = ?, updated_at = ? WHERE id = ?",
+                (DONE, glb_path, message, time.time(), object_id),
+            )
+            self._update_job(conn, object_id)
+
+    def fail(self, object_id, message):
+        """
+        Record a failed attempt, scheduling a retry with exponential backoff while attempts remain.
+        Objects that are not running (e.g. already done) are left as they are.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            obj = conn.execute(
+                "SELECT objects.status, objects.attempts, jobs.status AS job_status FROM objects JOIN jobs ON jobs.id = objects.job_id WHERE objects.id = ?",
+                (object_id,),
+            ).fetchone()
+            if obj is None or obj["status"] != RUNNING:
+                return
+            if obj["job_status"] == CANCELLED:
+                conn.execute(
+                    "UPDATE objects SET status = ?, message = ?, updated_at = ? WHERE id = ?",
+                    (CANCELLED, message, now, object_id),
+                )
+            elif obj["attempts"] < self.max_attempts:
+                delay = self.backoff * 2 ** (obj["attempts"] - 1)
+                conn.execute(
+                    "UPDATE objects SET status = ?, next_attempt_at = ?, message = ?, updated_at = ? WHERE id = ?",
+                    (PENDING, now + delay, f"{message} (retrying in {delay:.0f}s)", now, object_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE objects SET status = ?, message = ?, updated_at = ? WHERE id = ?",
+                    (FAILED, message, now, object_id),
+                )
+            self._update_job(conn, object_id)
+
+    def _update_job(self, conn, object_id):
+        """Close a job once none of its objects can run anymore."""
+        job_id = conn.execute("SELECT job_id FROM objects WHERE id = ?", (object_id,)).fetchone()["job_id"]
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM objects WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        if counts.get(PENDING, 0) or counts.get(RUNNING, 0):
+            return
+        status = FAILED if counts.get(FAILED, 0) else COMPLETED
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status != ?",
+            (status, time.time(), job_id, CANCELLED),
+        )
+
+    def cancel(self, job_id):
+        """Cancel a job. Objects already running finish, but nothing else of the job is started."""
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, now, job_id, QUEUED, RUNNING),
+            ).rowcount
+            conn.execute(
+                "UPDATE objects SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (CANCELLED, now, job_id, PENDING),
+            )
+        return bool(updated)
+
+    def job(self, job_id):
+        """A job with its objects, or None if it does not exist."""
+        with self._connect() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            objects = conn.execute("SELECT * FROM objects WHERE job_id = ? ORDER BY idx", (job_id,)).fetchall()
+        job = dict(job)
+        job["params"] = json.loads(job["params"])
+        job["objects"] = [dict(obj) for obj in objects]
+        return job
+
+    def list_jobs(self, limit=20):
+        """The most recent jobs with their object counts per state."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT jobs.id, jobs.scene_name, jobs.status, jobs.priority, jobs.created_at,
+                    COUNT(objects.id) AS total,
+                    SUM(objects.status = 'done') AS done,
+                    SUM(objects.status = 'failed') AS failed
+                FROM jobs LEFT JOIN objects ON objects.job_id = jobs.id
+                GROUP BY jobs.id ORDER BY jobs.id DESC LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def is_cancelled(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and row["status"] == CANCELLED
+
+
+class JobScheduler:
+    """Background thread that runs queued jobs on an `AssetGenerator`.
+
+    Objects are claimed `batch_size` at a time from the highest priority job and
+    generated with the generator's scene engine; each result is written back as soon
+    as it is known, so a restart only redoes the objects that were in flight.
+    """
+
+    def __init__(self, queue, generator, batch_size, poll_interval=2.0):
+        self.queue = queue
+        self.generator = generator
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.queue.recover()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job, objects = self.queue.claim(self.batch_size)
+            except Exception as e:
+                logger.error(f"Error claiming jobs: {e}")
+                job, objects = None, []
+            if not objects:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._run_objects(job, objects)
+
+    def _run_objects(self, job, objects):
+        params = job["params"]
+        reported = set()
+
+        def on_result(i, result):
+            success, message, glb_path = result
+            if success:
+                self.queue.complete(objects[i]["id"], glb_path, message)
+            else:
+                self.queue.fail(objects[i]["id"], message)
+            # only once the result is stored, a failed write leaves the object to the sweep below
+            reported.add(i)
+
+        logger.info(f"Job {job['id']}: generating {', '.join(obj['name'] for obj in objects)}")
+        error = None
+        try:
+            self.generator.generate_objects(
+                [{"name": obj["name"], "prompt": obj["prompt"]} for obj in objects],
+                params["output_dir"],
+                model_name=params["model_name"],
+                seed=params["seed"],
+                sparse_steps=params["sparse_steps"],
+                slat_steps=params["slat_steps"],
+                on_result=on_result,
+            )
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            error = str(e)
+        # Objects that already reported a result keep it. The others fail, whether the
+        # generation raised, returned without reporting them or their result was not stored,
+        # so none is left running
+        for i, obj in enumerate(objects):
+            if i in reported:
+                continue
+            message = f"Error generating assets for {obj['name']}: {error or 'no result was recorded'}"
+            try:
+                self.queue.fail(obj["id"], message)
+            except Exception as e:
+                logger.error(f"Job {job['id']}: error failing {obj['name']}: {e}")
+
+
+def format_job(job):
+    """Human-readable status of a job and its objects."""
+    lines = [f"Job {job['id']} ({job['scene_name']}): {job['status']}"]
+    for obj in job["objects"]:
+        line = f"- {obj['name']}: {obj['status']}"
+        if obj["glb_path"]:
+            line += f" -> {obj['glb_path']}"
+        elif obj["message"]:
+            line += f" ({obj['message']})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,334 @@
+"""Deterministic OpenAI-compatible stand-in for the agent's LLM server.
+
+Serves `/v1/models` and `/v1/chat/completions` (plain and streamed) with responses
+that are either scripted, replayed from recorded exchanges, or synthesized in the
+formats `ScenePlanningAgent` parses. Latency, errors and malformed answers can be
+injected, deterministically per request, so the agent tier can be tested and load
+tested without a NIM container or a GPU.
+
+    python llm_stub.py --port 8000 --latency-ms 300 --tokens-per-second 40
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from config import AGENT_MODEL, LLM_STUB_HOST, LLM_STUB_PORT, LOG_LEVEL, LOG_FORMAT
+
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+
+_OBJECTS = [
+    "Sofa", "Coffee Table", "Floor Lamp", "Bookshelf", "Armchair", "Area Rug", "Side Table",
+    "Potted Plant", "Dining Table", "Dining Chair", "Desk", "Office Chair", "Wall Clock",
+    "Cabinet", "Bed", "Nightstand", "Wardrobe", "Mirror", "Bench", "Vase",
+]
+_MATERIALS = ["oak wood", "brushed steel", "matte ceramic", "woven linen", "polished brass", "smooth marble"]
+_STYLES = ["modern", "rustic", "minimalist", "mid-century", "industrial", "Scandinavian"]
+_NAME_WORDS = ["Cozy", "Sunlit", "Quiet", "Urban", "Rustic", "Modern", "Lounge", "Studio", "Retreat", "Corner"]
+
+
+def _text(content):
+    """Text of an OpenAI message content, which may be a list of content parts."""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def request_key(messages):
+    """Stable key of a conversation, used to record and replay responses."""
+    canonical = json.dumps([[m.get("role"), _text(m.get("content"))] for m in messages], sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def synthesize_response(messages, rng):
+    """Answer in the formats the agent expects, chosen from the last user message."""
+    user = [_text(m.get("content")) for m in messages if m.get("role") == "user"]
+    last = user[-1] if user else ""
+    if "3D prompts" in last or "did not follow the schema" in last:
+        match = re.search(r"(?:strictly from this list|exactly these objects):\s*(\[.*?\])", last)
+        names = re.findall(r"'([^']+)'|\"([^\"]+)\"", match.group(1)) if match else []
+        names = [a or b for a, b in names] or rng.sample(_OBJECTS, 3)
+        prompts = {
+            name: f"A {rng.choice(_STYLES)} {name.lower()} made of {rng.choice(_MATERIALS)}, "
+            f"with clean edges, a {rng.choice(['satin', 'glossy', 'matte'])} finish and subtle wear, "
+            f"placed to complement the surrounding furniture."
+            for name in names
+        }
+        scene_name = " ".join(rng.sample(_NAME_WORDS, 2))
+        if "JSON" in last:
+            plan = {"scene_name": scene_name, "objects": [{"name": k, "prompt": v} for k, v in prompts.items()]}
+            return f"```json\n{json.dumps(plan, indent=2)}\n```"
+        return "\n".join(f"Object: {name}\nPrompt: {prompt}\n" for name, prompt in prompts.items())
+    if "Scene Name" in last:
+        return f"Scene Name: {' '.join(rng.sample(_NAME_WORDS, 2))}"
+    objects = rng.sample(_OBJECTS, rng.randint(5, 8))
+    lines = ["Suggested objects:"] + [f"{i + 1}. {obj}" for i, obj in enumerate(objects)]
+    lines += [
+        "",
+        "",
+        f"Scene arrangement: The {objects[0].lower()} anchors the space, with the {objects[1].lower()} "
+        f"in front of it and the remaining pieces around the edges.",
+        "",
+        "You can select which objects to keep by checking their boxes in the Object Management panel on the right.",
+    ]
+    return "\n".join(lines)
+
+
+class StubLLM:
+    """Response policy and fault injection of the stub server.
+
+    Responses come from, in order: the first `script` rule whose regex matches the
+    last user message, the `replay` recordings keyed by `request_key`, the `upstream`
+    server (recorded to `record_path` if given), and finally `synthesize_response`.
+
+    Args:
+        script: List of {"match": regex, "response": text} rules.
+        replay: Dict of request key to response text.
+        upstream: Base URL of a real OpenAI-compatible server to forward to.
+        record_path: JSONL file where forwarded exchanges are appended.
+        latency_ms, jitter_ms: Delay before the first token, uniformly jittered.
+        tokens_per_second: Generation speed, None for instant.
+        error_rate: Fraction of requests answered with HTTP 500.
+        malformed_rate: Fraction of answers replaced by text the agent cannot parse.
+        seed: Seed of the per-request random choices.
+    """
+
+    def __init__(
+        self,
+        script=None,
+        replay=None,
+        upstream=None,
+        record_path=None,
+        latency_ms=0.0,
+        jitter_ms=0.0,
+        tokens_per_second=None,
+        error_rate=0.0,
+        malformed_rate=0.0,
+        seed=0,
+    ):
+        self.script = [(re.compile(rule["match"], re.S), rule["response"]) for rule in script or []]
+        self.replay = replay or {}
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.record_path = record_path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self._record_lock = threading.Lock()
+        self._counts = {}
+        self.cancelled = 0
+        self._counter_lock = threading.Lock()
+
+    def _rng(self, key):
+        """Random generators of one request: fault injection draws differently for every repeat
+        of a request, content only depends on the conversation. Both are reproducible across runs."""
+        with self._counter_lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return random.Random(f"{self.seed}:{key}:{count}"), random.Random(f"{self.seed}:{key}")
+
+    def plan(self, body):
+        """Decide the answer to a chat completion request.
+
+        Returns:
+            dict: "status" (200 or 500), "text", "first_token_delay" and "token_delay" in seconds.
+        """
+        messages = body.get("messages", [])
+        key = request_key(messages)
+        faults, content = self._rng(key)
+        delay = max(0.0, self.latency_ms + faults.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        token_delay = 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+        if faults.random() < self.error_rate:
+            return {"status": 500, "text": "Injected server error", "first_token_delay": delay, "token_delay": 0.0}
+        text = self._respond(body, messages, key, content)
+        if faults.random() < self.malformed_rate:
+            text = "I am not sure what you mean. " * 3
+        return {"status": 200, "text": text, "first_token_delay": delay, "token_delay": token_delay}
+
+    def _respond(self, body, messages, key, rng):
+        last = next((_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+        for pattern, response in self.script:
+            if pattern.search(last):
+                return response
+        if key in self.replay:
+            return self.replay[key]
+        if self.upstream:
+            return self._forward(body, key)
+        return synthesize_response(messages, rng)
+
+    def _forward(self, body, key):
+        request = urllib.request.Request(
+            f"{self.upstream}/chat/completions",
+            data=json.dumps({**body, "stream": False}).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": "Bearer not-needed"},
+        )
+        with urllib.request.urlopen(request, timeout=300) as response:
+            text = json.loads(response.read())["choices"][0]["message"]["content"]
+        if self.record_path:
+            with self._record_lock, open(self.record_path, "a") as f:
+                f.write(json.dumps({"key": key, "messages": body.get("messages", []), "response": text}) + "\n")
+        self.replay[key] = text
+        return text
+
+
+def load_replay(path):
+    """Recorded exchanges from a JSONL file written with `record_path`."""
+    replay = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                replay[entry.get("key") or request_key(entry["messages"])] = entry["response"]
+    return replay
+
+
+def _tokens(text):
+    return re.findall(r"\s*\S+|\s+$", text)
+
+
+def _usage(body, text):
+    prompt_tokens = sum(len(_text(m.get("content")).split()) for m in body.get("messages", []))
+    completion_tokens = len(_tokens(text))
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": AGENT_MODEL, "object": "model", "owned_by": "stub"}]})
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            plan = stub.plan(body)
+            time.sleep(plan["first_token_delay"])
+            if plan["status"] != 200:
+                self._send_json(plan["status"], {"error": {"message": plan["text"], "type": "server_error"}})
+                return
+            model = body.get("model", AGENT_MODEL)
+            completion_id = f"chatcmpl-stub-{time.time_ns()}"
+            if body.get("stream"):
+                self._stream(body, plan, model, completion_id)
+                return
+            time.sleep(plan["token_delay"] * len(_tokens(plan["text"])))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": plan["text"]}, "finish_reason": "stop"}],
+                "usage": _usage(body, plan["text"]),
+            })
+
+        def _stream(self, body, plan, model, completion_id):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def send(choices, **extra):
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": choices, **extra}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            tokens = _tokens(plan["text"])
+            i = 0
+            try:
+                send([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+                for i, token in enumerate(tokens):
+                    if i > 0:
+                        time.sleep(plan["token_delay"])
+                    send([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+                send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    send([], usage=_usage(body, plan["text"]))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client closed the stream, like a real server we stop generating
+                stub.cancelled += 1
+                logger.info(f"Stream {completion_id} cancelled by the client after {i} of {len(tokens)} tokens")
+
+    return Handler
+
+
+def serve(stub, host=LLM_STUB_HOST, port=LLM_STUB_PORT):
+    """Start the stub server in a background thread. Returns the server; call `shutdown()` to stop it."""
+    server = ThreadingHTTPServer((host, port), _make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"LLM stub listening on http://{host}:{server.server_address[1]}/v1")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible stub for the scene planning agent")
+    parser.add_argument("--host", default=LLM_STUB_HOST)
+    parser.add_argument("--port", type=int, default=LLM_STUB_PORT)
+    parser.add_argument("--script", help="JSON file with a list of {\"match\": regex, \"response\": text} rules")
+    parser.add_argument("--replay", help="JSONL file of recorded exchanges to answer from")
+    parser.add_argument("--upstream", help="Real server to forward unknown requests to, e.g. http://localhost:8001/v1")
+    parser.add_argument("--record", help="JSONL file where forwarded exchanges are appended")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    stub = StubLLM(
+        script=script,
+        replay=load_replay(args.replay) if args.replay else None,
+        upstream=args.upstream,
+        record_path=args.record,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    server = serve(stub, args.host, args.port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import time
+import logging
+import threading
+import torch
+from config import LOG_LEVEL, LOG_FORMAT
+
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+
+def _tensors(module):
+    """Parameters and buffers of a module, each shared tensor once."""
+    yield from module.named_parameters()
+    yield from module.named_buffers()
+
+
+def _nbytes(module):
+    return sum(t.numel() * t.element_size() for _, t in _tensors(module))
+
+
+class _Entry:
+    """A submodel tracked by the pool."""
+
+    def __init__(self, pipeline_name, key, module):
+        self.pipeline_name = pipeline_name
+        self.key = key
+        self.module = module
+        self.nbytes = _nbytes(module)
+        self.on_device = True
+        self.host = None  # Host copy of every tensor, kept once made since the weights never change
+        self.last_used = time.monotonic()
+
+    @property
+    def host_bytes(self):
+        return self.nbytes if self.host is not None else 0
+
+
+class _PooledModels:
+    """Dictionary view of a pipeline's submodels that goes through the pool on every access.
+
+    Reading a managed key promotes the submodel to the device (evicting others if needed)
+    and marks it as recently used. Everything else is delegated to the wrapped dict, so
+    lazy loading and its statistics keep working. A lazy submodel is loaded straight onto
+    the device, so room for its estimated size is made before it loads.
+    """
+
+    def __init__(self, pool, pipeline_name, inner, prefix="", managed=None):
+        self._pool = pool
+        self._pipeline_name = pipeline_name
+        self._inner = inner
+        self._prefix = prefix
+        self._managed = managed
+
+    def __getitem__(self, key):
+        managed = self._managed is None or key in self._managed
+        if managed and key in getattr(self._inner, "pending", ()):
+            with self._pool._lock:
+                self._pool._make_room(self._inner.estimate_nbytes(key) or 0)
+                value = self._inner[key]
+        else:
+            value = self._inner[key]
+        if isinstance(value, torch.nn.Module) and managed:
+            self._pool._acquire(self._pipeline_name, self._prefix + key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        self._inner[key] = value
+
+    def __contains__(self, key):
+        return key in self._inner
+
+    def __iter__(self):
+        return iter(self._inner)
+
+    def __len__(self):
+        return len(self._inner)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return self._inner.keys()
+
+    def values(self):
+        return self._inner.values()
+
+    def items(self):
+        return self._inner.items()
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class ModelPool:
+    """Keeps several pipelines warm across device and host memory.
+
+    Submodels are tracked individually against two budgets, in bytes of weights:
+    when bringing a submodel to the device would exceed `device_budget`, the least
+    recently used submodels on the device are offloaded to (pinned) host memory. The
+    host copy is made once and kept, so later offloads only swap tensor storage and
+    promotions are a single host-to-device copy. When the host copies exceed
+    `host_budget`, whole pipelines are dropped, least recently used first; the active
+    one never is. A dropped pipeline is loaded from disk again on its next use.
+
+    Budgets are plain byte counts, so the pool also runs on the CPU with simulated
+    budgets (device "cpu", no pinned memory).
+
+    Args:
+        loader: Callable (name, device) -> pipeline, loading a pipeline from disk.
+        device: Device the submodels run on.
+        device_budget: Bytes of weights allowed on the device, or None for no limit.
+        host_budget: Bytes of host copies allowed, or None for no limit.
+        pin_memory: Whether host copies are pinned. Defaults to True when CUDA is available.
+    """
+
+    def __init__(self, loader, device="cuda", device_budget=None, host_budget=None, pin_memory=None):
+        self.loader = loader
+        self.device = torch.device(device)
+        self.device_budget = device_budget
+        self.host_budget = host_budget
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+        self.pipelines = {}
+        self.last_used = {}
+        self.active = None
+        self._entries = {}
+        self._lock = threading.RLock()
+        self.stats = {"disk_loads": 0, "promotions": 0, "offloads": 0, "dropped": 0}
+
+    def get(self, name):
+        """The pipeline `name`, loaded from disk only if it is not resident."""
+        with self._lock:
+            if name not in self.pipelines:
+                start = time.time()
+                pipeline = self.loader(name, self.device)
+                self.stats["disk_loads"] += 1
+                self._wrap(name, pipeline)
+                self.pipelines[name] = pipeline
+                logger.info(f"Loaded {name} from disk in {time.time() - start:.1f}s")
+            self.active = name
+            self.last_used[name] = time.monotonic()
+            self._enforce_host_budget()
+            return self.pipelines[name]
+
+    def _wrap(self, name, pipeline):
+        """Route submodel access of a pipeline through the pool."""
+        pipeline.models = _PooledModels(self, name, pipeline.models)
+        if isinstance(getattr(pipeline, "text_cond_model", None), dict):
+            pipeline.text_cond_model = _PooledModels(
+                self, name, pipeline.text_cond_model, prefix="text_cond_", managed={"model"}
+            )
+        # Submodels loaded eagerly are on the device already
+        for key, module in list(pipeline.models.items()):
+            if isinstance(module, torch.nn.Module):
+                self._register(name, key, module)
+        if isinstance(pipeline.__dict__.get("text_cond_model"), _PooledModels):
+            self._register(name, "text_cond_model", pipeline.text_cond_model._inner["model"])
+
+    def _register(self, pipeline_name, key, module):
+        entry = self._entries.get((pipeline_name, key))
+        if entry is None or entry.module is not module:
+            entry = _Entry(pipeline_name, key, module)
+            self._entries[(pipeline_name, key)] = entry
+        return entry
+
+    def _acquire(self, pipeline_name, key, module):
+        """Make a submodel resident on the device and mark it as used."""
+        with self._lock:
+            entry = self._register(pipeline_name, key, module)
+            entry.last_used = time.monotonic()
+            if entry.on_device:
+                self._enforce_device_budget(keep=entry)
+                return
+            self._make_room(entry.nbytes, keep=entry)
+            for name, t in _tensors(entry.module):
+                t.data = entry.host[name].to(self.device, non_blocking=True)
+            entry.on_device = True
+            self.stats["promotions"] += 1
+
+    def _make_room(self, nbytes, keep=None):
+        if self.device_budget is None:
+            return
+        while self.device_bytes + nbytes > self.device_budget:
+            victims = [e for e in self._entries.values() if e.on_device and e is not keep]
+            if not victims:
+                return
+            self._offload(min(victims, key=lambda e: e.last_used))
+
+    def _enforce_device_budget(self, keep=None):
+        self._make_room(0, keep=keep)
+
+    def _offload(self, entry):
+        """Move a submodel to host memory, reusing its host copy if it has one."""
+        if entry.host is None:
+            entry.host = {}
+            for name, t in _tensors(entry.module):
+                host = t.detach().to("cpu", copy=True)
+                entry.host[name] = host.pin_memory() if self.pin_memory else host
+        for name, t in _tensors(entry.module):
+            t.data = entry.host[name]
+        entry.on_device = False
+        self.stats["offloads"] += 1
+        self._enforce_host_budget()
+
+    def _enforce_host_budget(self):
+        if self.host_budget is None:
+            return
+        while self.host_bytes > self.host_budget:
+            candidates = [name for name in self.pipelines if name != self.active]
+            if not candidates:
+                return
+            self.drop(min(candidates, key=lambda name: self.last_used.get(name, 0)))
+
+    def drop(self, name):
+        """Forget a pipeline entirely; it is loaded from disk again on its next use."""
+        with self._lock:
+            if name not in self.pipelines:
+                return
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
+            del self.pipelines[name]
+            self.last_used.pop(name, None)
+            if self.active == name:
+                self.active = None
+            self.stats["dropped"] += 1
+            logger.info(f"Dropped {name} from the model pool")
+
+    def clear(self):
+        for name in list(self.pipelines):
+            self.drop(name)
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @property
+    def device_bytes(self):
+        return sum(e.nbytes for e in self._entries.values() if e.on_device)
+
+    @property
+    def host_bytes(self):
+        return sum(e.host_bytes for e in self._entries.values())
+
+    def residency(self):
+        """Tier of every tracked submodel, as {pipeline: {key: 'device' | 'host'}}."""
+        with self._lock:
+            out = {}
+            for (name, key), entry in self._entries.items():
+                out.setdefault(name, {})[key] = "device" if entry.on_device else "host"
+            return out
+
+    def format_stats(self):
+        gb = 1024**3
+        lines = [
+            f"Device: {self.device_bytes / gb:.2f} GB"
+            + (f" / {self.device_budget / gb:.2f} GB" if self.device_budget is not None else ""),
+            f"Host: {self.host_bytes / gb:.2f} GB"
+            + (f" / {self.host_budget / gb:.2f} GB" if self.host_budget is not None else ""),
+            ", ".join(f"{k}: {v}" for k, v in self.stats.items()),
+        ]
+        for name, tiers in self.residency().items():
+            on_device = sum(tier == "device" for tier in tiers.values())
+            marker = " (active)" if name == self.active else ""
+            lines.append(f"- {name}{marker}: {on_device}/{len(tiers)} submodels on device")
+        return "\n".join(lines)
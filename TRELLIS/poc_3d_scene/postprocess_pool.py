@@ -0,0 +1,100 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import LOG_LEVEL, LOG_FORMAT
+
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(num_threads):
+    """Limit intra-op threads so that workers do not oversubscribe the CPU."""
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+def _postprocess_worker(payload, glb_path, settings):
+    """Run the CPU postprocess stages for one object and export it as GLB.
+
+    Runs in a worker process. Returns (glb_path, seconds spent).
+    """
+    from trellis.utils import postprocessing_utils
+    start = time.time()
+    glb = postprocessing_utils.mesh_to_glb(**payload, **settings, bake_rasterizer="cpu", verbose=False)
+    glb.export(glb_path)
+    return glb_path, time.time() - start
+
+
+def make_payload(outputs, render_fn):
+    """Move the decoded outputs of one object to host memory, ready to be sent to a worker.
+
+    Args:
+        outputs: Outputs of `pipeline.run` for one object.
+        render_fn: Renders the texture baking views of a Gaussian on the GPU, see
+            `postprocessing_utils.render_glb_observations`.
+    """
+    mesh = outputs["mesh"][0]
+    return {
+        "vertices": mesh.vertices.cpu().numpy(),
+        "faces": mesh.faces.cpu().numpy(),
+        **render_fn(outputs["gaussian"][0]),
+    }
+
+
+class PostprocessPool:
+    """Pool of CPU worker processes for mesh postprocessing and GLB export.
+
+    `submit` blocks while `max_pending` objects are queued or running, which keeps the
+    sampling side from piling up decoded outputs in memory. Each object is a separate
+    task, so a failure only affects that object; if a worker dies the pool is restarted
+    and the objects in flight are reported as failed.
+
+    Workers are started with the spawn method so they never inherit a CUDA context.
+    """
+
+    def __init__(self, num_workers, max_pending, settings):
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        self.settings = settings
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,),
+            )
+        return self._executor
+
+    def submit(self, payload, glb_path):
+        """Queue one object, waiting for a free slot first. Returns a future of (glb_path, seconds)."""
+        self._slots.acquire()
+        try:
+            future = self._get_executor().submit(_postprocess_worker, payload, glb_path, self.settings)
+        except BrokenProcessPool:
+            logger.warning("Postprocess pool is broken, restarting it")
+            self._executor = None
+            try:
+                future = self._get_executor().submit(_postprocess_worker, payload, glb_path, self.settings)
+            except Exception:
+                self._slots.release()
+                raise
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,133 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from config import LOG_LEVEL, LOG_FORMAT
+
+# Set up logging
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+
+# Words that do not change what a planning request asks for
+_FILLER_WORDS = {
+    "a", "an", "the", "i", "i'd", "id", "me", "my", "we", "please", "want", "would", "like",
+    "to", "some", "can", "you", "could", "create", "make", "design", "generate", "give",
+    "need", "just", "of", "scene",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    response TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses(used_at);
+"""
+
+
+def semantic_terms(text):
+    """Content words of a request, in order: 'A cozy living room, please!' and
+    'I would like a cozy living room' both give ('cozy', 'living', 'room'). Order and
+    repeats are kept, so 'a red chair and a blue table' and 'a blue chair and a red
+    table' stay different requests."""
+    words = (w.strip("'") for w in re.findall(r"[a-z0-9']+", str(text).lower()))
+    return tuple(w for w in words if w and w not in _FILLER_WORDS)
+
+
+def make_key(kind, model, rules, text="", objects=()):
+    """Cache key of an LLM request.
+
+    Requests are keyed by what they ask for rather than their exact wording: the content
+    words of `text`, in order, and the set of `objects`, both normalized. The model and the rules
+    in effect are part of the key, so changing either never serves stale answers.
+    """
+    payload = {
+        "kind": kind,
+        "model": model,
+        "rules": hashlib.sha256("\n".join(rules).encode("utf-8")).hexdigest(),
+        "terms": semantic_terms(text),
+        "objects": sorted({" ".join(re.sub(r"[^a-z0-9]+", " ", o.lower()).split()) for o in objects}),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Persistent cache of LLM responses, stored in SQLite.
+
+    Entries not used for `ttl` seconds expire; above `max_entries` the least recently
+    used ones are removed. Each call opens its own connection, so the cache can be
+    shared between Gradio sessions, threads and processes.
+    """
+
+    def __init__(self, db_path, max_entries=10000, ttl=None):
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """The cached response for `key`, or None."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, used_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row["used_at"] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET hits = hits + 1, used_at = ? WHERE key = ?", (now, key))
+        return row["response"]
+
+    def put(self, key, kind, response, input_tokens=0, output_tokens=0):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO responses (key, kind, response, input_tokens, output_tokens, created_at, used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET response = excluded.response, used_at = excluded.used_at
+                """,
+                (key, kind, response, input_tokens, output_tokens, now, now),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            count = conn.execute("DELETE FROM responses").rowcount
+        logger.info(f"Cleared {count} cached agent responses")
+        return count
+
+    def stats(self):
+        """Entries, total hits and the tokens the hits saved, per request kind."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT kind, COUNT(*) AS entries, SUM(hits) AS hits,
+                    SUM(hits * (input_tokens + output_tokens)) AS tokens_saved
+                FROM responses GROUP BY kind
+                """
+            ).fetchall()
+        return {row["kind"]: {k: row[k] or 0 for k in ("entries", "hits", "tokens_saved")} for row in rows}
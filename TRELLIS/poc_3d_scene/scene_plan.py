@@ -0,0 +1,105 @@
+import re
+import json
+
+# Structured output of the planning call, shown to the LLM and enforced by `validate_plan`
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scene_name": {"type": "string", "description": "Short descriptive name of the scene, 2-3 words"},
+        "objects": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "Object name, exactly as given in the list"},
+                    "prompt": {"type": "string", "description": "3D generation prompt, at most 40 words"},
+                },
+                "required": ["name", "prompt"],
+            },
+        },
+    },
+    "required": ["scene_name", "objects"],
+}
+
+MAX_PROMPT_WORDS = 40
+MAX_NAME_WORDS = 5
+
+
+def normalize_name(name):
+    """Comparable form of an object name: 'coffee_table', 'Coffee Table ' -> 'coffee table'."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+
+
+def extract_json(text):
+    """The first JSON object in an LLM response, which may be wrapped in prose or a code fence.
+
+    Raises:
+        ValueError: If no JSON object can be decoded.
+    """
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"\{", text):
+        try:
+            value, _ = decoder.raw_decode(text[match.start():])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+    raise ValueError("No JSON object found in the response")
+
+
+def validate_plan(data, objects, max_words=MAX_PROMPT_WORDS):
+    """Check a structured planning answer against `PLAN_SCHEMA` and the requested objects.
+
+    Prompts longer than `max_words` are truncated rather than rejected. Returned object
+    names are matched to the requested ones ignoring case, spacing and underscores, and
+    the requested spelling is kept.
+
+    Args:
+        data: Decoded JSON answer.
+        objects: Object names the plan must cover.
+
+    Returns:
+        (plan, errors): plan is {"scene_name": str, "prompts": {name: prompt}} in the order
+            of `objects`, or None if there are errors; errors is a list of messages.
+    """
+    errors = []
+    if not isinstance(data, dict):
+        return None, ["The answer must be a JSON object"]
+
+    scene_name = data.get("scene_name")
+    if not isinstance(scene_name, str) or not scene_name.strip():
+        errors.append("'scene_name' must be a non-empty string")
+    else:
+        scene_name = scene_name.strip().strip("\"'*").strip()
+        if len(scene_name.split()) > MAX_NAME_WORDS:
+            errors.append(f"'scene_name' must have at most {MAX_NAME_WORDS} words")
+
+    entries = data.get("objects")
+    if not isinstance(entries, list):
+        return None, errors + ["'objects' must be a list"]
+
+    requested = {normalize_name(name): name for name in objects}
+    prompts = {}
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append(f"objects[{i}] must be an object with 'name' and 'prompt'")
+            continue
+        name, prompt = entry.get("name"), entry.get("prompt")
+        if not isinstance(name, str) or normalize_name(name) not in requested:
+            errors.append(f"objects[{i}] has name {name!r}, which is not in the list")
+            continue
+        name = requested[normalize_name(name)]
+        if name in prompts:
+            errors.append(f"'{name}' appears more than once")
+            continue
+        if not isinstance(prompt, str) or not prompt.strip():
+            errors.append(f"'{name}' needs a non-empty 'prompt'")
+            continue
+        prompts[name] = " ".join(prompt.strip().strip("*").split()[:max_words])
+
+    missing = [name for name in objects if name not in prompts]
+    if missing:
+        errors.append(f"Missing prompts for: {', '.join(missing)}")
+    if errors:
+        return None, errors
+    return {"scene_name": scene_name, "prompts": {name: prompts[name] for name in objects}}, []
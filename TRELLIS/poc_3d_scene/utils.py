@@ -63,3 +63,72 @@ def ensure_output_directory(output_dir):
     except Exception as e:
         logger.error(f"Failed to create output directory: {e}")
         return False
+
+
+class ObjectListParser:
+    """Incremental parser of the suggested objects in an LLM response.
+
+    Text can be fed in arbitrary chunks, as tokens arrive; each complete line is parsed
+    as soon as its newline is seen. The result is the same as parsing the whole response.
+    """
+
+    def __init__(self):
+        self.objects = []
+        self._buffer = ""
+        self._in_objects_section = False
+        self._done = False
+
+    def feed(self, text):
+        """Add text; returns the objects parsed so far."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            self._parse_line(line)
+        return list(self.objects)
+
+    def finish(self):
+        """Parse the last, unterminated line; returns all objects."""
+        self._parse_line(self._buffer)
+        self._buffer = ""
+        return list(self.objects)
+
+    def _parse_line(self, line):
+        if self._done:
+            return
+        line = line.strip()
+
+        # Look for the start of the objects section
+        if "Suggested objects:" in line:
+            self._in_objects_section = True
+            return
+
+        # Skip empty lines
+        if not line:
+            return
+
+        # If we're in the objects section and the line starts with a number
+        if self._in_objects_section and line[0].isdigit():
+            # Extract the object name after the number and dot
+            obj = line.split('.', 1)[-1].strip()
+            if obj:
+                # Format the object name
+                # Replace underscores with spaces and capitalize first letter of each word
+                obj = obj.replace('_', ' ').title()
+                self.objects.append(obj)
+        # If we hit a line that doesn't start with a number, we're done with the objects section
+        elif self._in_objects_section and not line[0].isdigit():
+            self._done = True
+
+
+def parse_object_list(response):
+    """Parse the LLM response to extract suggested objects from numbered lists.
+
+    Args:
+        response (str): The LLM's response text
+
+    Returns:
+        list: List of extracted objects with proper formatting
+    """
+    parser = ObjectListParser()
+    parser.feed(response)
+    return parser.finish()
@@ -7,6 +7,7 @@ import numpy as np
 import pandas as pd
 from PIL import Image
 from torch.utils.data import Dataset
+from .shards import ShardReader, open_shards
 
 
 class StandardDatasetBase(Dataset):
@@ -24,6 +25,7 @@ class StandardDatasetBase(Dataset):
         self.roots = roots.split(',')
         self.instances = []
         self.metadata = pd.DataFrame()
+        self._shards = {}
         
         self._stats = {}
         for root in self.roots:
@@ -45,6 +47,16 @@ class StandardDatasetBase(Dataset):
     def get_instance(self, root: str, instance: str) -> Dict[str, Any]:
         pass
         
+    def get_shards(self, root: str, *subdirs: str) -> Optional[ShardReader]:
+        """
+        Packed shards of `root/shards/<subdirs>`, see `dataset_toolkits/pack_shards.py`.
+        Returns None if they have not been packed, in which case the per-object files are read.
+        """
+        path = os.path.join(root, 'shards', *subdirs)
+        if path not in self._shards:
+            self._shards[path] = open_shards(path)
+        return self._shards[path]
+
     def __len__(self):
         return len(self.instances)
 
@@ -0,0 +1,224 @@
+from typing import *
+import os
+import json
+import numpy as np
+
+
+__all__ = [
+    'ShardWriter',
+    'ShardReader',
+    'open_shards',
+]
+
+
+SHARD_VERSION = 1
+INDEX_FILE = 'index.npy'
+HEADER_FILE = 'index.json'
+ALIGNMENT = 64
+
+
+def _shard_file(shard: int) -> str:
+    return f'shard_{shard:05d}.bin'
+
+
+def _require_zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compressed shards need the 'zstandard' package: pip install zstandard") from e
+    return zstandard
+
+
+class ShardWriter:
+    """
+    Pack per-object arrays into a few large shard files with an index.
+
+    Every record holds the same named fields. A field is an array whose leading dimension
+    may differ between records (e.g. the number of voxels) while its dtype and trailing
+    dimensions are fixed; both are taken from the first record. Uncompressed fields are
+    stored raw at 64-byte aligned offsets, so `ShardReader` returns them as views into the
+    memory-mapped shard. With compression='zstd' every field of every record is an
+    independent zstd frame.
+
+    Layout of the output directory:
+        index.json      header: version, fields, compression, attrs
+        index.npy       one row per record: key, shard and per field offset, nbytes, rows
+        shard_XXXXX.bin concatenated field payloads, a new shard every `shard_bytes`
+
+    Args:
+        path (str): Output directory.
+        shard_bytes (int): Size after which a new shard file is started.
+        compression (str): None or 'zstd'.
+        compression_level (int): zstd compression level.
+        attrs (dict): JSON-serializable attributes stored in the header,
+            e.g. the resolution the coordinates were quantized at.
+    """
+    def __init__(
+        self,
+        path: str,
+        shard_bytes: int = 1 << 30,
+        compression: Optional[Literal['zstd']] = None,
+        compression_level: int = 3,
+        attrs: Optional[Dict[str, Any]] = None,
+    ):
+        if compression not in (None, 'zstd'):
+            raise ValueError(f"Unknown compression {compression}")
+        self.path = path
+        self.shard_bytes = shard_bytes
+        self.compression = compression
+        self.attrs = attrs or {}
+        self.fields = None
+        self._compressor = _require_zstd().ZstdCompressor(level=compression_level) if compression == 'zstd' else None
+        self._keys = []
+        self._rows = []
+        self._shard = -1
+        self._file = None
+        os.makedirs(path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _next_shard(self):
+        if self._file is not None:
+            self._file.close()
+        self._shard += 1
+        self._file = open(os.path.join(self.path, _shard_file(self._shard)), 'wb')
+
+    def add(self, key: str, **arrays: np.ndarray) -> None:
+        """
+        Append a record.
+
+        Args:
+            key (str): Record key, e.g. the sha256 of the object.
+            **arrays: One array per field.
+        """
+        if self.fields is None:
+            self.fields = {
+                name: {'dtype': np.asarray(array).dtype.str, 'shape': list(np.shape(array)[1:])}
+                for name, array in arrays.items()
+            }
+        if set(arrays) != set(self.fields):
+            raise ValueError(f"Record {key} has fields {sorted(arrays)}, expected {sorted(self.fields)}")
+        if self._file is None or self._file.tell() >= self.shard_bytes:
+            self._next_shard()
+
+        row = [key, self._shard]
+        for name, spec in self.fields.items():
+            array = np.asarray(arrays[name])
+            if list(array.shape[1:]) != spec['shape']:
+                raise ValueError(f"Field {name} of {key} has shape {array.shape}, expected (N, {', '.join(map(str, spec['shape']))})")
+            payload = np.ascontiguousarray(array, dtype=spec['dtype']).tobytes()
+            if self._compressor is not None:
+                payload = self._compressor.compress(payload)
+            else:
+                self._file.write(b'\0' * (-self._file.tell() % ALIGNMENT))
+            row += [self._file.tell(), len(payload), array.shape[0]]
+            self._file.write(payload)
+        self._keys.append(key)
+        self._rows.append(tuple(row))
+
+    def close(self) -> None:
+        """Finish the last shard and write the index."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        fields = self.fields or {}
+        key_size = max([len(key) for key in self._keys], default=1)
+        dtype = [('key', f'S{key_size}'), ('shard', '<u4')]
+        for name in fields:
+            dtype += [(f'{name}_offset', '<u8'), (f'{name}_nbytes', '<u8'), (f'{name}_rows', '<u8')]
+        index = np.array(self._rows, dtype=dtype)
+        np.save(os.path.join(self.path, INDEX_FILE), index)
+        with open(os.path.join(self.path, HEADER_FILE), 'w') as f:
+            json.dump({
+                'version': SHARD_VERSION,
+                'fields': fields,
+                'compression': self.compression,
+                'num_shards': self._shard + 1,
+                'num_records': len(index),
+                'attrs': self.attrs,
+            }, f, indent=4)
+
+
+class ShardReader:
+    """
+    Random access to the records of a directory written by `ShardWriter`.
+
+    Shards are memory-mapped copy-on-write on first access, so uncompressed fields are
+    returned as zero-copy, writable views whose pages are shared between DataLoader
+    workers. The maps are not pickled; each worker process opens its own.
+
+    Args:
+        path (str): Directory written by `ShardWriter`.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        if header['version'] != SHARD_VERSION:
+            raise ValueError(f"Unsupported shard version {header['version']} in {path}")
+        self.fields = header['fields']
+        self.compression = header['compression']
+        self.attrs = header['attrs']
+        self.index = np.load(os.path.join(path, INDEX_FILE))
+        self._rows = {key.decode(): i for i, key in enumerate(self.index['key'].tolist())}
+        self._mmaps = {}
+        if self.compression == 'zstd':
+            _require_zstd()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_mmaps'] = {}
+        return state
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def keys(self) -> List[str]:
+        return list(self._rows)
+
+    def _mmap(self, shard: int) -> np.memmap:
+        if shard not in self._mmaps:
+            self._mmaps[shard] = np.memmap(os.path.join(self.path, _shard_file(shard)), dtype=np.uint8, mode='c')
+        return self._mmaps[shard]
+
+    def read(self, key: str, fields: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Read a record.
+
+        Args:
+            key (str): Record key.
+            fields (List[str]): Fields to read, all by default.
+
+        Returns:
+            Dict[str, np.ndarray]: Array of shape (rows, *shape) per field.
+        """
+        row = self.index[self._rows[key]]
+        buffer = self._mmap(int(row['shard']))
+        out = {}
+        for name in fields or self.fields:
+            spec = self.fields[name]
+            offset, nbytes, rows = (int(row[f'{name}_{k}']) for k in ('offset', 'nbytes', 'rows'))
+            data = buffer[offset:offset + nbytes]
+            if self.compression == 'zstd':
+                data = np.frombuffer(bytearray(_require_zstd().ZstdDecompressor().decompress(data)), dtype=np.uint8)
+            out[name] = data.view(spec['dtype']).reshape(rows, *spec['shape'])
+        return out
+
+    def __getitem__(self, key: str) -> Dict[str, np.ndarray]:
+        return self.read(key)
+
+
+def open_shards(path: str) -> Optional[ShardReader]:
+    """
+    Open the shards at `path` if they have been written, otherwise return None.
+    """
+    if not os.path.exists(os.path.join(path, HEADER_FILE)):
+        return None
+    return ShardReader(path)
@@ -41,8 +41,15 @@ class SparseStructure(StandardDatasetBase):
         return metadata, stats
 
     def get_instance(self, root, instance):
-        position = utils3d.io.read_ply(os.path.join(root, 'voxels', f'{instance}.ply'))[0]
-        coords = ((torch.tensor(position) + 0.5) * self.resolution).int().contiguous()
+        shards = self.get_shards(root, 'voxels')
+        if shards is not None and shards.attrs.get('resolution') == self.resolution and instance in shards:
+            coords = torch.from_numpy(shards.read(instance)['coords']).long()
+        else:
+            if os.path.exists(os.path.join(root, 'voxels', f'{instance}.npy')):
+                position = (np.load(os.path.join(root, 'voxels', f'{instance}.npy')) + 0.5) / 64 - 0.5
+            else:
+                position = utils3d.io.read_ply(os.path.join(root, 'voxels', f'{instance}.ply'))[0]
+            coords = ((torch.tensor(position) + 0.5) * self.resolution).int().contiguous()
         ss = torch.zeros(1, self.resolution, self.resolution, self.resolution, dtype=torch.long)
         ss[:, coords[:, 0], coords[:, 1], coords[:, 2]] = 1
         return {'ss': ss}
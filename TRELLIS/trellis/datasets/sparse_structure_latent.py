@@ -163,8 +163,12 @@ class SparseStructureLatent(SparseStructureLatentVisMixin, StandardDatasetBase):
         return metadata, stats
                 
     def get_instance(self, root, instance):
-        latent = np.load(os.path.join(root, 'ss_latents', self.latent_model, f'{instance}.npz'))
-        z = torch.tensor(latent['mean']).float()
+        shards = self.get_shards(root, 'ss_latents', self.latent_model)
+        if shards is not None and instance in shards:
+            z = torch.from_numpy(shards.read(instance, ['mean'])['mean']).float()
+        else:
+            latent = np.load(os.path.join(root, 'ss_latents', self.latent_model, f'{instance}.npz'))
+            z = torch.tensor(latent['mean']).float()
         if self.normalization is not None:
             z = (z - self.mean) / self.std
 
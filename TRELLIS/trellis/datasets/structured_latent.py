@@ -149,9 +149,15 @@ class SLat(SLatVisMixin, StandardDatasetBase):
         return metadata, stats
 
     def get_instance(self, root, instance):
-        data = np.load(os.path.join(root, 'latents', self.latent_model, f'{instance}.npz'))
-        coords = torch.tensor(data['coords']).int()
-        feats = torch.tensor(data['feats']).float()
+        shards = self.get_shards(root, 'latents', self.latent_model)
+        if shards is not None and instance in shards:
+            data = shards.read(instance)
+            coords = torch.from_numpy(data['coords']).int()
+            feats = torch.from_numpy(data['feats']).float()
+        else:
+            data = np.load(os.path.join(root, 'latents', self.latent_model, f'{instance}.npz'))
+            coords = torch.tensor(data['coords']).int()
+            feats = torch.tensor(data['feats']).float()
         if self.normalization is not None:
             feats = (feats - self.mean) / self.std
         return {
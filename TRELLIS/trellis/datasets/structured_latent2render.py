@@ -74,9 +74,15 @@ class SLat2Render(StandardDatasetBase):
         }
     
     def _get_latent(self, root, instance):
-        data = np.load(os.path.join(root, 'latents', self.latent_model, f'{instance}.npz'))
-        coords = torch.tensor(data['coords']).int()
-        feats = torch.tensor(data['feats']).float()
+        shards = self.get_shards(root, 'latents', self.latent_model)
+        if shards is not None and instance in shards:
+            data = shards.read(instance)
+            coords = torch.from_numpy(data['coords']).int()
+            feats = torch.from_numpy(data['feats']).float()
+        else:
+            data = np.load(os.path.join(root, 'latents', self.latent_model, f'{instance}.npz'))
+            coords = torch.tensor(data['coords']).int()
+            feats = torch.tensor(data['feats']).float()
         return {
             'coords': coords,
             'feats': feats,
@@ -37,35 +37,107 @@ def __getattr__(name):
     return globals()[name]
 
 
-def from_pretrained(path: str, **kwargs):
+def resolve_pretrained(path: str):
+    """
+    Locate the config and weight files of a pretrained checkpoint, downloading them if needed.
+
+    Returns:
+        Tuple[str, str]: Paths of the config file and the safetensors file.
+    """
+    import os
+    is_local = os.path.exists(f"{path}.json") and os.path.exists(f"{path}.safetensors")
+
+    if is_local:
+        return f"{path}.json", f"{path}.safetensors"
+
+    from huggingface_hub import hf_hub_download
+    path_parts = path.split('/')
+    repo_id = f'{path_parts[0]}/{path_parts[1]}'
+    model_name = '/'.join(path_parts[2:])
+    config_file = hf_hub_download(repo_id, f"{model_name}.json")
+    model_file = hf_hub_download(repo_id, f"{model_name}.safetensors")
+    return config_file, model_file
+
+
+def pretrained_nbytes(path: str, dtype=None) -> int:
+    """
+    Bytes of weights of a pretrained checkpoint, read from the safetensors header without loading it.
+
+    Args:
+        path: The path to the checkpoint, as for `from_pretrained`.
+        dtype: If given, floating point tensors are counted at this dtype.
+    """
+    import json
+    import struct
+    _, model_file = resolve_pretrained(path)
+    with open(model_file, 'rb') as f:
+        header = json.loads(f.read(struct.unpack('<Q', f.read(8))[0]))
+    itemsizes = {'F64': 8, 'F32': 4, 'F16': 2, 'BF16': 2, 'I64': 8, 'I32': 4, 'I16': 2, 'I8': 1, 'U8': 1, 'BOOL': 1}
+    nbytes = 0
+    for key, info in header.items():
+        if key == '__metadata__':
+            continue
+        numel = 1
+        for n in info['shape']:
+            numel *= n
+        itemsize = itemsizes.get(info['dtype'], 4)
+        if dtype is not None and info['dtype'] in ('F64', 'F32', 'F16', 'BF16'):
+            itemsize = dtype.itemsize
+        nbytes += numel * itemsize
+    return nbytes
+
+
+def load_safetensors_into(model, model_file: str):
+    """
+    Copy the weights of a safetensors file into an already built model, tensor by tensor.
+
+    The file is memory-mapped and each tensor is copied straight into the parameter or
+    buffer it belongs to, so the checkpoint is never materialized as a whole in host memory.
+    Keys must match exactly, as with a strict `load_state_dict`.
+    """
+    import torch
+    from safetensors import safe_open
+    targets = model.state_dict()
+    with safe_open(model_file, framework='pt', device='cpu') as f:
+        keys = set(f.keys())
+        missing = sorted(set(targets) - keys)
+        unexpected = sorted(keys - set(targets))
+        if missing or unexpected:
+            raise RuntimeError(
+                f"Error(s) in loading state_dict for {model.__class__.__name__}: "
+                f"missing keys {missing}, unexpected keys {unexpected}"
+            )
+        with torch.no_grad():
+            for key in keys:
+                targets[key].copy_(f.get_tensor(key), non_blocking=True)
+    return model
+
+
+def from_pretrained(path: str, device=None, dtype=None, **kwargs):
     """
     Load a model from a pretrained checkpoint.
 
     Args:
         path: The path to the checkpoint. Can be either local path or a Hugging Face model name.
               NOTE: config file and model file should take the name f'{path}.json' and f'{path}.safetensors' respectively.
+        device: Device to build and load the model on. The modules are allocated there directly
+              and the weights are copied from the memory-mapped file, without a CPU copy of the model.
+        dtype: If given, floating point parameters and buffers are cast to this dtype.
         **kwargs: Additional arguments for the model constructor.
     """
-    import os
     import json
-    from safetensors.torch import load_file
-    is_local = os.path.exists(f"{path}.json") and os.path.exists(f"{path}.safetensors")
-
-    if is_local:
-        config_file = f"{path}.json"
-        model_file = f"{path}.safetensors"
-    else:
-        from huggingface_hub import hf_hub_download
-        path_parts = path.split('/')
-        repo_id = f'{path_parts[0]}/{path_parts[1]}'
-        model_name = '/'.join(path_parts[2:])
-        config_file = hf_hub_download(repo_id, f"{model_name}.json")
-        model_file = hf_hub_download(repo_id, f"{model_name}.safetensors")
+    import torch
+    config_file, model_file = resolve_pretrained(path)
 
     with open(config_file, 'r') as f:
         config = json.load(f)
-    model = __getattr__(config['name'])(**config['args'], **kwargs)
-    model.load_state_dict(load_file(model_file))
+    with torch.device(device if device is not None else 'cpu'):
+        model = __getattr__(config['name'])(**config['args'], **kwargs)
+    if dtype is not None:
+        model.to(dtype)
+    load_safetensors_into(model, model_file)
+    if device is not None and torch.device(device).type == 'cuda':
+        torch.cuda.synchronize(device)
 
     return model
 
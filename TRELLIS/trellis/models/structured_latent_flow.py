@@ -109,6 +109,8 @@ class SLatFlowModel(nn.Module):
         self.qk_rms_norm = qk_rms_norm
         self.qk_rms_norm_cross = qk_rms_norm_cross
         self.dtype = torch.float16 if use_fp16 else torch.float32
+        # Number of spconv / torchsparse tensors rebuilt during the last forward pass
+        self.backend_rebuilds = 0
 
         if self.io_block_channels is not None:
             assert int(np.log2(patch_size)) == np.log2(patch_size), "Patch size must be a power of 2"
@@ -238,6 +240,7 @@ class SLatFlowModel(nn.Module):
         nn.init.constant_(self.out_layer.bias, 0)
 
     def forward(self, x: sp.SparseTensor, t: torch.Tensor, cond: torch.Tensor) -> sp.SparseTensor:
+        rebuilds_before = sp.get_backend_rebuilds()
         h = self.input_layer(x).type(self.dtype)
         t_emb = self.t_embedder(t)
         if self.share_mod:
@@ -265,6 +268,7 @@ class SLatFlowModel(nn.Module):
 
         h = h.replace(F.layer_norm(h.feats, h.feats.shape[-1:]))
         h = self.out_layer(h.type(x.dtype))
+        self.backend_rebuilds = sp.get_backend_rebuilds() - rebuilds_before
         return h
     
 
@@ -103,7 +103,11 @@ class SLatMeshDecoder(SparseTransformerBase):
         )
         self.resolution = resolution
         self.rep_config = representation_config
-        self.mesh_extractor = SparseFeatures2Mesh(res=self.resolution*4, use_color=self.rep_config.get('use_color', False))
+        self.mesh_extractor = SparseFeatures2Mesh(
+            res=self.resolution*4,
+            use_color=self.rep_config.get('use_color', False),
+            extract_mode=self.rep_config.get('extract_mode', 'dense'),
+        )
         self.out_channels = self.mesh_extractor.feats_channels
         self.upsample = nn.ModuleList([
             SparseSubdivideBlock3d(
@@ -21,7 +21,7 @@ def __from_env():
         BACKEND = env_sparse_backend
     if env_sparse_debug is not None:
         DEBUG = env_sparse_debug == '1'
-    if env_sparse_attn is not None and env_sparse_attn in ['xformers', 'flash_attn']:
+    if env_sparse_attn is not None and env_sparse_attn in ['xformers', 'flash_attn', 'sdpa', 'naive']:
         ATTN = env_sparse_attn
         
     print(f"[SPARSE] Backend: {BACKEND}, Attention: {ATTN}")
@@ -38,7 +38,7 @@ def set_debug(debug: bool):
     global DEBUG
     DEBUG = debug
 
-def set_attn(attn: Literal['xformers', 'flash_attn']):
+def set_attn(attn: Literal['xformers', 'flash_attn', 'sdpa', 'naive']):
     global ATTN
     ATTN = attn
     
@@ -51,6 +51,8 @@ __attributes = {
     'sparse_batch_op': 'basic',
     'sparse_cat': 'basic',
     'sparse_unbind': 'basic',
+    'get_backend_rebuilds': 'basic',
+    'reset_backend_rebuilds': 'basic',
     'SparseGroupNorm': 'norm',
     'SparseLayerNorm': 'norm',
     'SparseGroupNorm32': 'norm',
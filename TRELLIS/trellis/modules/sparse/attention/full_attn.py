@@ -2,11 +2,16 @@ from typing import *
 import torch
 from .. import SparseTensor
 from .. import DEBUG, ATTN
+from ...attention.full_attn import _naive_sdpa
 
 if ATTN == 'xformers':
     import xformers.ops as xops
 elif ATTN == 'flash_attn':
     import flash_attn
+elif ATTN == 'sdpa':
+    from torch.nn.functional import scaled_dot_product_attention as sdpa
+elif ATTN == 'naive':
+    pass
 else:
     raise ValueError(f"Unknown attention module: {ATTN}")
 
@@ -16,6 +21,78 @@ __all__ = [
 ]
 
 
+def _pad_varlen(x: torch.Tensor, seqlen: List[int]) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Pad a packed [T, ...] tensor of variable-length sequences into a [N, L, ...] batch.
+
+    Returns:
+        (torch.Tensor): The padded batch.
+        (torch.Tensor): A [N, L] boolean mask of valid positions.
+    """
+    lens = torch.tensor(seqlen, device=x.device)
+    mask = torch.arange(max(seqlen), device=x.device)[None] < lens[:, None]
+    out = x.new_zeros(len(seqlen), max(seqlen), *x.shape[1:])
+    out[mask] = x
+    return out, mask
+
+
+def dense_attention(q: torch.Tensor, k: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+    """
+    Attention over a batch of equal-length sequences for the 'sdpa' and 'naive' backends.
+
+    Args:
+        q (torch.Tensor): A [N, L, H, Ci] tensor containing Qs.
+        k (torch.Tensor): A [N, L, H, Ci] tensor containing Ks.
+        v (torch.Tensor): A [N, L, H, Co] tensor containing Vs.
+    """
+    if ATTN == 'sdpa':
+        out = sdpa(q.permute(0, 2, 1, 3), k.permute(0, 2, 1, 3), v.permute(0, 2, 1, 3))
+        return out.permute(0, 2, 1, 3)
+    elif ATTN == 'naive':
+        return _naive_sdpa(q, k, v)
+    else:
+        raise ValueError(f"Unknown attention module: {ATTN}")
+
+
+def varlen_attention(
+    q: torch.Tensor,
+    k: torch.Tensor,
+    v: torch.Tensor,
+    q_seqlen: List[int],
+    kv_seqlen: List[int],
+) -> torch.Tensor:
+    """
+    Attention over packed variable-length sequences for the 'sdpa' and 'naive' backends.
+
+    'sdpa' pads the sequences into a batch and masks the padded keys, which is equivalent
+    to a block-diagonal mask over the packed sequence. 'naive' attends each sequence
+    separately and serves as the numerical reference.
+
+    Args:
+        q (torch.Tensor): A [T_Q, H, Ci] tensor containing Qs.
+        k (torch.Tensor): A [T_KV, H, Ci] tensor containing Ks.
+        v (torch.Tensor): A [T_KV, H, Co] tensor containing Vs.
+        q_seqlen (List[int]): The length of each query sequence.
+        kv_seqlen (List[int]): The length of each key/value sequence.
+    """
+    if ATTN == 'sdpa':
+        q, q_mask = _pad_varlen(q, q_seqlen)                # [N, L_Q, H, Ci]
+        k, kv_mask = _pad_varlen(k, kv_seqlen)              # [N, L_KV, H, Ci]
+        v, _ = _pad_varlen(v, kv_seqlen)                    # [N, L_KV, H, Co]
+        attn_mask = kv_mask[:, None, None, :]               # [N, 1, 1, L_KV]
+        out = sdpa(q.permute(0, 2, 1, 3), k.permute(0, 2, 1, 3), v.permute(0, 2, 1, 3), attn_mask=attn_mask)
+        out = out.permute(0, 2, 1, 3)                       # [N, L_Q, H, Co]
+        return out[q_mask]                                  # [T_Q, H, Co]
+    elif ATTN == 'naive':
+        out = [
+            _naive_sdpa(qi[None], ki[None], vi[None])[0]
+            for qi, ki, vi in zip(q.split(q_seqlen), k.split(kv_seqlen), v.split(kv_seqlen))
+        ]
+        return torch.cat(out)
+    else:
+        raise ValueError(f"Unknown attention module: {ATTN}")
+
+
 @overload
 def sparse_scaled_dot_product_attention(qkv: SparseTensor) -> SparseTensor:
     """
@@ -206,6 +283,12 @@ def sparse_scaled_dot_product_attention(*args, **kwargs):
             out = flash_attn.flash_attn_varlen_kvpacked_func(q, kv, cu_seqlens_q, cu_seqlens_kv, max(q_seqlen), max(kv_seqlen))
         elif num_all_args == 3:
             out = flash_attn.flash_attn_varlen_func(q, k, v, cu_seqlens_q, cu_seqlens_kv, max(q_seqlen), max(kv_seqlen))
+    elif ATTN in ['sdpa', 'naive']:
+        if num_all_args == 1:
+            q, k, v = qkv.unbind(dim=1)
+        elif num_all_args == 2:
+            k, v = kv.unbind(dim=1)
+        out = varlen_attention(q, k, v, q_seqlen, kv_seqlen)
     else:
         raise ValueError(f"Unknown attention module: {ATTN}")
     
@@ -1,7 +1,6 @@
 from typing import *
 from enum import Enum
 import torch
-import math
 from .. import SparseTensor
 from .. import DEBUG, ATTN
 
@@ -9,6 +8,8 @@ if ATTN == 'xformers':
     import xformers.ops as xops
 elif ATTN == 'flash_attn':
     import flash_attn
+elif ATTN in ['sdpa', 'naive']:
+    from .full_attn import dense_attention, varlen_attention
 else:
     raise ValueError(f"Unknown attention module: {ATTN}")
 
@@ -39,10 +40,13 @@ def calc_serialization(
     serialize_mode: SerializeMode = SerializeMode.Z_ORDER,
     shift_sequence: int = 0,
     shift_window: Tuple[int, int, int] = (0, 0, 0)
-) -> Tuple[torch.Tensor, torch.Tensor, List[int]]:
+) -> Tuple[torch.Tensor, torch.Tensor, List[int], List[int]]:
     """
     Calculate serialization and partitioning for a set of coordinates.
 
+    All windows of all batch items are built at once on the device. Per-batch window counts
+    only depend on the layout, which lives on the host, so no device synchronization is needed.
+
     Args:
         tensor (SparseTensor): The input tensor.
         window_size (int): The window size to use.
@@ -51,20 +55,19 @@ def calc_serialization(
         shift_window (Tuple[int, int, int]): The shift of serialized coordinates.
 
     Returns:
-        (torch.Tensor, torch.Tensor): Forwards and backwards indices.
+        (torch.Tensor): Forwards indices.
+        (torch.Tensor): Backwards indices.
+        (List[int]): Sequence lengths.
+        (List[int]): Sequence batch indices.
     """
-    fwd_indices = []
-    bwd_indices = []
-    seq_lens = []
-    seq_batch_indices = []
-    offsets = [0]
-    
     if 'vox2seq' not in globals():
         import vox2seq
 
+    device = tensor.device
+
     # Serialize the input
     serialize_coords = tensor.coords[:, 1:].clone()
-    serialize_coords += torch.tensor(shift_window, dtype=torch.int32, device=tensor.device).reshape(1, 3)
+    serialize_coords += torch.tensor(shift_window, dtype=torch.int32, device=device).reshape(1, 3)
     if serialize_mode == SerializeMode.Z_ORDER:
         code = vox2seq.encode(serialize_coords, mode='z_order', permute=[0, 1, 2])
     elif serialize_mode == SerializeMode.Z_ORDER_TRANSPOSED:
@@ -75,44 +78,54 @@ def calc_serialization(
         code = vox2seq.encode(serialize_coords, mode='hilbert', permute=[1, 0, 2])
     else:
         raise ValueError(f"Unknown serialize mode: {serialize_mode}")
-    
-    for bi, s in enumerate(tensor.layout):
-        num_points = s.stop - s.start
-        num_windows = (num_points + window_size - 1) // window_size
-        valid_window_size = num_points / num_windows
-        to_ordered = torch.argsort(code[s.start:s.stop])
-        if num_windows == 1:
-            fwd_indices.append(to_ordered)
-            bwd_indices.append(torch.zeros_like(to_ordered).scatter_(0, to_ordered, torch.arange(num_points, device=tensor.device)))
-            fwd_indices[-1] += s.start
-            bwd_indices[-1] += offsets[-1]
-            seq_lens.append(num_points)
-            seq_batch_indices.append(bi)
-            offsets.append(offsets[-1] + seq_lens[-1])
-        else:
-            # Partition the input
-            offset = 0
-            mids = [(i + 0.5) * valid_window_size + shift_sequence for i in range(num_windows)]
-            split = [math.floor(i * valid_window_size + shift_sequence) for i in range(num_windows + 1)]
-            bwd_index = torch.zeros((num_points,), dtype=torch.int64, device=tensor.device)
-            for i in range(num_windows):
-                mid = mids[i]
-                valid_start = split[i]
-                valid_end = split[i + 1]
-                padded_start = math.floor(mid - 0.5 * window_size)
-                padded_end = padded_start + window_size
-                fwd_indices.append(to_ordered[torch.arange(padded_start, padded_end, device=tensor.device) % num_points])
-                offset += valid_start - padded_start
-                bwd_index.scatter_(0, fwd_indices[-1][valid_start-padded_start:valid_end-padded_start], torch.arange(offset, offset + valid_end - valid_start, device=tensor.device))
-                offset += padded_end - valid_start
-                fwd_indices[-1] += s.start
-            seq_lens.extend([window_size] * num_windows)
-            seq_batch_indices.extend([bi] * num_windows)
-            bwd_indices.append(bwd_index + offsets[-1])
-            offsets.append(offsets[-1] + num_windows * window_size)
-
-    fwd_indices = torch.cat(fwd_indices)
-    bwd_indices = torch.cat(bwd_indices)
+
+    # Order points by code within each batch item; batches are contiguous so one sort suffices
+    key = (tensor.coords[:, 0].long() << 40) | code.long()
+    to_ordered = torch.sort(key, stable=True).indices
+
+    # Per-batch window layout, derived from the host-side layout
+    num_points = [s.stop - s.start for s in tensor.layout]
+    num_windows = [(n + window_size - 1) // window_size for n in num_points]
+    out_lens = [n if w == 1 else w * window_size for n, w in zip(num_points, num_windows)]
+    seq_lens = []
+    seq_batch_indices = []
+    for bi, (n, w) in enumerate(zip(num_points, num_windows)):
+        seq_lens.extend([n] if w == 1 else [window_size] * w)
+        seq_batch_indices.extend([bi] * w)
+
+    M = sum(out_lens)
+    batch_start = torch.tensor([s.start for s in tensor.layout], dtype=torch.int64).to(device, non_blocking=True)
+    batch_points = torch.tensor(num_points, dtype=torch.int64).to(device, non_blocking=True)
+    batch_windows = torch.tensor(num_windows, dtype=torch.int64).to(device, non_blocking=True)
+    batch_out_lens = torch.tensor(out_lens, dtype=torch.int64).to(device, non_blocking=True)
+    batch_out_start = torch.cumsum(batch_out_lens, dim=0) - batch_out_lens
+
+    # Locate every output slot in its batch item and window
+    slot = torch.arange(M, device=device)
+    slot_batch = torch.repeat_interleave(torch.arange(len(num_points), device=device), batch_out_lens, output_size=M)
+    k = slot - batch_out_start[slot_batch]
+    n = batch_points[slot_batch]
+    multi = batch_windows[slot_batch] > 1
+
+    # Padded windows centered on evenly spaced valid ranges, wrapping around the sequence
+    valid_window_size = n.double() / batch_windows[slot_batch].double()
+    i = (k // window_size).double()
+    j = k % window_size
+    mid = (i + 0.5) * valid_window_size + shift_sequence
+    padded_start = torch.floor(mid - 0.5 * window_size).long()
+    pos = padded_start + j
+    valid_start = torch.floor(i * valid_window_size + shift_sequence).long()
+    valid_end = torch.floor((i + 1) * valid_window_size + shift_sequence).long()
+    local = torch.where(multi, torch.remainder(pos, n), k)
+    valid = ~multi | ((pos >= valid_start) & (pos < valid_end))
+
+    fwd_indices = to_ordered[batch_start[slot_batch] + local]
+
+    # Each point is written back from the single window where it lies in the valid range
+    T = tensor.coords.shape[0]
+    bwd_indices = torch.empty(T + 1, dtype=torch.int64, device=device)
+    bwd_indices.scatter_(0, torch.where(valid, fwd_indices, T), slot)
+    bwd_indices = bwd_indices[:T]
 
     return fwd_indices, bwd_indices, seq_lens, seq_batch_indices
     
@@ -168,6 +181,9 @@ def sparse_serialized_scaled_dot_product_self_attention(
             out = xops.memory_efficient_attention(q, k, v)          # [B, N, H, C]
         elif ATTN == 'flash_attn':
             out = flash_attn.flash_attn_qkvpacked_func(qkv_feats)   # [B, N, H, C]
+        elif ATTN in ['sdpa', 'naive']:
+            q, k, v = qkv_feats.unbind(dim=2)                       # [B, N, H, C]
+            out = dense_attention(q, k, v)                          # [B, N, H, C]
         else:
             raise ValueError(f"Unknown attention module: {ATTN}")
         out = out.reshape(B * N, H, C)                              # [M, H, C]
@@ -183,6 +199,9 @@ def sparse_serialized_scaled_dot_product_self_attention(
             cu_seqlens = torch.cat([torch.tensor([0]), torch.cumsum(torch.tensor(seq_lens), dim=0)], dim=0) \
                         .to(qkv.device).int()
             out = flash_attn.flash_attn_varlen_qkvpacked_func(qkv_feats, cu_seqlens, max(seq_lens)) # [M, H, C]
+        elif ATTN in ['sdpa', 'naive']:
+            q, k, v = qkv_feats.unbind(dim=1)                       # [M, H, C]
+            out = varlen_attention(q, k, v, seq_lens, seq_lens)     # [M, H, C]
 
     out = out[bwd_indices]      # [T, H, C]
 
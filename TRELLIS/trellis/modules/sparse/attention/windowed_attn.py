@@ -1,6 +1,5 @@
 from typing import *
 import torch
-import math
 from .. import SparseTensor
 from .. import DEBUG, ATTN
 
@@ -8,6 +7,8 @@ if ATTN == 'xformers':
     import xformers.ops as xops
 elif ATTN == 'flash_attn':
     import flash_attn
+elif ATTN in ['sdpa', 'naive']:
+    from .full_attn import dense_attention, varlen_attention
 else:
     raise ValueError(f"Unknown attention module: {ATTN}")
 
@@ -25,6 +26,10 @@ def calc_window_partition(
     """
     Calculate serialization and partitioning for a set of coordinates.
 
+    Window indices are bit-packed per axis, so the ordering needs no knowledge of the
+    coordinate extent. The only device synchronization is the single transfer of the
+    per-window lengths and batch indices required by the attention kernels.
+
     Args:
         tensor (SparseTensor): The input tensor.
         window_size (int): The window size to use.
@@ -39,23 +44,20 @@ def calc_window_partition(
     DIM = tensor.coords.shape[1] - 1
     shift_window = (shift_window,) * DIM if isinstance(shift_window, int) else shift_window
     window_size = (window_size,) * DIM if isinstance(window_size, int) else window_size
-    shifted_coords = tensor.coords.clone().detach()
-    shifted_coords[:, 1:] += torch.tensor(shift_window, device=tensor.device, dtype=torch.int32).unsqueeze(0)
-
-    MAX_COORDS = shifted_coords[:, 1:].max(dim=0).values.tolist()
-    NUM_WINDOWS = [math.ceil((mc + 1) / ws) for mc, ws in zip(MAX_COORDS, window_size)]
-    OFFSET = torch.cumprod(torch.tensor([1] + NUM_WINDOWS[::-1]), dim=0).tolist()[::-1]
-
-    shifted_coords[:, 1:] //= torch.tensor(window_size, device=tensor.device, dtype=torch.int32).unsqueeze(0)
-    shifted_indices = (shifted_coords * torch.tensor(OFFSET, device=tensor.device, dtype=torch.int32).unsqueeze(0)).sum(dim=1)
-    fwd_indices = torch.argsort(shifted_indices)
+    BITS = 63 // (DIM + 1)
+    shifted_coords = tensor.coords.to(torch.int64, copy=True)
+    shifted_coords[:, 1:] += torch.tensor(shift_window, device=tensor.device, dtype=torch.int64).unsqueeze(0)
+    shifted_coords[:, 1:] //= torch.tensor(window_size, device=tensor.device, dtype=torch.int64).unsqueeze(0)
+
+    # Pack (batch, window_x, window_y, ...) into one key with lexicographic order
+    shifts = torch.arange(DIM, -1, -1, device=tensor.device, dtype=torch.int64) * BITS
+    shifted_indices = (shifted_coords << shifts.unsqueeze(0)).sum(dim=1)
+    sorted_indices, fwd_indices = torch.sort(shifted_indices, stable=True)
     bwd_indices = torch.empty_like(fwd_indices)
     bwd_indices[fwd_indices] = torch.arange(fwd_indices.shape[0], device=tensor.device)
-    seq_lens = torch.bincount(shifted_indices)
-    seq_batch_indices = torch.arange(seq_lens.shape[0], device=tensor.device, dtype=torch.int32) // OFFSET[0]
-    mask = seq_lens != 0
-    seq_lens = seq_lens[mask].tolist()
-    seq_batch_indices = seq_batch_indices[mask].tolist()
+    window_indices, seq_lens = torch.unique_consecutive(sorted_indices, return_counts=True)
+    seq_batch_indices = window_indices >> (DIM * BITS)
+    seq_lens, seq_batch_indices = torch.stack([seq_lens, seq_batch_indices]).tolist()
 
     return fwd_indices, bwd_indices, seq_lens, seq_batch_indices
     
@@ -110,6 +112,9 @@ def sparse_windowed_scaled_dot_product_self_attention(
             out = xops.memory_efficient_attention(q, k, v)          # [B, N, H, C]
         elif ATTN == 'flash_attn':
             out = flash_attn.flash_attn_qkvpacked_func(qkv_feats)   # [B, N, H, C]
+        elif ATTN in ['sdpa', 'naive']:
+            q, k, v = qkv_feats.unbind(dim=2)                       # [B, N, H, C]
+            out = dense_attention(q, k, v)                          # [B, N, H, C]
         else:
             raise ValueError(f"Unknown attention module: {ATTN}")
         out = out.reshape(B * N, H, C)                              # [M, H, C]
@@ -125,6 +130,9 @@ def sparse_windowed_scaled_dot_product_self_attention(
             cu_seqlens = torch.cat([torch.tensor([0]), torch.cumsum(torch.tensor(seq_lens), dim=0)], dim=0) \
                         .to(qkv.device).int()
             out = flash_attn.flash_attn_varlen_qkvpacked_func(qkv_feats, cu_seqlens, max(seq_lens)) # [M, H, C]
+        elif ATTN in ['sdpa', 'naive']:
+            q, k, v = qkv_feats.unbind(dim=1)                       # [M, H, C]
+            out = varlen_attention(q, k, v, seq_lens, seq_lens)     # [M, H, C]
 
     out = out[bwd_indices]      # [T, H, C]
 
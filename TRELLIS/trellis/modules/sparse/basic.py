@@ -1,4 +1,5 @@
 from typing import *
+import copy
 import torch
 import torch.nn as nn
 from . import BACKEND, DEBUG
@@ -11,9 +12,31 @@ __all__ = [
     'sparse_batch_op',
     'sparse_cat',
     'sparse_unbind',
+    'get_backend_rebuilds',
+    'reset_backend_rebuilds',
 ]
 
 
+_backend_rebuilds = 0
+
+
+def _count_backend_rebuild() -> None:
+    global _backend_rebuilds
+    _backend_rebuilds += 1
+
+
+def get_backend_rebuilds() -> int:
+    """
+    Number of backend sparse tensors (spconv / torchsparse) built by SparseTensor so far.
+    """
+    return _backend_rebuilds
+
+
+def reset_backend_rebuilds() -> None:
+    global _backend_rebuilds
+    _backend_rebuilds = 0
+
+
 class SparseTensor:
     """
     Sparse tensor with support for both torchsparse and spconv backends.
@@ -22,18 +45,21 @@ class SparseTensor:
     - feats (torch.Tensor): Features of the sparse tensor.
     - coords (torch.Tensor): Coordinates of the sparse tensor.
     - shape (torch.Size): Shape of the sparse tensor.
-    - layout (List[slice]): Layout of the sparse tensor for each batch
+    - layout (List[slice] or torch.Tensor): Layout of the sparse tensor for each batch,
+        either as slices or as a [B + 1] tensor of row offsets
     - data (SparseTensorData): Sparse tensor data used for convolusion
 
     NOTE:
     - Data corresponding to a same batch should be contiguous.
     - Coords should be in [0, 1023]
+    - The layout is kept as an offsets tensor on the device of the coords. The list of
+      slices is only materialized, with a single host sync, when `layout` is accessed.
     """
     @overload
-    def __init__(self, feats: torch.Tensor, coords: torch.Tensor, shape: Optional[torch.Size] = None, layout: Optional[List[slice]] = None, **kwargs): ...
+    def __init__(self, feats: torch.Tensor, coords: torch.Tensor, shape: Optional[torch.Size] = None, layout: Optional[Union[List[slice], torch.Tensor]] = None, **kwargs): ...
 
     @overload
-    def __init__(self, data, shape: Optional[torch.Size] = None, layout: Optional[List[slice]] = None, **kwargs): ...
+    def __init__(self, data, shape: Optional[torch.Size] = None, layout: Optional[Union[List[slice], torch.Tensor]] = None, **kwargs): ...
 
     def __init__(self, *args, **kwargs):
         # Lazy import of sparse tensor backend
@@ -69,12 +95,14 @@ class SparseTensor:
             if shape is None:
                 shape = self.__cal_shape(feats, coords)
             if layout is None:
-                layout = self.__cal_layout(coords, shape[0])
+                layout = self.__cal_offsets(coords, shape[0])
             if BACKEND == 'torchsparse':
                 self.data = SparseTensorData(feats, coords, **kwargs)
+                _count_backend_rebuild()
             elif BACKEND == 'spconv':
                 spatial_shape = list(coords.max(0)[0] + 1)[1:]
                 self.data = SparseTensorData(feats.reshape(feats.shape[0], -1), coords, spatial_shape, shape[0], **kwargs)
+                _count_backend_rebuild()
                 self.data._features = feats
         elif method_id == 1:
             data, shape, layout = args + (None,) * (3 - len(args))
@@ -92,10 +120,11 @@ class SparseTensor:
             if shape is None:
                 shape = self.__cal_shape(self.feats, self.coords)
             if layout is None:
-                layout = self.__cal_layout(self.coords, shape[0])
+                layout = self.__cal_offsets(self.coords, shape[0])
 
         self._shape = shape
-        self._layout = layout
+        self._layout = None if isinstance(layout, torch.Tensor) else layout
+        self._offsets = layout if isinstance(layout, torch.Tensor) else None
         self._scale = kwargs.get('scale', (1, 1, 1))
         self._spatial_cache = kwargs.get('spatial_cache', {})
 
@@ -103,7 +132,8 @@ class SparseTensor:
             try:
                 assert self.feats.shape[0] == self.coords.shape[0], f"Invalid feats shape: {self.feats.shape}, coords shape: {self.coords.shape}"
                 assert self.shape == self.__cal_shape(self.feats, self.coords), f"Invalid shape: {self.shape}"
-                assert self.layout == self.__cal_layout(self.coords, self.shape[0]), f"Invalid layout: {self.layout}"
+                assert self.offsets.device == self.coords.device, f"Invalid layout device: {self.offsets.device}, coords device: {self.coords.device}"
+                assert torch.equal(self.offsets, self.__cal_offsets(self.coords, self.shape[0])), f"Invalid layout: {self.layout}"
                 for i in range(self.shape[0]):
                     assert torch.all(self.coords[self.layout[i], 0] == i), f"The data of batch {i} is not contiguous"
             except Exception as e:
@@ -120,11 +150,11 @@ class SparseTensor:
         shape.extend([*feats.shape[1:]])
         return torch.Size(shape)
     
-    def __cal_layout(self, coords, batch_size):
-        seq_len = torch.bincount(coords[:, 0], minlength=batch_size)
-        offset = torch.cumsum(seq_len, dim=0) 
-        layout = [slice((offset[i] - seq_len[i]).item(), offset[i].item()) for i in range(batch_size)]
-        return layout
+    def __cal_offsets(self, coords, batch_size):
+        # bincount via scatter_add, torch.bincount syncs to find the number of bins
+        seq_len = torch.zeros(batch_size, dtype=torch.int64, device=coords.device)
+        seq_len.scatter_add_(0, coords[:, 0].long(), torch.ones_like(coords[:, 0], dtype=torch.int64))
+        return torch.nn.functional.pad(torch.cumsum(seq_len, dim=0), (1, 0))
     
     @property
     def shape(self) -> torch.Size:
@@ -135,8 +165,34 @@ class SparseTensor:
     
     @property
     def layout(self) -> List[slice]:
+        if self._layout is None:
+            offsets = self._offsets.tolist()
+            self._layout = [slice(offsets[i], offsets[i + 1]) for i in range(self.shape[0])]
         return self._layout
 
+    @property
+    def offsets(self) -> torch.Tensor:
+        """
+        The [B + 1] row offsets of the batch elements, on the device of the coords.
+        """
+        if self._offsets is None:
+            self._offsets = self.__cal_offsets(self.coords, self.shape[0])
+        return self._offsets
+
+    @property
+    def seqlens(self) -> torch.Tensor:
+        """
+        The [B] number of rows of each batch element.
+        """
+        return self.offsets[1:] - self.offsets[:-1]
+
+    @property
+    def batch_indices(self) -> torch.Tensor:
+        """
+        The [N] batch index of each row.
+        """
+        return self.coords[:, 0].long()
+
     @property
     def feats(self) -> torch.Tensor:
         if BACKEND == 'torchsparse':
@@ -243,6 +299,8 @@ class SparseTensor:
     def replace(self, feats: torch.Tensor, coords: Optional[torch.Tensor] = None) -> 'SparseTensor':
         new_shape = [self.shape[0]]
         new_shape.extend(feats.shape[1:])
+        if coords is None:
+            return self.__replace_feats(feats, torch.Size(new_shape))
         if BACKEND == 'torchsparse':
             new_data = SparseTensorData(
                 feats=feats,
@@ -270,7 +328,31 @@ class SparseTensor:
             new_data.int8_scale = self.data.int8_scale
             if coords is not None:
                 new_data.indices = coords
-        new_tensor = SparseTensor(new_data, shape=torch.Size(new_shape), layout=self.layout, scale=self._scale, spatial_cache=self._spatial_cache)
+        _count_backend_rebuild()
+        # the offsets follow the coords, e.g. to another device
+        layout = self._layout if self._layout is not None else self._offsets.to(coords.device)
+        new_tensor = SparseTensor(new_data, shape=torch.Size(new_shape), layout=layout, scale=self._scale, spatial_cache=self._spatial_cache)
+        return new_tensor
+
+    def __replace_feats(self, feats: torch.Tensor, shape: torch.Size) -> 'SparseTensor':
+        """
+        Swap the features without rebuilding the backend tensor.
+        Coords, indice dicts, caches and layout are shared by reference.
+        """
+        new_data = copy.copy(self.data)
+        if BACKEND == 'torchsparse':
+            new_data.F = feats
+        elif BACKEND == 'spconv':
+            new_data._features = feats
+        new_tensor = SparseTensor.__new__(SparseTensor)
+        new_tensor.data = new_data
+        new_tensor._shape = shape
+        new_tensor._layout = self._layout
+        new_tensor._offsets = self._offsets
+        new_tensor._scale = self._scale
+        new_tensor._spatial_cache = self._spatial_cache
+        if DEBUG:
+            assert feats.shape[0] == self.coords.shape[0], f"Invalid feats shape: {feats.shape}, coords shape: {self.coords.shape}"
         return new_tensor
 
     @staticmethod
@@ -356,16 +438,19 @@ class SparseTensor:
                 raise ValueError(f"Unknown index type: {idx.dtype}")
         else:
             raise ValueError(f"Unknown index type: {type(idx)}")
-        
-        coords = []
-        feats = []
-        for new_idx, old_idx in enumerate(idx):
-            coords.append(self.coords[self.layout[old_idx]].clone())
-            coords[-1][:, 0] = new_idx
-            feats.append(self.feats[self.layout[old_idx]])
-        coords = torch.cat(coords, dim=0).contiguous()
-        feats = torch.cat(feats, dim=0).contiguous()
-        return SparseTensor(feats=feats, coords=coords)
+        if not isinstance(idx, torch.Tensor):
+            idx = torch.tensor(list(idx), dtype=torch.int64)
+        idx = idx.to(device=self.device, dtype=torch.int64)
+
+        # Gather the rows of all selected batch elements at once
+        seq_len = self.seqlens[idx]
+        new_offsets = torch.nn.functional.pad(torch.cumsum(seq_len, dim=0), (1, 0))
+        new_batch = torch.repeat_interleave(torch.arange(idx.shape[0], device=self.device), seq_len)
+        rows = torch.arange(new_batch.shape[0], device=self.device) - new_offsets[new_batch] + self.offsets[idx][new_batch]
+        coords = self.coords[rows]
+        coords[:, 0] = new_batch.to(coords.dtype)
+        feats = self.feats[rows]
+        return SparseTensor(feats=feats, coords=coords, shape=torch.Size([idx.shape[0], *feats.shape[1:]]), layout=new_offsets)
 
     def register_spatial_cache(self, key, value) -> None:
         """
@@ -398,11 +483,10 @@ def sparse_batch_broadcast(input: SparseTensor, other: torch.Tensor) -> torch.Te
         target (SparseTensor): Sparse tensor to broadcast to.
         op (callable): Operation to perform after broadcasting. Defaults to torch.add.
     """
-    coords, feats = input.coords, input.feats
-    broadcasted = torch.zeros_like(feats)
-    for k in range(input.shape[0]):
-        broadcasted[input.layout[k]] = other[k]
-    return broadcasted
+    feats = input.feats
+    broadcasted = other[input.batch_indices]
+    broadcasted = broadcasted.reshape(broadcasted.shape[0], *[1] * (feats.dim() - broadcasted.dim()), *broadcasted.shape[1:])
+    return broadcasted.expand_as(feats).to(feats.dtype)
 
 
 def sparse_batch_op(input: SparseTensor, other: torch.Tensor, op: callable = torch.add) -> SparseTensor:
@@ -426,16 +510,22 @@ def sparse_cat(inputs: List[SparseTensor], dim: int = 0) -> SparseTensor:
     """
     if dim == 0:
         start = 0
+        num_rows = 0
         coords = []
+        offsets = [inputs[0].offsets[:1]]
         for input in inputs:
             coords.append(input.coords.clone())
             coords[-1][:, 0] += start
+            offsets.append(input.offsets[1:] + num_rows)
             start += input.shape[0]
+            num_rows += input.feats.shape[0]
         coords = torch.cat(coords, dim=0)
         feats = torch.cat([input.feats for input in inputs], dim=0)
         output = SparseTensor(
             coords=coords,
             feats=feats,
+            shape=torch.Size([start, *feats.shape[1:]]),
+            layout=torch.cat(offsets, dim=0),
         )
     else:
         feats = torch.cat([input.feats for input in inputs], dim=dim)
@@ -25,7 +25,7 @@ class SparseConv3d(nn.Module):
         spatial_changed = any(s != 1 for s in self.stride) or (self.padding is not None)
         new_data = self.conv(x.data)
         new_shape = [x.shape[0], self.conv.out_channels]
-        new_layout = None if spatial_changed else x.layout
+        new_layout = None if spatial_changed else x.offsets
 
         if spatial_changed and (x.shape[0] != 1):
             # spconv was non-1 stride will break the contiguous of the output tensor, sort by the coords
@@ -71,7 +71,7 @@ class SparseInverseConv3d(nn.Module):
 
         new_data = self.conv(data)
         new_shape = [x.shape[0], self.conv.out_channels]
-        new_layout = None if spatial_changed else x.layout
+        new_layout = None if spatial_changed else x.offsets
         out = SparseTensor(
             new_data, shape=torch.Size(new_shape), layout=new_layout,
             scale=tuple([s // stride for s, stride in zip(x._scale, self.stride)]),
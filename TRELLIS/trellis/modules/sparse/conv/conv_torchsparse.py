@@ -13,7 +13,7 @@ class SparseConv3d(nn.Module):
     def forward(self, x: SparseTensor) -> SparseTensor:
         out = self.conv(x.data)
         new_shape = [x.shape[0], self.conv.out_channels]
-        out = SparseTensor(out, shape=torch.Size(new_shape), layout=x.layout if all(s == 1 for s in self.conv.stride) else None)
+        out = SparseTensor(out, shape=torch.Size(new_shape), layout=x.offsets if all(s == 1 for s in self.conv.stride) else None)
         out._spatial_cache = x._spatial_cache
         out._scale = tuple([s * stride for s, stride in zip(x._scale, self.conv.stride)])
         return out
@@ -29,7 +29,7 @@ class SparseInverseConv3d(nn.Module):
     def forward(self, x: SparseTensor) -> SparseTensor:
         out = self.conv(x.data)        
         new_shape = [x.shape[0], self.conv.out_channels]
-        out = SparseTensor(out, shape=torch.Size(new_shape), layout=x.layout if all(s == 1 for s in self.conv.stride) else None)
+        out = SparseTensor(out, shape=torch.Size(new_shape), layout=x.offsets if all(s == 1 for s in self.conv.stride) else None)
         out._spatial_cache = x._spatial_cache
         out._scale = tuple([s // stride for s, stride in zip(x._scale, self.conv.stride)])
         return out
@@ -11,20 +11,35 @@ __all__ = [
 ]
 
 
+def _segment_mean(x: torch.Tensor, batch: torch.Tensor, count: torch.Tensor) -> torch.Tensor:
+    """
+    Mean of the rows of `x` within each batch element, in one scatter regardless of batch size.
+    """
+    total = torch.zeros(count.shape[0], *x.shape[1:], dtype=x.dtype, device=x.device)
+    return total.index_add_(0, batch, x) / count.view(-1, *[1] * (x.dim() - 1))
+
+
 class SparseGroupNorm(nn.GroupNorm):
     def __init__(self, num_groups, num_channels, eps=1e-5, affine=True):
         super(SparseGroupNorm, self).__init__(num_groups, num_channels, eps, affine)
 
     def forward(self, input: SparseTensor) -> SparseTensor:
-        nfeats = torch.zeros_like(input.feats)
-        for k in range(input.shape[0]):
-            if DEBUG:
-                assert (input.coords[input.layout[k], 0] == k).all(), f"SparseGroupNorm: batch index mismatch"
-            bfeats = input.feats[input.layout[k]]
-            bfeats = bfeats.permute(1, 0).reshape(1, input.shape[1], -1)
-            bfeats = super().forward(bfeats)
-            bfeats = bfeats.reshape(input.shape[1], -1).permute(1, 0)
-            nfeats[input.layout[k]] = bfeats
+        if DEBUG:
+            assert torch.equal(input.batch_indices.sort().values, input.batch_indices), f"SparseGroupNorm: batch index mismatch"
+        feats = input.feats
+        N, C = feats.shape[0], feats.shape[1]
+        G = self.num_groups
+        batch = input.batch_indices
+        count = (input.seqlens * (C // G)).clamp_min(1).to(feats.dtype)
+        # Two-pass statistics over the rows of each batch element and the channels of each group
+        x = feats.reshape(N, G, -1)
+        mean = _segment_mean(x.sum(dim=-1), batch, count)
+        x = x - mean[batch].unsqueeze(-1)
+        var = _segment_mean(x.pow(2).sum(dim=-1), batch, count)
+        x = x * torch.rsqrt(var + self.eps)[batch].unsqueeze(-1)
+        nfeats = x.reshape(feats.shape)
+        if self.affine:
+            nfeats = nfeats * self.weight.view(1, -1, *[1] * (feats.dim() - 2)) + self.bias.view(1, -1, *[1] * (feats.dim() - 2))
         return input.replace(nfeats)
 
 
@@ -33,14 +48,8 @@ class SparseLayerNorm(nn.LayerNorm):
         super(SparseLayerNorm, self).__init__(normalized_shape, eps, elementwise_affine)
 
     def forward(self, input: SparseTensor) -> SparseTensor:
-        nfeats = torch.zeros_like(input.feats)
-        for k in range(input.shape[0]):
-            bfeats = input.feats[input.layout[k]]
-            bfeats = bfeats.permute(1, 0).reshape(1, input.shape[1], -1)
-            bfeats = super().forward(bfeats)
-            bfeats = bfeats.reshape(input.shape[1], -1).permute(1, 0)
-            nfeats[input.layout[k]] = bfeats
-        return input.replace(nfeats)
+        # Rows are normalized independently, so the whole batch goes through a single call
+        return input.replace(super().forward(input.feats))
 
 
 class SparseGroupNorm32(SparseGroupNorm):
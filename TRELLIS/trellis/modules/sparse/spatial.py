@@ -50,7 +50,7 @@ class SparseDownsample(nn.Module):
         out._spatial_cache = input._spatial_cache
 
         out.register_spatial_cache(f'upsample_{factor}_coords', input.coords)
-        out.register_spatial_cache(f'upsample_{factor}_layout', input.layout)
+        out.register_spatial_cache(f'upsample_{factor}_layout', input.offsets)
         out.register_spatial_cache(f'upsample_{factor}_idx', idx)
 
         return out
@@ -3,12 +3,13 @@ from .trellis_image_to_3d import TrellisImageTo3DPipeline
 from .trellis_text_to_3d import TrellisTextTo3DPipeline
 
 
-def from_pretrained(path: str):
+def from_pretrained(path: str, **kwargs):
     """
     Load a pipeline from a model folder or a Hugging Face model hub.
 
     Args:
         path: The path to the model. Can be either local path or a Hugging Face model name.
+        **kwargs: Loading options passed to the pipeline, see `Pipeline.from_pretrained`.
     """
     import os
     import json
@@ -22,4 +23,4 @@ def from_pretrained(path: str):
 
     with open(config_file, 'r') as f:
         config = json.load(f)
-    return globals()[config['name']].from_pretrained(path)
+    return globals()[config['name']].from_pretrained(path, **kwargs)
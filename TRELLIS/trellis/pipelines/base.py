@@ -1,9 +1,86 @@
 from typing import *
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import torch.nn as nn
 from .. import models
 
 
+class LazyModels(dict):
+    """
+    Dictionary of submodels where some entries are only loaded on first access.
+
+    Pending entries are registered with `add_loader`; they count as members of the
+    dictionary but are only materialized by `__getitem__` (or `get`). Iterating over
+    `values()` or `items()` only visits the models loaded so far, so moving a pipeline
+    to a device does not force them: pending models are loaded straight onto `device`.
+    Load times are kept in `load_times`, and `on_load(key, seconds)` is called after each load.
+    A loader may come with an estimate of its size in bytes, see `estimate_nbytes`.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaders = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._estimates = {}
+        self.device = None
+        self.load_times = {}
+        self.on_load = None
+
+    def add_loader(
+        self,
+        key: str,
+        loader: Callable[[Optional[torch.device]], nn.Module],
+        estimate: Optional[Callable[[], int]] = None,
+    ) -> None:
+        self._loaders[key] = loader
+        if estimate is not None:
+            self._estimates[key] = estimate
+
+    def estimate_nbytes(self, key: str) -> Optional[int]:
+        """
+        Bytes of weights a pending submodel will take once loaded, or None if unknown.
+        """
+        if key not in self._loaders or key not in self._estimates:
+            return None
+        try:
+            return self._estimates[key]()
+        except Exception:
+            return None
+
+    def __missing__(self, key):
+        with self._lock:
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+            if key not in self._loaders:
+                raise KeyError(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Per-key lock, so that different submodels can load concurrently
+        with key_lock:
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+            start = time.time()
+            model = self._loaders[key](self.device)
+            model.eval()
+            self.load_times[key] = time.time() - start
+            self[key] = model
+            del self._loaders[key]
+        if self.on_load is not None:
+            self.on_load(key, self.load_times[key])
+        return model
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._loaders
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    @property
+    def pending(self) -> List[str]:
+        return list(self._loaders.keys())
+
+
 class Pipeline:
     """
     A base class for pipelines.
@@ -19,9 +96,24 @@ class Pipeline:
             model.eval()
 
     @staticmethod
-    def from_pretrained(path: str) -> "Pipeline":
+    def from_pretrained(
+        path: str,
+        device: Optional[torch.device] = None,
+        dtype: Optional[torch.dtype] = None,
+        lazy: bool = False,
+        num_workers: int = 4,
+    ) -> "Pipeline":
         """
         Load a pretrained model.
+
+        Args:
+            path (str): The path to the model. Can be either local path or a Hugging Face repository.
+            device (torch.device): Device to load the submodels on, see `models.from_pretrained`.
+            dtype (torch.dtype): Optional dtype of the floating point weights.
+            lazy (bool): Load each submodel on its first use instead of now.
+            num_workers (int): Submodels loaded in parallel threads when not lazy.
+
+        The time spent loading each submodel is recorded in `pipeline.models.load_times`.
         """
         import os
         import json
@@ -36,12 +128,29 @@ class Pipeline:
         with open(config_file, 'r') as f:
             args = json.load(f)['args']
 
-        _models = {}
+        def loader(v):
+            def load(target_device):
+                try:
+                    return models.from_pretrained(f"{path}/{v}", device=target_device, dtype=dtype)
+                except:
+                    return models.from_pretrained(v, device=target_device, dtype=dtype)
+            return load
+
+        def estimate(v):
+            def nbytes():
+                try:
+                    return models.pretrained_nbytes(f"{path}/{v}", dtype=dtype)
+                except:
+                    return models.pretrained_nbytes(v, dtype=dtype)
+            return nbytes
+
+        _models = LazyModels()
+        _models.device = device
         for k, v in args['models'].items():
-            try:
-                _models[k] = models.from_pretrained(f"{path}/{v}")
-            except:
-                _models[k] = models.from_pretrained(v)
+            _models.add_loader(k, loader(v), estimate(v))
+        if not lazy:
+            with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+                list(executor.map(_models.__getitem__, _models.pending))
 
         new_pipeline = Pipeline(_models)
         new_pipeline._pretrained_args = args
@@ -49,6 +158,9 @@ class Pipeline:
 
     @property
     def device(self) -> torch.device:
+        # Target device of lazily loaded or offloaded submodels, when known
+        if getattr(self.models, 'device', None) is not None:
+            return torch.device(self.models.device)
         for model in self.models.values():
             if hasattr(model, 'device'):
                 return model.device
@@ -58,6 +170,8 @@ class Pipeline:
         raise RuntimeError("No device found.")
 
     def to(self, device: torch.device) -> None:
+        if isinstance(self.models, LazyModels):
+            self.models.device = device
         for model in self.models.values():
             model.to(device)
 
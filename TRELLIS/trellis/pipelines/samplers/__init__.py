@@ -1,2 +1,6 @@
 from .base import Sampler
-from .flow_euler import FlowEulerSampler, FlowEulerCfgSampler, FlowEulerGuidanceIntervalSampler
\ No newline at end of file
+from .trajectory import TrajectoryRecorder
+from .flow_euler import FlowEulerSampler, FlowEulerCfgSampler, FlowEulerGuidanceIntervalSampler
+from .flow_heun import FlowHeunSampler, FlowHeunCfgSampler, FlowHeunGuidanceIntervalSampler
+from .flow_dpm_solver import FlowDPMSolverSampler, FlowDPMSolverCfgSampler, FlowDPMSolverGuidanceIntervalSampler
+from .flow_adaptive import FlowAdaptiveSampler, FlowAdaptiveCfgSampler, FlowAdaptiveGuidanceIntervalSampler
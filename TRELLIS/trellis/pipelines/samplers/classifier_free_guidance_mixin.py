@@ -1,4 +1,42 @@
 from typing import *
+import torch
+from ...modules import sparse as sp
+
+
+def _expand_batch(cond, batch_size: int):
+    if cond.shape[0] == 1 and batch_size > 1:
+        cond = cond.repeat(batch_size, *([1] * (len(cond.shape) - 1)))
+    return cond
+
+
+def batched_cfg_inference(inference_model, model, x_t, t, cond, neg_cond, **kwargs):
+    """
+    Evaluate the conditional and unconditional predictions in a single forward pass.
+
+    The input is duplicated along the batch dimension and paired with the stacked
+    conditions, so the model sees [x_t | cond] and [x_t | neg_cond] in one call.
+    Works for dense tensors and for ragged SparseTensors.
+
+    Args:
+        inference_model: The single-condition inference function to call.
+        model: The model to sample from.
+        x_t: The [N x C x ...] tensor or SparseTensor of noisy inputs at time t.
+        t: The current timestep.
+        cond: conditional information.
+        neg_cond: negative conditional information.
+        **kwargs: Additional arguments for model inference.
+
+    Returns:
+        (pred, neg_pred) with the same type and layout as x_t.
+    """
+    batch_size = x_t.shape[0]
+    cond = torch.cat([_expand_batch(cond, batch_size), _expand_batch(neg_cond, batch_size)])
+    if isinstance(x_t, sp.SparseTensor):
+        out = inference_model(model, sp.sparse_cat([x_t, x_t]), t, cond, **kwargs)
+        num_points = x_t.feats.shape[0]
+        return x_t.replace(out.feats[:num_points]), x_t.replace(out.feats[num_points:])
+    out = inference_model(model, torch.cat([x_t, x_t]), t, cond, **kwargs)
+    return out[:batch_size], out[batch_size:]
 
 
 class ClassifierFreeGuidanceSamplerMixin:
@@ -6,7 +44,10 @@ class ClassifierFreeGuidanceSamplerMixin:
     A mixin class for samplers that apply classifier-free guidance.
     """
 
-    def _inference_model(self, model, x_t, t, cond, neg_cond, cfg_strength, **kwargs):
-        pred = super()._inference_model(model, x_t, t, cond, **kwargs)
-        neg_pred = super()._inference_model(model, x_t, t, neg_cond, **kwargs)
+    def _inference_model(self, model, x_t, t, cond, neg_cond, cfg_strength, cfg_batched=False, **kwargs):
+        if cfg_batched:
+            pred, neg_pred = batched_cfg_inference(super()._inference_model, model, x_t, t, cond, neg_cond, **kwargs)
+        else:
+            pred = super()._inference_model(model, x_t, t, cond, **kwargs)
+            neg_pred = super()._inference_model(model, x_t, t, neg_cond, **kwargs)
         return (1 + cfg_strength) * pred - cfg_strength * neg_pred
@@ -0,0 +1,198 @@
+from typing import *
+import torch
+from tqdm import tqdm
+from easydict import EasyDict as edict
+from .flow_euler import FlowEulerSampler
+from .classifier_free_guidance_mixin import ClassifierFreeGuidanceSamplerMixin
+from .guidance_interval_mixin import GuidanceIntervalSamplerMixin
+from .trajectory import TrajectoryRecorder
+from ...modules import sparse as sp
+
+
+class FlowAdaptiveSampler(FlowEulerSampler):
+    """
+    Generate samples from a flow-matching model using an adaptive-step embedded Heun-Euler solver.
+
+    Each attempted step computes both the Euler and the Heun update; their difference is a local
+    error estimate that decides whether the step is accepted and how large the next one should be.
+    Steps are taken in the warped time of the `rescale_t` schedule, so the schedule still shapes
+    where the solver spends its evaluations.
+
+    Args:
+        sigma_min: The minimum scale of noise in flow.
+    """
+    @staticmethod
+    def _warp(u: float, rescale_t: float) -> float:
+        return rescale_t * u / (1 + (rescale_t - 1) * u)
+
+    @staticmethod
+    def _error_norm(x_low, x_high, x_t, rtol: float, atol: float) -> float:
+        if isinstance(x_t, sp.SparseTensor):
+            x_low, x_high, x_t = x_low.feats, x_high.feats, x_t.feats
+        scale = atol + rtol * torch.maximum(x_t.abs(), x_high.abs())
+        return ((x_high - x_low).float() / scale).pow(2).mean().sqrt().item()
+
+    @torch.no_grad()
+    def sample(
+        self,
+        model,
+        noise,
+        cond: Optional[Any] = None,
+        steps: int = 50,
+        rescale_t: float = 1.0,
+        verbose: bool = True,
+        trajectory: Literal['all', 'none', 'cpu', 'disk'] = 'all',
+        trajectory_interval: int = 1,
+        rtol: float = 5e-2,
+        atol: float = 5e-3,
+        min_step: float = 1e-3,
+        max_nfe: Optional[int] = None,
+        **kwargs
+    ):
+        """
+        Generate samples from the model using the adaptive-step solver.
+
+        Args:
+            model: The model to sample from.
+            noise: The initial noise tensor.
+            cond: conditional information.
+            steps: The number of uniform steps used as the initial step size.
+            rescale_t: The rescale factor for t.
+            verbose: If True, show a progress bar.
+            trajectory: The retention policy for intermediate predictions, see `TrajectoryRecorder`.
+            trajectory_interval: Retain every `trajectory_interval`-th accepted step.
+            rtol: The relative error tolerance.
+            atol: The absolute error tolerance.
+            min_step: The smallest step size; steps this small are always accepted.
+            max_nfe: The budget of function evaluations. Once it is nearly spent, the remaining
+                interval is covered by a single final step.
+            **kwargs: Additional arguments for model_inference.
+
+        Returns:
+            a dict containing the following
+            - 'samples': the model samples.
+            - 'pred_x_t': a list of prediction of x_t.
+            - 'pred_x_0': a list of prediction of x_0.
+            - 'trajectory_steps': the step indices of the retained predictions.
+            - 'nfe': the number of function evaluations.
+        """
+        sample = noise
+        recorder = TrajectoryRecorder(trajectory, trajectory_interval)
+        u, h = 1.0, 1.0 / steps
+        nfe, step = 0, 0
+        pred_x_0 = pred_v = None
+        pbar = tqdm(total=100, desc="Sampling", disable=not verbose)
+        while u > 0:
+            budget_spent = max_nfe is not None and nfe + (pred_v is None) + 1 >= max_nfe
+            if budget_spent:
+                h = u
+            h = min(h, u)
+            u_prev = u - h if u - h > 1e-8 else 0.0
+            t, t_prev = self._warp(u, rescale_t), self._warp(u_prev, rescale_t)
+
+            if pred_v is None:
+                pred_x_0, _, pred_v = self._get_model_prediction(model, sample, t, cond, **kwargs)
+                nfe += 1
+            x_euler = sample - (t - t_prev) * pred_v
+            _, _, pred_v_prev = self._get_model_prediction(model, x_euler, t_prev, cond, **kwargs)
+            nfe += 1
+            x_heun = sample - (t - t_prev) * ((pred_v + pred_v_prev) * 0.5)
+
+            err = self._error_norm(x_euler, x_heun, sample, rtol, atol)
+            if err <= 1 or h <= min_step or budget_spent:
+                sample = x_heun
+                recorder.record(step, pred_x_t=x_heun, pred_x_0=pred_x_0)
+                pbar.update(round(100 * (1 - u_prev)) - pbar.n)
+                u, step = u_prev, step + 1
+                pred_x_0 = pred_v = None
+            factor = 5.0 if err == 0 else min(5.0, max(0.2, 0.9 * err ** -0.5))
+            h = max(h * factor, min_step)
+        pbar.close()
+        ret = edict({"samples": sample, "nfe": nfe, "steps": step, **recorder.export()})
+        return ret
+
+
+class FlowAdaptiveCfgSampler(ClassifierFreeGuidanceSamplerMixin, FlowAdaptiveSampler):
+    """
+    Generate samples from a flow-matching model using the adaptive-step solver with classifier-free guidance.
+    """
+    @torch.no_grad()
+    def sample(
+        self,
+        model,
+        noise,
+        cond,
+        neg_cond,
+        steps: int = 50,
+        rescale_t: float = 1.0,
+        cfg_strength: float = 3.0,
+        cfg_batched: bool = False,
+        verbose: bool = True,
+        **kwargs
+    ):
+        """
+        Generate samples from the model using the adaptive-step solver.
+
+        Args:
+            model: The model to sample from.
+            noise: The initial noise tensor.
+            cond: conditional information.
+            neg_cond: negative conditional information.
+            steps: The number of uniform steps used as the initial step size.
+            rescale_t: The rescale factor for t.
+            cfg_strength: The strength of classifier-free guidance.
+            cfg_batched: If True, evaluate the conditional and negative predictions in a single batched forward pass.
+            verbose: If True, show a progress bar.
+            **kwargs: Additional arguments for model_inference.
+
+        Returns:
+            a dict containing the following
+            - 'samples': the model samples.
+            - 'pred_x_t': a list of prediction of x_t.
+            - 'pred_x_0': a list of prediction of x_0.
+        """
+        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, cfg_batched=cfg_batched, **kwargs)
+
+
+class FlowAdaptiveGuidanceIntervalSampler(GuidanceIntervalSamplerMixin, FlowAdaptiveSampler):
+    """
+    Generate samples from a flow-matching model using the adaptive-step solver with classifier-free guidance and interval.
+    """
+    @torch.no_grad()
+    def sample(
+        self,
+        model,
+        noise,
+        cond,
+        neg_cond,
+        steps: int = 50,
+        rescale_t: float = 1.0,
+        cfg_strength: float = 3.0,
+        cfg_interval: Tuple[float, float] = (0.0, 1.0),
+        cfg_batched: bool = False,
+        verbose: bool = True,
+        **kwargs
+    ):
+        """
+        Generate samples from the model using the adaptive-step solver.
+
+        Args:
+            model: The model to sample from.
+            noise: The initial noise tensor.
+            cond: conditional information.
+            neg_cond: negative conditional information.
+            steps: The number of uniform steps used as the initial step size.
+            rescale_t: The rescale factor for t.
+            cfg_strength: The strength of classifier-free guidance.
+            cfg_interval: The interval for classifier-free guidance.
+            cfg_batched: If True, evaluate the conditional and negative predictions in a single batched forward pass.
+            verbose: If True, show a progress bar.
+            **kwargs: Additional arguments for model_inference.
+
+        Returns:
+            a dict containing the following
+            - 'samples': the model samples.
+            - 'pred_x_t': a list of prediction of x_t.
+            - 'pred_x_0': a list of prediction of x_0.
+        """
+        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, cfg_interval=cfg_interval, cfg_batched=cfg_batched, **kwargs)
@@ -6,6 +6,7 @@ from easydict import EasyDict as edict
 from .base import Sampler
 from .classifier_free_guidance_mixin import ClassifierFreeGuidanceSamplerMixin
 from .guidance_interval_mixin import GuidanceIntervalSamplerMixin
+from .trajectory import TrajectoryRecorder
 
 
 class FlowEulerSampler(Sampler):
@@ -41,6 +42,12 @@ class FlowEulerSampler(Sampler):
             cond = cond.repeat(x_t.shape[0], *([1] * (len(cond.shape) - 1)))
         return model(x_t, t, cond, **kwargs)
 
+    @staticmethod
+    def _get_t_pairs(steps: int, rescale_t: float = 1.0) -> List[Tuple[float, float]]:
+        t_seq = np.linspace(1, 0, steps + 1)
+        t_seq = rescale_t * t_seq / (1 + (rescale_t - 1) * t_seq)
+        return list((t_seq[i], t_seq[i + 1]) for i in range(steps))
+
     def _get_model_prediction(self, model, x_t, t, cond=None, **kwargs):
         pred_v = self._inference_model(model, x_t, t, cond, **kwargs)
         pred_x_0, pred_eps = self._v_to_xstart_eps(x_t=x_t, t=t, v=pred_v)
@@ -85,6 +92,8 @@ class FlowEulerSampler(Sampler):
         steps: int = 50,
         rescale_t: float = 1.0,
         verbose: bool = True,
+        trajectory: Literal['all', 'none', 'cpu', 'disk'] = 'all',
+        trajectory_interval: int = 1,
         **kwargs
     ):
         """
@@ -97,6 +106,8 @@ class FlowEulerSampler(Sampler):
             steps: The number of steps to sample.
             rescale_t: The rescale factor for t.
             verbose: If True, show a progress bar.
+            trajectory: The retention policy for intermediate predictions, see `TrajectoryRecorder`.
+            trajectory_interval: Retain every `trajectory_interval`-th step.
             **kwargs: Additional arguments for model_inference.
 
         Returns:
@@ -104,18 +115,17 @@ class FlowEulerSampler(Sampler):
             - 'samples': the model samples.
             - 'pred_x_t': a list of prediction of x_t.
             - 'pred_x_0': a list of prediction of x_0.
+            - 'trajectory_steps': the step indices of the retained predictions.
+            - 'nfe': the number of function evaluations.
         """
         sample = noise
-        t_seq = np.linspace(1, 0, steps + 1)
-        t_seq = rescale_t * t_seq / (1 + (rescale_t - 1) * t_seq)
-        t_pairs = list((t_seq[i], t_seq[i + 1]) for i in range(steps))
-        ret = edict({"samples": None, "pred_x_t": [], "pred_x_0": []})
-        for t, t_prev in tqdm(t_pairs, desc="Sampling", disable=not verbose):
+        t_pairs = self._get_t_pairs(steps, rescale_t)
+        recorder = TrajectoryRecorder(trajectory, trajectory_interval, steps)
+        for i, (t, t_prev) in enumerate(tqdm(t_pairs, desc="Sampling", disable=not verbose)):
             out = self.sample_once(model, sample, t, t_prev, cond, **kwargs)
             sample = out.pred_x_prev
-            ret.pred_x_t.append(out.pred_x_prev)
-            ret.pred_x_0.append(out.pred_x_0)
-        ret.samples = sample
+            recorder.record(i, pred_x_t=out.pred_x_prev, pred_x_0=out.pred_x_0)
+        ret = edict({"samples": sample, "nfe": steps, **recorder.export()})
         return ret
 
 
@@ -133,6 +143,7 @@ class FlowEulerCfgSampler(ClassifierFreeGuidanceSamplerMixin, FlowEulerSampler):
         steps: int = 50,
         rescale_t: float = 1.0,
         cfg_strength: float = 3.0,
+        cfg_batched: bool = False,
         verbose: bool = True,
         **kwargs
     ):
@@ -147,6 +158,7 @@ class FlowEulerCfgSampler(ClassifierFreeGuidanceSamplerMixin, FlowEulerSampler):
             steps: The number of steps to sample.
             rescale_t: The rescale factor for t.
             cfg_strength: The strength of classifier-free guidance.
+            cfg_batched: If True, evaluate the conditional and negative predictions in a single batched forward pass.
             verbose: If True, show a progress bar.
             **kwargs: Additional arguments for model_inference.
 
@@ -156,7 +168,7 @@ class FlowEulerCfgSampler(ClassifierFreeGuidanceSamplerMixin, FlowEulerSampler):
             - 'pred_x_t': a list of prediction of x_t.
             - 'pred_x_0': a list of prediction of x_0.
         """
-        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, **kwargs)
+        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, cfg_batched=cfg_batched, **kwargs)
 
 
 class FlowEulerGuidanceIntervalSampler(GuidanceIntervalSamplerMixin, FlowEulerSampler):
@@ -174,6 +186,7 @@ class FlowEulerGuidanceIntervalSampler(GuidanceIntervalSamplerMixin, FlowEulerSa
         rescale_t: float = 1.0,
         cfg_strength: float = 3.0,
         cfg_interval: Tuple[float, float] = (0.0, 1.0),
+        cfg_batched: bool = False,
         verbose: bool = True,
         **kwargs
     ):
@@ -189,6 +202,7 @@ class FlowEulerGuidanceIntervalSampler(GuidanceIntervalSamplerMixin, FlowEulerSa
             rescale_t: The rescale factor for t.
             cfg_strength: The strength of classifier-free guidance.
             cfg_interval: The interval for classifier-free guidance.
+            cfg_batched: If True, evaluate the conditional and negative predictions in a single batched forward pass.
             verbose: If True, show a progress bar.
             **kwargs: Additional arguments for model_inference.
 
@@ -198,4 +212,4 @@ class FlowEulerGuidanceIntervalSampler(GuidanceIntervalSamplerMixin, FlowEulerSa
             - 'pred_x_t': a list of prediction of x_t.
             - 'pred_x_0': a list of prediction of x_0.
         """
-        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, cfg_interval=cfg_interval, **kwargs)
+        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, cfg_interval=cfg_interval, cfg_batched=cfg_batched, **kwargs)
@@ -0,0 +1,180 @@
+from typing import *
+import torch
+from tqdm import tqdm
+from easydict import EasyDict as edict
+from .flow_euler import FlowEulerSampler
+from .classifier_free_guidance_mixin import ClassifierFreeGuidanceSamplerMixin
+from .guidance_interval_mixin import GuidanceIntervalSamplerMixin
+from .trajectory import TrajectoryRecorder
+
+
+class FlowHeunSampler(FlowEulerSampler):
+    """
+    Generate samples from a flow-matching model using Heun's (RK2) method.
+    Each step costs two model evaluations and is second-order accurate.
+
+    Args:
+        sigma_min: The minimum scale of noise in flow.
+    """
+    @torch.no_grad()
+    def sample_once(
+        self,
+        model,
+        x_t,
+        t: float,
+        t_prev: float,
+        cond: Optional[Any] = None,
+        **kwargs
+    ):
+        """
+        Sample x_{t-1} from the model using Heun's method.
+
+        Args:
+            model: The model to sample from.
+            x_t: The [N x C x ...] tensor of noisy inputs at time t.
+            t: The current timestep.
+            t_prev: The previous timestep.
+            cond: conditional information.
+            **kwargs: Additional arguments for model inference.
+
+        Returns:
+            a dict containing the following
+            - 'pred_x_prev': x_{t-1}.
+            - 'pred_x_0': a prediction of x_0.
+        """
+        pred_x_0, pred_eps, pred_v = self._get_model_prediction(model, x_t, t, cond, **kwargs)
+        x_euler = x_t - float(t - t_prev) * pred_v
+        _, _, pred_v_prev = self._get_model_prediction(model, x_euler, t_prev, cond, **kwargs)
+        pred_x_prev = x_t - float(t - t_prev) * ((pred_v + pred_v_prev) * 0.5)
+        return edict({"pred_x_prev": pred_x_prev, "pred_x_0": pred_x_0})
+
+    @torch.no_grad()
+    def sample(
+        self,
+        model,
+        noise,
+        cond: Optional[Any] = None,
+        steps: int = 50,
+        rescale_t: float = 1.0,
+        verbose: bool = True,
+        trajectory: Literal['all', 'none', 'cpu', 'disk'] = 'all',
+        trajectory_interval: int = 1,
+        **kwargs
+    ):
+        """
+        Generate samples from the model using Heun's method.
+
+        Args:
+            model: The model to sample from.
+            noise: The initial noise tensor.
+            cond: conditional information.
+            steps: The number of steps to sample. The number of function evaluations is 2 * steps.
+            rescale_t: The rescale factor for t.
+            verbose: If True, show a progress bar.
+            trajectory: The retention policy for intermediate predictions, see `TrajectoryRecorder`.
+            trajectory_interval: Retain every `trajectory_interval`-th step.
+            **kwargs: Additional arguments for model_inference.
+
+        Returns:
+            a dict containing the following
+            - 'samples': the model samples.
+            - 'pred_x_t': a list of prediction of x_t.
+            - 'pred_x_0': a list of prediction of x_0.
+            - 'trajectory_steps': the step indices of the retained predictions.
+            - 'nfe': the number of function evaluations.
+        """
+        sample = noise
+        t_pairs = self._get_t_pairs(steps, rescale_t)
+        recorder = TrajectoryRecorder(trajectory, trajectory_interval, steps)
+        for i, (t, t_prev) in enumerate(tqdm(t_pairs, desc="Sampling", disable=not verbose)):
+            out = self.sample_once(model, sample, t, t_prev, cond, **kwargs)
+            sample = out.pred_x_prev
+            recorder.record(i, pred_x_t=out.pred_x_prev, pred_x_0=out.pred_x_0)
+        ret = edict({"samples": sample, "nfe": 2 * steps, **recorder.export()})
+        return ret
+
+
+class FlowHeunCfgSampler(ClassifierFreeGuidanceSamplerMixin, FlowHeunSampler):
+    """
+    Generate samples from a flow-matching model using Heun's method with classifier-free guidance.
+    """
+    @torch.no_grad()
+    def sample(
+        self,
+        model,
+        noise,
+        cond,
+        neg_cond,
+        steps: int = 50,
+        rescale_t: float = 1.0,
+        cfg_strength: float = 3.0,
+        cfg_batched: bool = False,
+        verbose: bool = True,
+        **kwargs
+    ):
+        """
+        Generate samples from the model using Heun's method.
+
+        Args:
+            model: The model to sample from.
+            noise: The initial noise tensor.
+            cond: conditional information.
+            neg_cond: negative conditional information.
+            steps: The number of steps to sample.
+            rescale_t: The rescale factor for t.
+            cfg_strength: The strength of classifier-free guidance.
+            cfg_batched: If True, evaluate the conditional and negative predictions in a single batched forward pass.
+            verbose: If True, show a progress bar.
+            **kwargs: Additional arguments for model_inference.
+
+        Returns:
+            a dict containing the following
+            - 'samples': the model samples.
+            - 'pred_x_t': a list of prediction of x_t.
+            - 'pred_x_0': a list of prediction of x_0.
+        """
+        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, cfg_batched=cfg_batched, **kwargs)
+
+
+class FlowHeunGuidanceIntervalSampler(GuidanceIntervalSamplerMixin, FlowHeunSampler):
+    """
+    Generate samples from a flow-matching model using Heun's method with classifier-free guidance and interval.
+    """
+    @torch.no_grad()
+    def sample(
+        self,
+        model,
+        noise,
+        cond,
+        neg_cond,
+        steps: int = 50,
+        rescale_t: float = 1.0,
+        cfg_strength: float = 3.0,
+        cfg_interval: Tuple[float, float] = (0.0, 1.0),
+        cfg_batched: bool = False,
+        verbose: bool = True,
+        **kwargs
+    ):
+        """
+        Generate samples from the model using Heun's method.
+
+        Args:
+            model: The model to sample from.
+            noise: The initial noise tensor.
+            cond: conditional information.
+            neg_cond: negative conditional information.
+            steps: The number of steps to sample.
+            rescale_t: The rescale factor for t.
+            cfg_strength: The strength of classifier-free guidance.
+            cfg_interval: The interval for classifier-free guidance.
+            cfg_batched: If True, evaluate the conditional and negative predictions in a single batched forward pass.
+            verbose: If True, show a progress bar.
+            **kwargs: Additional arguments for model_inference.
+
+        Returns:
+            a dict containing the following
+            - 'samples': the model samples.
+            - 'pred_x_t': a list of prediction of x_t.
+            - 'pred_x_0': a list of prediction of x_0.
+        """
+        return super().sample(model, noise, cond, steps, rescale_t, verbose, neg_cond=neg_cond, cfg_strength=cfg_strength, cfg_interval=cfg_interval, cfg_batched=cfg_batched, **kwargs)
@@ -1,4 +1,5 @@
 from typing import *
+from .classifier_free_guidance_mixin import batched_cfg_inference
 
 
 class GuidanceIntervalSamplerMixin:
@@ -6,10 +7,13 @@ class GuidanceIntervalSamplerMixin:
     A mixin class for samplers that apply classifier-free guidance with interval.
     """
 
-    def _inference_model(self, model, x_t, t, cond, neg_cond, cfg_strength, cfg_interval, **kwargs):
+    def _inference_model(self, model, x_t, t, cond, neg_cond, cfg_strength, cfg_interval, cfg_batched=False, **kwargs):
         if cfg_interval[0] <= t <= cfg_interval[1]:
-            pred = super()._inference_model(model, x_t, t, cond, **kwargs)
-            neg_pred = super()._inference_model(model, x_t, t, neg_cond, **kwargs)
+            if cfg_batched:
+                pred, neg_pred = batched_cfg_inference(super()._inference_model, model, x_t, t, cond, neg_cond, **kwargs)
+            else:
+                pred = super()._inference_model(model, x_t, t, cond, **kwargs)
+                neg_pred = super()._inference_model(model, x_t, t, neg_cond, **kwargs)
             return (1 + cfg_strength) * pred - cfg_strength * neg_pred
         else:
             return super()._inference_model(model, x_t, t, cond, **kwargs)
@@ -0,0 +1,118 @@
+from typing import *
+import os
+import shutil
+import tempfile
+import torch
+from ...modules import sparse as sp
+
+
+__all__ = [
+    'TrajectoryRecorder',
+    'DiskTrajectory',
+]
+
+
+class _TemporaryDirectory:
+    """
+    A temporary directory removed when the last reference to it is released.
+    """
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix='trellis_traj_')
+
+    def __del__(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class DiskTrajectory(Sequence):
+    """
+    A list-like view of trajectory tensors saved to disk.
+    Tensors are loaded lazily on indexing.
+
+    Args:
+        directory: The temporary directory holding the saved tensors.
+        paths: The file paths, in trajectory order.
+    """
+    def __init__(self, directory: _TemporaryDirectory, paths: List[str]):
+        self.directory = directory
+        self.paths = paths
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        data = torch.load(self.paths[idx])
+        if isinstance(data, dict):
+            return sp.SparseTensor(feats=data['feats'], coords=data['coords'])
+        return data
+
+
+class TrajectoryRecorder:
+    """
+    Retain the intermediate predictions of a sampler according to a policy.
+
+    Args:
+        mode: The retention policy.
+            - 'all': keep every step on the sampling device.
+            - 'none': keep nothing, only the final sample is returned.
+            - 'cpu': keep the retained steps offloaded to host memory.
+            - 'disk': keep the retained steps saved to a temporary directory.
+        interval: Retain every `interval`-th step. The last step is always retained.
+        num_steps: The total number of sampling steps.
+        keys: The names of the predictions to record.
+    """
+    def __init__(
+        self,
+        mode: Literal['all', 'none', 'cpu', 'disk'] = 'all',
+        interval: int = 1,
+        num_steps: Optional[int] = None,
+        keys: Tuple[str, ...] = ('pred_x_t', 'pred_x_0'),
+    ):
+        assert mode in ['all', 'none', 'cpu', 'disk'], f"Unknown trajectory mode: {mode}"
+        assert interval >= 1, f"Trajectory interval must be positive, got {interval}"
+        self.mode = mode
+        self.interval = interval
+        self.num_steps = num_steps
+        self.keys = keys
+        self.steps = []
+        self.data = {k: [] for k in keys}
+        self.directory = _TemporaryDirectory() if mode == 'disk' else None
+
+    def should_record(self, step: int) -> bool:
+        if self.mode == 'none':
+            return False
+        return (step + 1) % self.interval == 0 or step + 1 == self.num_steps
+
+    def _store(self, key: str, step: int, value):
+        if self.mode == 'cpu':
+            return value.cpu()
+        if self.mode == 'disk':
+            path = os.path.join(self.directory.path, f'{key}_{step:05d}.pt')
+            if isinstance(value, sp.SparseTensor):
+                torch.save({'feats': value.feats.cpu(), 'coords': value.coords.cpu()}, path)
+            else:
+                torch.save(value.cpu(), path)
+            return path
+        return value
+
+    def record(self, step: int, **values) -> None:
+        """
+        Record the predictions of a step if the policy retains it.
+        """
+        if not self.should_record(step):
+            return
+        self.steps.append(step)
+        for k in self.keys:
+            self.data[k].append(self._store(k, step, values[k]))
+
+    def export(self) -> dict:
+        """
+        Return the retained predictions, one list per key, plus the indices of the retained steps.
+        """
+        if self.mode == 'disk':
+            ret = {k: DiskTrajectory(self.directory, v) for k, v in self.data.items()}
+        else:
+            ret = dict(self.data)
+        ret['trajectory_steps'] = list(self.steps)
+        return ret
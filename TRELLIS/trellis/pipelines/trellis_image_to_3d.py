@@ -43,14 +43,15 @@ class TrellisImageTo3DPipeline(Pipeline):
         self._init_image_cond_model(image_cond_model)
 
     @staticmethod
-    def from_pretrained(path: str) -> "TrellisImageTo3DPipeline":
+    def from_pretrained(path: str, **kwargs) -> "TrellisImageTo3DPipeline":
         """
         Load a pretrained model.
 
         Args:
             path (str): The path to the model. Can be either local path or a Hugging Face repository.
+            **kwargs: Loading options (device, dtype, lazy, num_workers), see `Pipeline.from_pretrained`.
         """
-        pipeline = super(TrellisImageTo3DPipeline, TrellisImageTo3DPipeline).from_pretrained(path)
+        pipeline = super(TrellisImageTo3DPipeline, TrellisImageTo3DPipeline).from_pretrained(path, **kwargs)
         new_pipeline = TrellisImageTo3DPipeline()
         new_pipeline.__dict__ = pipeline.__dict__
         args = pipeline._pretrained_args
@@ -177,7 +178,7 @@ class TrellisImageTo3DPipeline(Pipeline):
         flow_model = self.models['sparse_structure_flow_model']
         reso = flow_model.resolution
         noise = torch.randn(num_samples, flow_model.in_channels, reso, reso, reso).to(self.device)
-        sampler_params = {**self.sparse_structure_sampler_params, **sampler_params}
+        sampler_params = {'trajectory': 'none', **self.sparse_structure_sampler_params, **sampler_params}
         z_s = self.sparse_structure_sampler.sample(
             flow_model,
             noise,
@@ -236,7 +237,7 @@ class TrellisImageTo3DPipeline(Pipeline):
             feats=torch.randn(coords.shape[0], flow_model.in_channels).to(self.device),
             coords=coords,
         )
-        sampler_params = {**self.slat_sampler_params, **sampler_params}
+        sampler_params = {'trajectory': 'none', **self.slat_sampler_params, **sampler_params}
         slat = self.slat_sampler.sample(
             flow_model,
             noise,
@@ -314,7 +315,7 @@ class TrellisImageTo3DPipeline(Pipeline):
         
         elif mode =='multidiffusion':
             from .samplers import FlowEulerSampler
-            def _new_inference_model(self, model, x_t, t, cond, neg_cond, cfg_strength, cfg_interval, **kwargs):
+            def _new_inference_model(self, model, x_t, t, cond, neg_cond, cfg_strength, cfg_interval, cfg_batched=False, **kwargs):
                 if cfg_interval[0] <= t <= cfg_interval[1]:
                     preds = []
                     for i in range(len(cond)):
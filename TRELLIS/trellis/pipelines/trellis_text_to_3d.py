@@ -1,12 +1,13 @@
 from typing import *
+import json
 import torch
 import torch.nn as nn
 import numpy as np
 from transformers import CLIPTextModel, AutoTokenizer
-import open3d as o3d
 from .base import Pipeline
 from . import samplers
 from ..modules import sparse as sp
+from ..utils.voxel_utils import voxelize_mesh
 
 
 class TrellisTextTo3DPipeline(Pipeline):
@@ -39,14 +40,15 @@ class TrellisTextTo3DPipeline(Pipeline):
         self._init_text_cond_model(text_cond_model)
 
     @staticmethod
-    def from_pretrained(path: str) -> "TrellisTextTo3DPipeline":
+    def from_pretrained(path: str, **kwargs) -> "TrellisTextTo3DPipeline":
         """
         Load a pretrained model.
 
         Args:
             path (str): The path to the model. Can be either local path or a Hugging Face repository.
+            **kwargs: Loading options (device, dtype, lazy, num_workers), see `Pipeline.from_pretrained`.
         """
-        pipeline = super(TrellisTextTo3DPipeline, TrellisTextTo3DPipeline).from_pretrained(path)
+        pipeline = super(TrellisTextTo3DPipeline, TrellisTextTo3DPipeline).from_pretrained(path, **kwargs)
         new_pipeline = TrellisTextTo3DPipeline()
         new_pipeline.__dict__ = pipeline.__dict__
         args = pipeline._pretrained_args
@@ -112,6 +114,7 @@ class TrellisTextTo3DPipeline(Pipeline):
         cond: dict,
         num_samples: int = 1,
         sampler_params: dict = {},
+        noise: Optional[torch.Tensor] = None,
     ) -> torch.Tensor:
         """
         Sample sparse structures with the given conditioning.
@@ -120,12 +123,15 @@ class TrellisTextTo3DPipeline(Pipeline):
             cond (dict): The conditioning information.
             num_samples (int): The number of samples to generate.
             sampler_params (dict): Additional parameters for the sampler.
+            noise (torch.Tensor): The initial noise. Drawn from the global RNG if not given.
         """
         # Sample occupancy latent
         flow_model = self.models['sparse_structure_flow_model']
         reso = flow_model.resolution
-        noise = torch.randn(num_samples, flow_model.in_channels, reso, reso, reso).to(self.device)
-        sampler_params = {**self.sparse_structure_sampler_params, **sampler_params}
+        if noise is None:
+            noise = torch.randn(num_samples, flow_model.in_channels, reso, reso, reso)
+        noise = noise.to(self.device)
+        sampler_params = {'trajectory': 'none', **self.sparse_structure_sampler_params, **sampler_params}
         z_s = self.sparse_structure_sampler.sample(
             flow_model,
             noise,
@@ -169,6 +175,7 @@ class TrellisTextTo3DPipeline(Pipeline):
         cond: dict,
         coords: torch.Tensor,
         sampler_params: dict = {},
+        noise: Optional[torch.Tensor] = None,
     ) -> sp.SparseTensor:
         """
         Sample structured latent with the given conditioning.
@@ -177,14 +184,18 @@ class TrellisTextTo3DPipeline(Pipeline):
             cond (dict): The conditioning information.
             coords (torch.Tensor): The coordinates of the sparse structure.
             sampler_params (dict): Additional parameters for the sampler.
+            noise (torch.Tensor): The initial noise features, one row per coordinate.
+                Drawn from the global RNG if not given.
         """
         # Sample structured latent
         flow_model = self.models['slat_flow_model']
+        if noise is None:
+            noise = torch.randn(coords.shape[0], flow_model.in_channels)
         noise = sp.SparseTensor(
-            feats=torch.randn(coords.shape[0], flow_model.in_channels).to(self.device),
+            feats=noise.to(self.device),
             coords=coords,
         )
-        sampler_params = {**self.slat_sampler_params, **sampler_params}
+        sampler_params = {'trajectory': 'none', **self.slat_sampler_params, **sampler_params}
         slat = self.slat_sampler.sample(
             flow_model,
             noise,
@@ -202,9 +213,9 @@ class TrellisTextTo3DPipeline(Pipeline):
     @torch.no_grad()
     def run(
         self,
-        prompt: str,
+        prompt: Union[str, List[str]],
         num_samples: int = 1,
-        seed: int = 42,
+        seed: Union[int, List[int]] = 42,
         sparse_structure_sampler_params: dict = {},
         slat_sampler_params: dict = {},
         formats: List[str] = ['mesh', 'gaussian', 'radiance_field'],
@@ -213,43 +224,161 @@ class TrellisTextTo3DPipeline(Pipeline):
         Run the pipeline.
 
         Args:
-            prompt (str): The text prompt.
+            prompt (Union[str, List[str]]): The text prompt. A list of prompts is generated in a
+                single sampling pass, see `run_batch`.
             num_samples (int): The number of samples to generate.
-            seed (int): The random seed.
+            seed (Union[int, List[int]]): The random seed, or one seed per prompt.
             sparse_structure_sampler_params (dict): Additional parameters for the sparse structure sampler.
             slat_sampler_params (dict): Additional parameters for the structured latent sampler.
             formats (List[str]): The formats to decode the structured latent to.
         """
+        if isinstance(prompt, list):
+            return self.run_batch(prompt, num_samples, seed, sparse_structure_sampler_params, slat_sampler_params, formats)
         cond = self.get_cond([prompt])
         torch.manual_seed(seed)
         coords = self.sample_sparse_structure(cond, num_samples, sparse_structure_sampler_params)
         slat = self.sample_slat(cond, coords, slat_sampler_params)
         return self.decode_slat(slat, formats)
     
-    def voxelize(self, mesh: o3d.geometry.TriangleMesh) -> torch.Tensor:
+    @staticmethod
+    def _expand_per_prompt(value: Any, num_prompts: int, name: str) -> list:
+        """
+        Broadcast a shared argument to one entry per prompt.
+        """
+        if isinstance(value, (list, tuple)):
+            assert len(value) == num_prompts, f"{name} must have one entry per prompt, got {len(value)} for {num_prompts} prompts"
+            return list(value)
+        return [value] * num_prompts
+
+    @staticmethod
+    def _group_by_params(params: List[dict]) -> List[List[int]]:
+        """
+        Group prompt indices that share identical sampler parameters.
+        Prompts in one group can be sampled together on a common timestep schedule.
+        """
+        groups = {}
+        for i, p in enumerate(params):
+            groups.setdefault(json.dumps(p, sort_keys=True, default=str), []).append(i)
+        return list(groups.values())
+
+    @staticmethod
+    def _select_cond(cond: dict, indices: List[int], num_samples: int) -> dict:
+        """
+        Gather the conditions of the given prompts, repeated for each sample.
+        """
+        index = torch.tensor(indices, device=cond['cond'].device)
+        return {
+            'cond': cond['cond'][index].repeat_interleave(num_samples, 0),
+            'neg_cond': cond['neg_cond'],
+        }
+
+    @torch.no_grad()
+    def run_batch(
+        self,
+        prompts: List[str],
+        num_samples: int = 1,
+        seeds: Union[int, List[int]] = 42,
+        sparse_structure_sampler_params: Union[dict, List[dict]] = {},
+        slat_sampler_params: Union[dict, List[dict]] = {},
+        formats: List[str] = ['mesh', 'gaussian', 'radiance_field'],
+    ) -> List[dict]:
+        """
+        Run the pipeline on several prompts at once.
+
+        Prompts that share the same sampler parameters are stacked into one batch, so each
+        stage runs a single sampling loop per distinct parameter set. Every prompt draws its
+        noise from its own generator seeded with its seed, in the same order as `run`, so the
+        outputs match running the prompts one at a time.
+
+        Args:
+            prompts (List[str]): The text prompts.
+            num_samples (int): The number of samples to generate per prompt.
+            seeds (Union[int, List[int]]): The random seed, or one seed per prompt.
+            sparse_structure_sampler_params (Union[dict, List[dict]]): Additional parameters for the
+                sparse structure sampler, shared or one dict per prompt.
+            slat_sampler_params (Union[dict, List[dict]]): Additional parameters for the structured
+                latent sampler, shared or one dict per prompt.
+            formats (List[str]): The formats to decode the structured latent to.
+
+        Returns:
+            List[dict]: The decoded outputs, one dict per prompt.
+        """
+        num_prompts = len(prompts)
+        seeds = self._expand_per_prompt(seeds, num_prompts, 'seeds')
+        ss_params = self._expand_per_prompt(sparse_structure_sampler_params, num_prompts, 'sparse_structure_sampler_params')
+        slat_params = self._expand_per_prompt(slat_sampler_params, num_prompts, 'slat_sampler_params')
+        generators = [torch.Generator().manual_seed(seed) for seed in seeds]
+        cond = self.get_cond(prompts)
+
+        # Sample sparse structures
+        flow_model = self.models['sparse_structure_flow_model']
+        reso = flow_model.resolution
+        ss_noise = [
+            torch.randn(num_samples, flow_model.in_channels, reso, reso, reso, generator=g)
+            for g in generators
+        ]
+        coords = [None] * num_prompts
+        for group in self._group_by_params(ss_params):
+            group_coords = self.sample_sparse_structure(
+                self._select_cond(cond, group, num_samples),
+                num_samples * len(group),
+                ss_params[group[0]],
+                noise=torch.cat([ss_noise[i] for i in group]),
+            )
+            counts = torch.bincount(group_coords[:, 0].long() // num_samples, minlength=len(group))
+            for j, (i, c) in enumerate(zip(group, group_coords.split(counts.tolist()))):
+                c = c.clone()
+                c[:, 0] -= j * num_samples
+                coords[i] = c
+        for i, c in enumerate(coords):
+            counts = torch.bincount(c[:, 0].long(), minlength=num_samples)
+            if (counts == 0).any():
+                raise ValueError(f"Empty sparse structure sampled for prompt {i}: {prompts[i]!r}")
+
+        # Sample structured latents
+        slat_flow_model = self.models['slat_flow_model']
+        slat_noise = [torch.randn(c.shape[0], slat_flow_model.in_channels, generator=g) for c, g in zip(coords, generators)]
+        outputs = [None] * num_prompts
+        for group in self._group_by_params(slat_params):
+            group_coords = []
+            for j, i in enumerate(group):
+                c = coords[i].clone()
+                c[:, 0] += j * num_samples
+                group_coords.append(c)
+            slat = self.sample_slat(
+                self._select_cond(cond, group, num_samples),
+                torch.cat(group_coords),
+                slat_params[group[0]],
+                noise=torch.cat([slat_noise[i] for i in group]),
+            )
+            decoded = self.decode_slat(slat, formats)
+            for j, i in enumerate(group):
+                outputs[i] = {k: v[j * num_samples:(j + 1) * num_samples] for k, v in decoded.items()}
+        return outputs
+
+    def voxelize(self, mesh: Any) -> torch.Tensor:
         """
         Voxelize a mesh.
 
         Args:
-            mesh (o3d.geometry.TriangleMesh): The mesh to voxelize.
-            sha256 (str): The SHA256 hash of the mesh.
-            output_dir (str): The output directory.
+            mesh: The mesh to voxelize, anything with `vertices` and `triangles` or `faces`
+                (e.g. an open3d or trimesh mesh). It is normalized to the unit cube, the
+                input is not modified.
         """
-        vertices = np.asarray(mesh.vertices)
+        vertices = np.asarray(mesh.vertices, dtype=np.float64)
+        faces = np.asarray(mesh.triangles if hasattr(mesh, 'triangles') else mesh.faces)
         aabb = np.stack([vertices.min(0), vertices.max(0)])
         center = (aabb[0] + aabb[1]) / 2
         scale = (aabb[1] - aabb[0]).max()
         vertices = (vertices - center) / scale
         vertices = np.clip(vertices, -0.5 + 1e-6, 0.5 - 1e-6)
-        mesh.vertices = o3d.utility.Vector3dVector(vertices)
-        voxel_grid = o3d.geometry.VoxelGrid.create_from_triangle_mesh_within_bounds(mesh, voxel_size=1/64, min_bound=(-0.5, -0.5, -0.5), max_bound=(0.5, 0.5, 0.5))
-        vertices = np.array([voxel.grid_index for voxel in voxel_grid.get_voxels()])
-        return torch.tensor(vertices).int().cuda()
+        coords = voxelize_mesh(vertices, faces, 64)
+        return torch.tensor(coords).int().cuda()
 
     @torch.no_grad()
     def run_variant(
         self,
-        mesh: o3d.geometry.TriangleMesh,
+        mesh: Any,
         prompt: str,
         num_samples: int = 1,
         seed: int = 42,
@@ -260,7 +389,7 @@ class TrellisTextTo3DPipeline(Pipeline):
         Run the pipeline for making variants of an asset.
 
         Args:
-            mesh (o3d.geometry.TriangleMesh): The base mesh.
+            mesh: The base mesh, see `voxelize`.
             prompt (str): The text prompt.
             num_samples (int): The number of samples to generate.
             seed (int): The random seed
@@ -0,0 +1,137 @@
+from typing import *
+import numpy as np
+import torch
+
+
+__all__ = [
+    'TriangleRasterizer',
+    'interpolate',
+]
+
+
+class TriangleRasterizer:
+    """
+    Pure PyTorch triangle rasterizer with a depth buffer, for machines without nvdiffrast.
+
+    Follows the nvdiffrast conventions: pixels are sampled at their centers, the first
+    image row is at y = -1 in clip space, and triangles outside -1 <= z/w <= 1 or behind the
+    camera are dropped. Triangles are processed in chunks of at most `max_candidates`
+    bounding-box pixels, and the depth and index buffers are reused across calls with
+    the same resolution.
+
+    Args:
+        max_candidates (int): Maximum number of candidate pixels processed at once.
+    """
+    def __init__(self, max_candidates: int = 1 << 22):
+        self.max_candidates = max_candidates
+        self._buffers = {}
+
+    def _get_buffers(self, width, height, device):
+        key = (width, height, str(device))
+        if key not in self._buffers:
+            self._buffers[key] = (
+                torch.empty(width * height, dtype=torch.float32, device=device),
+                torch.empty(width * height, dtype=torch.int64, device=device),
+            )
+        zbuf, winner = self._buffers[key]
+        return zbuf.fill_(float('inf')), winner.fill_(-1)
+
+    @torch.no_grad()
+    def rasterize(self, clip: torch.Tensor, faces: torch.Tensor, width: int, height: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Args:
+            clip (torch.Tensor): [V, 4] clip-space vertices.
+            faces (torch.Tensor): [F, 3] triangles.
+            width, height (int): Image size.
+
+        Returns:
+            face_id (torch.Tensor): [H, W] index of the visible triangle, -1 where empty.
+            bary (torch.Tensor): [H, W, 3] perspective-correct barycentric coordinates.
+        """
+        faces = faces.long()
+        device = clip.device
+        w = clip[:, 3]
+        sx = (clip[:, 0] / w + 1) * 0.5 * width
+        sy = (clip[:, 1] / w + 1) * 0.5 * height
+        sz = clip[:, 2] / w
+
+        # Triangles in front of the camera, with their pixel bounding boxes
+        fx, fy, fz, fw = sx[faces], sy[faces], sz[faces], w[faces]
+        valid = (fw > 0).all(dim=1)
+        x_min = torch.ceil(fx.min(dim=1).values - 0.5).clamp(0, width - 1).long()
+        x_max = torch.floor(fx.max(dim=1).values - 0.5).clamp(-1, width - 1).long()
+        y_min = torch.ceil(fy.min(dim=1).values - 0.5).clamp(0, height - 1).long()
+        y_max = torch.floor(fy.max(dim=1).values - 0.5).clamp(-1, height - 1).long()
+        nx = (x_max - x_min + 1).clamp(min=0) * valid
+        ny = (y_max - y_min + 1).clamp(min=0) * valid
+        count = nx * ny
+
+        pix_all, z_all, fid_all, bary_all = [], [], [], []
+        cumsum = torch.cumsum(count, dim=0).cpu().numpy()
+        start = 0
+        while start < faces.shape[0]:
+            base = cumsum[start - 1] if start > 0 else 0
+            end = int(np.searchsorted(cumsum, base + self.max_candidates, side='right'))
+            end = max(end, start + 1)
+            c = count[start:end]
+            fid = torch.repeat_interleave(torch.arange(start, end, device=device), c)
+            if fid.shape[0] > 0:
+                local = torch.arange(fid.shape[0], device=device) - (torch.cumsum(c, dim=0) - c)[fid - start]
+                px = x_min[fid] + local % nx[fid]
+                py = y_min[fid] + local // nx[fid]
+                bary, z = self._barycentric(fx[fid], fy[fid], fz[fid], px.float() + 0.5, py.float() + 0.5)
+                inside = (bary >= 0).all(dim=1) & (z >= -1) & (z <= 1)
+                pix_all.append((py * width + px)[inside])
+                z_all.append(z[inside])
+                fid_all.append(fid[inside])
+                bary_all.append(bary[inside])
+            start = end
+
+        face_id = torch.full((height * width,), -1, dtype=torch.int64, device=device)
+        bary_map = torch.zeros(height * width, 3, dtype=clip.dtype, device=device)
+        if sum(p.shape[0] for p in pix_all) == 0:
+            return face_id.reshape(height, width), bary_map.reshape(height, width, 3)
+        pix, z, fid, bary = torch.cat(pix_all), torch.cat(z_all), torch.cat(fid_all), torch.cat(bary_all)
+
+        # Depth test, ties go to the later candidate
+        zbuf, winner = self._get_buffers(width, height, device)
+        zbuf.scatter_reduce_(0, pix, z, reduce='amin')
+        front = (z == zbuf[pix]).nonzero().squeeze(1)
+        winner.scatter_reduce_(0, pix[front], front, reduce='amax')
+        covered = (winner >= 0).nonzero().squeeze(1)
+        chosen = winner[covered]
+
+        # Perspective correction
+        b = bary[chosen] / fw[fid[chosen]]
+        b = b / b.sum(dim=1, keepdim=True)
+        face_id[covered] = fid[chosen]
+        bary_map[covered] = b
+        return face_id.reshape(height, width), bary_map.reshape(height, width, 3)
+
+    @staticmethod
+    def _barycentric(fx, fy, fz, px, py):
+        x0, x1, x2 = fx.unbind(dim=1)
+        y0, y1, y2 = fy.unbind(dim=1)
+        area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+        area = torch.where(area == 0, torch.full_like(area, float('nan')), area)
+        b0 = ((x1 - px) * (y2 - py) - (x2 - px) * (y1 - py)) / area
+        b1 = ((x2 - px) * (y0 - py) - (x0 - px) * (y2 - py)) / area
+        b2 = 1 - b0 - b1
+        bary = torch.stack([b0, b1, b2], dim=1)
+        bary = torch.nan_to_num(bary, nan=-1.0)
+        z = (bary * fz).sum(dim=1)
+        return bary, z
+
+
+def interpolate(attrs: torch.Tensor, faces: torch.Tensor, face_id: torch.Tensor, bary: torch.Tensor) -> torch.Tensor:
+    """
+    Interpolate [V, C] vertex attributes over a rasterized image. Empty pixels are zero.
+
+    Returns:
+        torch.Tensor: [H, W, C] interpolated attributes.
+    """
+    out = torch.zeros(*face_id.shape, attrs.shape[-1], dtype=attrs.dtype, device=attrs.device)
+    mask = face_id >= 0
+    corners = attrs[faces.long()[face_id[mask]]]
+    out[mask] = (bary[mask].unsqueeze(-1) * corners).sum(dim=1)
+    return out
@@ -1,8 +1,12 @@
 import torch
-import nvdiffrast.torch as dr
 from easydict import EasyDict as edict
 from ..representations.mesh import MeshExtractResult
+from .cpu_rasterizer import TriangleRasterizer, interpolate
 import torch.nn.functional as F
+try:
+    import nvdiffrast.torch as dr
+except ImportError:
+    dr = None
 
 
 def intrinsics_to_projection(
@@ -37,6 +41,9 @@ class MeshRenderer:
     """
     Renderer for the Mesh representation.
 
+    Uses nvdiffrast on CUDA devices and falls back to a PyTorch rasterizer, without
+    antialiasing, on the CPU or when nvdiffrast is not installed.
+
     Args:
         rendering_options (dict): Rendering options.
         glctx (nvdiffrast.torch.RasterizeGLContext): RasterizeGLContext object for CUDA/OpenGL interop.
@@ -49,7 +56,11 @@ class MeshRenderer:
             "ssaa": 1
         })
         self.rendering_options.update(rendering_options)
-        self.glctx = dr.RasterizeCudaContext(device=device)
+        self.use_cuda = dr is not None and torch.device(device).type == 'cuda'
+        if self.use_cuda:
+            self.glctx = dr.RasterizeCudaContext(device=device)
+        else:
+            self.rasterizer = TriangleRasterizer()
         self.device=device
         
     def render(
@@ -77,30 +88,76 @@ class MeshRenderer:
                 mask (torch.Tensor): [H, W] rendered mask image
         """
         resolution = self.rendering_options["resolution"]
-        near = self.rendering_options["near"]
-        far = self.rendering_options["far"]
-        ssaa = self.rendering_options["ssaa"]
-        
         if mesh.vertices.shape[0] == 0 or mesh.faces.shape[0] == 0:
             default_img = torch.zeros((1, resolution, resolution, 3), dtype=torch.float32, device=self.device)
             ret_dict = {k : default_img if k in ['normal', 'normal_map', 'color'] else default_img[..., :1] for k in return_types}
             return ret_dict
+        ret = self.render_batch(mesh, extrinsics[None], intrinsics[None], return_types)
+        return edict({k: v.squeeze() for k, v in ret.items()})
+
+    def render_batch(
+            self,
+            mesh : MeshExtractResult,
+            extrinsics: torch.Tensor,
+            intrinsics: torch.Tensor,
+            return_types = ["mask", "normal", "depth"]
+        ) -> edict:
+        """
+        Render the mesh from several views at once.
+
+        Args:
+            mesh : meshmodel
+            extrinsics (torch.Tensor): (B, 4, 4) camera extrinsics
+            intrinsics (torch.Tensor): (B, 3, 3) camera intrinsics
+            return_types (list): list of return types, see `render`
+
+        Returns:
+            edict based on return_types containing [B, C, H, W] images.
+        """
+        resolution = self.rendering_options["resolution"]
+        near = self.rendering_options["near"]
+        far = self.rendering_options["far"]
+        ssaa = self.rendering_options["ssaa"]
+        batch_size = extrinsics.shape[0]
+        channels = {'mask': 1, 'depth': 1, 'normal': 3, 'normal_map': 3, 'color': 3}
+
+        if mesh.vertices.shape[0] == 0 or mesh.faces.shape[0] == 0:
+            return edict({
+                k: torch.zeros((batch_size, channels[k], resolution, resolution), dtype=torch.float32, device=self.device)
+                for k in return_types
+            })
+
+        perspective = torch.stack([intrinsics_to_projection(intr, near, far) for intr in intrinsics])
         
-        perspective = intrinsics_to_projection(intrinsics, near, far)
-        
-        RT = extrinsics.unsqueeze(0)
-        full_proj = (perspective @ extrinsics).unsqueeze(0)
+        RT = extrinsics
+        full_proj = perspective @ extrinsics
         
-        vertices = mesh.vertices.unsqueeze(0)
+        vertices = mesh.vertices.unsqueeze(0).expand(batch_size, -1, -1)
 
         vertices_homo = torch.cat([vertices, torch.ones_like(vertices[..., :1])], dim=-1)
         vertices_camera = torch.bmm(vertices_homo, RT.transpose(-1, -2))
         vertices_clip = torch.bmm(vertices_homo, full_proj.transpose(-1, -2))
         faces_int = mesh.faces.int()
+        if self.use_cuda:
+            images = self._render_nvdiffrast(mesh, vertices_camera, vertices_clip, faces_int, resolution * ssaa, return_types)
+        else:
+            images = self._render_cpu(mesh, vertices_camera, vertices_clip, faces_int, resolution * ssaa, return_types)
+
+        out_dict = edict()
+        for type, img in images.items():
+            if ssaa > 1:
+                img = F.interpolate(img.permute(0, 3, 1, 2), (resolution, resolution), mode='bilinear', align_corners=False, antialias=True)
+            else:
+                img = img.permute(0, 3, 1, 2)
+            out_dict[type] = img
+
+        return out_dict
+
+    def _render_nvdiffrast(self, mesh, vertices_camera, vertices_clip, faces_int, size, return_types):
         rast, _ = dr.rasterize(
-            self.glctx, vertices_clip, faces_int, (resolution * ssaa, resolution * ssaa))
+            self.glctx, vertices_clip, faces_int, (size, size))
         
-        out_dict = edict()
+        images = {}
         for type in return_types:
             img = None
             if type == "mask" :
@@ -110,7 +167,7 @@ class MeshRenderer:
                 img = dr.antialias(img, rast, vertices_clip, faces_int)
             elif type == "normal" :
                 img = dr.interpolate(
-                    mesh.face_normal.reshape(1, -1, 3), rast,
+                    mesh.face_normal.reshape(-1, 3), rast,
                     torch.arange(mesh.faces.shape[0] * 3, device=self.device, dtype=torch.int).reshape(-1, 3)
                 )[0]
                 img = dr.antialias(img, rast, vertices_clip, faces_int)
@@ -122,12 +179,27 @@ class MeshRenderer:
             elif type == "color" :
                 img = dr.interpolate(mesh.vertex_attrs[:, :3].contiguous(), rast, faces_int)[0]
                 img = dr.antialias(img, rast, vertices_clip, faces_int)
+            images[type] = img
+        return images
 
-            if ssaa > 1:
-                img = F.interpolate(img.permute(0, 3, 1, 2), (resolution, resolution), mode='bilinear', align_corners=False, antialias=True)
-                img = img.squeeze()
-            else:
-                img = img.permute(0, 3, 1, 2).squeeze()
-            out_dict[type] = img
-
-        return out_dict
+    def _render_cpu(self, mesh, vertices_camera, vertices_clip, faces_int, size, return_types):
+        images = {type: [] for type in return_types}
+        for camera, clip in zip(vertices_camera, vertices_clip):
+            face_id, bary = self.rasterizer.rasterize(clip, faces_int, size, size)
+            mask = face_id >= 0
+            for type in return_types:
+                if type == "mask":
+                    img = mask[..., None].float()
+                elif type == "depth":
+                    img = interpolate(camera[:, 2:3].contiguous(), faces_int, face_id, bary)
+                elif type == "normal":
+                    img = torch.zeros(size, size, 3, dtype=torch.float32, device=face_id.device)
+                    img[mask] = mesh.face_normal.reshape(-1, 3, 3)[face_id[mask], 0]
+                    # normalize norm pictures
+                    img = (img + 1) / 2
+                elif type == "normal_map":
+                    img = interpolate(mesh.vertex_attrs[:, 3:].contiguous(), faces_int, face_id, bary)
+                elif type == "color":
+                    img = interpolate(mesh.vertex_attrs[:, :3].contiguous(), faces_int, face_id, bary)
+                images[type].append(img)
+        return {type: torch.stack(imgs) for type, imgs in images.items()}
@@ -0,0 +1,202 @@
+from typing import *
+import io
+import json
+import zlib
+import struct
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+from plyfile import PlyData, PlyElement
+
+
+__all__ = [
+    'write_ply',
+    'read_ply',
+    'write_compact',
+    'iter_compact',
+    'read_compact',
+]
+
+
+# Gaussian attributes in file order, with their PLY property prefix
+FIELDS = ['xyz', 'f_dc', 'f_rest', 'opacity', 'scale', 'rotation']
+_PLY_PREFIX = {'f_dc': 'f_dc_', 'f_rest': 'f_rest_', 'scale': 'scale_', 'rotation': 'rot_'}
+
+COMPACT_MAGIC = b'TRGS'
+COMPACT_VERSION = 1
+
+
+def _ply_names(attrs: Dict[str, np.ndarray]) -> List[str]:
+    names = ['x', 'y', 'z', 'nx', 'ny', 'nz']
+    for field in FIELDS[1:]:
+        if field not in attrs:
+            continue
+        if field == 'opacity':
+            names.append('opacity')
+        else:
+            names += [f'{_PLY_PREFIX[field]}{i}' for i in range(attrs[field].shape[1])]
+    return names
+
+
+def write_ply(path: str, attrs: Dict[str, np.ndarray]) -> None:
+    """
+    Write Gaussian attributes as a binary PLY in the layout of the reference 3DGS implementation.
+
+    The columns are packed into one float32 array and reinterpreted as the structured
+    vertex array, so no per-point Python objects are created.
+
+    Args:
+        path (str): Output path.
+        attrs (Dict[str, np.ndarray]): Arrays of shape (N, C) keyed by field name.
+            'xyz', 'f_dc', 'opacity', 'scale' and 'rotation' are required, 'f_rest' is optional.
+    """
+    xyz = attrs['xyz']
+    columns = [xyz, np.zeros_like(xyz)] + [attrs[field] for field in FIELDS[1:] if field in attrs]
+    columns = np.ascontiguousarray(np.concatenate(columns, axis=1), dtype='<f4')
+    dtype = np.dtype([(name, '<f4') for name in _ply_names(attrs)])
+    elements = columns.view(dtype).reshape(-1)
+    PlyData([PlyElement.describe(elements, 'vertex')], byte_order='<').write(path)
+
+
+def read_ply(path: str) -> Dict[str, np.ndarray]:
+    """
+    Read Gaussian attributes written by `write_ply` or by the reference 3DGS implementation.
+
+    Returns:
+        Dict[str, np.ndarray]: float32 arrays of shape (N, C) keyed by field name.
+            Values are exactly the ones stored in the file.
+    """
+    data = PlyData.read(path).elements[0].data
+    names = data.dtype.names
+
+    def columns(prefix):
+        selected = sorted([n for n in names if n.startswith(prefix)], key=lambda n: int(n.split('_')[-1]))
+        return structured_to_unstructured(data[selected], dtype=np.float32)
+
+    attrs = {
+        'xyz': structured_to_unstructured(data[['x', 'y', 'z']], dtype=np.float32),
+        'f_dc': columns('f_dc_'),
+        'opacity': structured_to_unstructured(data[['opacity']], dtype=np.float32),
+        'scale': columns('scale_'),
+        'rotation': columns('rot'),
+    }
+    if any(n.startswith('f_rest_') for n in names):
+        attrs['f_rest'] = columns('f_rest_')
+    return attrs
+
+
+def write_compact(
+    path: str,
+    attrs: Dict[str, np.ndarray],
+    position_bits: Optional[int] = 16,
+    chunk_size: int = 65536,
+    compression_level: int = 6,
+) -> None:
+    """
+    Write Gaussian attributes in a compact chunked format.
+
+    Positions are quantized to `position_bits` bits per axis inside their bounding box
+    (or kept as float32 if None); every other attribute is stored in half precision.
+    Points are split into chunks of `chunk_size`, stored column by column and compressed
+    independently with zlib, so a reader can decode them one at a time.
+
+    Layout: magic, version and header length (little-endian uint32), a JSON header, then
+    for each chunk its point count, compressed size (uint32) and zlib payload.
+
+    Args:
+        path (str): Output path.
+        attrs (Dict[str, np.ndarray]): Same as `write_ply`.
+        position_bits (int): Bits per position axis, from 1 to 16, or None for float32.
+        chunk_size (int): Points per chunk.
+        compression_level (int): zlib compression level.
+    """
+    assert position_bits is None or 1 <= position_bits <= 16, f"Unsupported position bits: {position_bits}"
+    xyz = attrs['xyz'].astype(np.float32)
+    num_points = xyz.shape[0]
+    fields = [field for field in FIELDS if field in attrs]
+    header = {
+        'num_points': num_points,
+        'chunk_size': chunk_size,
+        'position_bits': position_bits,
+        'fields': {field: attrs[field].shape[1] for field in fields},
+    }
+    if position_bits is not None:
+        lo = xyz.min(axis=0) if num_points > 0 else np.zeros(3, dtype=np.float32)
+        hi = xyz.max(axis=0) if num_points > 0 else np.ones(3, dtype=np.float32)
+        extent = np.where(hi > lo, hi - lo, 1).astype(np.float32)
+        header['position_min'] = lo.tolist()
+        header['position_extent'] = extent.tolist()
+        levels = (1 << position_bits) - 1
+        xyz = np.round((xyz - lo) / extent * levels).clip(0, levels).astype('<u2')
+    header = json.dumps(header).encode('utf-8')
+
+    with open(path, 'wb') as f:
+        f.write(COMPACT_MAGIC)
+        f.write(struct.pack('<II', COMPACT_VERSION, len(header)))
+        f.write(header)
+        for start in range(0, num_points, chunk_size):
+            end = min(start + chunk_size, num_points)
+            buffer = io.BytesIO()
+            for field in fields:
+                column = xyz[start:end] if field == 'xyz' else attrs[field][start:end].astype('<f2')
+                buffer.write(np.ascontiguousarray(column).tobytes())
+            payload = zlib.compress(buffer.getvalue(), compression_level)
+            f.write(struct.pack('<II', end - start, len(payload)))
+            f.write(payload)
+
+
+def _read_compact_header(f) -> dict:
+    magic = f.read(4)
+    if magic != COMPACT_MAGIC:
+        raise ValueError(f"Not a compact Gaussian file (magic {magic!r})")
+    version, header_size = struct.unpack('<II', f.read(8))
+    if version != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact Gaussian version: {version}")
+    return json.loads(f.read(header_size).decode('utf-8'))
+
+
+def iter_compact(path: str) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Stream the chunks of a compact Gaussian file.
+
+    Yields:
+        Dict[str, np.ndarray]: float32 arrays of shape (chunk, C) keyed by field name.
+    """
+    with open(path, 'rb') as f:
+        header = _read_compact_header(f)
+        position_bits = header['position_bits']
+        if position_bits is not None:
+            lo = np.array(header['position_min'], dtype=np.float32)
+            scale = np.array(header['position_extent'], dtype=np.float32) / ((1 << position_bits) - 1)
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                break
+            count, size = struct.unpack('<II', chunk_header)
+            payload = zlib.decompress(f.read(size))
+            chunk, offset = {}, 0
+            for field, channels in header['fields'].items():
+                dtype = np.dtype('<f2')
+                if field == 'xyz':
+                    dtype = np.dtype('<u2') if position_bits is not None else np.dtype('<f4')
+                nbytes = count * channels * dtype.itemsize
+                column = np.frombuffer(payload, dtype=dtype, count=count * channels, offset=offset).reshape(count, channels)
+                offset += nbytes
+                if field == 'xyz' and position_bits is not None:
+                    column = column.astype(np.float32) * scale + lo
+                chunk[field] = column.astype(np.float32)
+            yield chunk
+
+
+def read_compact(path: str) -> Dict[str, np.ndarray]:
+    """
+    Read a whole compact Gaussian file.
+
+    Returns:
+        Dict[str, np.ndarray]: float32 arrays of shape (N, C) keyed by field name.
+    """
+    with open(path, 'rb') as f:
+        header = _read_compact_header(f)
+    chunks = list(iter_compact(path))
+    if len(chunks) == 0:
+        return {field: np.zeros((0, channels), dtype=np.float32) for field, channels in header['fields'].items()}
+    return {field: np.concatenate([chunk[field] for chunk in chunks], axis=0) for field in header['fields']}
@@ -1,7 +1,7 @@
 import torch
 import numpy as np
-from plyfile import PlyData, PlyElement
 from .general_utils import inverse_sigmoid, strip_symmetric, build_scaling_rotation
+from . import gaussian_io
 import utils3d
 
 
@@ -115,21 +115,27 @@ class Gaussian:
         # All channels except the 3 DC
         for i in range(self._features_dc.shape[1]*self._features_dc.shape[2]):
             l.append('f_dc_{}'.format(i))
+        if self._features_rest is not None:
+            for i in range(self._features_rest.shape[1]*self._features_rest.shape[2]):
+                l.append('f_rest_{}'.format(i))
         l.append('opacity')
         for i in range(self._scaling.shape[1]):
             l.append('scale_{}'.format(i))
         for i in range(self._rotation.shape[1]):
             l.append('rot_{}'.format(i))
         return l
-        
-    def save_ply(self, path, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]]):
+
+    def export_attributes(self, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]]):
+        """
+        Activated attributes in the layout of the reference 3DGS PLY files, as float32 numpy arrays.
+        `transform` is an orthogonal matrix applied to positions and rotations.
+        """
         xyz = self.get_xyz.detach().cpu().numpy()
-        normals = np.zeros_like(xyz)
         f_dc = self._features_dc.detach().transpose(1, 2).flatten(start_dim=1).contiguous().cpu().numpy()
         opacities = inverse_sigmoid(self.get_opacity).detach().cpu().numpy()
         scale = torch.log(self.get_scaling).detach().cpu().numpy()
         rotation = (self._rotation + self.rots_bias[None, :]).detach().cpu().numpy()
-        
+
         if transform is not None:
             transform = np.array(transform)
             xyz = np.matmul(xyz, transform.T)
@@ -137,65 +143,36 @@ class Gaussian:
             rotation = np.matmul(transform, rotation)
             rotation = utils3d.numpy.matrix_to_quaternion(rotation)
 
-        dtype_full = [(attribute, 'f4') for attribute in self.construct_list_of_attributes()]
-
-        elements = np.empty(xyz.shape[0], dtype=dtype_full)
-        attributes = np.concatenate((xyz, normals, f_dc, opacities, scale, rotation), axis=1)
-        elements[:] = list(map(tuple, attributes))
-        el = PlyElement.describe(elements, 'vertex')
-        PlyData([el]).write(path)
+        attrs = {'xyz': xyz, 'f_dc': f_dc, 'opacity': opacities, 'scale': scale, 'rotation': rotation}
+        if self._features_rest is not None:
+            attrs['f_rest'] = self._features_rest.detach().transpose(1, 2).flatten(start_dim=1).contiguous().cpu().numpy()
+        return {k: np.asarray(v, dtype=np.float32) for k, v in attrs.items()}
 
-    def load_ply(self, path, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]]):
-        plydata = PlyData.read(path)
-
-        xyz = np.stack((np.asarray(plydata.elements[0]["x"]),
-                        np.asarray(plydata.elements[0]["y"]),
-                        np.asarray(plydata.elements[0]["z"])),  axis=1)
-        opacities = np.asarray(plydata.elements[0]["opacity"])[..., np.newaxis]
-
-        features_dc = np.zeros((xyz.shape[0], 3, 1))
-        features_dc[:, 0, 0] = np.asarray(plydata.elements[0]["f_dc_0"])
-        features_dc[:, 1, 0] = np.asarray(plydata.elements[0]["f_dc_1"])
-        features_dc[:, 2, 0] = np.asarray(plydata.elements[0]["f_dc_2"])
-
-        if self.sh_degree > 0:
-            extra_f_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("f_rest_")]
-            extra_f_names = sorted(extra_f_names, key = lambda x: int(x.split('_')[-1]))
-            assert len(extra_f_names)==3*(self.sh_degree + 1) ** 2 - 3
-            features_extra = np.zeros((xyz.shape[0], len(extra_f_names)))
-            for idx, attr_name in enumerate(extra_f_names):
-                features_extra[:, idx] = np.asarray(plydata.elements[0][attr_name])
-            # Reshape (P,F*SH_coeffs) to (P, F, SH_coeffs except DC)
-            features_extra = features_extra.reshape((features_extra.shape[0], 3, (self.max_sh_degree + 1) ** 2 - 1))
-
-        scale_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("scale_")]
-        scale_names = sorted(scale_names, key = lambda x: int(x.split('_')[-1]))
-        scales = np.zeros((xyz.shape[0], len(scale_names)))
-        for idx, attr_name in enumerate(scale_names):
-            scales[:, idx] = np.asarray(plydata.elements[0][attr_name])
-
-        rot_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("rot")]
-        rot_names = sorted(rot_names, key = lambda x: int(x.split('_')[-1]))
-        rots = np.zeros((xyz.shape[0], len(rot_names)))
-        for idx, attr_name in enumerate(rot_names):
-            rots[:, idx] = np.asarray(plydata.elements[0][attr_name])
-            
+    def import_attributes(self, attrs, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]]):
+        """
+        Set the Gaussians from attributes returned by `export_attributes` with the same `transform`.
+        """
+        xyz, rots = attrs['xyz'], attrs['rotation']
         if transform is not None:
             transform = np.array(transform)
             xyz = np.matmul(xyz, transform)
-            rotation = utils3d.numpy.quaternion_to_matrix(rotation)
-            rotation = np.matmul(rotation, transform)
-            rotation = utils3d.numpy.matrix_to_quaternion(rotation)
-            
+            rots = utils3d.numpy.quaternion_to_matrix(rots)
+            rots = np.matmul(transform.T, rots)
+            rots = utils3d.numpy.matrix_to_quaternion(rots)
+
         # convert to actual gaussian attributes
         xyz = torch.tensor(xyz, dtype=torch.float, device=self.device)
-        features_dc = torch.tensor(features_dc, dtype=torch.float, device=self.device).transpose(1, 2).contiguous()
+        features_dc = torch.tensor(attrs['f_dc'], dtype=torch.float, device=self.device)[:, None, :].contiguous()
         if self.sh_degree > 0:
-            features_extra = torch.tensor(features_extra, dtype=torch.float, device=self.device).transpose(1, 2).contiguous()
-        opacities = torch.sigmoid(torch.tensor(opacities, dtype=torch.float, device=self.device))
-        scales = torch.exp(torch.tensor(scales, dtype=torch.float, device=self.device))
+            num_rest = (self.sh_degree + 1) ** 2 - 1
+            assert 'f_rest' in attrs and attrs['f_rest'].shape[1] == 3 * num_rest
+            features_extra = torch.tensor(attrs['f_rest'], dtype=torch.float, device=self.device)
+            # Reshape (P,F*SH_coeffs) to (P, SH_coeffs except DC, F)
+            features_extra = features_extra.reshape(-1, 3, num_rest).transpose(1, 2).contiguous()
+        opacities = torch.sigmoid(torch.tensor(attrs['opacity'], dtype=torch.float, device=self.device))
+        scales = torch.exp(torch.tensor(attrs['scale'], dtype=torch.float, device=self.device))
         rots = torch.tensor(rots, dtype=torch.float, device=self.device)
-        
+
         # convert to _hidden attributes
         self._xyz = (xyz - self.aabb[None, :3]) / self.aabb[None, 3:]
         self._features_dc = features_dc
@@ -206,4 +183,19 @@ class Gaussian:
         self._opacity = self.inverse_opacity_activation(opacities) - self.opacity_bias
         self._scaling = self.inverse_scaling_activation(torch.sqrt(torch.square(scales) - self.mininum_kernel_size ** 2)) - self.scale_bias
         self._rotation = rots - self.rots_bias[None, :]
-        
\ No newline at end of file
+
+    def save_ply(self, path, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]]):
+        gaussian_io.write_ply(path, self.export_attributes(transform))
+
+    def load_ply(self, path, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]]):
+        self.import_attributes(gaussian_io.read_ply(path), transform)
+
+    def save_compact(self, path, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]], position_bits=16, chunk_size=65536):
+        """
+        Save in the compact format of `gaussian_io.write_compact`: quantized positions,
+        half-precision features, opacity, scale and rotation, compressed in chunks.
+        """
+        gaussian_io.write_compact(path, self.export_attributes(transform), position_bits=position_bits, chunk_size=chunk_size)
+
+    def load_compact(self, path, transform=[[1, 0, 0], [0, 0, -1], [0, 1, 0]]):
+        self.import_attributes(gaussian_io.read_compact(path), transform)
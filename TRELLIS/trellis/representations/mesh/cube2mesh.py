@@ -1,3 +1,4 @@
+from typing import *
 import torch
 from ...modules.sparse import SparseTensor
 from easydict import EasyDict as edict
@@ -56,20 +57,59 @@ class MeshExtractResult:
 
 
 class SparseFeatures2Mesh:
-    def __init__(self, device="cuda", res=64, use_color=True):
+    def __init__(self, device="cuda", res=64, use_color=True, extract_mode: Literal['dense', 'sparse'] = 'dense'):
         '''
         a model to generate a mesh from sparse features structures using flexicube
+
+        extract_mode:
+            - 'dense': run flexicubes on the full (res+1)^3 grid.
+            - 'sparse': run flexicubes only on the cubes touching the occupied voxels.
+              The mesh is the same, but memory scales with the number of voxels.
+
+        device is where the grid and flexicubes tables are meant to live. They are only
+        built on the first call and follow the device of the input features, so the
+        extractor can be created and run on machines without CUDA.
         '''
         super().__init__()
+        assert extract_mode in ['dense', 'sparse'], f"Unknown extract mode: {extract_mode}"
         self.device=device
         self.res = res
-        self.mesh_extractor = FlexiCubes(device=device)
+        self.extract_mode = extract_mode
+        self.mesh_extractor = None
         self.sdf_bias = -1.0 / res
-        verts, cube = construct_dense_grid(self.res, self.device)
-        self.reg_c = cube.to(self.device)
-        self.reg_v = verts.to(self.device)
+        self._reg_c = None
+        self._reg_v = None
         self.use_color = use_color
         self._calc_layout()
+
+    @property
+    def reg_c(self):
+        if self._reg_c is None:
+            self._build_dense_grid()
+        return self._reg_c
+
+    @property
+    def reg_v(self):
+        if self._reg_v is None:
+            self._build_dense_grid()
+        return self._reg_v
+
+    def to(self, device):
+        '''move the flexicubes tables and the dense grid, if built, to device'''
+        device = torch.device(device)
+        if self.mesh_extractor is not None and torch.device(self.mesh_extractor.device) == device:
+            return self
+        self.device = device
+        self.mesh_extractor = FlexiCubes(device=device)
+        if self._reg_c is not None:
+            self._reg_c = self._reg_c.to(device)
+            self._reg_v = self._reg_v.to(device)
+        return self
+
+    def _build_dense_grid(self):
+        verts, cube = construct_dense_grid(self.res, self.device)
+        self._reg_c = cube.to(self.device)
+        self._reg_v = verts.to(self.device)
     
     def _calc_layout(self):
         LAYOUTS = {
@@ -103,6 +143,7 @@ class SparseFeatures2Mesh:
         Returns:
             return the success tag and ni you loss, 
         """
+        self.to(cubefeats.feats.device)
         # add sdf bias to verts_attrs
         coords = cubefeats.coords[:, 1:]
         feats = cubefeats.feats
@@ -111,26 +152,33 @@ class SparseFeatures2Mesh:
         sdf += self.sdf_bias
         v_attrs = [sdf, deform, color] if self.use_color else [sdf, deform]
         v_pos, v_attrs, reg_loss = sparse_cube2verts(coords, torch.cat(v_attrs, dim=-1), training=training)
-        v_attrs_d = get_dense_attrs(v_pos, v_attrs, res=self.res+1, sdf_init=True)
-        weights_d = get_dense_attrs(coords, weights, res=self.res, sdf_init=False)
+        if self.extract_mode == 'sparse':
+            reg_v, reg_c, cube_coords = construct_sparse_grid(coords, self.res)
+            v_attrs_d = get_sparse_attrs(v_pos, v_attrs, reg_v, res=self.res+1, sdf_init=True)
+            weights_d = get_sparse_attrs(coords, weights, cube_coords, res=self.res, sdf_init=False)
+        else:
+            reg_v, reg_c, cube_coords = self.reg_v, self.reg_c, None
+            v_attrs_d = get_dense_attrs(v_pos, v_attrs, res=self.res+1, sdf_init=True)
+            weights_d = get_dense_attrs(coords, weights, res=self.res, sdf_init=False)
         if self.use_color:
             sdf_d, deform_d, colors_d = v_attrs_d[..., 0], v_attrs_d[..., 1:4], v_attrs_d[..., 4:]
         else:
             sdf_d, deform_d = v_attrs_d[..., 0], v_attrs_d[..., 1:4]
             colors_d = None
             
-        x_nx3 = get_defomed_verts(self.reg_v, deform_d, self.res)
+        x_nx3 = get_defomed_verts(reg_v, deform_d, self.res)
         
         vertices, faces, L_dev, colors = self.mesh_extractor(
             voxelgrid_vertices=x_nx3,
             scalar_field=sdf_d,
-            cube_idx=self.reg_c,
+            cube_idx=reg_c,
             resolution=self.res,
             beta=weights_d[:, :12],
             alpha=weights_d[:, 12:20],
             gamma_f=weights_d[:, 20],
             voxelgrid_colors=colors_d,
-            training=training)
+            training=training,
+            cube_coords=cube_coords)
         
         mesh = MeshExtractResult(vertices=vertices, faces=faces, vertex_attrs=colors, res=self.res)
         if training:
@@ -48,7 +48,8 @@ class FlexiCubes:
         self.adj_pairs = torch.tensor([0, 1, 1, 3, 3, 2, 2, 0], dtype=torch.long, device=device)
 
     def __call__(self, voxelgrid_vertices, scalar_field, cube_idx, resolution, qef_reg_scale=1e-3,
-                 weight_scale=0.99, beta=None, alpha=None, gamma_f=None, voxelgrid_colors=None, training=False):
+                 weight_scale=0.99, beta=None, alpha=None, gamma_f=None, voxelgrid_colors=None, training=False,
+                 cube_coords=None):
         assert torch.is_tensor(voxelgrid_vertices) and \
             check_tensor(voxelgrid_vertices, (None, 3), throw=False), \
             "'voxelgrid_vertices' should be a tensor of shape (num_vertices, 3)"
@@ -72,6 +73,10 @@ class FlexiCubes:
             torch.is_tensor(gamma_f) and
             check_tensor(gamma_f, (num_cubes,), throw=False)
         ), "'gamma_f' should be a tensor of shape (num_cubes,)"
+        assert cube_coords is None or (
+            torch.is_tensor(cube_coords) and
+            check_tensor(cube_coords, (num_cubes, 3), throw=False)
+        ), "'cube_coords' should be a tensor of shape (num_cubes, 3)"
 
         surf_cubes, occ_fx8 = self._identify_surf_cubes(scalar_field, cube_idx)
         if surf_cubes.sum() == 0:
@@ -87,7 +92,7 @@ class FlexiCubes:
         if voxelgrid_colors is not None:
             voxelgrid_colors = torch.sigmoid(voxelgrid_colors)
 
-        case_ids = self._get_case_id(occ_fx8, surf_cubes, resolution)
+        case_ids = self._get_case_id(occ_fx8, surf_cubes, resolution, cube_coords)
 
         surf_edges, idx_map, edge_counts, surf_edges_mask = self._identify_surf_edges(
             scalar_field, cube_idx, surf_cubes
@@ -135,11 +140,13 @@ class FlexiCubes:
         return beta[surf_cubes], alpha[surf_cubes], gamma_f[surf_cubes]
 
     @torch.no_grad()
-    def _get_case_id(self, occ_fx8, surf_cubes, res):
+    def _get_case_id(self, occ_fx8, surf_cubes, res, cube_coords=None):
         """
         Obtains the ID of topology cases based on cell corner occupancy. This function resolves the 
         ambiguity in the Dual Marching Cubes (DMC) configurations as described in Section 1.3 of the 
         supplementary material. It should be noted that this function assumes a regular grid.
+        If 'cube_coords' is given, the cubes are a subset of that grid in raster order and
+        adjacent cubes are looked up by their linear index instead of in a dense array.
         """
         case_ids = (occ_fx8[surf_cubes] * self.cube_corners_idx.to(self.device).unsqueeze(0)).sum(-1)
 
@@ -148,6 +155,8 @@ class FlexiCubes:
         problem_config = problem_config[to_check]
         if not isinstance(res, (list, tuple)):
             res = [res, res, res]
+        if cube_coords is not None:
+            return self._resolve_sparse_case_id(case_ids, problem_config, to_check, cube_coords[surf_cubes], res)
 
         # The 'problematic_configs' only contain configurations for surface cubes. Next, we construct a 3D array,
         # 'problem_config_full', to store configurations for all cubes (with default config for non-surface cubes).
@@ -177,6 +186,37 @@ class FlexiCubes:
         case_ids.index_put_((idx,), problem_config[to_invert][..., -1])
         return case_ids
 
+    @torch.no_grad()
+    def _resolve_sparse_case_id(self, case_ids, problem_config, to_check, surf_coords, res):
+        """
+        Same as the ambiguity resolution in '_get_case_id', with the problematic cubes kept in a
+        sorted table of linear indices instead of a dense grid of configurations.
+        """
+        def linear_index(v):
+            return (v[..., 0] * res[1] + v[..., 1]) * res[2] + v[..., 2]
+
+        vol_idx_problem = surf_coords[to_check].long()
+        problem_keys = linear_index(vol_idx_problem)  # ascending, cubes are in raster order
+        vol_idx_problem_adj = vol_idx_problem + problem_config[..., 1:4]
+
+        within_range = (
+            vol_idx_problem_adj[..., 0] >= 0) & (
+            vol_idx_problem_adj[..., 0] < res[0]) & (
+            vol_idx_problem_adj[..., 1] >= 0) & (
+            vol_idx_problem_adj[..., 1] < res[1]) & (
+            vol_idx_problem_adj[..., 2] >= 0) & (
+            vol_idx_problem_adj[..., 2] < res[2])
+
+        vol_idx_problem_adj = vol_idx_problem_adj[within_range]
+        problem_config = problem_config[within_range]
+        # If two cubes with cases C16 and C19 share an ambiguous face, both cases are inverted.
+        adj_keys = linear_index(vol_idx_problem_adj)
+        pos = torch.searchsorted(problem_keys, adj_keys).clamp(max=problem_keys.shape[0] - 1)
+        to_invert = problem_keys[pos] == adj_keys
+        idx = torch.arange(case_ids.shape[0], device=self.device)[to_check][within_range][to_invert]
+        case_ids.index_put_((idx,), problem_config[to_invert][..., -1])
+        return case_ids
+
     @torch.no_grad()
     def _identify_surf_edges(self, scalar_field, cube_idx, surf_cubes):
         """
@@ -16,6 +16,43 @@ def construct_dense_grid(res, device='cuda'):
     return verts, cube_fx8
 
 
+def construct_sparse_grid(coords, res):
+    '''
+    construct the cubes of a res^3 grid that can touch the given voxels, i.e. the voxels
+    dilated by one, and their corner vertices. Cubes and vertices are ordered as in
+    construct_dense_grid, so the extracted mesh has the same topology.
+    '''
+    keys = coords.long()
+    for axis in range(3):
+        shift = torch.zeros(3, 3, dtype=torch.long, device=keys.device)
+        shift[:, axis] = torch.tensor([-1, 0, 1], device=keys.device)
+        keys = (keys.unsqueeze(1) + shift.unsqueeze(0)).reshape(-1, 3)
+        keys = keys[((keys >= 0) & (keys < res)).all(dim=-1)]
+        keys = torch.unique(keys, dim=0)
+    cube_coords = keys
+    res_v = res + 1
+    verts = cube_coords.unsqueeze(1) + cube_corners.unsqueeze(0).to(cube_coords)
+    verts_key = (verts[..., 0] * res_v + verts[..., 1]) * res_v + verts[..., 2]
+    verts_key, cube_fx8 = torch.unique(verts_key.reshape(-1), return_inverse=True)
+    verts = torch.stack([verts_key // (res_v ** 2), (verts_key // res_v) % res_v, verts_key % res_v], dim=1)
+    return verts, cube_fx8.reshape(-1, 8), cube_coords
+
+
+def get_sparse_attrs(coords : torch.Tensor, feats : torch.Tensor, grid_coords : torch.Tensor, res : int, sdf_init=True):
+    '''
+    same as get_dense_attrs, but only for the grid points in grid_coords (sorted in raster order)
+    '''
+    F = feats.shape[-1]
+    sparse_attrs = torch.zeros([grid_coords.shape[0], F], device=feats.device)
+    if sdf_init:
+        sparse_attrs[..., 0] = 1 # initial outside sdf value
+    grid_key = (grid_coords[:, 0] * res + grid_coords[:, 1]) * res + grid_coords[:, 2]
+    coords = coords.long()
+    key = (coords[:, 0] * res + coords[:, 1]) * res + coords[:, 2]
+    sparse_attrs[torch.searchsorted(grid_key, key)] = feats
+    return sparse_attrs
+
+
 def construct_voxel_grid(coords):
     verts = (cube_corners.unsqueeze(0).to(coords) + coords.unsqueeze(1)).reshape(-1, 3)
     verts_unique, inverse_indices = torch.unique(verts, dim=0, return_inverse=True)
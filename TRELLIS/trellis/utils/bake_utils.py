@@ -0,0 +1,305 @@
+from typing import *
+from collections import OrderedDict
+import numpy as np
+import torch
+import torch.nn.functional as F
+from tqdm import tqdm
+from ..renderers.cpu_rasterizer import TriangleRasterizer, interpolate
+
+
+__all__ = [
+    'CudaRasterizer',
+    'CpuRasterizer',
+    'get_rasterizer',
+    'ViewBuffers',
+    'bake_average',
+    'bake_multires',
+]
+
+
+class CudaRasterizer:
+    """
+    Rasterizer backed by nvdiffrast through utils3d. One context is reused for every call.
+    """
+    device = 'cuda'
+
+    def __init__(self):
+        import utils3d
+        self.utils3d = utils3d
+        self.ctx = utils3d.torch.RastContext(backend='cuda')
+
+    def __call__(self, vertices, faces, uvs, width, height, view=None, projection=None) -> dict:
+        """
+        Returns:
+            a dict containing the following, in rasterization order (first row at the bottom)
+            - 'uv': [1, H, W, 2] interpolated uv.
+            - 'uv_dr': [1, H, W, 4] screen-space derivatives of uv, or None.
+            - 'mask': [H, W] coverage.
+        """
+        rast = self.utils3d.torch.rasterize_triangle_faces(
+            self.ctx, vertices[None], faces, width, height, uv=None if uvs is None else uvs[None], view=view, projection=projection
+        )
+        return {
+            'uv': rast['uv'].detach() if uvs is not None else None,
+            'uv_dr': rast['uv_dr'].detach() if uvs is not None else None,
+            'mask': rast['mask'][0].detach() > 0,
+        }
+
+
+class CpuRasterizer:
+    """
+    Rasterizer backed by the pure PyTorch `TriangleRasterizer`, for machines without nvdiffrast.
+
+    Args:
+        max_candidates (int): Maximum number of candidate pixels processed at once.
+    """
+    device = 'cpu'
+
+    def __init__(self, max_candidates: int = 1 << 22):
+        self.rasterizer = TriangleRasterizer(max_candidates)
+
+    @torch.no_grad()
+    def __call__(self, vertices, faces, uvs, width, height, view=None, projection=None) -> dict:
+        """
+        Returns:
+            Same as `CudaRasterizer`, with 'uv_dr' set to None.
+        """
+        if vertices.shape[-1] == 2:
+            clip = torch.cat([vertices, torch.zeros_like(vertices[:, :1]), torch.ones_like(vertices[:, :1])], dim=-1)
+        else:
+            clip = torch.cat([vertices, torch.ones_like(vertices[:, :1])], dim=-1)
+            if view is not None:
+                clip = clip @ view.T
+            if projection is not None:
+                clip = clip @ projection.T
+        face_id, bary = self.rasterizer.rasterize(clip, faces, width, height)
+        uv = None if uvs is None else interpolate(uvs, faces, face_id, bary)[None]
+        return {'uv': uv, 'uv_dr': None, 'mask': face_id >= 0}
+
+
+def get_rasterizer(backend: Optional[Literal['cuda', 'cpu']] = None):
+    """
+    Create a rasterizer. Defaults to nvdiffrast when CUDA is available and to the CPU fallback otherwise.
+    """
+    if backend is None:
+        backend = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if backend == 'cuda':
+        return CudaRasterizer()
+    elif backend == 'cpu':
+        return CpuRasterizer()
+    raise ValueError(f"Unknown rasterizer backend: {backend}")
+
+
+class ViewBuffers:
+    """
+    Per-view rasterization buffers (uv, uv_dr) paired with the observations and masks,
+    all in rasterization order.
+
+    With `max_cached=None` every view is rasterized once up front. Otherwise views are
+    rasterized on demand and at most `max_cached` of them are kept, least recently used
+    first out, and the observations stay in host memory until they are needed.
+    `num_rasterized` counts the rasterizations so far.
+
+    Args:
+        rasterizer: A rasterizer from `get_rasterizer`.
+        vertices, faces, uvs: The mesh on the rasterizer device.
+        observations (List[np.array]): Images. Shape (H, W, 3), uint8.
+        masks (List[np.array]): Masks. Shape (H, W).
+        views, projections (List[torch.Tensor]): Camera matrices on the rasterizer device.
+        max_cached (int): Maximum number of views kept, or None to keep all.
+    """
+    def __init__(self, rasterizer, vertices, faces, uvs, observations, masks, views, projections, max_cached: Optional[int] = None, verbose: bool = False):
+        self.rasterizer = rasterizer
+        self.vertices, self.faces, self.uvs = vertices, faces, uvs
+        self.observations = observations
+        self.masks = masks
+        self.views = views
+        self.projections = projections
+        self.max_cached = max_cached
+        self.device = vertices.device
+        self._cache = OrderedDict()
+        self.num_rasterized = 0
+        if max_cached is None:
+            for i in tqdm(range(len(self)), disable=not verbose, desc='Texture baking: UV'):
+                self[i]
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def sample_order(self, repeats: int = 1) -> Iterator[int]:
+        """
+        Endless random view indices for stochastic optimization.
+
+        When every view is kept, views are drawn uniformly. Otherwise the views are visited
+        in shuffled passes, a block of `max_cached` views at a time, and every view of a block
+        is drawn `repeats` times in random order before moving on, so a pass rasterizes each
+        view once instead of missing the cache on almost every draw.
+
+        Args:
+            repeats (int): Draws of every view per pass.
+        """
+        if self.max_cached is None or self.max_cached >= len(self):
+            while True:
+                yield np.random.randint(0, len(self))
+        while True:
+            permutation = np.random.permutation(len(self))
+            for start in range(0, len(self), self.max_cached):
+                block = permutation[start:start + self.max_cached]
+                yield from np.random.permutation(np.repeat(block, repeats)).tolist()
+
+    def _load(self, i: int) -> dict:
+        self.num_rasterized += 1
+        observation = torch.tensor(self.observations[i] / 255.0).float().to(self.device).flip(0)
+        mask = torch.tensor(self.masks[i] > 0).bool().to(self.device).flip(0)
+        rast = self.rasterizer(
+            self.vertices, self.faces, self.uvs, observation.shape[1], observation.shape[0],
+            view=self.views[i], projection=self.projections[i]
+        )
+        return {'uv': rast['uv'], 'uv_dr': rast['uv_dr'], 'observation': observation, 'mask': mask & rast['mask']}
+
+    def __getitem__(self, i: int) -> dict:
+        if i in self._cache:
+            self._cache.move_to_end(i)
+            return self._cache[i]
+        item = self._load(i)
+        self._cache[i] = item
+        if self.max_cached is not None and len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return item
+
+
+def sample_texture(texture: torch.Tensor, uv: torch.Tensor, uv_dr: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """
+    Sample a [1, S, S, C] texture at [1, H, W, 2] uv coordinates.
+    Uses nvdiffrast with mipmapping when derivatives are available, bilinear sampling otherwise.
+    """
+    if uv_dr is not None and texture.is_cuda:
+        import nvdiffrast.torch as dr
+        return dr.texture(texture, uv, uv_dr)
+    grid = uv * 2 - 1
+    return F.grid_sample(texture.permute(0, 3, 1, 2), grid, mode='bilinear', padding_mode='border', align_corners=False).permute(0, 2, 3, 1)
+
+
+def splat_views(buffers: ViewBuffers, texture_size: int, verbose: bool = False) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Accumulate every observed pixel into the four nearest texels with bilinear weights.
+
+    Returns:
+        The weighted color sums [S * S, 3] and the weight sums [S * S], with the first row at v = 0.
+    """
+    color_sum = torch.zeros(texture_size * texture_size, 3, dtype=torch.float32, device=buffers.device)
+    weight_sum = torch.zeros(texture_size * texture_size, dtype=torch.float32, device=buffers.device)
+    for i in tqdm(range(len(buffers)), disable=not verbose, desc='Texture baking (average)'):
+        item = buffers[i]
+        mask = item['mask']
+        uv = item['uv'][0][mask]
+        obs = item['observation'][mask]
+        p = uv * texture_size - 0.5
+        p0 = p.floor()
+        frac = p - p0
+        p0 = p0.long()
+        for dx, dy in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+            wx = frac[:, 0] if dx else 1 - frac[:, 0]
+            wy = frac[:, 1] if dy else 1 - frac[:, 1]
+            x = (p0[:, 0] + dx).clamp(0, texture_size - 1)
+            y = (p0[:, 1] + dy).clamp(0, texture_size - 1)
+            idx = y * texture_size + x
+            w = wx * wy
+            color_sum.index_add_(0, idx, obs * w[:, None])
+            weight_sum.index_add_(0, idx, w)
+    return color_sum, weight_sum
+
+
+def bake_average(buffers: ViewBuffers, texture_size: int, verbose: bool = False) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Closed-form bake: each texel is the weighted average of the pixels that land on it,
+    which is the least-squares solution of the data term without regularization.
+
+    Returns:
+        The [1, S, S, 3] texture with the first row at v = 0, and the [S, S] mask of observed texels.
+    """
+    color_sum, weight_sum = splat_views(buffers, texture_size, verbose)
+    observed = weight_sum > 1e-8
+    texture = torch.zeros_like(color_sum)
+    texture[observed] = color_sum[observed] / weight_sum[observed][:, None]
+    return texture.reshape(1, texture_size, texture_size, 3), observed.reshape(texture_size, texture_size)
+
+
+def _tv_loss(texture):
+    return F.l1_loss(texture[:, :-1, :, :], texture[:, 1:, :, :]) + \
+           F.l1_loss(texture[:, :, :-1, :], texture[:, :, 1:, :])
+
+
+def bake_multires(
+    buffers: ViewBuffers,
+    texture_size: int,
+    num_levels: int = 3,
+    max_steps: int = 1000,
+    min_steps: int = 100,
+    lambda_tv: float = 1e-2,
+    lr: Tuple[float, float] = (1e-2, 1e-5),
+    tol: float = 1e-3,
+    check_interval: int = 50,
+    init: Optional[torch.Tensor] = None,
+    verbose: bool = False,
+) -> torch.Tensor:
+    """
+    Coarse-to-fine texture optimization.
+
+    The texture is optimized at texture_size / 2^(num_levels-1) first, then upsampled and
+    refined at every finer level. The total variation term is evaluated at the resolution of
+    the current level. A level stops early once the smoothed loss improves by less than `tol`
+    (relative) over `check_interval` steps. Views are drawn by `ViewBuffers.sample_order`,
+    at most one pass over the views per level when the buffers keep only some of them.
+
+    Args:
+        buffers (ViewBuffers): The views to fit.
+        texture_size (int): Size of the final texture.
+        num_levels (int): Number of resolution levels.
+        max_steps (int): Maximum number of steps per level.
+        min_steps (int): Minimum number of steps per level before early stopping.
+        lambda_tv (float): Weight of total variation loss.
+        lr (Tuple[float, float]): Start and end learning rate of the cosine schedule of each level.
+        tol (float): Relative improvement of the smoothed loss under which a level stops.
+        check_interval (int): Number of steps between convergence checks.
+        init (torch.Tensor): Optional [1, S, S, 3] initial texture at any resolution.
+        verbose (bool): Whether to print progress.
+
+    Returns:
+        The [1, S, S, 3] texture with the first row at v = 0.
+    """
+    sizes = [max(texture_size >> (num_levels - 1 - i), 1) for i in range(num_levels)]
+    if init is None:
+        texture = torch.zeros((1, sizes[0], sizes[0], 3), dtype=torch.float32, device=buffers.device)
+    else:
+        texture = F.interpolate(init.permute(0, 3, 1, 2), size=(sizes[0], sizes[0]), mode='area').permute(0, 2, 3, 1)
+
+    order = buffers.sample_order(repeats=max(1, max_steps // len(buffers)))
+    for level, size in enumerate(sizes):
+        if texture.shape[1] != size:
+            texture = F.interpolate(texture.permute(0, 3, 1, 2), size=(size, size), mode='bilinear', align_corners=False).permute(0, 2, 3, 1)
+        texture = torch.nn.Parameter(texture.detach().contiguous())
+        optimizer = torch.optim.Adam([texture], betas=(0.5, 0.9), lr=lr[0])
+        ema, last_ema = None, None
+        with tqdm(total=max_steps, disable=not verbose, desc=f'Texture baking (level {level + 1}/{num_levels}, {size}px)') as pbar:
+            for step in range(max_steps):
+                optimizer.zero_grad()
+                item = buffers[next(order)]
+                render = sample_texture(texture, item['uv'], item['uv_dr'])[0]
+                mask = item['mask']
+                loss = F.l1_loss(render[mask], item['observation'][mask]) if mask.any() else render.sum() * 0
+                if lambda_tv > 0:
+                    loss = loss + lambda_tv * _tv_loss(texture)
+                loss.backward()
+                optimizer.step()
+                optimizer.param_groups[0]['lr'] = lr[1] + 0.5 * (lr[0] - lr[1]) * (1 + np.cos(np.pi * step / max_steps))
+                pbar.set_postfix({'loss': loss.item()})
+                pbar.update()
+                # Early stopping on the smoothed loss
+                ema = loss.item() if ema is None else 0.9 * ema + 0.1 * loss.item()
+                if (step + 1) % check_interval == 0:
+                    if step + 1 >= min_steps and last_ema is not None and last_ema - ema < tol * last_ema:
+                        break
+                    last_ema = ema
+        texture = texture.detach()
+    return texture
@@ -12,8 +12,9 @@ from pymeshfix import _meshfix
 import igraph
 import cv2
 from PIL import Image
-from .random_utils import sphere_hammersley_sequence
 from .render_utils import render_multiview
+from .visibility_utils import RasterizeVisibility, get_visibility_estimator
+from . import bake_utils
 from ..renderers import GaussianRenderer
 from ..representations import Strivec, Gaussian, MeshExtractResult
 
@@ -26,11 +27,12 @@ def _fill_holes(
     max_hole_nbe=32,
     resolution=128,
     num_views=500,
+    visibility='rasterize',
     debug=False,
     verbose=False
 ):
     """
-    Rasterize a mesh from multiple views and remove invisible faces.
+    Estimate face visibility from multiple views and remove invisible faces.
     Also includes postprocessing to:
         1. Remove connected components that are have low visibility.
         2. Mincut to remove faces at the inner side of the mesh connected to the outer side with a small hole.
@@ -40,44 +42,17 @@ def _fill_holes(
         faces (torch.Tensor): Faces of the mesh. Shape (F, 3).
         max_hole_size (float): Maximum area of a hole to fill.
         resolution (int): Resolution of the rasterization.
-        num_views (int): Number of views to rasterize the mesh.
+        num_views (int): Number of views to estimate visibility from.
+        visibility (str or callable): Visibility estimator, 'rasterize' (nvdiffrast, CUDA), 'raycast' (BVH, CPU),
+            or a callable mapping (verts, faces, verbose) to the fraction of views each face is visible in.
         verbose (bool): Whether to print progress.
     """
-    # Construct cameras
-    yaws = []
-    pitchs = []
-    for i in range(num_views):
-        y, p = sphere_hammersley_sequence(i, num_views)
-        yaws.append(y)
-        pitchs.append(p)
-    yaws = torch.tensor(yaws).cuda()
-    pitchs = torch.tensor(pitchs).cuda()
-    radius = 2.0
-    fov = torch.deg2rad(torch.tensor(40)).cuda()
-    projection = utils3d.torch.perspective_from_fov_xy(fov, fov, 1, 3)
-    views = []
-    for (yaw, pitch) in zip(yaws, pitchs):
-        orig = torch.tensor([
-            torch.sin(yaw) * torch.cos(pitch),
-            torch.cos(yaw) * torch.cos(pitch),
-            torch.sin(pitch),
-        ]).cuda().float() * radius
-        view = utils3d.torch.view_look_at(orig, torch.tensor([0, 0, 0]).float().cuda(), torch.tensor([0, 0, 1]).float().cuda())
-        views.append(view)
-    views = torch.stack(views, dim=0)
-
-    # Rasterize
-    visblity = torch.zeros(faces.shape[0], dtype=torch.int32, device=verts.device)
-    rastctx = utils3d.torch.RastContext(backend='cuda')
-    for i in tqdm(range(views.shape[0]), total=views.shape[0], disable=not verbose, desc='Rasterizing'):
-        view = views[i]
-        buffers = utils3d.torch.rasterize_triangle_faces(
-            rastctx, verts[None], faces, resolution, resolution, view=view, projection=projection
-        )
-        face_id = buffers['face_id'][0][buffers['mask'][0] > 0.95] - 1
-        face_id = torch.unique(face_id).long()
-        visblity[face_id] += 1
-    visblity = visblity.float() / num_views
+    # Estimate visibility
+    if visibility == 'rasterize':
+        visibility = RasterizeVisibility(resolution=resolution, num_views=num_views)
+    elif isinstance(visibility, str):
+        visibility = get_visibility_estimator(visibility, num_views=num_views)
+    visblity = visibility(verts, faces, verbose=verbose).to(verts.device)
     
     # Mincut
     ## construct outer faces
@@ -188,11 +163,12 @@ def _fill_holes(
         if verbose:
             tqdm.write(f'Removed 0 faces by mincut')
             
+    device = verts.device
     mesh = _meshfix.PyTMesh()
     mesh.load_array(verts.cpu().numpy(), faces.cpu().numpy())
     mesh.fill_small_boundaries(nbe=max_hole_nbe, refine=True)
     verts, faces = mesh.return_arrays()
-    verts, faces = torch.tensor(verts, device='cuda', dtype=torch.float32), torch.tensor(faces, device='cuda', dtype=torch.int32)
+    verts, faces = torch.tensor(verts, device=device, dtype=torch.float32), torch.tensor(faces, device=device, dtype=torch.int32)
 
     return verts, faces
 
@@ -207,6 +183,7 @@ def postprocess_mesh(
     fill_holes_max_hole_nbe: int = 32,
     fill_holes_resolution: int = 1024,
     fill_holes_num_views: int = 1000,
+    fill_holes_visibility: str = 'rasterize',
     debug: bool = False,
     verbose: bool = False,
 ):
@@ -222,7 +199,8 @@ def postprocess_mesh(
         fill_holes_max_hole_size (float): Maximum area of a hole to fill.
         fill_holes_max_hole_nbe (int): Maximum number of boundary edges of a hole to fill.
         fill_holes_resolution (int): Resolution of the rasterization.
-        fill_holes_num_views (int): Number of views to rasterize the mesh.
+        fill_holes_num_views (int): Number of views to estimate visibility from.
+        fill_holes_visibility (str): Visibility estimator, 'rasterize' (nvdiffrast, CUDA) or 'raycast' (BVH, CPU).
         verbose (bool): Whether to print progress.
     """
 
@@ -239,13 +217,15 @@ def postprocess_mesh(
 
     # Remove invisible faces
     if fill_holes:
-        vertices, faces = torch.tensor(vertices).cuda(), torch.tensor(faces.astype(np.int32)).cuda()
+        device = 'cuda' if fill_holes_visibility == 'rasterize' else 'cpu'
+        vertices, faces = torch.tensor(vertices).to(device), torch.tensor(faces.astype(np.int32)).to(device)
         vertices, faces = _fill_holes(
             vertices, faces,
             max_hole_size=fill_holes_max_hole_size,
             max_hole_nbe=fill_holes_max_hole_nbe,
             resolution=fill_holes_resolution,
             num_views=fill_holes_num_views,
+            visibility=fill_holes_visibility,
             debug=debug,
             verbose=verbose,
         )
@@ -284,8 +264,10 @@ def bake_texture(
     texture_size: int = 2048,
     near: float = 0.1,
     far: float = 10.0,
-    mode: Literal['fast', 'opt'] = 'opt',
+    mode: Literal['fast', 'opt', 'average', 'multires', 'stream'] = 'opt',
     lambda_tv: float = 1e-2,
+    rasterizer: Optional[Literal['cuda', 'cpu']] = None,
+    max_cached_views: int = 8,
     verbose: bool = False,
 ):
     """
@@ -302,10 +284,25 @@ def bake_texture(
         texture_size (int): Size of the texture.
         near (float): Near plane of the camera.
         far (float): Far plane of the camera.
-        mode (Literal['fast', 'opt']): Mode of texture baking.
+        mode (Literal['fast', 'opt', 'average', 'multires', 'stream']): Mode of texture baking.
+            - 'fast': nearest texel average.
+            - 'opt': 2500 steps of optimization at full resolution.
+            - 'average': closed-form bilinear weighted average, no optimization.
+            - 'multires': coarse-to-fine optimization with early stopping, initialized from 'average'.
+            - 'stream': 'multires' keeping at most `max_cached_views` views rasterized at a time.
         lambda_tv (float): Weight of total variation loss in optimization.
+        rasterizer (Literal['cuda', 'cpu']): Rasterizer of the 'average', 'multires' and 'stream' modes.
+            Defaults to 'cuda' when available.
+        max_cached_views (int): Number of views kept in memory in 'stream' mode.
         verbose (bool): Whether to print progress.
     """
+    if mode in ['average', 'multires', 'stream']:
+        return _bake_texture_engine(
+            vertices, faces, uvs, observations, masks, extrinsics, intrinsics,
+            texture_size=texture_size, near=near, far=far, mode=mode, lambda_tv=lambda_tv,
+            rasterizer=rasterizer, max_cached_views=max_cached_views, verbose=verbose,
+        )
+
     vertices = torch.tensor(vertices).cuda()
     faces = torch.tensor(faces.astype(np.int32)).cuda()
     uvs = torch.tensor(uvs).cuda()
@@ -318,13 +315,13 @@ def bake_texture(
         texture = torch.zeros((texture_size * texture_size, 3), dtype=torch.float32).cuda()
         texture_weights = torch.zeros((texture_size * texture_size), dtype=torch.float32).cuda()
         rastctx = utils3d.torch.RastContext(backend='cuda')
-        for observation, view, projection in tqdm(zip(observations, views, projections), total=len(observations), disable=not verbose, desc='Texture baking (fast)'):
+        for i, (observation, view, projection) in tqdm(enumerate(zip(observations, views, projections)), total=len(observations), disable=not verbose, desc='Texture baking (fast)'):
             with torch.no_grad():
                 rast = utils3d.torch.rasterize_triangle_faces(
                     rastctx, vertices[None], faces, observation.shape[1], observation.shape[0], uv=uvs[None], view=view, projection=projection
                 )
                 uv_map = rast['uv'][0].detach().flip(0)
-                mask = rast['mask'][0].detach().bool() & masks[0]
+                mask = rast['mask'][0].detach().bool().flip(0) & masks[i]
             
             # nearest neighbor interpolation
             uv_map = (uv_map * texture_size).floor().long()
@@ -396,32 +393,107 @@ def bake_texture(
     return texture
 
 
-def to_glb(
+def _bake_texture_engine(
+    vertices: np.array,
+    faces: np.array,
+    uvs: np.array,
+    observations: List[np.array],
+    masks: List[np.array],
+    extrinsics: List[np.array],
+    intrinsics: List[np.array],
+    texture_size: int,
+    near: float,
+    far: float,
+    mode: Literal['average', 'multires', 'stream'],
+    lambda_tv: float,
+    rasterizer: Optional[Literal['cuda', 'cpu']],
+    max_cached_views: int,
+    verbose: bool,
+):
+    """
+    The 'average', 'multires' and 'stream' modes of `bake_texture`, which also run on the CPU.
+    """
+    rasterizer = bake_utils.get_rasterizer(rasterizer)
+    device = rasterizer.device
+    vertices = torch.tensor(vertices).float().to(device)
+    faces = torch.tensor(faces.astype(np.int32)).to(device)
+    uvs = torch.tensor(uvs).float().to(device)
+    views = [utils3d.torch.extrinsics_to_view(torch.tensor(extr).float().to(device)) for extr in extrinsics]
+    projections = [utils3d.torch.intrinsics_to_perspective(torch.tensor(intr).float().to(device), near, far) for intr in intrinsics]
+
+    buffers = bake_utils.ViewBuffers(
+        rasterizer, vertices, faces, uvs, observations, masks, views, projections,
+        max_cached=max_cached_views if mode == 'stream' else None,
+        verbose=verbose,
+    )
+    texture, _ = bake_utils.bake_average(buffers, texture_size, verbose=verbose)
+    if mode in ['multires', 'stream']:
+        texture = bake_utils.bake_multires(buffers, texture_size, lambda_tv=lambda_tv, init=texture, verbose=verbose)
+
+    texture = np.clip(texture[0].flip(0).detach().cpu().numpy() * 255, 0, 255).astype(np.uint8)
+    coverage = rasterizer((uvs * 2 - 1), faces, None, texture_size, texture_size)['mask'].flip(0)
+    mask = (~coverage).cpu().numpy().astype(np.uint8)
+    texture = cv2.inpaint(texture, mask, 3, cv2.INPAINT_TELEA)
+    return texture
+
+
+def render_glb_observations(
     app_rep: Union[Strivec, Gaussian],
-    mesh: MeshExtractResult,
+    resolution: int = 1024,
+    nviews: int = 100,
+) -> dict:
+    """
+    Render the views a texture is baked from. This is the only GPU-bound stage of `to_glb`.
+
+    Args:
+        app_rep (Union[Strivec, Gaussian]): Appearance representation.
+        resolution (int): Resolution of the views.
+        nviews (int): Number of views.
+
+    Returns:
+        A dict of lists of numpy arrays, with keys 'observations', 'masks', 'extrinsics' and 'intrinsics'.
+    """
+    observations, extrinsics, intrinsics = render_multiview(app_rep, resolution=resolution, nviews=nviews)
+    masks = [np.any(observation > 0, axis=-1) for observation in observations]
+    extrinsics = [extrinsics[i].cpu().numpy() for i in range(len(extrinsics))]
+    intrinsics = [intrinsics[i].cpu().numpy() for i in range(len(intrinsics))]
+    return {
+        'observations': observations,
+        'masks': masks,
+        'extrinsics': extrinsics,
+        'intrinsics': intrinsics,
+    }
+
+
+def mesh_to_glb(
+    vertices: np.array,
+    faces: np.array,
+    observations: List[np.array],
+    masks: List[np.array],
+    extrinsics: List[np.array],
+    intrinsics: List[np.array],
     simplify: float = 0.95,
     fill_holes: bool = True,
     fill_holes_max_size: float = 0.04,
+    fill_holes_visibility: Literal['rasterize', 'raycast'] = 'rasterize',
     texture_size: int = 1024,
+    bake_mode: Literal['fast', 'opt', 'average', 'multires', 'stream'] = 'opt',
+    bake_rasterizer: Optional[Literal['cuda', 'cpu']] = None,
     debug: bool = False,
     verbose: bool = True,
 ) -> trimesh.Trimesh:
     """
-    Convert a generated asset to a glb file.
+    Postprocess, parametrize and texture a mesh from rendered views.
+    Runs entirely on the CPU with fill_holes_visibility='raycast', bake_mode in
+    ['average', 'multires', 'stream'] and bake_rasterizer='cpu'.
 
     Args:
-        app_rep (Union[Strivec, Gaussian]): Appearance representation.
-        mesh (MeshExtractResult): Extracted mesh.
-        simplify (float): Ratio of faces to remove in simplification.
-        fill_holes (bool): Whether to fill holes in the mesh.
-        fill_holes_max_size (float): Maximum area of a hole to fill.
-        texture_size (int): Size of the texture.
-        debug (bool): Whether to print debug information.
-        verbose (bool): Whether to print progress.
+        vertices (np.array): Vertices of the mesh. Shape (V, 3).
+        faces (np.array): Faces of the mesh. Shape (F, 3).
+        observations, masks, extrinsics, intrinsics: Views from `render_glb_observations`.
+        bake_rasterizer (str): Rasterizer of the 'average', 'multires' and 'stream' bake modes.
+        See `to_glb` for the other arguments.
     """
-    vertices = mesh.vertices.cpu().numpy()
-    faces = mesh.faces.cpu().numpy()
-    
     # mesh postprocess
     vertices, faces = postprocess_mesh(
         vertices, faces,
@@ -431,7 +503,8 @@ def to_glb(
         fill_holes_max_hole_size=fill_holes_max_size,
         fill_holes_max_hole_nbe=int(250 * np.sqrt(1-simplify)),
         fill_holes_resolution=1024,
-        fill_holes_num_views=1000,
+        fill_holes_num_views=1000 if fill_holes_visibility == 'rasterize' else 100,
+        fill_holes_visibility=fill_holes_visibility,
         debug=debug,
         verbose=verbose,
     )
@@ -440,15 +513,12 @@ def to_glb(
     vertices, faces, uvs = parametrize_mesh(vertices, faces)
 
     # bake texture
-    observations, extrinsics, intrinsics = render_multiview(app_rep, resolution=1024, nviews=100)
-    masks = [np.any(observation > 0, axis=-1) for observation in observations]
-    extrinsics = [extrinsics[i].cpu().numpy() for i in range(len(extrinsics))]
-    intrinsics = [intrinsics[i].cpu().numpy() for i in range(len(intrinsics))]
     texture = bake_texture(
         vertices, faces, uvs,
         observations, masks, extrinsics, intrinsics,
-        texture_size=texture_size, mode='opt',
+        texture_size=texture_size, mode=bake_mode,
         lambda_tv=0.01,
+        rasterizer=bake_rasterizer,
         verbose=verbose
     )
     texture = Image.fromarray(texture)
@@ -464,6 +534,49 @@ def to_glb(
     return mesh
 
 
+def to_glb(
+    app_rep: Union[Strivec, Gaussian],
+    mesh: MeshExtractResult,
+    simplify: float = 0.95,
+    fill_holes: bool = True,
+    fill_holes_max_size: float = 0.04,
+    fill_holes_visibility: Literal['rasterize', 'raycast'] = 'rasterize',
+    texture_size: int = 1024,
+    bake_mode: Literal['fast', 'opt', 'average', 'multires', 'stream'] = 'opt',
+    debug: bool = False,
+    verbose: bool = True,
+) -> trimesh.Trimesh:
+    """
+    Convert a generated asset to a glb file.
+
+    Args:
+        app_rep (Union[Strivec, Gaussian]): Appearance representation.
+        mesh (MeshExtractResult): Extracted mesh.
+        simplify (float): Ratio of faces to remove in simplification.
+        fill_holes (bool): Whether to fill holes in the mesh.
+        fill_holes_max_size (float): Maximum area of a hole to fill.
+        fill_holes_visibility (str): Visibility estimator for hole filling. 'raycast' runs on the CPU with 100 views.
+        texture_size (int): Size of the texture.
+        bake_mode (str): Mode of texture baking, see `bake_texture`.
+        debug (bool): Whether to print debug information.
+        verbose (bool): Whether to print progress.
+    """
+    views = render_glb_observations(app_rep, resolution=1024, nviews=100)
+    return mesh_to_glb(
+        mesh.vertices.cpu().numpy(),
+        mesh.faces.cpu().numpy(),
+        **views,
+        simplify=simplify,
+        fill_holes=fill_holes,
+        fill_holes_max_size=fill_holes_max_size,
+        fill_holes_visibility=fill_holes_visibility,
+        texture_size=texture_size,
+        bake_mode=bake_mode,
+        debug=debug,
+        verbose=verbose,
+    )
+
+
 def simplify_gs(
     gs: Gaussian,
     simplify: float = 0.95,
@@ -10,34 +10,42 @@ from ..modules import sparse as sp
 from .random_utils import sphere_hammersley_sequence
 
 
-def yaw_pitch_r_fov_to_extrinsics_intrinsics(yaws, pitchs, rs, fovs):
-    is_list = isinstance(yaws, list)
-    if not is_list:
-        yaws = [yaws]
-        pitchs = [pitchs]
-    if not isinstance(rs, list):
-        rs = [rs] * len(yaws)
-    if not isinstance(fovs, list):
-        fovs = [fovs] * len(yaws)
-    extrinsics = []
-    intrinsics = []
-    for yaw, pitch, r, fov in zip(yaws, pitchs, rs, fovs):
-        fov = torch.deg2rad(torch.tensor(float(fov))).cuda()
-        yaw = torch.tensor(float(yaw)).cuda()
-        pitch = torch.tensor(float(pitch)).cuda()
-        orig = torch.tensor([
-            torch.sin(yaw) * torch.cos(pitch),
-            torch.cos(yaw) * torch.cos(pitch),
-            torch.sin(pitch),
-        ]).cuda() * r
-        extr = utils3d.torch.extrinsics_look_at(orig, torch.tensor([0, 0, 0]).float().cuda(), torch.tensor([0, 0, 1]).float().cuda())
-        intr = utils3d.torch.intrinsics_from_fov_xy(fov, fov)
-        extrinsics.append(extr)
-        intrinsics.append(intr)
+def _as_batch(values, n, device):
+    values = torch.as_tensor(values, dtype=torch.float32).to(device).reshape(-1)
+    return values.expand(n) if values.shape[0] == 1 else values
+
+
+def yaw_pitch_r_fov_to_extrinsics_intrinsics(yaws, pitchs, rs, fovs, device='cuda'):
+    """
+    Cameras on spheres around the origin looking at it, with z up. All cameras are built at once.
+
+    Args:
+        yaws, pitchs: Angles in radians, a scalar or a sequence (list, array or tensor).
+        rs: Distances to the origin, a scalar or one per camera.
+        fovs: Fields of view in degrees, a scalar or one per camera.
+        device: Device of the returned matrices.
+
+    Returns:
+        Lists of (4, 4) extrinsics and (3, 3) intrinsics for sequence inputs, single matrices for scalars.
+    """
+    is_list = not (np.isscalar(yaws) or (isinstance(yaws, torch.Tensor) and yaws.dim() == 0))
+    yaws = _as_batch(yaws, 1, device)
+    n = yaws.shape[0]
+    pitchs = _as_batch(pitchs, n, device)
+    rs = _as_batch(rs, n, device)
+    fovs = torch.deg2rad(_as_batch(fovs, n, device))
+    origs = torch.stack([
+        torch.sin(yaws) * torch.cos(pitchs),
+        torch.cos(yaws) * torch.cos(pitchs),
+        torch.sin(pitchs),
+    ], dim=-1) * rs[:, None]
+    targets = torch.zeros_like(origs)
+    ups = torch.tensor([0, 0, 1], dtype=torch.float32, device=device).expand(n, 3)
+    extrinsics = utils3d.torch.extrinsics_look_at(origs, targets, ups)
+    intrinsics = utils3d.torch.intrinsics_from_fov_xy(fovs, fovs)
     if not is_list:
-        extrinsics = extrinsics[0]
-        intrinsics = intrinsics[0]
-    return extrinsics, intrinsics
+        return extrinsics[0], intrinsics[0]
+    return list(extrinsics.unbind(0)), list(intrinsics.unbind(0))
 
 
 def get_renderer(sample, **kwargs):
@@ -59,7 +67,7 @@ def get_renderer(sample, **kwargs):
         renderer.pipe.kernel_size = kwargs.get('kernel_size', 0.1)
         renderer.pipe.use_mip_gaussian = True
     elif isinstance(sample, MeshExtractResult):
-        renderer = MeshRenderer()
+        renderer = MeshRenderer(device=str(sample.vertices.device))
         renderer.rendering_options.resolution = kwargs.get('resolution', 512)
         renderer.rendering_options.near = kwargs.get('near', 1)
         renderer.rendering_options.far = kwargs.get('far', 100)
@@ -69,26 +77,90 @@ def get_renderer(sample, **kwargs):
     return renderer
 
 
-def render_frames(sample, extrinsics, intrinsics, options={}, colors_overwrite=None, verbose=True, **kwargs):
-    renderer = get_renderer(sample, **options)
-    rets = {}
-    for j, (extr, intr) in tqdm(enumerate(zip(extrinsics, intrinsics)), desc='Rendering', disable=not verbose):
-        if isinstance(sample, MeshExtractResult):
-            res = renderer.render(sample, extr, intr)
-            if 'normal' not in rets: rets['normal'] = []
-            rets['normal'].append(np.clip(res['normal'].detach().cpu().numpy().transpose(1, 2, 0) * 255, 0, 255).astype(np.uint8))
+class _FrameReadback:
+    """
+    Copies rendered batches to host memory. CUDA batches go through pinned buffers with
+    non-blocking copies, so the readback of a batch overlaps with rendering the next one.
+    """
+    def __init__(self):
+        self.pending = {}
+
+    def push(self, key, images):
+        if images is None:
+            self.pending.setdefault(key, []).append((None, None))
+            return
+        if images.is_cuda:
+            buffer = torch.empty(images.shape, dtype=images.dtype, pin_memory=True)
+            buffer.copy_(images, non_blocking=True)
+            event = torch.cuda.Event()
+            event.record()
         else:
-            res = renderer.render(sample, extr, intr, colors_overwrite=colors_overwrite)
-            if 'color' not in rets: rets['color'] = []
-            if 'depth' not in rets: rets['depth'] = []
-            rets['color'].append(np.clip(res['color'].detach().cpu().numpy().transpose(1, 2, 0) * 255, 0, 255).astype(np.uint8))
-            if 'percent_depth' in res:
-                rets['depth'].append(res['percent_depth'].detach().cpu().numpy())
-            elif 'depth' in res:
-                rets['depth'].append(res['depth'].detach().cpu().numpy())
+            buffer, event = images, None
+        self.pending.setdefault(key, []).append((buffer, event))
+
+    def collect(self):
+        rets = {}
+        for key, batches in self.pending.items():
+            rets[key] = []
+            for buffer, event in batches:
+                if buffer is None:
+                    rets[key].append(None)
+                    continue
+                if event is not None:
+                    event.synchronize()
+                rets[key].extend(list(buffer.numpy()))
+        return rets
+
+
+def _to_uint8(images):
+    """[B, C, H, W] images in [0, 1] to [B, H, W, C] uint8, truncating like numpy's astype."""
+    return (images.permute(0, 2, 3, 1) * 255).clamp(0, 255).to(torch.uint8)
+
+
+def render_frames(sample, extrinsics, intrinsics, options={}, colors_overwrite=None, verbose=True, batch_size=16, **kwargs):
+    """
+    Render a sample from several views.
+
+    Views are rendered in batches of `batch_size` (meshes are rasterized together) and
+    converted to uint8 on the device before being copied back asynchronously.
+
+    Returns:
+        dict: Lists of frames: 'normal' ([H, W, 3] uint8) for meshes, 'color' ([H, W, 3] uint8)
+            and 'depth' ([H, W] float or None) otherwise.
+    """
+    renderer = get_renderer(sample, **options)
+    readback = _FrameReadback()
+    num_views = len(extrinsics)
+    with tqdm(total=num_views, desc='Rendering', disable=not verbose) as pbar:
+        for start in range(0, num_views, batch_size):
+            extr = extrinsics[start:start + batch_size]
+            intr = intrinsics[start:start + batch_size]
+            if isinstance(sample, MeshExtractResult):
+                res = renderer.render_batch(sample, torch.stack(list(extr)), torch.stack(list(intr)), return_types=['normal'])
+                readback.push('normal', _to_uint8(res['normal']))
             else:
-                rets['depth'].append(None)
-    return rets
+                colors, depths = [], []
+                for e, i in zip(extr, intr):
+                    res = renderer.render(sample, e, i, colors_overwrite=colors_overwrite)
+                    colors.append(res['color'])
+                    if 'percent_depth' in res:
+                        depths.append(res['percent_depth'])
+                    elif 'depth' in res:
+                        depths.append(res['depth'])
+                    else:
+                        depths.append(None)
+                readback.push('color', _to_uint8(torch.stack(colors).detach()))
+                for depth in depths:
+                    readback.push('depth', None if depth is None else depth.detach()[None])
+            pbar.update(len(extr))
+    return readback.collect()
+
+
+def _camera_device(sample):
+    """Build cameras where the sample lives, so meshes on the CPU render without CUDA."""
+    if isinstance(sample, MeshExtractResult):
+        return sample.vertices.device
+    return 'cuda'
 
 
 def render_video(sample, resolution=512, bg_color=(0, 0, 0), num_frames=300, r=2, fov=40, **kwargs):
@@ -96,7 +168,7 @@ def render_video(sample, resolution=512, bg_color=(0, 0, 0), num_frames=300, r=2
     pitch = 0.25 + 0.5 * torch.sin(torch.linspace(0, 2 * 3.1415, num_frames))
     yaws = yaws.tolist()
     pitch = pitch.tolist()
-    extrinsics, intrinsics = yaw_pitch_r_fov_to_extrinsics_intrinsics(yaws, pitch, r, fov)
+    extrinsics, intrinsics = yaw_pitch_r_fov_to_extrinsics_intrinsics(yaws, pitch, r, fov, device=_camera_device(sample))
     return render_frames(sample, extrinsics, intrinsics, {'resolution': resolution, 'bg_color': bg_color}, **kwargs)
 
 
@@ -106,7 +178,7 @@ def render_multiview(sample, resolution=512, nviews=30):
     cams = [sphere_hammersley_sequence(i, nviews) for i in range(nviews)]
     yaws = [cam[0] for cam in cams]
     pitchs = [cam[1] for cam in cams]
-    extrinsics, intrinsics = yaw_pitch_r_fov_to_extrinsics_intrinsics(yaws, pitchs, r, fov)
+    extrinsics, intrinsics = yaw_pitch_r_fov_to_extrinsics_intrinsics(yaws, pitchs, r, fov, device=_camera_device(sample))
     res = render_frames(sample, extrinsics, intrinsics, {'resolution': resolution, 'bg_color': (0, 0, 0)})
     return res['color'], extrinsics, intrinsics
 
@@ -116,5 +188,5 @@ def render_snapshot(samples, resolution=512, bg_color=(0, 0, 0), offset=(-16 / 1
     yaw_offset = offset[0]
     yaw = [y + yaw_offset for y in yaw]
     pitch = [offset[1] for _ in range(4)]
-    extrinsics, intrinsics = yaw_pitch_r_fov_to_extrinsics_intrinsics(yaw, pitch, r, fov)
+    extrinsics, intrinsics = yaw_pitch_r_fov_to_extrinsics_intrinsics(yaw, pitch, r, fov, device=_camera_device(samples))
     return render_frames(samples, extrinsics, intrinsics, {'resolution': resolution, 'bg_color': bg_color}, **kwargs)
@@ -0,0 +1,165 @@
+from typing import *
+import numpy as np
+import torch
+from tqdm import tqdm
+import trimesh
+from .random_utils import sphere_hammersley_sequence
+
+
+__all__ = [
+    'RasterizeVisibility',
+    'RayCastVisibility',
+    'get_visibility_estimator',
+]
+
+
+def sphere_view_origins(num_views: int, radius: float = 2.0) -> np.ndarray:
+    """
+    Camera positions spread over a sphere around the origin with a Hammersley sequence.
+
+    Returns:
+        np.ndarray: Camera positions. Shape (num_views, 3).
+    """
+    origins = []
+    for i in range(num_views):
+        yaw, pitch = sphere_hammersley_sequence(i, num_views)
+        origins.append([
+            np.sin(yaw) * np.cos(pitch),
+            np.cos(yaw) * np.cos(pitch),
+            np.sin(pitch),
+        ])
+    return np.array(origins, dtype=np.float32) * radius
+
+
+class RasterizeVisibility:
+    """
+    Face visibility from rasterizing the mesh with nvdiffrast from views on a sphere.
+    A face is visible in a view if it covers at least one pixel.
+
+    Args:
+        resolution (int): Resolution of the rasterization.
+        num_views (int): Number of views to rasterize the mesh.
+        radius (float): Distance of the cameras to the origin.
+        fov (float): Field of view of the cameras, in degrees.
+    """
+    device = 'cuda'
+
+    def __init__(self, resolution: int = 1024, num_views: int = 1000, radius: float = 2.0, fov: float = 40):
+        self.resolution = resolution
+        self.num_views = num_views
+        self.radius = radius
+        self.fov = fov
+
+    @torch.no_grad()
+    def __call__(self, verts: torch.Tensor, faces: torch.Tensor, verbose: bool = False) -> torch.Tensor:
+        """
+        Args:
+            verts (torch.Tensor): Vertices of the mesh. Shape (V, 3).
+            faces (torch.Tensor): Faces of the mesh. Shape (F, 3).
+
+        Returns:
+            torch.Tensor: Fraction of views each face is visible in. Shape (F,).
+        """
+        import utils3d
+        origins = torch.tensor(sphere_view_origins(self.num_views, self.radius)).cuda()
+        fov = torch.deg2rad(torch.tensor(self.fov)).cuda()
+        projection = utils3d.torch.perspective_from_fov_xy(fov, fov, 1, 3)
+        target = torch.tensor([0, 0, 0]).float().cuda()
+        up = torch.tensor([0, 0, 1]).float().cuda()
+
+        visblity = torch.zeros(faces.shape[0], dtype=torch.int32, device=verts.device)
+        rastctx = utils3d.torch.RastContext(backend='cuda')
+        for i in tqdm(range(self.num_views), total=self.num_views, disable=not verbose, desc='Rasterizing'):
+            view = utils3d.torch.view_look_at(origins[i], target, up)
+            buffers = utils3d.torch.rasterize_triangle_faces(
+                rastctx, verts[None], faces, self.resolution, self.resolution, view=view, projection=projection
+            )
+            face_id = buffers['face_id'][0][buffers['mask'][0] > 0.95] - 1
+            face_id = torch.unique(face_id).long()
+            visblity[face_id] += 1
+        return visblity.float() / self.num_views
+
+
+class RayCastVisibility:
+    """
+    Face visibility from casting rays through a BVH on the CPU.
+
+    For every view, a ray is cast from the camera to a few sample points on each face.
+    The face is visible in that view if one of its rays hits the face itself first.
+    Rays are traced with trimesh, which uses Embree when it is installed.
+
+    Compared to rasterization, the cost scales with faces x views instead of pixels x views,
+    and faces smaller than a pixel are not missed.
+
+    Args:
+        num_views (int): Number of views to cast rays from.
+        radius (float): Distance of the cameras to the origin.
+        num_samples (int): Sample points per face, 1 (centroid) or 4 (centroid and near each corner).
+        batch_size (int): Maximum number of rays traced at once.
+    """
+    device = 'cpu'
+
+    def __init__(self, num_views: int = 100, radius: float = 2.0, num_samples: int = 4, batch_size: int = 1 << 20):
+        assert num_samples in [1, 4], f"Unsupported number of samples per face: {num_samples}"
+        self.num_views = num_views
+        self.radius = radius
+        self.num_samples = num_samples
+        self.batch_size = batch_size
+
+    def _face_samples(self, triangles: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Sample points of each face. Shape (F, num_samples, 3).
+        """
+        bary = [[1 / 3, 1 / 3, 1 / 3]]
+        if self.num_samples == 4:
+            bary += [[0.6, 0.2, 0.2], [0.2, 0.6, 0.2], [0.2, 0.2, 0.6]]
+        bary = np.array(bary, dtype=np.float64)
+        return np.einsum('sk,fkc->fsc', bary, triangles)
+
+    @torch.no_grad()
+    def __call__(self, verts: torch.Tensor, faces: torch.Tensor, verbose: bool = False) -> torch.Tensor:
+        """
+        Args:
+            verts (torch.Tensor): Vertices of the mesh. Shape (V, 3).
+            faces (torch.Tensor): Faces of the mesh. Shape (F, 3).
+
+        Returns:
+            torch.Tensor: Fraction of views each face is visible in. Shape (F,).
+        """
+        mesh = trimesh.Trimesh(verts.cpu().numpy(), faces.cpu().numpy(), process=False)
+        num_faces = faces.shape[0]
+        samples = self._face_samples(mesh.triangles).reshape(-1, 3)
+        sample_face = np.repeat(np.arange(num_faces), self.num_samples)
+        origins = sphere_view_origins(self.num_views, self.radius).astype(np.float64)
+
+        visible_count = np.zeros(num_faces, dtype=np.int32)
+        views_per_batch = max(1, self.batch_size // samples.shape[0])
+        for start in tqdm(range(0, self.num_views, views_per_batch), disable=not verbose, desc='Ray casting'):
+            batch_origins = origins[start:start + views_per_batch]
+            ray_origins = np.repeat(batch_origins, samples.shape[0], axis=0)
+            ray_directions = np.tile(samples, (batch_origins.shape[0], 1)) - ray_origins
+            ray_directions /= np.linalg.norm(ray_directions, axis=1, keepdims=True)
+            hit = mesh.ray.intersects_first(ray_origins, ray_directions)
+            hit_self = (hit == np.tile(sample_face, batch_origins.shape[0])).reshape(-1, num_faces, self.num_samples)
+            visible_count += hit_self.any(axis=2).sum(axis=0).astype(np.int32)
+        return torch.tensor(visible_count, dtype=torch.float32, device=verts.device) / self.num_views
+
+
+VISIBILITY_ESTIMATORS = {
+    'rasterize': RasterizeVisibility,
+    'raycast': RayCastVisibility,
+}
+
+
+def get_visibility_estimator(name: str, **kwargs):
+    """
+    Create a visibility estimator by name.
+
+    Args:
+        name (str): One of 'rasterize' (nvdiffrast, CUDA) and 'raycast' (BVH, CPU).
+        **kwargs: Arguments of the estimator.
+    """
+    if name not in VISIBILITY_ESTIMATORS:
+        raise ValueError(f"Unknown visibility estimator: {name}")
+    return VISIBILITY_ESTIMATORS[name](**kwargs)
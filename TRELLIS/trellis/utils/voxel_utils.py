@@ -0,0 +1,196 @@
+from typing import *
+import numpy as np
+
+
+__all__ = [
+    'voxelize_triangles',
+    'voxelize_meshes',
+    'voxelize_mesh',
+]
+
+
+def _round(x: np.ndarray) -> np.ndarray:
+    """`std::round` for non-negative values: halves round up rather than to even."""
+    floor = np.floor(x)
+    return floor + (x - floor >= 0.5)
+
+
+def _triangle_box_overlap(v0: List[np.ndarray], v1: List[np.ndarray], v2: List[np.ndarray], half: float) -> np.ndarray:
+    """
+    Separating axis test of triangles against cubes centered at the origin (Akenine-Moller),
+    with the operations in the order of open3d's `IntersectionTest::TriangleAABB`, so the
+    float64 results agree on touching and coplanar cases too.
+
+    Args:
+        v0, v1, v2 (List[np.ndarray]): x, y and z of the triangle vertices relative to the
+            box centers, [P] each.
+        half (float): Half size of the boxes.
+
+    Returns:
+        np.ndarray: [P] bool, whether each triangle overlaps its box.
+    """
+    X, Y, Z = 0, 1, 2
+    e0 = [v1[i] - v0[i] for i in range(3)]
+    e1 = [v2[i] - v1[i] for i in range(3)]
+    e2 = [v0[i] - v2[i] for i in range(3)]
+    overlap = np.ones(v0[0].shape[0], dtype=bool)
+
+    def axis_test(p, q, rad):
+        overlap[(np.minimum(p, q) > rad) | (np.maximum(p, q) < -rad)] = False
+
+    # 9 edge x axis tests
+    for e, (x_first, x_second), (y_first, y_second), (z_first, z_second) in [
+        (e0, (v0, v2), (v0, v2), (v1, v2)),
+        (e1, (v0, v2), (v0, v2), (v0, v1)),
+        (e2, (v0, v1), (v0, v1), (v1, v2)),
+    ]:
+        fe = [np.abs(c) for c in e]
+        a, b = e[Z], e[Y]
+        axis_test(a * x_first[Y] - b * x_first[Z], a * x_second[Y] - b * x_second[Z], fe[Z] * half + fe[Y] * half)
+        a, b = e[Z], e[X]
+        axis_test(-a * y_first[X] + b * y_first[Z], -a * y_second[X] + b * y_second[Z], fe[Z] * half + fe[X] * half)
+        a, b = e[Y], e[X]
+        axis_test(a * z_first[X] - b * z_first[Y], a * z_second[X] - b * z_second[Y], fe[Y] * half + fe[X] * half)
+
+    # box axes
+    for axis in (X, Y, Z):
+        lo = np.minimum(np.minimum(v0[axis], v1[axis]), v2[axis])
+        hi = np.maximum(np.maximum(v0[axis], v1[axis]), v2[axis])
+        overlap[(lo > half) | (hi < -half)] = False
+
+    # triangle plane
+    normal = [
+        e0[Y] * e1[Z] - e0[Z] * e1[Y],
+        e0[Z] * e1[X] - e0[X] * e1[Z],
+        e0[X] * e1[Y] - e0[Y] * e1[X],
+    ]
+    positive = [n > 0 for n in normal]
+    vmin = [np.where(positive[i], -half - v0[i], half - v0[i]) for i in range(3)]
+    vmax = [np.where(positive[i], half - v0[i], -half - v0[i]) for i in range(3)]
+    overlap &= ~(normal[X] * vmin[X] + normal[Y] * vmin[Y] + normal[Z] * vmin[Z] > 0)
+    overlap &= normal[X] * vmax[X] + normal[Y] * vmax[Y] + normal[Z] * vmax[Z] >= 0
+    return overlap
+
+
+def voxelize_triangles(
+    triangles: np.ndarray,
+    resolution: int = 64,
+    batch_ids: Optional[np.ndarray] = None,
+    max_pairs: int = 1 << 20,
+    max_bitmap: int = 1 << 24,
+) -> np.ndarray:
+    """
+    Voxels of the grid over [-0.5, 0.5]^3 that intersect any of the triangles.
+
+    Matches open3d's `VoxelGrid.create_from_triangle_mesh_within_bounds`, which tests the
+    voxels in the bounding box of every triangle, grown by up to two voxels. Candidates
+    beyond the box cannot pass the test and are skipped, and the rest are first culled
+    with a conservative plane distance check; the survivors get open3d's exact test,
+    `max_pairs` (triangle, voxel) pairs at a time. Voxels outside the grid are dropped.
+
+    Args:
+        triangles (np.ndarray): [T, 3, 3] triangle vertices.
+        resolution (int): Voxels per side.
+        batch_ids (np.ndarray): [T] index of the mesh of every triangle, if several are voxelized together.
+        max_pairs (int): Candidate pairs tested at once, bounds the memory use.
+        max_bitmap (int): Largest number of voxels (of all batches) deduplicated with an
+            occupancy bitmap; larger grids are deduplicated by sorting the hits instead.
+
+    Returns:
+        np.ndarray: [N, 3] unique grid indices in lexicographic order, or [N, 4] with the
+            batch index first if `batch_ids` is given.
+    """
+    triangles = np.asarray(triangles, dtype=np.float64)
+    voxel_size = 1 / resolution
+    half = voxel_size / 2
+    lo, hi = triangles.min(axis=1), triangles.max(axis=1)
+    start = np.floor((lo + 0.5) / voxel_size).astype(np.int64)
+    # open3d's range; voxels past the one containing `hi` are disjoint from the triangle
+    stop = start + _round((hi - lo) / voxel_size).astype(np.int64) + 2
+    stop = np.minimum(stop, np.floor((hi + 0.5) / voxel_size + 1e-6).astype(np.int64) + 1)
+    stop = np.minimum(stop, resolution)
+    start = np.maximum(start, 0)
+    counts = np.maximum(stop - start, 0)
+    num_pairs = counts.prod(axis=1)
+    offsets = np.concatenate([[0], np.cumsum(num_pairs)])
+
+    # plane of every triangle for culling, with a tolerance well above the rounding error
+    normal = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 1])
+    plane = np.einsum('ij,ij->i', normal, triangles[:, 0])
+    radius = np.abs(normal).sum(axis=1) * (half + 1e-6)
+
+    # hits as keys ((batch * R + x) * R + y) * R + z, deduplicated in an occupancy bitmap
+    # when it is small enough, which is cheaper than sorting them
+    num_batches = int(batch_ids.max()) + 1 if batch_ids is not None and len(batch_ids) > 0 else 1
+    occupied = np.zeros(num_batches * resolution**3, dtype=bool) if num_batches * resolution**3 <= max_bitmap else None
+    hits = []
+    for first in range(0, int(offsets[-1]), max_pairs):
+        pairs = np.arange(first, min(first + max_pairs, int(offsets[-1])))
+        tri = np.searchsorted(offsets, pairs, side='right') - 1
+        local = pairs - offsets[tri]
+        count_y, count_z = counts[tri, 1], counts[tri, 2]
+        index = [
+            start[tri, 0] + local // (count_y * count_z),
+            start[tri, 1] + local // count_z % count_y,
+            start[tri, 2] + local % count_z,
+        ]
+        center = [(-0.5 + half) + index[i] * voxel_size for i in range(3)]
+        near = np.abs(normal[tri, 0] * center[0] + normal[tri, 1] * center[1] + normal[tri, 2] * center[2] - plane[tri]) <= radius[tri]
+        tri, index, center = tri[near], [c[near] for c in index], [c[near] for c in center]
+        hit = _triangle_box_overlap(
+            [triangles[tri, 0, i] - center[i] for i in range(3)],
+            [triangles[tri, 1, i] - center[i] for i in range(3)],
+            [triangles[tri, 2, i] - center[i] for i in range(3)],
+            half,
+        )
+        batch = batch_ids[tri[hit]].astype(np.int64) if batch_ids is not None else 0
+        keys = ((batch * resolution + index[0][hit]) * resolution + index[1][hit]) * resolution + index[2][hit]
+        if occupied is not None:
+            occupied[keys] = True
+        else:
+            hits.append(np.unique(keys))
+
+    if occupied is not None:
+        keys = np.flatnonzero(occupied)
+    else:
+        keys = np.unique(np.concatenate(hits)) if hits else np.zeros(0, dtype=np.int64)
+    coords = np.stack([keys // resolution**2 % resolution, keys // resolution % resolution, keys % resolution], axis=1)
+    if batch_ids is not None:
+        coords = np.concatenate([(keys // resolution**3)[:, None], coords], axis=1)
+    return coords
+
+
+def voxelize_meshes(
+    meshes: List[Tuple[np.ndarray, np.ndarray]],
+    resolution: int = 64,
+    max_pairs: int = 1 << 20,
+    max_bitmap: int = 1 << 24,
+) -> List[np.ndarray]:
+    """
+    Voxelize several meshes in one pass, see `voxelize_triangles`.
+
+    Args:
+        meshes (List[Tuple[np.ndarray, np.ndarray]]): (vertices [V, 3], faces [F, 3]) of each
+            mesh, with the vertices inside [-0.5, 0.5]^3.
+        resolution (int): Voxels per side.
+
+    Returns:
+        List[np.ndarray]: [N, 3] grid indices of every mesh.
+    """
+    if len(meshes) == 0:
+        return []
+    triangles = np.concatenate([np.asarray(vertices, dtype=np.float64)[np.asarray(faces)] for vertices, faces in meshes])
+    batch_ids = np.repeat(np.arange(len(meshes)), [len(faces) for _, faces in meshes])
+    coords = voxelize_triangles(triangles, resolution, batch_ids, max_pairs, max_bitmap)
+    splits = np.searchsorted(coords[:, 0], np.arange(1, len(meshes)))
+    return [c[:, 1:] for c in np.split(coords, splits)]
+
+
+def voxelize_mesh(vertices: np.ndarray, faces: np.ndarray, resolution: int = 64) -> np.ndarray:
+    """
+    Voxelize a mesh with vertices inside [-0.5, 0.5]^3.
+
+    Returns:
+        np.ndarray: [N, 3] grid indices.
+    """
+    return voxelize_meshes([(vertices, faces)], resolution)[0]